@@ -5,43 +5,98 @@ Implements n8n workflow management and execution capabilities
 
 import asyncio
 import aiohttp
+import hashlib
 import json
+import os
+import random
+import re
+import time
+from pathlib import Path
 from typing import Dict, List, Any, Optional
 from datetime import datetime
 import uuid
 
+# Execution states after which n8n will not change an execution any more
+TERMINAL_STATUSES = {"success", "error", "crashed", "canceled"}
+DEFAULT_REGISTRY_FILE = Path("./config/n8n_workflows.json")
+
 class N8nIntegration:
     """Integration with n8n workflow automation platform"""
     
-    def __init__(self, base_url: str, api_key: str):
+    def __init__(self, base_url: str, api_key: str, max_connections: int = 20,
+                 timeout: float = 30.0, keepalive_timeout: float = 30.0,
+                 webhook_base_url: Optional[str] = None, poll_initial_delay: float = 0.5,
+                 poll_max_delay: float = 10.0, poll_retries: int = 3):
         self.base_url = base_url.rstrip('/')
         self.api_key = api_key
         self.headers = {
             'Content-Type': 'application/json',
             'Authorization': f'Bearer {api_key}'
         }
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.keepalive_timeout = keepalive_timeout
+        # Webhooks are served next to the REST API: http://host:5678/webhook/<path>
+        self.webhook_base_url = (webhook_base_url or self.base_url.rsplit('/api/', 1)[0]).rstrip('/')
+        self.poll_initial_delay = poll_initial_delay
+        self.poll_max_delay = poll_max_delay
+        # Consecutive transient errors (connection, 429, 5xx) tolerated while polling one execution
+        self.poll_retries = poll_retries
+        self._session: Optional[aiohttp.ClientSession] = None
+    
+    def _get_session(self) -> aiohttp.ClientSession:
+        """One long-lived session, so every call reuses pooled keep-alive connections"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.max_connections,
+                    limit_per_host=self.max_connections,
+                    keepalive_timeout=self.keepalive_timeout,
+                    ttl_dns_cache=300
+                ),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers=self.headers
+            )
+        return self._session
+    
+    async def close(self):
+        """Close the pooled connections"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc):
+        await self.close()
     
-    async def _make_request(self, method: str, endpoint: str, data: Optional[Dict] = None) -> Dict[str, Any]:
+    async def _make_request(self, method: str, endpoint: str, data: Optional[Dict] = None,
+                            url: Optional[str] = None) -> Dict[str, Any]:
         """Make authenticated request to n8n API"""
-        url = f"{self.base_url}{endpoint}"
+        url = url or f"{self.base_url}{endpoint}"
         
-        async with aiohttp.ClientSession() as session:
-            try:
-                if method.upper() == 'GET':
-                    async with session.get(url, headers=self.headers) as response:
-                        return await response.json()
-                elif method.upper() in ['POST', 'PUT']:
-                    async with session.post(url, headers=self.headers, json=data) as response:
-                        return await response.json()
-                elif method.upper() == 'PATCH':
-                    async with session.patch(url, headers=self.headers, json=data) as response:
-                        return await response.json()
-            except Exception as e:
-                return {
-                    "success": False,
-                    "error": str(e),
-                    "url": url
-                }
+        try:
+            async with self._get_session().request(method.upper(), url, json=data) as response:
+                try:
+                    body = await response.json(content_type=None)
+                except ValueError:
+                    # e.g. a proxy's plain-text 413 Request Entity Too Large
+                    body = None
+                if response.status >= 400:
+                    return {
+                        "success": False,
+                        "error": (body or {}).get("message") or response.reason,
+                        "status_code": response.status,
+                        "url": url
+                    }
+                return body if body is not None else {}
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "url": url
+            }
     
     async def list_workflows(self) -> Dict[str, Any]:
         """List all available workflows"""
@@ -55,6 +110,23 @@ class N8nIntegration:
         """Create a new workflow"""
         return await self._make_request('POST', '/workflows', workflow_data)
     
+    async def delete_workflow(self, workflow_id: str) -> Dict[str, Any]:
+        """Delete a workflow"""
+        return await self._make_request('DELETE', f'/workflows/{workflow_id}')
+    
+    async def list_all_workflows(self) -> List[Dict[str, Any]]:
+        """List every workflow, following the API's pagination cursor"""
+        workflows: List[Dict[str, Any]] = []
+        cursor = None
+        while True:
+            page = await self._make_request('GET', '/workflows' + (f'?cursor={cursor}' if cursor else ''))
+            if page.get("success") is False:
+                raise RuntimeError(page.get("error"))
+            workflows.extend(page.get("data", []))
+            cursor = page.get("nextCursor")
+            if not cursor:
+                return workflows
+    
     async def execute_workflow(self, workflow_id: str, input_data: Dict[str, Any] = None) -> Dict[str, Any]:
         """Execute a workflow with optional input data"""
         execution_data = {
@@ -66,9 +138,10 @@ class N8nIntegration:
         
         return await self._make_request('POST', '/executions', execution_data)
     
-    async def get_execution(self, execution_id: str) -> Dict[str, Any]:
-        """Get details of a specific execution"""
-        return await self._make_request('GET', f'/executions/{execution_id}')
+    async def get_execution(self, execution_id: str, include_data: bool = False) -> Dict[str, Any]:
+        """Get details of a specific execution, with its node output data if requested"""
+        query = '?includeData=true' if include_data else ''
+        return await self._make_request('GET', f'/executions/{execution_id}{query}')
     
     async def list_executions(self, workflow_id: str = None) -> Dict[str, Any]:
         """List executions, optionally filtered by workflow ID"""
@@ -81,13 +154,297 @@ class N8nIntegration:
     async def stop_execution(self, execution_id: str) -> Dict[str, Any]:
         """Stop a running execution"""
         return await self._make_request('POST', f'/executions/{execution_id}/stop')
+    
+    async def trigger_webhook(self, webhook_path: str, data: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Call a workflow's webhook; with "respond when last node finishes" this returns its result"""
+        url = f"{self.webhook_base_url}/webhook/{webhook_path.lstrip('/')}"
+        return await self._make_request('POST', '', data or {}, url=url)
+    
+    async def _poll_execution(self, execution_id: str, include_data: bool) -> Dict[str, Any]:
+        """get_execution, retrying transient errors up to poll_retries times"""
+        delay = self.poll_initial_delay
+        for attempt in range(self.poll_retries + 1):
+            execution = await self.get_execution(execution_id, include_data=include_data)
+            status_code = execution.get("status_code")
+            transient = status_code is None or status_code == 429 or status_code >= 500
+            if execution.get("success") is not False or not transient or attempt == self.poll_retries:
+                return execution
+            await asyncio.sleep(delay * random.uniform(0.8, 1.2))
+            delay = min(self.poll_max_delay, delay * 2)
+    
+    async def wait_for_execution(self, execution_id: str, timeout: float = 300.0,
+                                 include_data: bool = True) -> Dict[str, Any]:
+        """
+        Poll an execution's status until it finishes, backing off exponentially
+        between polls, then fetch its run data once if `include_data`
+        """
+        started = time.monotonic()
+        delay = self.poll_initial_delay
+        polls = 0
+        while True:
+            execution = await self._poll_execution(execution_id, include_data=False)
+            polls += 1
+            if execution.get("success") is False:
+                return {**execution, "execution_id": execution_id, "polls": polls}
+            status = execution.get("status")
+            if execution.get("finished") or status in TERMINAL_STATUSES:
+                status = status or "success"
+                if include_data:
+                    execution = await self._poll_execution(execution_id, include_data=True)
+                    if execution.get("success") is False:
+                        # The run itself finished; only its data could not be fetched
+                        return {**execution, "execution_id": execution_id, "status": status, "polls": polls}
+                return {
+                    "success": status == "success",
+                    "execution_id": execution_id,
+                    "status": status,
+                    "execution": execution,
+                    "polls": polls,
+                    "wait_seconds": round(time.monotonic() - started, 3)
+                }
+            remaining = timeout - (time.monotonic() - started)
+            if remaining <= 0:
+                return {
+                    "success": False,
+                    "execution_id": execution_id,
+                    "error": f"Execution did not finish within {timeout}s",
+                    "status": status,
+                    "polls": polls
+                }
+            # Jitter keeps many concurrent waiters from polling in lockstep
+            await asyncio.sleep(min(remaining, delay * random.uniform(0.8, 1.2)))
+            delay = min(self.poll_max_delay, delay * 2)
+    
+    async def execute_many(self, workflow_id: str, inputs: List[Dict[str, Any]], concurrency: int = 5,
+                           wait: bool = True, timeout: float = 300.0,
+                           webhook_path: Optional[str] = None, retries: int = 0,
+                           retry_delay: float = 1.0) -> List[Dict[str, Any]]:
+        """
+        Run a workflow once per input with at most `concurrency` runs in flight.
+        With `wait`, each run is followed to completion, through its webhook
+        response when `webhook_path` is given and by polling otherwise.
+        A failed run is retried up to `retries` times with exponential backoff
+        (a missing workflow, HTTP 404, is not retried, nor is a run that
+        succeeded but whose data could not be fetched).
+        Results are returned in input order.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def run_one(index: int, input_data: Dict[str, Any]) -> Dict[str, Any]:
+            async with semaphore:
+                started = time.monotonic()
+                for attempt in range(retries + 1):
+                    if attempt:
+                        await asyncio.sleep(retry_delay * (2 ** (attempt - 1)) * random.uniform(0.8, 1.2))
+                    if webhook_path:
+                        result = await self.trigger_webhook(webhook_path, input_data)
+                    else:
+                        result = await self.execute_workflow(workflow_id, input_data)
+                        execution_id = result.get("id")
+                        if wait and execution_id is not None:
+                            result = await self.wait_for_execution(execution_id, timeout)
+                    if result.get("success") is not False or result.get("status_code") == 404:
+                        break
+                    if result.get("status") == "success":
+                        # It ran; rerunning it would process the input twice
+                        break
+                    if result.get("execution_id") and result.get("status") not in TERMINAL_STATUSES:
+                        # Timed out: stop it so the retry cannot end up processing the input twice
+                        await self.stop_execution(result["execution_id"])
+                return {
+                    "index": index,
+                    "input": input_data,
+                    "result": result,
+                    "attempts": attempt + 1,
+                    "seconds": round(time.monotonic() - started, 3)
+                }
+        
+        return list(await asyncio.gather(*(run_one(i, d) for i, d in enumerate(inputs))))
+
+def execution_output(execution: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """JSON of the items produced by an execution's last node (needs includeData)"""
+    result_data = (execution.get("data") or {}).get("resultData") or {}
+    runs = (result_data.get("runData") or {}).get(result_data.get("lastNodeExecuted"), [])
+    if not runs:
+        return []
+    main = (runs[-1].get("data") or {}).get("main") or [[]]
+    return [item.get("json", {}) for item in main[0] or []]
+
+class WorkflowTemplateRegistry:
+    """
+    Create-once registry mapping workflow templates to n8n workflow IDs.
+    
+    Each template is hashed over its nodes, connections and settings, and the
+    hash is put in the workflow name ("<name> [<key>@<hash>]"). A run looks up
+    the template's workflow in a local JSON cache, then by name in n8n, and
+    creates it only when neither has it. A template whose hash no longer
+    matches is stale: its workflow is replaced and the old one is deleted by
+    gc(), which also removes per-run workflows left behind by older versions.
+    """
+    
+    MARKER = re.compile(r" \[(?P<key>[\w-]+)@(?P<hash>[0-9a-f]{12})\]$")
+    # Timestamped names the run_* helpers gave their throwaway workflows before
+    # templates were registered. create_predefined_workflow's default
+    # "<template> - <hex>" names are deliberate user workflows and never match.
+    LEGACY_NAME = re.compile(r"^(Scraping Workflow|Email Workflow|Data Processing Workflow) - \d{8}_\d{6}$")
+    
+    def __init__(self, n8n: N8nIntegration, templates: Dict[str, Any],
+                 cache_file: Path = DEFAULT_REGISTRY_FILE):
+        self.n8n = n8n
+        self.templates = templates
+        self.cache_file = cache_file
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._cache = self._load_cache()
+    
+    @staticmethod
+    def template_hash(template: Dict[str, Any]) -> str:
+        """Stable hash of what a template does (its name and description are not part of it)"""
+        body = {k: template.get(k) for k in ("nodes", "connections", "settings")}
+        canonical = json.dumps(body, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode()).hexdigest()[:12]
+    
+    def workflow_name(self, key: str) -> str:
+        template = self.templates[key]
+        return f"{template['name']} [{key}@{self.template_hash(template)}]"
+    
+    def _load_cache(self) -> Dict[str, Any]:
+        try:
+            with open(self.cache_file, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def _save_cache(self):
+        self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.cache_file.with_suffix('.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(self._cache, f, indent=2)
+        os.replace(tmp, self.cache_file)
+    
+    def _entries(self) -> Dict[str, Any]:
+        # Workflow IDs only mean something on the instance that issued them
+        return self._cache.setdefault(self.n8n.base_url, {})
+    
+    def cached(self, key: str) -> Optional[Dict[str, Any]]:
+        """Cache entry for a template, if it was created from the current version"""
+        entry = self._entries().get(key)
+        if entry and entry["hash"] == self.template_hash(self.templates[key]):
+            return entry
+        return None
+    
+    def invalidate(self, key: str):
+        """Forget a template's workflow (e.g. it was deleted in n8n)"""
+        if self._entries().pop(key, None) is not None:
+            self._save_cache()
+    
+    async def ensure_workflow(self, key: str) -> Dict[str, Any]:
+        """Workflow ID for a template, creating the workflow only if n8n has none for this version"""
+        if key not in self.templates:
+            return {"success": False, "error": f"Template '{key}' not found"}
+        
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            entry = self.cached(key)
+            if entry:
+                return {"success": True, "workflow_id": entry["workflow_id"], "source": "cache"}
+            
+            name = self.workflow_name(key)
+            source = "lookup"
+            try:
+                workflows = await self.n8n.list_all_workflows()
+            except RuntimeError as e:
+                return {"success": False, "error": str(e)}
+            existing = [w for w in workflows if w.get("name") == name]
+            if existing:
+                workflow_id = existing[0]["id"]
+            else:
+                template = self.templates[key]
+                created = await self.n8n.create_workflow({
+                    "name": name,
+                    "nodes": template["nodes"],
+                    "connections": template["connections"],
+                    "settings": template.get("settings", {})
+                })
+                if "id" not in created:
+                    return {"success": False, "error": created.get("error", "Workflow creation failed"),
+                            "response": created}
+                workflow_id = created["id"]
+                source = "created"
+            
+            self._entries()[key] = {
+                "workflow_id": workflow_id,
+                "hash": self.template_hash(self.templates[key]),
+                "name": name,
+                "registered_at": datetime.now().isoformat()
+            }
+            self._save_cache()
+            return {"success": True, "workflow_id": workflow_id, "source": source}
+    
+    def stale_templates(self) -> List[str]:
+        """Templates whose cached workflow was built from an older version of the template"""
+        return [key for key, entry in self._entries().items()
+                if key in self.templates and entry["hash"] != self.template_hash(self.templates[key])]
+    
+    async def gc(self, dry_run: bool = False, include_legacy: bool = True) -> Dict[str, Any]:
+        """
+        Delete registry workflows that no current template version points at,
+        and (with include_legacy) per-run workflows created before the registry
+        """
+        current = {self.workflow_name(key) for key in self.templates}
+        orphans = []
+        for workflow in await self.n8n.list_all_workflows():
+            name = workflow.get("name", "")
+            if self.MARKER.search(name):
+                if name not in current:
+                    orphans.append(workflow)
+            elif include_legacy and self.LEGACY_NAME.match(name):
+                orphans.append(workflow)
+        
+        deleted, failed = [], []
+        if not dry_run:
+            semaphore = asyncio.Semaphore(self.n8n.max_connections)
+            
+            async def delete(workflow):
+                async with semaphore:
+                    result = await self.n8n.delete_workflow(workflow["id"])
+                    (failed if result.get("success") is False else deleted).append(workflow["id"])
+            
+            await asyncio.gather(*(delete(w) for w in orphans))
+        
+        entries = self._entries()
+        for key in [k for k, e in entries.items() if e["workflow_id"] in deleted or k not in self.templates]:
+            del entries[key]
+        self._save_cache()
+        return {
+            "success": not failed,
+            "orphans": [{"id": w["id"], "name": w.get("name")} for w in orphans],
+            "deleted": deleted,
+            "failed": failed,
+            "dry_run": dry_run
+        }
 
 class N8nWorkflowManager:
     """Higher-level manager for n8n workflows with OpenClaw integration"""
     
-    def __init__(self, n8n_base_url: str, n8n_api_key: str):
-        self.n8n = N8nIntegration(n8n_base_url, n8n_api_key)
+    def __init__(self, n8n_base_url: str, n8n_api_key: str, concurrency: int = 5,
+                 execution_timeout: float = 300.0, registry_file: Optional[Path] = None):
+        self.n8n = N8nIntegration(n8n_base_url, n8n_api_key, max_connections=max(concurrency * 2, 10))
         self.workflow_templates = self._load_workflow_templates()
+        self.registry = WorkflowTemplateRegistry(
+            self.n8n, self.workflow_templates, registry_file or DEFAULT_REGISTRY_FILE
+        )
+        self.concurrency = concurrency
+        self.execution_timeout = execution_timeout
+        self.retry_delay = 1.0
+    
+    async def close(self):
+        """Release the n8n connection pool"""
+        await self.n8n.close()
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc):
+        await self.close()
     
     def _load_workflow_templates(self) -> Dict[str, Any]:
         """Load predefined workflow templates"""
@@ -283,69 +640,152 @@ class N8nWorkflowManager:
         
         return await self.n8n.create_workflow(template)
     
-    async def run_web_scraping_workflow(self, urls: List[str]) -> Dict[str, Any]:
+    async def _execute_template(self, template_name: str, run) -> Dict[str, Any]:
+        """
+        Resolve a template's registered workflow and call `run(workflow_id)`.
+        If n8n no longer has that workflow, it is registered again and run once more.
+        """
+        for attempt in range(2):
+            workflow = await self.registry.ensure_workflow(template_name)
+            if not workflow.get("success"):
+                return workflow
+            workflow_id = workflow["workflow_id"]
+            result = await run(workflow_id)
+            missing = result.get("status_code") == 404 if isinstance(result, dict) else False
+            if not missing or attempt:
+                return {"workflow_id": workflow_id, "source": workflow["source"], "result": result}
+            self.registry.invalidate(template_name)
+    
+    async def run_web_scraping_workflow(self, urls: List[str], concurrency: Optional[int] = None,
+                                        wait: bool = True) -> Dict[str, Any]:
         """Run a web scraping workflow for given URLs"""
-        # First, create the workflow if it doesn't exist
-        workflow_result = await self.create_predefined_workflow("web_scraping", f"Scraping Workflow - {datetime.now().strftime('%Y%m%d_%H%M%S')}")
+        async def run(workflow_id):
+            # Check the workflow still exists first, so a deleted one fails fast instead of once per URL
+            found = await self.n8n.get_workflow(workflow_id)
+            if found.get("success") is False:
+                return found
+            # Execute the workflow for all URLs concurrently, bounded by the semaphore
+            return await self.n8n.execute_many(
+                workflow_id, [{"url": url} for url in urls],
+                concurrency=concurrency or self.concurrency, wait=wait, timeout=self.execution_timeout
+            )
         
-        if not workflow_result.get("success"):
-            return workflow_result
-        
-        workflow_id = workflow_result.get("id")
-        
-        # Execute the workflow for each URL
-        results = []
-        for url in urls:
-            execution_result = await self.n8n.execute_workflow(workflow_id, {"url": url})
-            results.append(execution_result)
+        outcome = await self._execute_template("web_scraping", run)
+        if "result" not in outcome:
+            return outcome
+        if isinstance(outcome["result"], dict):
+            return {"success": False, "workflow_id": outcome["workflow_id"], **outcome["result"]}
         
         return {
             "success": True,
-            "workflow_id": workflow_id,
-            "executions": results,
+            "workflow_id": outcome["workflow_id"],
+            "workflow_source": outcome["source"],
+            "executions": [run["result"] for run in outcome["result"]],
             "urls_processed": len(urls)
         }
     
     async def run_email_workflow(self, sender: str, recipients: List[str], subject: str, body: str) -> Dict[str, Any]:
         """Run an email automation workflow"""
-        workflow_result = await self.create_predefined_workflow("email_automation", f"Email Workflow - {datetime.now().strftime('%Y%m%d_%H%M%S')}")
-        
-        if not workflow_result.get("success"):
-            return workflow_result
-        
-        workflow_id = workflow_result.get("id")
-        
-        # Execute the workflow
-        execution_result = await self.n8n.execute_workflow(workflow_id, {
-            "sender": sender,
-            "recipients": recipients,
-            "subject": subject,
-            "body": body
-        })
+        outcome = await self._execute_template("email_automation", lambda workflow_id: self.n8n.execute_workflow(
+            workflow_id, {
+                "sender": sender,
+                "recipients": recipients,
+                "subject": subject,
+                "body": body
+            }
+        ))
+        if "result" not in outcome:
+            return outcome
         
         return {
-            "success": True,
-            "workflow_id": workflow_id,
-            "execution": execution_result
+            "success": outcome["result"].get("success") is not False,
+            "workflow_id": outcome["workflow_id"],
+            "workflow_source": outcome["source"],
+            "execution": outcome["result"]
         }
     
-    async def run_data_processing_workflow(self, data: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Run a data processing workflow"""
-        workflow_result = await self.create_predefined_workflow("data_processing", f"Data Processing Workflow - {datetime.now().strftime('%Y%m%d_%H%M%S')}")
+    async def run_data_processing_workflow(self, data: List[Dict[str, Any]], chunk_size: Optional[int] = None,
+                                           concurrency: Optional[int] = None,
+                                           retries: int = 2) -> Dict[str, Any]:
+        """
+        Run a data processing workflow.
         
-        if not workflow_result.get("success"):
-            return workflow_result
+        By default `data` is posted as one execution. With `chunk_size`, it is
+        split into batches of that many records that run as separate executions
+        (at most `concurrency` at a time), each retried up to `retries` times on
+        failure. The output items of all chunks are returned in input order.
+        """
+        if chunk_size is None:
+            outcome = await self._execute_template("data_processing", lambda workflow_id: self.n8n.execute_workflow(
+                workflow_id, {"data": data}
+            ))
+            if "result" not in outcome:
+                return outcome
+            
+            return {
+                "success": outcome["result"].get("success") is not False,
+                "workflow_id": outcome["workflow_id"],
+                "workflow_source": outcome["source"],
+                "execution": outcome["result"]
+            }
         
-        workflow_id = workflow_result.get("id")
+        if chunk_size < 1:
+            return {"success": False, "error": "chunk_size must be at least 1"}
+        chunks = [data[i:i + chunk_size] for i in range(0, len(data), chunk_size)]
         
-        # Execute the workflow
-        execution_result = await self.n8n.execute_workflow(workflow_id, {"data": data})
+        async def run(workflow_id):
+            found = await self.n8n.get_workflow(workflow_id)
+            if found.get("success") is False:
+                return found
+            return await self.n8n.execute_many(
+                workflow_id, [{"data": chunk} for chunk in chunks],
+                concurrency=concurrency or self.concurrency, timeout=self.execution_timeout,
+                retries=retries, retry_delay=self.retry_delay
+            )
         
+        outcome = await self._execute_template("data_processing", run)
+        if "result" not in outcome:
+            return outcome
+        if isinstance(outcome["result"], dict):
+            return {"success": False, "workflow_id": outcome["workflow_id"], **outcome["result"]}
+        
+        results, chunk_reports = [], []
+        for run_result, chunk in zip(outcome["result"], chunks):
+            result = run_result["result"]
+            report = {
+                "index": run_result["index"],
+                "records": len(chunk),
+                "attempts": run_result["attempts"],
+                "seconds": run_result["seconds"],
+                "success": result.get("success") is not False
+            }
+            if report["success"]:
+                # Chunks finish in any order; zip over the ordered runs keeps the input order
+                results.extend(execution_output(result.get("execution", {})))
+            else:
+                report["error"] = result.get("error") or result.get("status")
+            chunk_reports.append(report)
+        
+        failed = [r["index"] for r in chunk_reports if not r["success"]]
         return {
-            "success": True,
-            "workflow_id": workflow_id,
-            "execution": execution_result
+            "success": not failed,
+            "workflow_id": outcome["workflow_id"],
+            "workflow_source": outcome["source"],
+            "results": results,
+            "chunks": chunk_reports,
+            "failed_chunks": failed,
+            "records_processed": sum(r["records"] for r in chunk_reports if r["success"])
         }
+    
+    async def garbage_collect_workflows(self, dry_run: bool = False) -> Dict[str, Any]:
+        """Delete stale template workflows and leftover per-run workflows from n8n"""
+        try:
+            return await self.registry.gc(dry_run=dry_run)
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e)
+            }
 
 # Example usage and testing
 async def test_n8n_integration():
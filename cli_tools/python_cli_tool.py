@@ -4,25 +4,170 @@ Implements the CLI tools enhancement strategies with proper integration to skill
 """
 
 import argparse
+import atexit
+import re
+import signal
 import subprocess
 import sys
 import os
 import json
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
 import asyncio
 import aiohttp
+import threading
+import time
 from pathlib import Path
 
+# Stats sampling and connectivity probes are shared with the MCP servers
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "mcp-servers"))
+
+from net_probe import DNSCache, probe, probe_many
+from stats_sampler import StatsSampler
+
+# Substrings that make a command unsafe to pass to the shell, whatever the allowlist says
+DANGEROUS_PATTERNS = (
+    '&&', '||', ';', '`', '$(', '>/dev/', '</dev/', '>/proc/',
+    '&>', '>&', '<&', 'eval', 'exec', 'source', 'import os'
+)
+
+class AllowlistCache:
+    """
+    Allowlist parsed once into a command-name set and compiled regexes, reloaded
+    when the file changes. A missing, unreadable or malformed file revokes
+    everything; `on_error` is called once per distinct load error.
+    """
+    
+    def __init__(self, path: Path, check_interval: float = 1.0,
+                 on_error: Optional[Callable[[str], None]] = None):
+        self.path = Path(path)
+        self.check_interval = check_interval
+        self.on_error = on_error
+        self.commands = frozenset()
+        self.patterns = ()
+        self.reloads = 0
+        self.last_error: Optional[str] = None
+        self._signature = None
+        self._checked_at = float("-inf")
+        self._lock = threading.Lock()
+    
+    def _refresh(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        with self._lock:
+            self._checked_at = now
+            try:
+                stat = os.stat(self.path)
+                signature = (stat.st_mtime_ns, stat.st_size)
+                if signature == self._signature:
+                    return
+                with open(self.path, 'r') as f:
+                    allowlist = json.load(f)
+                if not isinstance(allowlist, dict):
+                    raise ValueError("expected a JSON object")
+            except (OSError, ValueError) as e:
+                # Fail closed; the file is read again once it changes
+                self._clear()
+                error = f"Cannot load allowlist {self.path}: {e}"
+                if error != self.last_error:
+                    self.last_error = error
+                    if self.on_error is not None:
+                        self.on_error(error)
+                return
+            patterns = []
+            for pattern in allowlist.get("approved_patterns", []):
+                try:
+                    patterns.append(re.compile(pattern))
+                except re.error:
+                    continue
+            self.commands = frozenset(allowlist.get("approved_commands", []))
+            self.patterns = tuple(patterns)
+            self._signature = signature
+            self.last_error = None
+            self.reloads += 1
+    
+    def _clear(self):
+        self.commands = frozenset()
+        self.patterns = ()
+        self._signature = None
+    
+    def allows(self, command: str) -> bool:
+        """Whether the stripped command's name or full text is approved"""
+        self._refresh()
+        command = command.strip()
+        parts = command.split(maxsplit=1)
+        if not parts:
+            return False
+        if parts[0] in self.commands:
+            return True
+        return any(pattern.match(command) for pattern in self.patterns)
+
+class AuditLogWriter:
+    """
+    Buffers audit log entries in memory and appends them to the log file from a
+    daemon thread, every `flush_interval` seconds or as soon as `max_buffer`
+    entries are waiting, so callers never wait on the file.
+    """
+    
+    def __init__(self, path: Path, flush_interval: float = 1.0, max_buffer: int = 1000):
+        self.path = Path(path)
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.writes = 0
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        atexit.register(self.flush)
+    
+    def write(self, entry: Dict[str, Any]):
+        with self._lock:
+            self._buffer.append(entry)
+            pending = len(self._buffer)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="audit-log-writer", daemon=True)
+                self._thread.start()
+        if pending >= self.max_buffer:
+            self._wake.set()
+    
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+    
+    def flush(self):
+        """Write out everything buffered so far"""
+        with self._write_lock:
+            with self._lock:
+                entries, self._buffer = self._buffer, []
+            if not entries:
+                return
+            # Serialized here rather than in write() to keep that off the callers' path
+            data = "".join(json.dumps(entry) + '\n' for entry in entries)
+            with open(self.path, 'a') as f:
+                f.write(data)
+            self.writes += 1
+
 class OpenClawCLITool:
     """Enhanced CLI tool for OpenClaw integration with security and validation"""
     
-    def __init__(self):
-        self.allowlist_file = Path("./config/cli_allowlist.json")
+    def __init__(self, allowlist_file: Optional[str] = None):
+        self.allowlist_file = Path(allowlist_file or "./config/cli_allowlist.json")
         self.log_file = Path("/tmp/openclaw_python_cli.log")
+        self.audit_log = AuditLogWriter(self.log_file)
+        self.allowlist = AllowlistCache(
+            self.allowlist_file, on_error=lambda error: self._log_activity("allowlist_error", {"error": error})
+        )
         self.security_mode = "strict"  # strict, moderate, relaxed
         self.max_execution_time = 300  # 5 minutes
+        self._stats_sampler: Optional[StatsSampler] = None
+        self.stats_first_window = 0.2  # seconds the first CPU measurement covers
+        self._dns = DNSCache()
         
         # Initialize allowlist if it doesn't exist
         self._init_allowlist()
@@ -63,11 +208,6 @@ class OpenClawCLITool:
             with open(self.allowlist_file, 'w') as f:
                 json.dump(default_allowlist, f, indent=2)
     
-    def _load_allowlist(self) -> Dict[str, Any]:
-        """Load the command allowlist"""
-        with open(self.allowlist_file, 'r') as f:
-            return json.load(f)
-    
     def _log_activity(self, action: str, details: Dict[str, Any]):
         """Log CLI activity for audit purposes"""
         log_entry = {
@@ -75,40 +215,17 @@ class OpenClawCLITool:
             "action": action,
             "details": details
         }
-        with open(self.log_file, 'a') as f:
-            f.write(json.dumps(log_entry) + '\n')
+        self.audit_log.write(log_entry)
     
     def _validate_command(self, command: str) -> bool:
         """Validate command against security rules and allowlist"""
         # Check for dangerous patterns
-        dangerous_patterns = [
-            '&&', '||', ';', '`', '$(', '>/dev/', '</dev/', '>/proc/',
-            '&>', '>&', '<&', 'eval', 'exec', 'source', 'import os'
-        ]
-        
-        for pattern in dangerous_patterns:
+        for pattern in DANGEROUS_PATTERNS:
             if pattern in command:
                 return False
         
-        # Check against allowlist
-        allowlist = self._load_allowlist()
-        command_parts = command.strip().split()
-        if not command_parts:
-            return False
-        
-        cmd_name = command_parts[0]
-        
-        # Check exact command name
-        if cmd_name in allowlist.get("approved_commands", []):
-            return True
-        
-        # Check patterns
-        import re
-        for pattern in allowlist.get("approved_patterns", []):
-            if re.match(pattern, command.strip()):
-                return True
-        
-        return False
+        # Check against the cached allowlist (re-read only when the file changes)
+        return self.allowlist.allows(command)
     
     async def run_command_securely(self, command: str, description: str = "", timeout: int = 30) -> Dict[str, Any]:
         """Run a command with security validation"""
@@ -139,7 +256,8 @@ class OpenClawCLITool:
             process = await asyncio.create_subprocess_shell(
                 command,
                 stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
+                stderr=asyncio.subprocess.PIPE,
+                start_new_session=True
             )
             
             try:
@@ -169,7 +287,11 @@ class OpenClawCLITool:
                 return result
                 
             except asyncio.TimeoutError:
-                process.kill()
+                # Kill the whole process group: children of the shell would keep the pipes open
+                try:
+                    os.killpg(process.pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
                 await process.wait()
                 
                 error_msg = f"Command '{command}' timed out after {timeout} seconds"
@@ -183,7 +305,19 @@ class OpenClawCLITool:
                     "command": command,
                     "timeout": timeout
                 }
-                
+
+            except asyncio.CancelledError:
+                # The caller gave up (e.g. a batch consumer stopped early): don't orphan the command
+                try:
+                    os.killpg(process.pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+                await process.wait()
+                self._log_activity("command_cancelled", {
+                    "command": command
+                })
+                raise
+
         except Exception as e:
             error_msg = f"Failed to execute command '{command}': {str(e)}"
             self._log_activity("execution_error", {
@@ -196,32 +330,117 @@ class OpenClawCLITool:
                 "command": command
             }
     
+    async def iter_batch(self, commands: List[str], concurrency: int = 8, timeout: int = 30,
+                         description: str = "") -> AsyncIterator[Dict[str, Any]]:
+        """Run independent commands with at most `concurrency` at once, yielding each result as it finishes"""
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def run_one(index: int, command: str) -> Dict[str, Any]:
+            queued = time.perf_counter()
+            async with semaphore:
+                started = time.perf_counter()
+                result = await self.run_command_securely(command, description, timeout)
+            result.update({
+                "index": index,
+                "queue_wait": round(started - queued, 6),
+                "elapsed": round(time.perf_counter() - started, 6)
+            })
+            return result
+        
+        tasks = [asyncio.ensure_future(run_one(i, c)) for i, c in enumerate(commands)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # The consumer stopped early: don't leave commands running in the background
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+    
+    async def run_batch(self, commands: List[str], concurrency: int = 8, timeout: int = 30,
+                        description: str = "",
+                        on_result: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """Run a batch of commands concurrently; results come back in input order with timing stats"""
+        started = time.perf_counter()
+        results: List[Optional[Dict[str, Any]]] = [None] * len(commands)
+        try:
+            async for result in self.iter_batch(commands, concurrency, timeout, description):
+                results[result["index"]] = result
+                if on_result:
+                    on_result(result)
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e)
+            }
+        wall = time.perf_counter() - started
+        
+        elapsed = sorted(r["elapsed"] for r in results)
+        rejected = sum(1 for r in results if "failed security validation" in r.get("error", ""))
+        timed_out = sum(1 for r in results if "timeout" in r)
+        busy = sum(elapsed)
+        
+        def percentile(q: float) -> float:
+            return elapsed[min(len(elapsed) - 1, int(q * len(elapsed)))] if elapsed else 0.0
+        
+        self._log_activity("batch_executed", {
+            "commands": len(commands),
+            "concurrency": concurrency,
+            "wall_seconds": round(wall, 3)
+        })
+        return {
+            "success": all(r["success"] for r in results),
+            "results": results,
+            "stats": {
+                "commands": len(commands),
+                "succeeded": sum(1 for r in results if r["success"]),
+                "failed": sum(1 for r in results if not r["success"]),
+                "rejected": rejected,
+                "timed_out": timed_out,
+                "concurrency": concurrency,
+                "wall_seconds": round(wall, 6),
+                "total_command_seconds": round(busy, 6),
+                "min_seconds": elapsed[0] if elapsed else 0.0,
+                "mean_seconds": round(busy / len(elapsed), 6) if elapsed else 0.0,
+                "p50_seconds": percentile(0.5),
+                "p95_seconds": percentile(0.95),
+                "max_seconds": elapsed[-1] if elapsed else 0.0,
+                "max_queue_wait_seconds": max((r["queue_wait"] for r in results), default=0.0),
+                # How much the pool overlapped: 1.0 means effectively sequential
+                "parallelism": round(busy / wall, 3) if wall > 0 else 0.0
+            }
+        }
+    
     def get_system_stats(self) -> Dict[str, Any]:
-        """Get system statistics"""
+        """Get system statistics from the shared sampler"""
         import psutil
         
         try:
-            cpu_percent = psutil.cpu_percent(interval=1)
-            memory = psutil.virtual_memory()
-            disk = psutil.disk_usage('/')
+            if self._stats_sampler is None:
+                self._stats_sampler = StatsSampler()
+                # CPU percent is measured between samples, so give the first one a short window
+                time.sleep(self.stats_first_window)
+            sample = self._stats_sampler.latest(max_age=self._stats_sampler.interval)
+            memory = sample["memory"]
+            disk = sample["disk"]
             
             stats = {
-                "timestamp": datetime.now().isoformat(),
+                "timestamp": datetime.fromtimestamp(sample["timestamp"]).isoformat(),
                 "cpu": {
-                    "percent": cpu_percent,
-                    "count": psutil.cpu_count()
+                    "percent": sample["cpu"]["percent"],
+                    "count": sample["cpu"]["count"]
                 },
                 "memory": {
-                    "total_gb": round(memory.total / (1024**3), 2),
-                    "available_gb": round(memory.available / (1024**3), 2),
-                    "percent_used": memory.percent,
-                    "used_gb": round(memory.used / (1024**3), 2)
+                    "total_gb": round(memory["total"] / (1024**3), 2),
+                    "available_gb": round(memory["available"] / (1024**3), 2),
+                    "percent_used": memory["percent"],
+                    "used_gb": round(memory["used"] / (1024**3), 2)
                 },
                 "disk": {
-                    "total_gb": round(disk.total / (1024**3), 2),
-                    "used_gb": round(disk.used / (1024**3), 2),
-                    "free_gb": round(disk.free / (1024**3), 2),
-                    "percent_used": round((disk.used / disk.total) * 100, 2)
+                    "total_gb": round(disk["total"] / (1024**3), 2),
+                    "used_gb": round(disk["used"] / (1024**3), 2),
+                    "free_gb": round(disk["free"] / (1024**3), 2),
+                    "percent_used": round((disk["used"] / disk["total"]) * 100, 2)
                 },
                 "uptime": psutil.boot_time()
             }
@@ -262,23 +481,36 @@ class OpenClawCLITool:
                 "error": str(e)
             }
     
+    async def probe_connectivity(self, targets: List[str], timeout: float = 5, concurrency: int = 64) -> Dict[str, Any]:
+        """Probe many host:port targets concurrently; DNS answers are cached between probes"""
+        started = time.perf_counter()
+        try:
+            results = await probe_many(targets, timeout, concurrency, self._dns)
+            return {
+                "success": True,
+                "results": results,
+                "connected": sum(1 for r in results if r["is_connected"]),
+                "failed": sum(1 for r in results if not r["is_connected"]),
+                "elapsed_ms": round((time.perf_counter() - started) * 1000, 3)
+            }
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e)
+            }
+    
     def check_connectivity(self, host: str = "google.com", port: int = 80, timeout: int = 5) -> Dict[str, Any]:
         """Check network connectivity to a host and port"""
         try:
-            import socket
-            
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
-                sock.settimeout(timeout)
-                result = sock.connect_ex((host, port))
-                
-                return {
-                    "success": True,
-                    "host": host,
-                    "port": port,
-                    "is_connected": result == 0,
-                    "status_code": result,
-                    "timeout": timeout
-                }
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                result = asyncio.run(probe(host, port, timeout, self._dns))
+            else:
+                # asyncio.run cannot nest inside a running loop; probe on a worker thread's own loop
+                with ThreadPoolExecutor(max_workers=1) as executor:
+                    result = executor.submit(asyncio.run, probe(host, port, timeout, self._dns)).result()
+            return {"success": True, **result, "timeout": timeout}
         except Exception as e:
             return {
                 "success": False,
@@ -294,10 +526,12 @@ def main():
     parser.add_argument("--desc", "--description", default="", help="Description of the command")
     parser.add_argument("--timeout", type=int, default=30, help="Timeout in seconds")
     parser.add_argument("--allowlist", help="Custom allowlist file")
+    parser.add_argument("--file", help="For batch: file with one command per line ('-' for stdin)")
+    parser.add_argument("--concurrency", type=int, default=8, help="For batch: max commands running at once")
     
     args = parser.parse_args()
     
-    cli_tool = OpenClawCLITool()
+    cli_tool = OpenClawCLITool(args.allowlist)
     
     # Handle special commands
     if args.command == "monitor":
@@ -320,6 +554,30 @@ def main():
         result = cli_tool.check_connectivity(host, port, timeout)
         print(json.dumps(result, indent=2))
         
+    elif args.command == "probe":
+        if not args.args:
+            print("Error: At least one host:port target is required")
+            sys.exit(1)
+        
+        result = asyncio.run(cli_tool.probe_connectivity(args.args, args.timeout))
+        print(json.dumps(result, indent=2))
+        
+    elif args.command == "batch":
+        commands = list(args.args or [])
+        if args.file:
+            with (sys.stdin if args.file == "-" else open(args.file)) as f:
+                commands += [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+        if not commands:
+            print("Error: Commands to run are required (--args or --file)")
+            sys.exit(1)
+        
+        # One JSON line per command as it finishes, then the batch summary
+        result = asyncio.run(cli_tool.run_batch(
+            commands, args.concurrency, args.timeout, args.desc,
+            on_result=lambda r: print(json.dumps(r), flush=True)
+        ))
+        print(json.dumps({k: result[k] for k in ("success", "stats", "error") if k in result}))
+        
     elif args.command == "run":
         if not args.args:
             print("Error: Command to run is required")
@@ -7,12 +7,13 @@ Provides a local API interface to run Kimi K2.5 model using llama.cpp server
 import asyncio
 import json
 from typing import Dict, Any, List, Optional
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field
 from datetime import datetime
-import subprocess
-import threading
+import random
 import time
+import aiohttp
 import requests
 from contextlib import asynccontextmanager
 
@@ -29,81 +30,280 @@ class ChatCompletionRequest(BaseModel):
 
 
 class HealthResponse(BaseModel):
-    """Health check response"""
+    """Health check response (liveness)"""
     status: str = "healthy"
     model: str = "kimi-k25-local"
     timestamp: datetime = Field(default_factory=datetime.now)
     local_deployed: bool = True
+    ready: bool = False
+    llama_server: str = "stopped"
+
+
+class ReadinessResponse(BaseModel):
+    """Readiness check response"""
+    ready: bool
+    llama_server: str
+    warmed_up: bool
+    restarts: int
+    managed: bool
+    last_error: Optional[str] = None
+    timestamp: datetime = Field(default_factory=datetime.now)
 
 
 # Global variables
 LLAMA_SERVER_URL = "http://127.0.0.1:8000/v1"  # Default llama.cpp server
-SERVER_PROCESS = None
-SERVER_READY = False
+
+# Command to start llama.cpp server with Kimi K2.5 model
+# NOTE: This assumes you've already set up llama.cpp and have the model
+LLAMA_SERVER_CMD = [
+    "./llama.cpp/llama-server",
+    "--model", "./models/kimi-k25-quantized/",  # Path to your downloaded model
+    "--host", "127.0.0.1",
+    "--port", "8000",
+    "--n-gpu-layers", "999",
+    "-ot", ".ffn_.*_exps.=CPU",  # Offload MoE layers to CPU
+    "--min-p", "0.01",
+    "--ctx-size", "16384",  # 16K context
+    "--parallel", "1",
+    "--batch-size", "512",
+    "--threads", "8"
+]
+
+
+class LlamaServerSupervisor:
+    """
+    Starts the llama.cpp server, probes it for readiness, warms it up and
+    restarts it with exponential backoff when it crashes.
+
+    Everything runs as a background task on the event loop, so application
+    startup never blocks on the model loading. If the llama-server binary is
+    missing the supervisor runs in external mode and only probes for a
+    manually started server.
+    """
+
+    def __init__(self, cmd: List[str], base_url: str,
+                 startup_timeout: float = 600.0,
+                 probe_timeout: float = 5.0,
+                 min_probe_interval: float = 0.25,
+                 max_probe_interval: float = 5.0,
+                 liveness_interval: float = 10.0,
+                 max_failed_probes: int = 3,
+                 min_restart_backoff: float = 1.0,
+                 max_restart_backoff: float = 60.0,
+                 warmup: bool = True,
+                 warmup_attempts: int = 3):
+        self.cmd = cmd
+        self.base_url = base_url.rstrip("/")
+        self.startup_timeout = startup_timeout
+        self.probe_timeout = probe_timeout
+        self.min_probe_interval = min_probe_interval
+        self.max_probe_interval = max_probe_interval
+        self.liveness_interval = liveness_interval
+        self.max_failed_probes = max_failed_probes
+        self.min_restart_backoff = min_restart_backoff
+        self.max_restart_backoff = max_restart_backoff
+        self.warmup = warmup
+        self.warmup_attempts = warmup_attempts
+
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.managed = True
+        self.state = "stopped"  # starting | warming | ready | restarting | external | stopped
+        self.ready = False
+        self.warmed_up = False
+        self.restarts = 0
+        self.last_error: Optional[str] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    async def start(self):
+        """Start supervising in the background and return immediately"""
+        self._stopping = False
+        self._session = aiohttp.ClientSession()
+        self._task = asyncio.create_task(self._supervise())
+
+    async def stop(self):
+        """Stop supervising and terminate the llama.cpp server"""
+        self._stopping = True
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._terminate()
+        if self._session:
+            await self._session.close()
+            self._session = None
+        self.ready = False
+        self.state = "stopped"
+
+    def readiness(self) -> ReadinessResponse:
+        """Snapshot of the current readiness state"""
+        return ReadinessResponse(
+            ready=self.ready,
+            llama_server=self.state,
+            warmed_up=self.warmed_up,
+            restarts=self.restarts,
+            managed=self.managed,
+            last_error=self.last_error,
+        )
+
+    async def probe(self) -> bool:
+        """Return True if the llama.cpp server answers /models"""
+        try:
+            timeout = aiohttp.ClientTimeout(total=self.probe_timeout)
+            async with self._session.get(f"{self.base_url}/models", timeout=timeout) as response:
+                return response.status == 200
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            return False
+
+    async def _supervise(self):
+        backoff = self.min_restart_backoff
+        while not self._stopping:
+            if self.managed and not await self._spawn():
+                continue
+
+            # A server that answers probes but cannot complete is not ready: restart it
+            if await self._wait_until_ready() and await self._warm_up():
+                self.ready = True
+                self.state = "ready" if self.managed else "external"
+                print("✅ Local Kimi K2.5 server is ready!")
+                backoff = self.min_restart_backoff
+                await self._monitor()
+                self.ready = False
+
+            if self._stopping:
+                break
+
+            if not self.managed:
+                # Nothing to restart; go back to probing for an external server
+                self.state = "external"
+                continue
+
+            await self._terminate()
+            self.restarts += 1
+            self.state = "restarting"
+            delay = random.uniform(backoff / 2, backoff)
+            print(f"⚠️  llama.cpp server is down ({self.last_error}), restarting in {delay:.1f}s...")
+            await asyncio.sleep(delay)
+            backoff = min(backoff * 2, self.max_restart_backoff)
+
+    async def _spawn(self) -> bool:
+        """Start the llama.cpp process; fall back to external mode if it is missing"""
+        self.state = "starting"
+        print("Starting local llama.cpp server for Kimi K2.5...")
+        try:
+            self.process = await asyncio.create_subprocess_exec(
+                *self.cmd,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.DEVNULL,
+            )
+            return True
+        except FileNotFoundError:
+            print("⚠️  llama.cpp server not found. Make sure you've run setup_local_kimi.sh and downloaded the model.")
+            print("⚠️  You can still use this API if you manually start llama.cpp server separately.")
+        except Exception as e:
+            print(f"⚠️  Error starting llama.cpp server: {e}")
+            print("⚠️  You can still use this API if you manually start llama.cpp server separately.")
+        self.managed = False
+        self.state = "external"
+        return False
+
+    async def _wait_until_ready(self) -> bool:
+        """Probe /models with exponential backoff until the server answers"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.startup_timeout
+        delay = self.min_probe_interval
+        while not self._stopping:
+            if self.managed and self.process.returncode is not None:
+                self.last_error = f"llama.cpp server exited with code {self.process.returncode}"
+                return False
+            if await self.probe():
+                return True
+            if self.managed and loop.time() >= deadline:
+                self.last_error = f"llama.cpp server not ready after {self.startup_timeout:.0f}s"
+                return False
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_probe_interval)
+        return False
+
+    async def _warm_up(self) -> bool:
+        """
+        Send a tiny completion so weights and caches are paged in before traffic.
+        Returns False if no attempt out of warmup_attempts succeeded.
+        """
+        if not self.warmup:
+            return True
+        self.state = "warming"
+        self.warmed_up = False
+        payload = {
+            "model": "kimi-k25-local",
+            "messages": [{"role": "user", "content": "Hi"}],
+            "max_tokens": 1,
+            "temperature": 0.0,
+        }
+        delay = self.min_probe_interval
+        for _ in range(self.warmup_attempts):
+            try:
+                async with self._session.post(f"{self.base_url}/chat/completions", json=payload) as response:
+                    await response.read()
+                    self.warmed_up = response.status == 200
+                    if self.warmed_up:
+                        return True
+                    self.last_error = f"Warm-up request returned status {response.status}"
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                self.last_error = f"Warm-up request failed: {e}"
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_probe_interval)
+        return False
+
+    async def _monitor(self):
+        """Return once the server has crashed or stopped answering probes"""
+        failed_probes = 0
+        while not self._stopping:
+            if self.managed:
+                try:
+                    await asyncio.wait_for(self.process.wait(), timeout=self.liveness_interval)
+                    self.last_error = f"llama.cpp server exited with code {self.process.returncode}"
+                    return
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                await asyncio.sleep(self.liveness_interval)
+
+            if await self.probe():
+                failed_probes = 0
+                continue
+            failed_probes += 1
+            if failed_probes >= self.max_failed_probes:
+                self.last_error = f"llama.cpp server failed {failed_probes} consecutive probes"
+                return
+
+    async def _terminate(self):
+        if self.process and self.process.returncode is None:
+            print("Shutting down local Kimi K2.5 server...")
+            self.process.terminate()
+            try:
+                await asyncio.wait_for(self.process.wait(), timeout=10)
+            except asyncio.TimeoutError:
+                self.process.kill()
+                await self.process.wait()
+        self.process = None
+
+
+SUPERVISOR = LlamaServerSupervisor(LLAMA_SERVER_CMD, LLAMA_SERVER_URL)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Handle startup and shutdown of the llama.cpp server"""
-    global SERVER_PROCESS, SERVER_READY
-    
-    # Startup
-    print("Starting local llama.cpp server for Kimi K2.5...")
-    
-    # Start the llama.cpp server in a subprocess
-    # NOTE: This assumes you've already set up llama.cpp and have the model
-    try:
-        # Command to start llama.cpp server with Kimi K2.5 model
-        cmd = [
-            "./llama.cpp/llama-server",
-            "--model", "./models/kimi-k25-quantized/",  # Path to your downloaded model
-            "--host", "127.0.0.1",
-            "--port", "8000",
-            "--n-gpu-layers", "999",
-            "-ot", ".ffn_.*_exps.=CPU",  # Offload MoE layers to CPU
-            "--min-p", "0.01",
-            "--ctx-size", "16384",  # 16K context
-            "--parallel", "1",
-            "--batch-size", "512",
-            "--threads", "8"
-        ]
-        
-        SERVER_PROCESS = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        
-        # Wait a bit for the server to start
-        time.sleep(5)
-        
-        # Check if server is responding
-        max_wait = 60  # Wait up to 60 seconds
-        waited = 0
-        while waited < max_wait and not SERVER_READY:
-            try:
-                response = requests.get(f"{LLAMA_SERVER_URL}/models", timeout=5)
-                if response.status_code == 200:
-                    SERVER_READY = True
-                    print("✅ Local Kimi K2.5 server is ready!")
-                    break
-            except requests.exceptions.RequestException:
-                time.sleep(2)
-                waited += 2
-        
-        if not SERVER_READY:
-            print("⚠️  Could not confirm server is ready, but continuing...")
-        
-    except FileNotFoundError:
-        print("⚠️  llama.cpp server not found. Make sure you've run setup_local_kimi.sh and downloaded the model.")
-        print("⚠️  You can still use this API if you manually start llama.cpp server separately.")
-    except Exception as e:
-        print(f"⚠️  Error starting llama.cpp server: {e}")
-        print("⚠️  You can still use this API if you manually start llama.cpp server separately.")
-    
+    """Supervise the llama.cpp server in the background for the app's lifetime"""
+    await SUPERVISOR.start()
+
     yield  # Run the application
-    
-    # Shutdown
-    if SERVER_PROCESS:
-        print("Shutting down local Kimi K2.5 server...")
-        SERVER_PROCESS.terminate()
-        SERVER_PROCESS.wait()
+
+    await SUPERVISOR.stop()
 
 
 app = FastAPI(
@@ -114,10 +314,40 @@ app = FastAPI(
 )
 
 
+def _require_ready():
+    """Refuse traffic until the llama.cpp server is ready and warmed up"""
+    if not SUPERVISOR.ready:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Local llama.cpp server is not ready ({SUPERVISOR.state})",
+            headers={"Retry-After": "5"},
+        )
+
+
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
-    """Health check endpoint"""
-    return HealthResponse(local_deployed=True)
+    """Liveness endpoint: the API process is up, readiness is reported alongside"""
+    return HealthResponse(
+        status="healthy" if SUPERVISOR.ready else "degraded",
+        local_deployed=True,
+        ready=SUPERVISOR.ready,
+        llama_server=SUPERVISOR.state,
+    )
+
+
+@app.get("/health/live", response_model=HealthResponse)
+async def liveness_check():
+    """Liveness endpoint (alias of /health)"""
+    return await health_check()
+
+
+@app.get("/health/ready", response_model=ReadinessResponse)
+async def readiness_check():
+    """Readiness endpoint: 503 until llama.cpp answers and has been warmed up"""
+    readiness = SUPERVISOR.readiness()
+    if not readiness.ready:
+        return JSONResponse(status_code=503, content=readiness.model_dump(mode="json"))
+    return readiness
 
 
 @app.get("/models")
@@ -148,6 +378,7 @@ async def chat_completions(request: ChatCompletionRequest):
     
     This proxies the request to the underlying llama.cpp server
     """
+    _require_ready()
     try:
         # Prepare the payload for llama.cpp server
         payload = {
@@ -181,6 +412,8 @@ async def chat_completions(request: ChatCompletionRequest):
         
         return response.json()
         
+    except HTTPException:
+        raise
     except requests.exceptions.ConnectionError:
         raise HTTPException(status_code=503, detail="Local llama.cpp server is not running")
     except requests.exceptions.Timeout:
@@ -0,0 +1,360 @@
+"""
+Columnar batch engine for ResearchAnalysisMCP.process_data
+
+Input (an inline list of dicts, or a CSV/JSONL file) is read in chunks and
+each chunk is transposed into columns once. The requested operations then run
+as a fused pipeline over those columns: renames happen once per column rather
+than once per row, and row filtering is a boolean mask applied column by
+column (NumPy when installed, itertools.compress otherwise). Deduplication
+keeps a set of 64-bit row hashes across chunks, so memory grows with the
+number of distinct rows rather than their size, and unhashable values
+(lists, dicts) are hashed through their canonical JSON.
+
+PyArrow, when installed, is used to parse CSV input straight into columns.
+Every CSV column is read as text on both paths, so a later block can never
+disagree with types inferred from an earlier one.
+"""
+
+import csv
+import json
+import tempfile
+from itertools import chain, compress, islice
+from operator import methodcaller
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = pa_csv = None
+
+OPERATIONS = ("clean", "deduplicate", "standardize")
+DEFAULT_CHUNK_SIZE = 50_000
+
+
+class _Missing:
+    """Marks a key absent from a row (distinct from an explicit None)"""
+
+    def __repr__(self):
+        return "MISSING"
+
+
+MISSING = _Missing()
+
+
+class Chunk:
+    """A block of rows stored as equal-length columns"""
+
+    def __init__(self, columns: Dict[str, Sequence[Any]], length: int):
+        self.columns = columns
+        self.length = length
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Dict[str, Any]]) -> "Chunk":
+        names = dict.fromkeys(chain.from_iterable(rows))
+        return cls({name: list(map(methodcaller("get", name, MISSING), rows)) for name in names}, len(rows))
+
+    def column_lists(self, names: Sequence[str]) -> List[List[Any]]:
+        # Iterating Python lists is much faster than iterating object ndarrays
+        return [_as_list(self.columns[name]) for name in names]
+
+    def to_rows(self) -> List[Dict[str, Any]]:
+        names = list(self.columns)
+        if not names:
+            return [{} for _ in range(self.length)]
+        rows = []
+        for values in zip(*self.column_lists(names)):
+            if MISSING in values:
+                rows.append({name: value for name, value in zip(names, values) if value is not MISSING})
+            else:
+                rows.append(dict(zip(names, values)))
+        return rows
+
+    def select(self, mask: Sequence[bool]) -> "Chunk":
+        if np is not None:
+            mask = np.asarray(mask, dtype=bool)
+            columns = {name: _object_array(column)[mask] for name, column in self.columns.items()}
+            return Chunk(columns, int(mask.sum()))
+        columns = {name: list(compress(column, mask)) for name, column in self.columns.items()}
+        return Chunk(columns, sum(1 for keep in mask if keep))
+
+
+def _as_list(column: Sequence[Any]) -> List[Any]:
+    return column.tolist() if np is not None and isinstance(column, np.ndarray) else column
+
+
+def _object_array(column: Sequence[Any]) -> "np.ndarray":
+    # fromiter keeps list/dict values as single elements instead of adding dimensions
+    if isinstance(column, np.ndarray):
+        return column
+    return np.fromiter(column, dtype=object, count=len(column))
+
+
+def _blank_mask(column: Sequence[Any]) -> Sequence[bool]:
+    """True where the value is missing, None or an empty string"""
+    if np is not None:
+        values = _object_array(column)
+        return (values == None) | (values == "") | (values == MISSING)  # noqa: E711 - elementwise
+    return [value is None or value is MISSING or value == "" for value in column]
+
+
+def _standard_name(name: str) -> str:
+    return name.lower().strip().replace(" ", "_")
+
+
+def _row_hash(names: tuple, values: tuple) -> int:
+    """Hash of a row's present (name, value) pairs; names must be sorted"""
+    try:
+        return hash((hash(names), values))
+    except TypeError:
+        return hash(json.dumps([names, values], sort_keys=True, default=str))
+
+
+class ColumnarPipeline:
+    """
+    Applies clean / deduplicate / standardize to a stream of chunks in one
+    pass. Deduplication state carries over between chunks, so one pipeline
+    instance must see the whole dataset.
+    """
+
+    def __init__(self, operations: Sequence[str]):
+        unknown = [op for op in operations if op not in OPERATIONS]
+        if unknown:
+            raise ValueError(f"Unknown operations: {', '.join(unknown)} (expected one of {', '.join(OPERATIONS)})")
+        self.operations = list(operations)
+        # One seen-set per deduplicate step, keyed by its position in operations
+        self._seen_hashes: Dict[int, set] = {i: set() for i, op in enumerate(self.operations) if op == "deduplicate"}
+        self.stats = {"chunks": 0, "input_rows": 0, "output_rows": 0,
+                      "empty_rows_removed": 0, "duplicates_removed": 0}
+
+    def _clean(self, chunk: Chunk) -> Chunk:
+        columns = {}
+        keep = None
+        for name, column in chunk.columns.items():
+            blank = _blank_mask(column)
+            if np is not None:
+                present = ~blank
+                if not present.any():
+                    continue
+                columns[name] = np.where(present, _object_array(column), MISSING)
+                keep = present if keep is None else keep | present
+            else:
+                if all(blank):
+                    continue
+                columns[name] = [MISSING if is_blank else value for value, is_blank in zip(column, blank)]
+                keep = [not b for b in blank] if keep is None else [k or not b for k, b in zip(keep, blank)]
+        cleaned = Chunk(columns, chunk.length)
+        if keep is None:
+            self.stats["empty_rows_removed"] += chunk.length
+            return Chunk({}, 0)
+        result = cleaned.select(keep)
+        self.stats["empty_rows_removed"] += chunk.length - result.length
+        return result
+
+    @staticmethod
+    def _standardize(chunk: Chunk) -> Chunk:
+        columns: Dict[str, Any] = {}
+        for name, column in chunk.columns.items():
+            standardized_name = _standard_name(name)
+            values = [value.strip() if type(value) is str else value for value in _as_list(column)]
+            if standardized_name in columns:
+                # Like the row-wise version, a later key overwrites an earlier one where present
+                values = [old if new is MISSING else new for old, new in zip(columns[standardized_name], values)]
+            columns[standardized_name] = values
+        return Chunk(columns, chunk.length)
+
+    def _deduplicate(self, chunk: Chunk, step: int) -> Chunk:
+        names = tuple(sorted(chunk.columns))
+        seen = self._seen_hashes[step]
+        keep = []
+        for values in zip(*chunk.column_lists(names)):
+            if MISSING in values:
+                present = [value is not MISSING for value in values]
+                row_hash = _row_hash(tuple(compress(names, present)), tuple(compress(values, present)))
+            else:
+                row_hash = _row_hash(names, values)
+            if row_hash in seen:
+                keep.append(False)
+            else:
+                seen.add(row_hash)
+                keep.append(True)
+        if not names and chunk.length:
+            # Every row is an empty dict: keep the first one ever seen
+            empty_hash = _row_hash((), ())
+            keep = [empty_hash not in seen] + [False] * (chunk.length - 1)
+            seen.add(empty_hash)
+        result = chunk.select(keep)
+        self.stats["duplicates_removed"] += chunk.length - result.length
+        return result
+
+    def output_names(self, names: Iterable[str]) -> List[str]:
+        """Column names as they appear in the output, before blank columns are dropped"""
+        if "standardize" in self.operations:
+            return list(dict.fromkeys(map(_standard_name, names)))
+        return list(names)
+
+    def process_chunk(self, chunk: Chunk) -> Chunk:
+        self.stats["chunks"] += 1
+        self.stats["input_rows"] += chunk.length
+        for step, operation in enumerate(self.operations):
+            if chunk.length == 0:
+                break
+            if operation == "clean":
+                chunk = self._clean(chunk)
+            elif operation == "standardize":
+                chunk = self._standardize(chunk)
+            elif operation == "deduplicate":
+                chunk = self._deduplicate(chunk, step)
+        self.stats["output_rows"] += chunk.length
+        return chunk
+
+    def process_rows(self, rows: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return self.process_chunk(Chunk.from_rows(rows)).to_rows()
+
+
+def _chunked(rows: Iterable[Dict[str, Any]], chunk_size: int) -> Iterator[Chunk]:
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, chunk_size))
+        if not batch:
+            return
+        yield Chunk.from_rows(batch)
+
+
+def _iter_jsonl(path: Path) -> Iterator[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if line.strip():
+                row = json.loads(line)
+                if not isinstance(row, dict):
+                    raise ValueError(f"{path}:{line_number}: expected a JSON object per line")
+                yield row
+
+
+def _rebatch(chunks: Iterable[Chunk], chunk_size: int) -> Iterator[Chunk]:
+    """Regroup chunks with the same columns into chunks of exactly chunk_size rows (the last may be shorter)"""
+    buffered: Optional[Dict[str, List[Any]]] = None
+    length = 0
+    for chunk in chunks:
+        if buffered is None:
+            buffered = {name: list(_as_list(column)) for name, column in chunk.columns.items()}
+        else:
+            for name, column in chunk.columns.items():
+                buffered[name].extend(_as_list(column))
+        length += chunk.length
+        start = 0
+        while length - start >= chunk_size:
+            yield Chunk({name: column[start:start + chunk_size] for name, column in buffered.items()}, chunk_size)
+            start += chunk_size
+        if start:
+            buffered = {name: column[start:] for name, column in buffered.items()}
+            length -= start
+    if length:
+        yield Chunk(buffered, length)
+
+
+def _iter_csv_chunks(path: Path, chunk_size: int) -> Iterator[Chunk]:
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if not header:
+            return
+        if pa_csv is not None:
+            # Arrow blocks are sized in bytes; regroup them into chunk_size rows
+            convert = pa_csv.ConvertOptions(column_types={name: pa.string() for name in header},
+                                            strings_can_be_null=False)
+            batches = pa_csv.open_csv(str(path), read_options=pa_csv.ReadOptions(block_size=1 << 22),
+                                      convert_options=convert)
+            chunks = (Chunk({name: batch.column(i).to_pylist() for i, name in enumerate(batch.schema.names)},
+                            batch.num_rows) for batch in batches)
+            yield from _rebatch(chunks, chunk_size)
+            return
+        while True:
+            block = [row for _, row in zip(range(chunk_size), reader)]
+            if not block:
+                return
+            width = len(header)
+            block = [row + [MISSING] * (width - len(row)) if len(row) < width else row[:width] for row in block]
+            yield Chunk(dict(zip(header, (list(column) for column in zip(*block)))), len(block))
+
+
+def iter_chunks(data: Optional[Sequence[Dict[str, Any]]] = None, source: Optional[str] = None,
+                chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Chunk]:
+    """Yield chunks from inline rows or a .csv / .jsonl / .ndjson file"""
+    if source is None:
+        yield from _chunked(data or [], chunk_size)
+        return
+    path = Path(source).expanduser()
+    suffix = path.suffix.lower()
+    if suffix == ".csv":
+        yield from _iter_csv_chunks(path, chunk_size)
+    elif suffix in (".jsonl", ".ndjson"):
+        yield from _chunked(_iter_jsonl(path), chunk_size)
+    else:
+        raise ValueError(f"Unsupported input format {suffix!r}; use .csv, .jsonl or .ndjson")
+
+
+class ChunkWriter:
+    """
+    Writes processed chunks to .jsonl or .csv. The CSV header is the union of
+    every chunk's input columns, which is only known at the end, so CSV rows
+    are spooled to a temporary file and written out on close().
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path).expanduser()
+        self.format = "csv" if self.path.suffix.lower() == ".csv" else "jsonl"
+        self._file = open(self.path, "w", newline="", encoding="utf-8")
+        self._spool = None
+        self._fieldnames: Dict[str, None] = {}
+        if self.format == "csv":
+            self._spool = tempfile.TemporaryFile("w+", encoding="utf-8", dir=self.path.parent)
+
+    def write(self, chunk: Chunk, columns: Sequence[str] = ()):
+        """Write a chunk; `columns` names its input columns, including any dropped as blank"""
+        rows = chunk.to_rows()
+        target = self._file if self._spool is None else self._spool
+        target.writelines(json.dumps(row, default=str) + "\n" for row in rows)
+        if self._spool is not None:
+            self._fieldnames.update(dict.fromkeys(columns))
+            self._fieldnames.update(dict.fromkeys(chunk.columns))
+
+    def close(self):
+        try:
+            if self._spool is not None:
+                writer = csv.DictWriter(self._file, fieldnames=list(self._fieldnames))
+                writer.writeheader()
+                self._spool.seek(0)
+                writer.writerows(map(json.loads, self._spool))
+                self._spool.close()
+        finally:
+            self._file.close()
+
+
+def run_pipeline(operations: Sequence[str], data: Optional[Sequence[Dict[str, Any]]] = None,
+                 source: Optional[str] = None, output_path: Optional[str] = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, Any]:
+    """
+    Run the pipeline over all input. Rows are returned inline unless
+    `output_path` is given, in which case they are streamed to that file.
+    """
+    pipeline = ColumnarPipeline(operations)
+    writer = ChunkWriter(output_path) if output_path else None
+    rows: List[Dict[str, Any]] = []
+    try:
+        for chunk in iter_chunks(data, source, chunk_size):
+            processed = pipeline.process_chunk(chunk)
+            if writer is not None:
+                writer.write(processed, pipeline.output_names(chunk.columns))
+            else:
+                rows.extend(processed.to_rows())
+    finally:
+        if writer is not None:
+            writer.close()
+    return {"rows": rows if writer is None else None, "stats": pipeline.stats}
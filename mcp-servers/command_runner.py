@@ -0,0 +1,160 @@
+"""
+Non-blocking command execution for SystemDevOpsMCP.run_command
+
+Commands run as child processes whose pipes are read incrementally on the
+event loop, so a long command no longer freezes the server. Each stream is
+capped at `max_output_bytes` (the rest is drained and counted, never
+buffered). The child is reaped with os.wait4 in a small thread pool, which
+also yields its own CPU time and peak RSS; asyncio's subprocess API reaps
+children internally and cannot report per-process rusage.
+"""
+
+import asyncio
+import os
+import signal
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+READ_CHUNK_BYTES = 64 * 1024
+
+# on_output(stream_name, chunk) is awaited for every chunk read, for live progress
+OutputCallback = Callable[[str, bytes], Awaitable[None]]
+
+
+class _CappedBuffer:
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.data = bytearray()
+        self.total = 0
+
+    def feed(self, chunk: bytes):
+        self.total += len(chunk)
+        room = self.limit - len(self.data)
+        if room > 0:
+            self.data += chunk[:room]
+
+    @property
+    def truncated_bytes(self) -> int:
+        return self.total - len(self.data)
+
+    def text(self) -> str:
+        return self.data.decode("utf-8", errors="replace")
+
+
+class CommandRunner:
+    """Runs shell commands concurrently, at most `max_concurrency` at a time"""
+
+    def __init__(self, max_concurrency: int = 8, max_output_bytes: int = 1024 * 1024):
+        self.max_concurrency = max_concurrency
+        self.max_output_bytes = max_output_bytes
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        # One reaper thread per concurrent child; wait4 blocks until the child exits
+        self._reapers = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="wait4")
+        self.running = 0
+
+    async def _pump(self, stream, name: str, buffer: _CappedBuffer, on_output: Optional[OutputCallback]):
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader(limit=READ_CHUNK_BYTES)
+        transport, _ = await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), stream)
+        try:
+            while True:
+                chunk = await reader.read(READ_CHUNK_BYTES)
+                if not chunk:
+                    return
+                buffer.feed(chunk)
+                if on_output is not None:
+                    await on_output(name, chunk)
+        finally:
+            transport.close()
+
+    @staticmethod
+    def _reap(pid: int):
+        if hasattr(os, "wait4"):
+            _, status, rusage = os.wait4(pid, 0)
+            return os.waitstatus_to_exitcode(status), rusage
+        _, status = os.waitpid(pid, 0)
+        return os.waitstatus_to_exitcode(status), None
+
+    @staticmethod
+    def _kill(process: subprocess.Popen):
+        try:
+            # The shell runs in its own session, so kill the whole group it started
+            os.killpg(process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError, AttributeError):
+            try:
+                process.kill()
+            except ProcessLookupError:
+                pass
+
+    async def run(self, command: str, timeout_seconds: float = 30, capture_output: bool = True,
+                  on_output: Optional[OutputCallback] = None) -> Dict[str, Any]:
+        queued = time.perf_counter()
+        async with self._semaphore:
+            self.running += 1
+            try:
+                return await self._run(command, timeout_seconds, capture_output, on_output, queued)
+            finally:
+                self.running -= 1
+
+    async def _run(self, command: str, timeout_seconds: float, capture_output: bool,
+                   on_output: Optional[OutputCallback], queued: float) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        pipe = subprocess.PIPE if capture_output else subprocess.DEVNULL
+        process = subprocess.Popen(command, shell=True, stdin=subprocess.DEVNULL, stdout=pipe, stderr=pipe,
+                                   start_new_session=True)
+        stdout = _CappedBuffer(self.max_output_bytes)
+        stderr = _CappedBuffer(self.max_output_bytes)
+        pumps = []
+        if capture_output:
+            pumps = [
+                asyncio.ensure_future(self._pump(process.stdout, "stdout", stdout, on_output)),
+                asyncio.ensure_future(self._pump(process.stderr, "stderr", stderr, on_output)),
+            ]
+        reaped = loop.run_in_executor(self._reapers, self._reap, process.pid)
+
+        timed_out = False
+        try:
+            await asyncio.wait_for(asyncio.shield(reaped), timeout=timeout_seconds)
+        except asyncio.TimeoutError:
+            timed_out = True
+            self._kill(process)
+        except asyncio.CancelledError:
+            self._kill(process)
+            raise
+        finally:
+            return_code, rusage = await reaped
+            # Already reaped by wait4; stop Popen from trying again
+            process.returncode = return_code
+            if pumps:
+                # Grandchildren may still hold the pipes open; don't wait on them forever
+                done, pending = await asyncio.wait(pumps, timeout=1.0)
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pumps, return_exceptions=True)
+
+        result = {
+            "return_code": return_code,
+            "timed_out": timed_out,
+            "execution_time_seconds": round(time.perf_counter() - started, 4),
+            "queue_wait_seconds": round(started - queued, 4),
+            "cpu_user_seconds": round(rusage.ru_utime, 4) if rusage else None,
+            "cpu_system_seconds": round(rusage.ru_stime, 4) if rusage else None,
+            # ru_maxrss is kilobytes on Linux, bytes on macOS
+            "max_rss": rusage.ru_maxrss if rusage else None,
+        }
+        if capture_output:
+            result.update({
+                "stdout": stdout.text(),
+                "stderr": stderr.text(),
+                "stdout_bytes": stdout.total,
+                "stderr_bytes": stderr.total,
+                "stdout_truncated_bytes": stdout.truncated_bytes,
+                "stderr_truncated_bytes": stderr.truncated_bytes,
+            })
+        return result
+
+    def close(self):
+        self._reapers.shutdown(wait=False)
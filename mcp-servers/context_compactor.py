@@ -0,0 +1,246 @@
+"""
+Token-budget-aware context compaction for long agent conversations
+
+Keeps the system prefix (and tool definitions, which are never touched)
+byte-for-byte stable so backend prompt caches stay warm, and replaces the
+oldest turns with a short extractive summary (or drops them) until the
+conversation fits the token budget. Turns are cut in fixed-size blocks so
+the compacted prefix stays identical across consecutive requests instead
+of shifting by one turn every time.
+"""
+
+import json
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+MESSAGE_OVERHEAD_TOKENS = 4
+SUMMARY_HEADER = "Summary of earlier conversation (older turns were compacted to fit the context window):"
+
+# Words, numbers and single punctuation marks, a close match to BPE piece counts
+_PIECE_PATTERN = re.compile(r"\w+|[^\w\s]")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+
+class TokenCounter:
+    """Counts tokens with tiktoken when installed, otherwise a fast regex approximation"""
+
+    def __init__(self, encoding: str = "o200k_base"):
+        self._encoding = None
+        if tiktoken is not None:
+            try:
+                self._encoding = tiktoken.get_encoding(encoding)
+            except Exception:
+                self._encoding = None
+        # Conversations resend the same history every turn, so memoize per text
+        self.count_text = lru_cache(maxsize=16384)(self._count_text)
+
+    def _count_text(self, text: str) -> int:
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+        tokens = 0
+        for piece in _PIECE_PATTERN.findall(text):
+            # Long words split into several BPE pieces (~4 characters each)
+            tokens += 1 + (len(piece) - 1) // 4 if len(piece) > 4 else 1
+        return tokens
+
+    def count_message(self, message: Dict[str, Any]) -> int:
+        tokens = MESSAGE_OVERHEAD_TOKENS
+        content = message.get("content")
+        if isinstance(content, str):
+            tokens += self.count_text(content)
+        elif isinstance(content, list):
+            for part in content:
+                if isinstance(part, dict) and part.get("type") == "text":
+                    tokens += self.count_text(part.get("text", ""))
+                elif isinstance(part, dict) and part.get("type") == "image_url":
+                    tokens += 85  # low-detail image tile
+        for key in ("tool_calls", "function_call"):
+            if message.get(key):
+                tokens += self.count_text(json.dumps(message[key], sort_keys=True))
+        return tokens
+
+    def count_messages(self, messages: List[Dict[str, Any]]) -> int:
+        return sum(self.count_message(message) for message in messages)
+
+    def count_tools(self, tools: Optional[List[Dict[str, Any]]]) -> int:
+        if not tools:
+            return 0
+        return self.count_text(json.dumps(tools, sort_keys=True))
+
+
+def _message_text(message: Dict[str, Any]) -> str:
+    content = message.get("content")
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return ""
+
+
+def _first_sentence(text: str, max_chars: int) -> str:
+    text = " ".join(text.split())
+    sentence = _SENTENCE_END.split(text, maxsplit=1)[0]
+    if len(sentence) > max_chars:
+        sentence = sentence[:max_chars].rstrip() + "..."
+    return sentence
+
+
+class ContextCompactor:
+    """
+    Fits a message list into a token budget.
+
+    strategy="summarize" replaces compacted turns with one extractive summary
+    message placed right after the system prefix; strategy="drop" removes
+    them outright.
+    """
+
+    def __init__(self, counter: Optional[TokenCounter] = None, strategy: str = "summarize",
+                 keep_recent_turns: int = 2, drop_granularity: int = 4,
+                 summary_max_tokens: int = 512, summary_chars_per_message: int = 160):
+        if strategy not in ("summarize", "drop"):
+            raise ValueError(f"Unknown compaction strategy: {strategy}")
+        self.counter = counter or TokenCounter()
+        self.strategy = strategy
+        self.keep_recent_turns = keep_recent_turns
+        self.drop_granularity = max(1, drop_granularity)
+        self.summary_max_tokens = summary_max_tokens
+        self.summary_chars_per_message = summary_chars_per_message
+
+    @staticmethod
+    def split_prefix(messages: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Leading system/developer messages form the stable prefix"""
+        index = 0
+        while index < len(messages) and messages[index].get("role") in ("system", "developer"):
+            index += 1
+        return messages[:index], messages[index:]
+
+    @staticmethod
+    def split_turns(history: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """Group history into turns starting at each user message, keeping tool calls with their results"""
+        turns: List[List[Dict[str, Any]]] = []
+        for message in history:
+            if message.get("role") == "user" or not turns:
+                turns.append([message])
+            else:
+                turns[-1].append(message)
+        return turns
+
+    def summarize(self, turns: List[List[Dict[str, Any]]]) -> Dict[str, Any]:
+        lines = [SUMMARY_HEADER]
+        used = self.counter.count_text(SUMMARY_HEADER)
+        for turn in turns:
+            for message in turn:
+                role = message.get("role")
+                if role == "tool":
+                    line = f"- tool result: {_first_sentence(_message_text(message), self.summary_chars_per_message // 2)}"
+                elif message.get("tool_calls"):
+                    names = ", ".join(call.get("function", {}).get("name", "?") for call in message["tool_calls"])
+                    line = f"- assistant called: {names}"
+                else:
+                    text = _first_sentence(_message_text(message), self.summary_chars_per_message)
+                    if not text:
+                        continue
+                    line = f"- {role}: {text}"
+                cost = self.counter.count_text(line) + 1
+                if used + cost > self.summary_max_tokens:
+                    lines.append("- ...")
+                    return {"role": "system", "content": "\n".join(lines)}
+                lines.append(line)
+                used += cost
+        return {"role": "system", "content": "\n".join(lines)}
+
+    def _truncate_to_fit(self, messages: List[Dict[str, Any]], excess: int,
+                         protected: int) -> Tuple[List[Dict[str, Any]], int]:
+        """Trim the longest string contents (after the protected prefix) by `excess` tokens"""
+        messages = list(messages)
+        exhausted = set()
+        while excess > 0:
+            candidates = [
+                (self.counter.count_text(m["content"]), i)
+                for i, m in enumerate(messages)
+                if i >= protected and i not in exhausted and isinstance(m.get("content"), str) and m["content"]
+            ]
+            if not candidates:
+                break
+            tokens, index = max(candidates)
+            if tokens <= 32:
+                break
+            text = messages[index]["content"]
+            target = max(0, tokens - excess)
+            marker = f"\n[... {min(tokens, excess)} tokens truncated ...]\n"
+            # The marker costs tokens too; dense text (JSON, numbers) can make it cost as much as the cut saves
+            keep_tokens = max(0, target - self.counter.count_text(marker))
+            keep_chars = int(len(text) * keep_tokens / tokens)
+            while True:
+                head, tail = text[: keep_chars // 2], text[len(text) - keep_chars // 2:]
+                content = head + marker + tail
+                new_tokens = self.counter.count_text(content)
+                if new_tokens <= target or keep_chars == 0:
+                    break
+                keep_chars = min(keep_chars - 1, int(keep_chars * target / new_tokens))
+            if new_tokens >= tokens:
+                # Cannot shrink this message any further; move on to the next largest one
+                exhausted.add(index)
+                continue
+            messages[index] = {**messages[index], "content": content}
+            excess -= tokens - new_tokens
+        return messages, excess
+
+    def compact(self, messages: List[Dict[str, Any]], budget_tokens: int,
+                tools: Optional[List[Dict[str, Any]]] = None) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Return (messages, report) where messages fit in `budget_tokens`
+        (tool definitions included) whenever that is possible.
+        """
+        tool_tokens = self.counter.count_tools(tools)
+        original_tokens = self.counter.count_messages(messages) + tool_tokens
+        report = {
+            "original_tokens": original_tokens,
+            "compacted_tokens": original_tokens,
+            "prefill_tokens_saved": 0,
+            "budget_tokens": budget_tokens,
+            "compacted_messages": 0,
+            "truncated": False,
+            "strategy": None,
+        }
+        if original_tokens <= budget_tokens:
+            return messages, report
+
+        prefix, history = self.split_prefix(messages)
+        turns = self.split_turns(history)
+        prefix_tokens = self.counter.count_messages(prefix) + tool_tokens
+        turn_tokens = [self.counter.count_messages(turn) for turn in turns]
+        max_droppable = max(0, len(turns) - self.keep_recent_turns)
+
+        # Cut in blocks of drop_granularity turns so the result is stable across requests
+        compacted: List[Dict[str, Any]] = list(messages)
+        drop = 0
+        while drop < max_droppable:
+            drop = min(max_droppable, drop + self.drop_granularity)
+            kept = [m for turn in turns[drop:] for m in turn]
+            summary = [self.summarize(turns[:drop])] if self.strategy == "summarize" else []
+            compacted = prefix + summary + kept
+            total = prefix_tokens + self.counter.count_messages(summary) + sum(turn_tokens[drop:])
+            if total <= budget_tokens:
+                break
+
+        total = self.counter.count_messages(compacted) + tool_tokens
+        if total > budget_tokens:
+            # Even the most recent turns are too large: trim oversized contents (e.g. tool output)
+            compacted, _ = self._truncate_to_fit(compacted, total - budget_tokens, protected=len(prefix))
+            total = self.counter.count_messages(compacted) + tool_tokens
+            report["truncated"] = True
+
+        report.update({
+            "compacted_tokens": total,
+            "prefill_tokens_saved": max(0, original_tokens - total),
+            "compacted_messages": sum(len(turn) for turn in turns[:drop]),
+            "strategy": self.strategy,
+        })
+        return compacted, report
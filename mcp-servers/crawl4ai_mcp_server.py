@@ -1,47 +1,80 @@
 import asyncio
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import FastMCP, Context
 from crawl4ai import AsyncWebCrawler
 from pydantic import BaseModel, Field
+from typing import List, Optional
 import json
+import aiohttp
+
+from crawl_engine import CrawlEngine
+from extraction import SchemaError, compile_schema
+from page_cache import PageCache, conditional_probe
 
 class ScrapeRequest(BaseModel):
     url: str = Field(description="URL to scrape")
     extraction_schema: dict = Field(default=None, description="Schema for structured extraction")
+    use_cache: bool = Field(default=True, description="Serve from the shared page cache when fresh")
+
+class CrawlRequest(BaseModel):
+    urls: List[str] = Field(description="Seed URLs to crawl")
+    max_depth: int = Field(default=0, description="Link-following depth (0 = seed URLs only)")
+    max_pages: int = Field(default=100, description="Maximum number of pages to crawl")
+    max_workers: int = Field(default=8, description="Concurrent fetches across all domains")
+    max_per_domain: int = Field(default=2, description="Concurrent fetches per domain")
+    per_domain_delay: float = Field(default=0.5, description="Seconds between request starts per domain")
+    same_domain_only: bool = Field(default=True, description="Only follow links within the seed domains")
+    include_content: bool = Field(default=True, description="Return page markdown (False returns metadata only)")
+    use_cache: bool = Field(default=True, description="Serve pages from the shared page cache when fresh")
 
 class Crawl4AIServer:
     def __init__(self):
         self.app = FastMCP("crawl4ai")
         self.crawler = AsyncWebCrawler()
+        self.cache = PageCache(namespace="crawl4ai")
+        self.session = None
 
     async def setup(self):
         await self.crawler.__aenter__()
+        self.session = aiohttp.ClientSession()
 
     async def cleanup(self):
         await self.crawler.__aexit__(None, None, None)
+        if self.session is not None:
+            await self.session.close()
+        self.cache.close()
 
-    async def scrape_url(self, url: str, extraction_schema: dict = None) -> dict:
+    async def scrape_url(self, url: str, extraction_schema: dict = None, use_cache: bool = True) -> dict:
         """Scrape a URL and optionally extract structured data."""
         try:
-            result = await self.crawler.arun(url=url)
-            if extraction_schema:
-                # For now, we'll return the full content along with extracted data
-                # since Crawl4AI's extraction might need more specific implementation
-                return {
-                    "success": True,
-                    "url": url,
-                    "content": result.markdown,
-                    "extracted_data": extraction_schema,  # Placeholder for actual extraction
-                    "links": result.links,
-                    "images": result.images
-                }
+            extractor = compile_schema(extraction_schema) if extraction_schema else None
+            if use_cache:
+                page, cache_status = await self.cache.get_or_fetch(url, self._fetch_revalidating,
+                                                                    required_fields=("html",))
             else:
+                page, cache_status = await self.render_page(url), "bypass"
+                page.pop("response_headers", None)
+            if extractor is not None:
+                # Only the extracted fields go back to the caller, not the whole page
                 return {
                     "success": True,
                     "url": url,
-                    "content": result.markdown,
-                    "links": result.links,
-                    "images": result.images
+                    "extracted_data": await asyncio.to_thread(extractor.extract, page["html"] or ""),
+                    "cache": cache_status
                 }
+            return {
+                "success": True,
+                "url": url,
+                "content": page.get("content"),
+                "links": page.get("links"),
+                "images": page.get("images"),
+                "cache": cache_status
+            }
+        except SchemaError as e:
+            return {
+                "success": False,
+                "error": f"Invalid extraction schema: {e}",
+                "url": url
+            }
         except Exception as e:
             return {
                 "success": False,
@@ -49,12 +82,106 @@ class Crawl4AIServer:
                 "url": url
             }
 
+    async def render_page(self, url: str) -> dict:
+        """Fetch and render one page through the shared crawler."""
+        result = await self.crawler.arun(url=url)
+        return {
+            "success": result.success,
+            "content": result.markdown,
+            "html": result.html,
+            "links": result.links,
+            "images": result.images,
+            "status_code": getattr(result, "status_code", None),
+            "error": getattr(result, "error_message", None),
+            "response_headers": getattr(result, "response_headers", None),
+        }
+
+    async def _fetch_revalidating(self, url: str, conditional_headers: dict) -> Optional[dict]:
+        # Rendering is expensive, so a stale entry is first checked with a plain conditional GET
+        if conditional_headers and await conditional_probe(self.session, url, conditional_headers):
+            return None
+        return await self.render_page(url)
+
+    async def fetch_page(self, url: str) -> dict:
+        """Fetch one page through the page cache (fetch backend for CrawlEngine)."""
+        page, cache_status = await self.cache.get_or_fetch(url, self._fetch_revalidating,
+                                                            required_fields=("html",))
+        return {**page, "cache": cache_status}
+
+    async def cache_stats(self) -> dict:
+        """Report page cache hit rate, bytes saved and disk usage."""
+        try:
+            return {
+                "success": True,
+                "cache": self.cache.stats()
+            }
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e)
+            }
+
+    async def crawl_urls(self, urls: List[str], max_depth: int = 0, max_pages: int = 100,
+                         max_workers: int = 8, max_per_domain: int = 2, per_domain_delay: float = 0.5,
+                         same_domain_only: bool = True, include_content: bool = True,
+                         ctx: Optional[Context] = None, use_cache: bool = True) -> dict:
+        """Crawl many URLs concurrently, reporting each page as it completes."""
+        engine = CrawlEngine(
+            self.fetch_page if use_cache else self.render_page,
+            max_workers=max_workers,
+            max_per_domain=max_per_domain,
+            per_domain_delay=per_domain_delay,
+            max_depth=max_depth,
+            max_pages=max_pages,
+            same_domain_only=same_domain_only,
+        )
+        pages = []
+        started = asyncio.get_event_loop().time()
+        try:
+            async for page in engine.crawl(urls):
+                page.pop("response_headers", None)
+                page.pop("html", None)
+                if not include_content:
+                    page.pop("content", None)
+                pages.append(page)
+                if ctx is not None:
+                    status = "ok" if page["success"] else f"failed: {page.get('error')}"
+                    await ctx.report_progress(len(pages), max_pages, f"{page['url']} ({status})")
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "pages": pages
+            }
+
+        succeeded = sum(1 for page in pages if page["success"])
+        return {
+            "success": True,
+            "pages": pages,
+            "crawled": len(pages),
+            "succeeded": succeeded,
+            "failed": len(pages) - succeeded,
+            "elapsed_seconds": round(asyncio.get_event_loop().time() - started, 3)
+        }
+
 def create_server():
     server = Crawl4AIServer()
     
     @server.app.tool("scrape_url", "Scrape content from a URL with optional structured extraction")
     async def handle_scrape(request: ScrapeRequest) -> dict:
-        return await server.scrape_url(request.url, request.extraction_schema)
+        return await server.scrape_url(request.url, request.extraction_schema, request.use_cache)
+    
+    @server.app.tool("crawl_urls", "Crawl many URLs concurrently with per-domain politeness and optional link following")
+    async def handle_crawl(request: CrawlRequest, ctx: Context) -> dict:
+        return await server.crawl_urls(
+            request.urls, request.max_depth, request.max_pages, request.max_workers,
+            request.max_per_domain, request.per_domain_delay, request.same_domain_only,
+            request.include_content, ctx, request.use_cache
+        )
+    
+    @server.app.tool("cache_stats", "Report page cache hit rate, bytes saved and disk usage")
+    async def handle_cache_stats() -> dict:
+        return await server.cache_stats()
     
     return server
 
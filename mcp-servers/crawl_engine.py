@@ -0,0 +1,175 @@
+"""
+Concurrent crawl engine with per-domain politeness
+
+Independent of the fetch backend: Crawl4AIServer plugs in AsyncWebCrawler,
+tests plug in a plain HTTP fetcher. Results are yielded as pages complete.
+"""
+
+import asyncio
+import re
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Set
+from urllib.parse import parse_qsl, urldefrag, urlencode, urljoin, urlsplit, urlunsplit
+
+FetchFunc = Callable[[str], Awaitable[Dict[str, Any]]]
+
+TRACKING_PARAMS = re.compile(r"^(utm_\w+|fbclid|gclid|mc_cid|mc_eid)$")
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str, base: Optional[str] = None) -> Optional[str]:
+    """
+    Canonical form used for dedup: absolute, lowercase scheme and host,
+    default port and fragment removed, tracking parameters dropped and the
+    query sorted. Returns None for non-HTTP(S) URLs.
+    """
+    try:
+        if base:
+            url = urljoin(base, url)
+        url, _ = urldefrag(url.strip())
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return None
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS or not parts.hostname:
+        return None
+
+    host = parts.hostname.lower()
+    if port and port != DEFAULT_PORTS[scheme]:
+        host = f"{host}:{port}"
+    path = re.sub(r"/{2,}", "/", parts.path) or "/"
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not TRACKING_PARAMS.match(key)
+    ))
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+def domain_of(url: str) -> str:
+    return urlsplit(url).netloc
+
+
+def extract_hrefs(links: Any) -> List[str]:
+    """Accept Crawl4AI's {"internal": [{"href": ...}], "external": [...]} or a plain list"""
+    if isinstance(links, dict):
+        links = [link for group in links.values() for link in (group or [])]
+    hrefs = []
+    for link in links or []:
+        href = link.get("href") if isinstance(link, dict) else link
+        if isinstance(href, str) and href:
+            hrefs.append(href)
+    return hrefs
+
+
+class DomainThrottle:
+    """Caps concurrent fetches per domain and spaces request starts by `delay` seconds"""
+
+    def __init__(self, max_concurrency: int = 2, delay: float = 0.5):
+        self.max_concurrency = max_concurrency
+        self.delay = delay
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._next_start: Dict[str, float] = {}
+
+    async def acquire(self, domain: str):
+        semaphore = self._semaphores.setdefault(domain, asyncio.Semaphore(self.max_concurrency))
+        await semaphore.acquire()
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        start = max(now, self._next_start.get(domain, now))
+        self._next_start[domain] = start + self.delay
+        if start > now:
+            try:
+                await asyncio.sleep(start - now)
+            except BaseException:
+                semaphore.release()
+                raise
+
+    def release(self, domain: str):
+        self._semaphores[domain].release()
+
+
+class CrawlEngine:
+    """Bounded worker pool over a deduplicated URL frontier with depth-limited link following"""
+
+    def __init__(self, fetch: FetchFunc, max_workers: int = 8, max_per_domain: int = 2,
+                 per_domain_delay: float = 0.5, max_depth: int = 0, max_pages: int = 100,
+                 same_domain_only: bool = True):
+        self.fetch = fetch
+        self.max_workers = max_workers
+        self.throttle = DomainThrottle(max_per_domain, per_domain_delay)
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.same_domain_only = same_domain_only
+
+    async def crawl(self, urls: Iterable[str]) -> AsyncIterator[Dict[str, Any]]:
+        """Yield one result dict per crawled page, in completion order"""
+        frontier: asyncio.Queue = asyncio.Queue()
+        results: asyncio.Queue = asyncio.Queue()
+        seen: Set[str] = set()
+        seed_domains: Set[str] = set()
+
+        def enqueue(url: str, depth: int, base: Optional[str] = None) -> bool:
+            normalized = normalize_url(url, base)
+            if not normalized or normalized in seen or len(seen) >= self.max_pages:
+                return False
+            if depth > 0 and self.same_domain_only and domain_of(normalized) not in seed_domains:
+                return False
+            seen.add(normalized)
+            frontier.put_nowait((normalized, depth))
+            return True
+
+        for url in urls:
+            normalized = normalize_url(url)
+            if normalized:
+                seed_domains.add(domain_of(normalized))
+                enqueue(normalized, 0)
+
+        async def worker():
+            while True:
+                url, depth = await frontier.get()
+                try:
+                    result = await self._crawl_one(url, depth)
+                    if result.get("success") and depth < self.max_depth:
+                        result["links_queued"] = sum(
+                            enqueue(href, depth + 1, base=url) for href in extract_hrefs(result.get("links"))
+                        )
+                    await results.put(result)
+                finally:
+                    frontier.task_done()
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.max_workers)]
+
+        async def close_when_drained():
+            await frontier.join()
+            await results.put(None)
+
+        closer = asyncio.create_task(close_when_drained())
+        try:
+            while True:
+                result = await results.get()
+                if result is None:
+                    break
+                yield result
+        finally:
+            for task in workers + [closer]:
+                task.cancel()
+            await asyncio.gather(*workers, closer, return_exceptions=True)
+
+    async def _crawl_one(self, url: str, depth: int) -> Dict[str, Any]:
+        domain = domain_of(url)
+        await self.throttle.acquire(domain)
+        started = time.perf_counter()
+        try:
+            result = dict(await self.fetch(url))
+        except Exception as e:
+            result = {"success": False, "error": str(e)}
+        finally:
+            self.throttle.release(domain)
+        result.setdefault("success", True)
+        result.update({
+            "url": url,
+            "depth": depth,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+        })
+        return result
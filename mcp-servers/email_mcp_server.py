@@ -1,15 +1,13 @@
 import asyncio
 from mcp.server.fastmcp import FastMCP
 from pydantic import BaseModel, Field, EmailStr
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.mime.base import MIMEBase
-from email import encoders
-import imaplib
-import email
 import json
-from typing import List, Optional
+from typing import Dict, List, Optional, Set, Tuple
+
+from imap_sync import DEFAULT_INDEX_PATH, FETCH_BATCH_SIZE, IMAPSession, MailboxIndex, sync_folder
+from mime_stream import StreamingMessage
+from rate_limit import TokenBucket
+from smtp_pool import SMTPPool
 
 class EmailConfig(BaseModel):
     smtp_server: str = Field(description="SMTP server address")
@@ -17,6 +15,15 @@ class EmailConfig(BaseModel):
     email_address: EmailStr = Field(description="Email address for sending/receiving")
     password: str = Field(description="Email password or app password")
     imap_server: str = Field(description="IMAP server address")
+    smtp_starttls: bool = Field(default=True, description="Upgrade SMTP connections with STARTTLS")
+    smtp_pool_size: int = Field(default=4, description="Max pooled SMTP connections")
+    smtp_idle_timeout: float = Field(default=60.0, description="Reconnect SMTP sessions idle longer than this (seconds)")
+    smtp_rate_per_minute: Optional[float] = Field(default=None, description="Max messages per minute to the SMTP server")
+    max_attachment_mb: float = Field(default=25, description="Largest attachment accepted, in MB")
+    max_message_mb: float = Field(default=35, description="Largest encoded message accepted, in MB")
+    imap_port: Optional[int] = Field(default=None, description="IMAP server port (993 with SSL, 143 without)")
+    imap_ssl: bool = Field(default=True, description="Connect to IMAP over SSL")
+    mail_index_path: str = Field(default=DEFAULT_INDEX_PATH, description="SQLite file caching synced message headers")
 
 class SendEmailRequest(BaseModel):
     to: List[EmailStr] = Field(description="Recipients' email addresses")
@@ -26,18 +33,90 @@ class SendEmailRequest(BaseModel):
     bcc: List[EmailStr] = Field(default=[], description="BCC recipients")
     attachments: List[str] = Field(default=[], description="File paths to attach")
 
+class BulkEmailRequest(BaseModel):
+    messages: List[SendEmailRequest] = Field(description="Messages to send")
+    concurrency: int = Field(default=4, description="Max messages in flight")
+
 class ReadEmailsRequest(BaseModel):
     folder: str = Field(default="INBOX", description="Mail folder to read from")
     limit: int = Field(default=10, description="Maximum number of emails to return")
     unread_only: bool = Field(default=False, description="Only return unread emails")
+    preview_bytes: int = Field(default=2048, description="Bytes of each body to fetch for the preview; cached previews shorter than this are refetched")
 
 class EmailMCP:
     def __init__(self):
         self.app = FastMCP("email")
         self.config = None
+        self.smtp_pool: Optional[SMTPPool] = None
+        self.rate_limits: Dict[Tuple[str, int], TokenBucket] = {}
+        self.imap_session: Optional[IMAPSession] = None
+        self.mail_index: Optional[MailboxIndex] = None
+        self._closing: Set[asyncio.Task] = set()
         
     def set_config(self, config: EmailConfig):
         self.config = config
+        # Sessions are tied to the old server and credentials; close them, they reopen on next use
+        retired = self._detach()
+        if not any(retired):
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            asyncio.run(self._close_resources(*retired))
+            return
+        task = loop.create_task(self._close_resources(*retired))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    def _detach(self) -> Tuple[Optional[SMTPPool], Optional[IMAPSession], Optional[MailboxIndex]]:
+        retired = (self.smtp_pool, self.imap_session, self.mail_index)
+        self.smtp_pool = None
+        self.imap_session = None
+        self.mail_index = None
+        return retired
+
+    @staticmethod
+    async def _close_resources(smtp_pool: Optional[SMTPPool], imap_session: Optional[IMAPSession],
+                               mail_index: Optional[MailboxIndex]):
+        if smtp_pool is not None:
+            await smtp_pool.close()
+        if imap_session is not None:
+            await imap_session.close()
+        if mail_index is not None:
+            mail_index.close()
+
+    async def close(self):
+        """Quit pooled SMTP connections, log out of IMAP and close the mail index"""
+        await self._close_resources(*self._detach())
+        if self._closing:
+            await asyncio.gather(*self._closing, return_exceptions=True)
+
+    def _pool(self) -> SMTPPool:
+        if self.smtp_pool is None:
+            self.smtp_pool = SMTPPool(
+                self.config.smtp_server, self.config.smtp_port,
+                username=self.config.email_address, password=self.config.password,
+                starttls=self.config.smtp_starttls, size=self.config.smtp_pool_size,
+                idle_timeout=self.config.smtp_idle_timeout
+            )
+        return self.smtp_pool
+
+    def _rate_limit(self) -> Optional[TokenBucket]:
+        if not self.config.smtp_rate_per_minute:
+            return None
+        key = (self.config.smtp_server, self.config.smtp_port)
+        if key not in self.rate_limits:
+            self.rate_limits[key] = TokenBucket.per_minute(self.config.smtp_rate_per_minute)
+        return self.rate_limits[key]
+
+    def _build_message(self, to: List[str], subject: str, body: str,
+                       cc: List[str], attachments: List[str]) -> StreamingMessage:
+        # Attachments are only stat'ed here; they are read and encoded in chunks while sending
+        return StreamingMessage(
+            self.config.email_address, to, subject, body, cc, attachments,
+            max_attachment_bytes=int(self.config.max_attachment_mb * 1024 * 1024),
+            max_message_bytes=int(self.config.max_message_mb * 1024 * 1024)
+        )
 
     async def send_email(self, to: List[str], subject: str, body: str, 
                          cc: List[str] = [], bcc: List[str] = [], 
@@ -47,41 +126,23 @@ class EmailMCP:
             return {"success": False, "error": "Email configuration not set"}
         
         try:
-            msg = MIMEMultipart()
-            msg['From'] = self.config.email_address
-            msg['To'] = ', '.join(to)
-            msg['Subject'] = subject
-            
-            if cc:
-                msg['Cc'] = ', '.join(cc)
-            
-            msg.attach(MIMEText(body, 'plain'))
-            
-            # Add attachments
-            for file_path in attachments:
-                with open(file_path, "rb") as attachment:
-                    part = MIMEBase('application', 'octet-stream')
-                    part.set_payload(attachment.read())
-                    encoders.encode_base64(part)
-                    part.add_header(
-                        'Content-Disposition',
-                        f'attachment; filename= {file_path.split("/")[-1]}'
-                    )
-                    msg.attach(part)
+            msg = await asyncio.to_thread(self._build_message, to, subject, body, cc, attachments)
             
-            # Connect to server and send email
-            server = smtplib.SMTP(self.config.smtp_server, self.config.smtp_port)
-            server.starttls()
-            server.login(self.config.email_address, self.config.password)
+            rate_limit = self._rate_limit()
+            if rate_limit:
+                await rate_limit.acquire()
             
+            # Reuses a pooled, already authenticated connection when one is idle
             all_recipients = to + cc + bcc
-            text = msg.as_string()
-            server.sendmail(self.config.email_address, all_recipients, text)
-            server.quit()
+            result = await self._pool().send(self.config.email_address, all_recipients, msg)
+            if not result["success"]:
+                return result
             
             return {
                 "success": True,
-                "message": f"Email sent to {len(to)} recipients"
+                "message": f"Email sent to {len(to)} recipients",
+                "size_bytes": msg.size,
+                "refused": result["refused"]
             }
         except Exception as e:
             return {
@@ -89,55 +150,75 @@ class EmailMCP:
                 "error": str(e)
             }
 
-    async def read_emails(self, folder: str = "INBOX", limit: int = 10, 
-                          unread_only: bool = False) -> dict:
-        """Read emails from specified folder."""
+    async def send_bulk(self, messages: List[dict], concurrency: int = 4) -> dict:
+        """Send many emails over pooled connections with bounded parallelism and rate limiting."""
         if not self.config:
             return {"success": False, "error": "Email configuration not set"}
         
         try:
-            mail = imaplib.IMAP4_SSL(self.config.imap_server)
-            mail.login(self.config.email_address, self.config.password)
-            mail.select(folder)
-            
-            # Search criteria
-            search_criteria = "(UNSEEN)" if unread_only else "ALL"
-            status, messages = mail.search(None, search_criteria)
-            
-            email_ids = messages[0].split()
-            email_ids = email_ids[-limit:] if len(email_ids) > limit else email_ids
+            async def build(m: dict):
+                return await asyncio.to_thread(
+                    self._build_message, m["to"], m["subject"], m["body"],
+                    m.get("cc", []), m.get("attachments", [])
+                )
             
-            emails = []
-            for e_id in reversed(email_ids):  # Reverse to get newest first
-                _, msg_data = mail.fetch(e_id, '(RFC822)')
-                msg = email.message_from_bytes(msg_data[0][1])
-                
-                email_info = {
-                    "id": e_id.decode(),
-                    "subject": msg.get("Subject", ""),
-                    "from": msg.get("From", ""),
-                    "date": msg.get("Date", ""),
-                    "body": ""
-                }
-                
-                # Extract body
-                if msg.is_multipart():
-                    for part in msg.walk():
-                        if part.get_content_type() == "text/plain":
-                            email_info["body"] = part.get_payload(decode=True).decode()
-                            break
+            # A message that cannot be built fails on its own instead of failing the batch
+            built = await asyncio.gather(*(build(m) for m in messages), return_exceptions=True)
+            results: List[Optional[dict]] = [None] * len(messages)
+            envelopes, positions = [], []
+            for index, (m, msg) in enumerate(zip(messages, built)):
+                if isinstance(msg, Exception):
+                    results[index] = {"success": False, "error": str(msg), "index": index}
                 else:
-                    email_info["body"] = msg.get_payload(decode=True).decode()
-                
-                emails.append(email_info)
+                    envelopes.append((self.config.email_address, m["to"] + m.get("cc", []) + m.get("bcc", []), msg))
+                    positions.append(index)
+            pool = self._pool()
+            for index, result in zip(positions, await pool.send_bulk(envelopes, concurrency, self._rate_limit())):
+                result["index"] = index
+                results[index] = result
+            return {
+                "success": all(r["success"] for r in results),
+                "sent": sum(1 for r in results if r["success"]),
+                "failed": sum(1 for r in results if not r["success"]),
+                "results": results,
+                "pool": dict(pool.stats)
+            }
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e)
+            }
+
+    async def read_emails(self, folder: str = "INBOX", limit: int = 10, 
+                          unread_only: bool = False, preview_bytes: int = 2048) -> dict:
+        """Read emails from specified folder."""
+        if not self.config:
+            return {"success": False, "error": "Email configuration not set"}
+        
+        try:
+            if self.imap_session is None:
+                self.imap_session = IMAPSession(
+                    self.config.imap_server, self.config.email_address, self.config.password,
+                    port=self.config.imap_port, use_ssl=self.config.imap_ssl
+                )
+            if self.mail_index is None:
+                self.mail_index = MailboxIndex(self.config.mail_index_path)
             
-            mail.close()
-            mail.logout()
+            # Only UIDs above the last sync are fetched, as headers plus a body preview, and
+            # older messages only as far back as `limit` reaches
+            sync = await self.imap_session.run(
+                sync_folder, self.mail_index, self.config.email_address, folder, preview_bytes,
+                FETCH_BATCH_SIZE, limit, unread_only
+            )
+            emails = await asyncio.to_thread(
+                self.mail_index.query, self.config.email_address, folder, limit, unread_only, preview_bytes
+            )
             
             return {
                 "success": True,
                 "emails": emails,
-                "count": len(emails)
+                "count": len(emails),
+                "sync": sync
             }
         except Exception as e:
             return {
@@ -155,9 +236,15 @@ def create_email_server():
             req.cc, req.bcc, req.attachments
         )
     
+    @server.app.tool("send_bulk", "Send many emails over pooled SMTP connections")
+    async def handle_send_bulk(req: BulkEmailRequest) -> dict:
+        return await server.send_bulk(
+            [m.model_dump() for m in req.messages], req.concurrency
+        )
+    
     @server.app.tool("read_emails", "Read emails from specified folder")
     async def handle_read_emails(req: ReadEmailsRequest) -> dict:
-        return await server.read_emails(req.folder, req.limit, req.unread_only)
+        return await server.read_emails(req.folder, req.limit, req.unread_only, req.preview_bytes)
     
     return server
 
@@ -0,0 +1,186 @@
+"""
+Schema-driven structured extraction from HTML
+
+A schema is compiled once into lxml XPath objects and regexes and cached by
+its canonical JSON, so repeated scrapes with the same schema only pay for
+parsing the page. Schemas follow Crawl4AI's JSON-CSS layout:
+
+    {
+        "baseSelector": "div.product",        # optional: one record per match
+        "selectorType": "css",                # or "xpath"
+        "fields": [
+            {"name": "title", "selector": "h2", "type": "text"},
+            {"name": "link", "selector": "a", "type": "attribute", "attribute": "href"},
+            {"name": "price", "selector": ".price", "type": "regex", "pattern": "[0-9.]+"},
+            {"name": "tags", "selector": ".tag", "type": "text", "multiple": true},
+            {"name": "sku", "xpath": ".//span[@itemprop='sku']", "type": "text"},
+            {"name": "specs", "selector": "ul.specs li", "type": "nested", "multiple": true,
+             "fields": [{"name": "label", "selector": "b", "type": "text"}]}
+        ]
+    }
+
+Field types are text, attribute, html, regex and nested. A field without a
+selector applies to the current element (the record or the whole page).
+"""
+
+import json
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from lxml import etree, html as lxml_html
+
+try:
+    from cssselect import GenericTranslator, SelectorError
+except ImportError:
+    GenericTranslator = None
+    SelectorError = ValueError
+
+FIELD_TYPES = ("text", "attribute", "html", "regex", "nested")
+
+
+class SchemaError(ValueError):
+    """Raised when an extraction schema is malformed"""
+
+
+def _compile_selector(css: Optional[str], xpath: Optional[str], root: bool) -> Optional[etree.XPath]:
+    if xpath:
+        try:
+            return etree.XPath(xpath)
+        except etree.XPathSyntaxError as e:
+            raise SchemaError(f"Invalid XPath {xpath!r}: {e}")
+    if css:
+        if GenericTranslator is None:
+            raise SchemaError("CSS selectors require the cssselect package")
+        try:
+            prefix = "descendant-or-self::" if root else "descendant::"
+            return etree.XPath(GenericTranslator().css_to_xpath(css, prefix=prefix))
+        except SelectorError as e:
+            raise SchemaError(f"Invalid CSS selector {css!r}: {e}")
+    return None
+
+
+def _text(element: Any) -> str:
+    if isinstance(element, str):
+        return element.strip()
+    return " ".join(element.text_content().split())
+
+
+class CompiledField:
+    def __init__(self, spec: Dict[str, Any], selector_type: str):
+        if not isinstance(spec, dict) or not spec.get("name"):
+            raise SchemaError(f"Every field needs a name: {spec!r}")
+        self.name = spec["name"]
+        self.type = spec.get("type", "text")
+        if self.type not in FIELD_TYPES:
+            raise SchemaError(f"Field {self.name!r} has unknown type {self.type!r}")
+        self.multiple = bool(spec.get("multiple", False))
+        self.default = spec.get("default")
+        self.attribute = spec.get("attribute")
+        if self.type == "attribute" and not self.attribute:
+            raise SchemaError(f"Field {self.name!r} of type attribute needs 'attribute'")
+
+        selector = spec.get("selector")
+        xpath = spec.get("xpath") or (selector if selector_type == "xpath" else None)
+        self.selector = _compile_selector(None if xpath else selector, xpath, root=False)
+
+        self.pattern = None
+        if self.type == "regex":
+            try:
+                self.pattern = re.compile(spec.get("pattern", ""), re.IGNORECASE if spec.get("ignore_case") else 0)
+            except re.error as e:
+                raise SchemaError(f"Field {self.name!r} has an invalid pattern: {e}")
+            if not self.pattern.pattern:
+                raise SchemaError(f"Field {self.name!r} of type regex needs 'pattern'")
+        self.fields = None
+        if self.type == "nested":
+            self.fields = _compile_fields(spec.get("fields"), selector_type)
+
+    def _value(self, element: Any) -> Any:
+        if self.type == "text":
+            return _text(element)
+        if self.type == "attribute":
+            return element.get(self.attribute) if not isinstance(element, str) else None
+        if self.type == "html":
+            return element if isinstance(element, str) else etree.tostring(element, encoding="unicode", with_tail=False)
+        if self.type == "nested":
+            return {field.name: field.extract(element) for field in self.fields}
+        text = _text(element)
+        if self.multiple:
+            return [m if isinstance(m, str) else m[0] for m in self.pattern.findall(text)]
+        match = self.pattern.search(text)
+        if match is None:
+            return None
+        return match.group(1) if self.pattern.groups else match.group(0)
+
+    def extract(self, element: Any) -> Any:
+        matches = self.selector(element) if self.selector is not None else [element]
+        if self.type == "regex" and self.multiple:
+            values = [value for match in matches for value in self._value(match)]
+            return values or self.default
+        if self.multiple:
+            values = [value for value in (self._value(match) for match in matches) if value not in (None, "")]
+            return values or self.default
+        for match in matches:
+            value = self._value(match)
+            if value not in (None, ""):
+                return value
+        return self.default
+
+
+def _compile_fields(specs: Any, selector_type: str) -> List[CompiledField]:
+    if not isinstance(specs, list) or not specs:
+        raise SchemaError("Schema needs a non-empty 'fields' list")
+    return [CompiledField(spec, selector_type) for spec in specs]
+
+
+class CompiledSchema:
+    """An extraction schema compiled to XPath objects; thread-safe and reusable"""
+
+    def __init__(self, schema: Dict[str, Any]):
+        if not isinstance(schema, dict):
+            raise SchemaError("Schema must be an object")
+        selector_type = schema.get("selectorType", schema.get("selector_type", "css")).lower()
+        if selector_type not in ("css", "xpath"):
+            raise SchemaError(f"Unknown selectorType {selector_type!r}")
+        base = schema.get("baseSelector")
+        self.base = _compile_selector(
+            base if selector_type == "css" else None, base if selector_type == "xpath" else None, root=True
+        )
+        self.fields = _compile_fields(schema.get("fields"), selector_type)
+
+    def _record(self, element: Any) -> Dict[str, Any]:
+        return {field.name: field.extract(element) for field in self.fields}
+
+    def extract_tree(self, root: Any) -> Any:
+        if self.base is None:
+            return self._record(root)
+        return [self._record(element) for element in self.base(root)]
+
+    def extract(self, html: str) -> Any:
+        if not html or not html.strip():
+            return [] if self.base is not None else {f.name: f.default for f in self.fields}
+        return self.extract_tree(lxml_html.fromstring(html))
+
+
+@lru_cache(maxsize=256)
+def _compile_cached(canonical: str) -> CompiledSchema:
+    return CompiledSchema(json.loads(canonical))
+
+
+def compile_schema(schema: Dict[str, Any]) -> CompiledSchema:
+    """Return the compiled extractor for `schema`, compiling it only on first use"""
+    try:
+        canonical = json.dumps(schema, sort_keys=True)
+    except (TypeError, ValueError) as e:
+        raise SchemaError(f"Schema is not JSON-serializable: {e}")
+    return _compile_cached(canonical)
+
+
+def extract(html: str, schema: Dict[str, Any]) -> Any:
+    return compile_schema(schema).extract(html)
+
+
+def cache_info() -> Dict[str, int]:
+    info = _compile_cached.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "size": info.currsize}
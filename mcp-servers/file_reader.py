@@ -0,0 +1,251 @@
+"""
+Windowed, memory-mapped file access for SystemDevOpsMCP.read_file
+
+Instead of decoding a whole file into one string, reads are served from an
+mmap of the file: a byte range, a window of lines, the last N lines, regex
+matches, or successive chunks addressed by byte offset. Only the requested bytes are
+ever copied out of the page cache, so multi-GB logs cost no more memory than
+the slice being returned.
+
+Line windows use a sparse line index (the byte offset of every
+LINE_INDEX_STRIDE-th line) cached per file and extended lazily, so paging
+through a large file does not rescan it from the start on every request.
+"""
+
+import mmap
+import os
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+LINE_INDEX_STRIDE = 4096
+LINE_INDEX_CACHE_SIZE = 32
+DEFAULT_CHUNK_BYTES = 256 * 1024
+MAX_LINE_BYTES = 64 * 1024
+
+
+@contextmanager
+def open_mapped(path: str):
+    """Yield a read-only mmap of `path` (an empty bytes object for empty files)"""
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            # mmap refuses zero-length files
+            yield b""
+            return
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if hasattr(mm, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+            yield mm
+        finally:
+            mm.close()
+
+
+def _utf8_safe_end(data, start: int, end: int) -> int:
+    """Move `end` back so a multi-byte UTF-8 sequence is not split"""
+    i = end
+    while i > start and end - i < 3 and (data[i - 1] & 0xC0) == 0x80:
+        i -= 1
+    if i > start and data[i - 1] >= 0xC0:
+        lead = data[i - 1]
+        width = 2 if lead < 0xE0 else 3 if lead < 0xF0 else 4
+        if end - (i - 1) < width:
+            return i - 1
+    return end
+
+
+def _decode(data: bytes, encoding: str) -> str:
+    return data.decode(encoding, errors="replace")
+
+
+class LineIndex:
+    """Byte offsets of every `stride`-th line start, extended on demand"""
+
+    def __init__(self, stride: int = LINE_INDEX_STRIDE):
+        self.stride = stride
+        self.offsets = [0]  # offsets[k] is where line k * stride starts
+        self.complete = False
+        self.total_lines: Optional[int] = None
+
+    def seek(self, mm, line: int) -> Optional[int]:
+        """Byte offset where 0-based `line` starts, or None past the end of the file"""
+        block = line // self.stride
+        while len(self.offsets) <= block and not self.complete:
+            self._extend(mm)
+        block = min(block, len(self.offsets) - 1)
+        position = self.offsets[block]
+        for _ in range(line - block * self.stride):
+            newline = mm.find(b"\n", position)
+            if newline == -1:
+                return None
+            position = newline + 1
+        return position if position < len(mm) or line == 0 else None
+
+    def _extend(self, mm):
+        position = self.offsets[-1]
+        for counted in range(self.stride):
+            newline = mm.find(b"\n", position)
+            if newline == -1 or newline + 1 >= len(mm):
+                self.complete = True
+                self.total_lines = (len(self.offsets) - 1) * self.stride + counted + (1 if position < len(mm) else 0)
+                return
+            position = newline + 1
+        self.offsets.append(position)
+
+
+_line_indexes: "OrderedDict[Tuple[str, int, int], LineIndex]" = OrderedDict()
+_line_indexes_lock = threading.Lock()
+
+
+def _line_index(path: str) -> LineIndex:
+    stat = os.stat(path)
+    key = (os.path.realpath(path), stat.st_mtime_ns, stat.st_size)
+    with _line_indexes_lock:
+        index = _line_indexes.get(key)
+        if index is None:
+            index = _line_indexes[key] = LineIndex()
+            while len(_line_indexes) > LINE_INDEX_CACHE_SIZE:
+                _line_indexes.popitem(last=False)
+        else:
+            _line_indexes.move_to_end(key)
+        return index
+
+
+def read_range(path: str, offset: int = 0, length: int = DEFAULT_CHUNK_BYTES,
+               encoding: str = "utf-8") -> Dict[str, Any]:
+    """Read `length` bytes from `offset`; a negative offset counts from the end"""
+    with open_mapped(path) as mm:
+        size = len(mm)
+        start = max(0, size + offset) if offset < 0 else min(offset, size)
+        end = min(size, start + max(0, length))
+        if encoding.lower().replace("-", "") == "utf8" and end < size:
+            # A window too small for one character returns it split rather than nothing
+            safe_end = _utf8_safe_end(mm, start, end)
+            end = safe_end if safe_end > start else end
+        content = _decode(mm[start:end], encoding)
+    return {
+        "offset": start,
+        "bytes_read": end - start,
+        "next_offset": end if end < size else None,
+        "size_bytes": size,
+        "eof": end >= size,
+        "content": content,
+    }
+
+
+def read_lines(path: str, start_line: int = 1, max_lines: int = 100, encoding: str = "utf-8",
+               max_bytes: int = DEFAULT_CHUNK_BYTES) -> Dict[str, Any]:
+    """Read up to `max_lines` lines starting at 1-based `start_line`"""
+    index = _line_index(path)
+    lines: List[str] = []
+    with open_mapped(path) as mm:
+        position = index.seek(mm, max(0, start_line - 1)) if len(mm) else None
+        used = 0
+        while position is not None and position < len(mm) and len(lines) < max_lines and used < max_bytes:
+            newline = mm.find(b"\n", position)
+            end = len(mm) if newline == -1 else newline
+            line = mm[position:min(end, position + MAX_LINE_BYTES)]
+            lines.append(_decode(line, encoding).rstrip("\r"))
+            used += len(line)
+            position = end + 1
+        more = position is not None and position < len(mm)
+    return {
+        "start_line": start_line,
+        "line_count": len(lines),
+        "next_line": start_line + len(lines) if more else None,
+        "total_lines": index.total_lines,
+        "lines": lines,
+    }
+
+
+def tail(path: str, lines: int = 50, encoding: str = "utf-8", max_bytes: int = DEFAULT_CHUNK_BYTES) -> Dict[str, Any]:
+    """Return the last `lines` lines, scanning backwards from the end"""
+    with open_mapped(path) as mm:
+        size = len(mm)
+        end = size - 1 if size and mm[size - 1] == 0x0A else size
+        start = end
+        for _ in range(max(1, lines)):
+            newline = mm.rfind(b"\n", 0, start)
+            if newline == -1:
+                start = 0
+                break
+            start = newline + 1
+            if end - start > max_bytes:
+                break
+            # Continue the next search before this line's leading newline
+            start = newline
+        else:
+            start += 1
+        truncated = end - start > max_bytes
+        if truncated:
+            start = end - max_bytes
+        text = _decode(mm[start:end], encoding)
+    result = text.split("\n") if size else []
+    return {
+        "line_count": len(result),
+        "offset": start,
+        "size_bytes": size,
+        "truncated": truncated,
+        "lines": [line.rstrip("\r") for line in result],
+    }
+
+
+def search(path: str, pattern: str, ignore_case: bool = False, max_matches: int = 100,
+           context_lines: int = 0, encoding: str = "utf-8") -> Dict[str, Any]:
+    """Regex search over the mapped bytes, returning matching lines with line numbers"""
+    flags = re.MULTILINE | (re.IGNORECASE if ignore_case else 0)
+    regex = re.compile(pattern.encode(encoding), flags)
+    matches: List[Dict[str, Any]] = []
+    truncated = False
+    with open_mapped(path) as mm:
+        line_number = 1
+        counted_to = 0
+        last_line_start = -1
+        for match in regex.finditer(mm):
+            line_start = mm.rfind(b"\n", 0, match.start()) + 1
+            if line_start == last_line_start:
+                # Report each line once, however many matches it holds
+                continue
+            if len(matches) >= max_matches:
+                truncated = True
+                break
+            line_number += mm[counted_to:line_start].count(b"\n")
+            counted_to = line_start
+            last_line_start = line_start
+            line_end = mm.find(b"\n", match.start())
+            line_end = len(mm) if line_end == -1 else line_end
+            entry = {
+                "line_number": line_number,
+                "offset": match.start(),
+                "line": _decode(mm[line_start:min(line_end, line_start + MAX_LINE_BYTES)], encoding).rstrip("\r"),
+                "match": _decode(match.group(0)[:MAX_LINE_BYTES], encoding),
+            }
+            if context_lines:
+                entry["before"] = _context_before(mm, line_start, context_lines, encoding)
+                entry["after"] = _context_after(mm, line_end, context_lines, encoding)
+            matches.append(entry)
+    return {"pattern": pattern, "match_count": len(matches), "truncated": truncated, "matches": matches}
+
+
+def _context_before(mm, line_start: int, count: int, encoding: str) -> List[str]:
+    lines = []
+    end = line_start - 1
+    while len(lines) < count and end >= 0:
+        start = mm.rfind(b"\n", 0, end) + 1
+        lines.append(_decode(mm[start:min(end, start + MAX_LINE_BYTES)], encoding).rstrip("\r"))
+        end = start - 1
+    return lines[::-1]
+
+
+def _context_after(mm, line_end: int, count: int, encoding: str) -> List[str]:
+    lines = []
+    start = line_end + 1
+    while len(lines) < count and start < len(mm):
+        end = mm.find(b"\n", start)
+        end = len(mm) if end == -1 else end
+        lines.append(_decode(mm[start:min(end, start + MAX_LINE_BYTES)], encoding).rstrip("\r"))
+        start = end + 1
+    return lines
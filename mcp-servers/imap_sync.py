@@ -0,0 +1,487 @@
+"""
+Incremental IMAP sync into a local SQLite mailbox index for EmailMCP
+
+IMAPSession keeps one logged-in imaplib connection per account and runs all
+of its (blocking, not thread-safe) calls on a single worker thread, checking
+it with NOOP after a quiet period and reconnecting once if the server has
+dropped it.
+
+sync_folder() only asks the server for messages whose UID is above the last
+one indexed. New messages are fetched in batches over UID ranges, and only
+a few header fields and the first `preview_bytes` of the body are
+requested (BODY.PEEK, so nothing is marked as read). The results are stored
+in MailboxIndex, a SQLite table of headers, flags and body previews that
+read_emails queries locally. A UIDVALIDITY change discards the folder's
+index, and an EXISTS count that disagrees with the index triggers a UID-only
+scan to drop expunged messages.
+
+The index holds every message from the folder's floor UID up, plus any older
+ones fetched for an unread-only read. The first sync fetches only the newest
+`backfill` messages; older ones are fetched when a read asks for more than
+the index holds. Each preview records the byte length it was fetched with
+and is fetched again when a read asks for a longer one.
+"""
+
+import asyncio
+import email
+import email.policy
+import html
+import imaplib
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+DEFAULT_INDEX_PATH = os.environ.get("MAIL_INDEX_PATH", str(Path.home() / ".cache" / "mcp-mail-index.sqlite3"))
+DEFAULT_PREVIEW_BYTES = 2048
+DEFAULT_BACKFILL = 500
+FETCH_BATCH_SIZE = 200
+HEADER_FIELDS = "SUBJECT FROM TO DATE MESSAGE-ID CONTENT-TYPE CONTENT-TRANSFER-ENCODING"
+
+# Bumped whenever the tables change; the index is only a cache, so older ones are rebuilt
+SCHEMA_VERSION = 2
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS folders (
+    account TEXT NOT NULL,
+    folder TEXT NOT NULL,
+    uidvalidity INTEGER NOT NULL,
+    last_uid INTEGER NOT NULL,
+    floor_uid INTEGER NOT NULL,
+    below_floor INTEGER NOT NULL,
+    synced_at REAL NOT NULL,
+    PRIMARY KEY (account, folder)
+);
+CREATE TABLE IF NOT EXISTS messages (
+    account TEXT NOT NULL,
+    folder TEXT NOT NULL,
+    uid INTEGER NOT NULL,
+    message_id TEXT,
+    subject TEXT,
+    from_addr TEXT,
+    to_addr TEXT,
+    date TEXT,
+    flags TEXT,
+    seen INTEGER NOT NULL,
+    size INTEGER,
+    preview TEXT,
+    preview_bytes INTEGER NOT NULL,
+    PRIMARY KEY (account, folder, uid)
+);
+"""
+
+_UID = re.compile(rb"\bUID (\d+)")
+_FLAGS = re.compile(rb"\bFLAGS \(([^)]*)\)")
+_SIZE = re.compile(rb"\bRFC822\.SIZE (\d+)")
+_TAGS = re.compile(r"<[^>]+>")
+_SPACE = re.compile(r"\s+")
+
+
+def uid_ranges(uids: Iterable[int]) -> str:
+    """Compress UIDs into an IMAP sequence set, e.g. [1, 2, 3, 7] -> "1:3,7" """
+    parts = []
+    start = previous = None
+    for uid in sorted(set(uids)):
+        if previous is not None and uid == previous + 1:
+            previous = uid
+            continue
+        if start is not None:
+            parts.append(f"{start}:{previous}" if previous != start else str(start))
+        start = previous = uid
+    if start is not None:
+        parts.append(f"{start}:{previous}" if previous != start else str(start))
+    return ",".join(parts)
+
+
+def _quote(folder: str) -> str:
+    if folder.startswith('"') or not re.search(r'[\s"\\]', folder):
+        return folder
+    return '"' + folder.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _check(typ: str, data: Any, what: str):
+    if typ != "OK":
+        detail = data[0].decode(errors="replace") if data and isinstance(data[0], bytes) else data
+        raise imaplib.IMAP4.error(f"{what} failed: {detail}")
+
+
+def parse_fetch(data: Sequence[Any]) -> List[Dict[str, Any]]:
+    """
+    Group an imaplib UID FETCH response into one dict per message. Each
+    message starts with a "<seq> (" line; literals (header and body preview)
+    arrive as (prefix, bytes) tuples, and UID/FLAGS/RFC822.SIZE may appear in
+    any of the non-literal pieces depending on the server's item order.
+    """
+    messages: List[Dict[str, Any]] = []
+    current: Optional[Dict[str, Any]] = None
+    for item in data:
+        prefix, literal = item if isinstance(item, tuple) else (item, None)
+        if not isinstance(prefix, bytes):
+            continue
+        if re.match(rb"\d+ \(", prefix):
+            current = {"meta": b"", "header": b"", "text": b""}
+            messages.append(current)
+        if current is None:
+            continue
+        current["meta"] += b" " + prefix
+        if literal is not None:
+            # The literal belongs to the last item named in the prefix, just before "{n}"
+            if prefix[prefix.rfind(b"BODY["):].startswith(b"BODY[TEXT]"):
+                current["text"] = literal
+            else:
+                current["header"] = literal
+
+    parsed = []
+    for message in messages:
+        uid = _UID.search(message["meta"])
+        if not uid:
+            continue
+        flags = _FLAGS.search(message["meta"])
+        size = _SIZE.search(message["meta"])
+        parsed.append({
+            "uid": int(uid.group(1)),
+            "flags": flags.group(1).decode() if flags else "",
+            "size": int(size.group(1)) if size else None,
+            "header": message["header"],
+            "text": message["text"],
+        })
+    return parsed
+
+
+def _text_of(part) -> str:
+    payload = part.get_payload(decode=True) or b""
+    charset = part.get_content_charset() or "utf-8"
+    try:
+        return payload.decode(charset, errors="replace")
+    except LookupError:
+        return payload.decode("utf-8", errors="replace")
+
+
+def build_preview(header: bytes, text: bytes, limit: int) -> str:
+    """Readable preview from the headers plus a partial body (which may cut a MIME part short)"""
+    try:
+        message = email.message_from_bytes(header.rstrip(b"\r\n") + b"\r\n\r\n" + text, policy=email.policy.compat32)
+        plain = html_part = None
+        for part in message.walk():
+            content_type = part.get_content_type()
+            if part.is_multipart():
+                continue
+            if content_type == "text/plain" and plain is None:
+                plain = _text_of(part)
+            elif content_type == "text/html" and html_part is None:
+                html_part = html.unescape(_TAGS.sub(" ", _text_of(part)))
+        body = plain if plain is not None else html_part if html_part is not None else text.decode("utf-8", "replace")
+    except Exception:
+        body = text.decode("utf-8", errors="replace")
+    return _SPACE.sub(" ", body).strip()[:limit]
+
+
+def _headers(header: bytes) -> Dict[str, str]:
+    message = email.message_from_bytes(header, policy=email.policy.default)
+    values = {}
+    for name in ("Subject", "From", "To", "Date", "Message-ID"):
+        try:
+            values[name] = str(message.get(name, "") or "")
+        except Exception:
+            values[name] = ""
+    return values
+
+
+class MailboxIndex:
+    """SQLite cache of message headers, flags and previews, per account and folder"""
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        if self._db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self._db.executescript("DROP TABLE IF EXISTS folders; DROP TABLE IF EXISTS messages;")
+            self._db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._db.executescript(SCHEMA)
+
+    @contextmanager
+    def _transaction(self):
+        # The connection is in autocommit mode; group multi-row writes into one transaction
+        self._db.execute("BEGIN")
+        try:
+            yield
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        self._db.execute("COMMIT")
+
+    def folder_state(self, account: str, folder: str) -> Optional[Tuple[int, int, int, int, float]]:
+        """(uidvalidity, last_uid, floor_uid, below_floor, synced_at), or None if never synced"""
+        with self._lock:
+            return self._db.execute(
+                "SELECT uidvalidity, last_uid, floor_uid, below_floor, synced_at FROM folders "
+                "WHERE account = ? AND folder = ?", (account, folder)).fetchone()
+
+    def reset_folder(self, account: str, folder: str):
+        with self._lock, self._transaction():
+            self._db.execute("DELETE FROM messages WHERE account = ? AND folder = ?", (account, folder))
+            self._db.execute("DELETE FROM folders WHERE account = ? AND folder = ?", (account, folder))
+
+    def set_folder_state(self, account: str, folder: str, uidvalidity: int, last_uid: int,
+                         floor_uid: int, below_floor: int):
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO folders VALUES (?, ?, ?, ?, ?, ?, ?)",
+                             (account, folder, uidvalidity, last_uid, floor_uid, below_floor, time.time()))
+
+    def store(self, account: str, folder: str, rows: Iterable[Dict[str, Any]]):
+        with self._lock, self._transaction():
+            self._db.executemany(
+                "INSERT OR REPLACE INTO messages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(account, folder, r["uid"], r["message_id"], r["subject"], r["from"], r["to"], r["date"],
+                  r["flags"], 1 if "\\Seen" in r["flags"] else 0, r["size"], r["preview"], r["preview_bytes"])
+                 for r in rows])
+
+    def count(self, account: str, folder: str, min_uid: int = 0) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM messages WHERE account = ? AND folder = ? AND uid >= ?",
+                                    (account, folder, min_uid)).fetchone()[0]
+
+    def uids(self, account: str, folder: str) -> Set[int]:
+        with self._lock:
+            return {row[0] for row in self._db.execute(
+                "SELECT uid FROM messages WHERE account = ? AND folder = ?", (account, folder))}
+
+    def short_previews(self, account: str, folder: str, limit: int, unread_only: bool,
+                       preview_bytes: int) -> List[int]:
+        """UIDs among the newest `limit` (unread) messages whose preview was fetched shorter than preview_bytes"""
+        sql = "SELECT uid, preview_bytes FROM messages WHERE account = ? AND folder = ?"
+        if unread_only:
+            sql += " AND seen = 0"
+        sql += " ORDER BY uid DESC LIMIT ?"
+        with self._lock:
+            rows = self._db.execute(sql, (account, folder, limit)).fetchall()
+        return [uid for uid, fetched in rows if fetched < preview_bytes]
+
+    def mark_unseen(self, account: str, folder: str, unseen: Set[int]):
+        """Flag exactly the UIDs in `unseen` as unread, keeping the flags text in step"""
+        with self._lock, self._transaction():
+            self._db.execute("UPDATE messages SET seen = 1, flags = TRIM(flags || ' ' || ?) "
+                             "WHERE account = ? AND folder = ? AND seen = 0", ("\\Seen", account, folder))
+            self._db.executemany("UPDATE messages SET seen = 0, flags = TRIM(REPLACE(' ' || flags || ' ', ?, ' ')) "
+                                 "WHERE account = ? AND folder = ? AND uid = ?",
+                                 [(" \\Seen ", account, folder, uid) for uid in unseen])
+
+    def retain(self, account: str, folder: str, uids: Set[int]) -> int:
+        """Drop indexed messages that are no longer on the server; returns how many"""
+        with self._lock, self._transaction():
+            indexed = {row[0] for row in self._db.execute(
+                "SELECT uid FROM messages WHERE account = ? AND folder = ?", (account, folder))}
+            gone = indexed - uids
+            self._db.executemany("DELETE FROM messages WHERE account = ? AND folder = ? AND uid = ?",
+                                 [(account, folder, uid) for uid in gone])
+            return len(gone)
+
+    def query(self, account: str, folder: str, limit: int = 10, unread_only: bool = False,
+              preview_chars: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Newest messages first; previews fetched longer than `preview_chars` are cut to it"""
+        sql = ("SELECT uid, subject, from_addr, to_addr, date, message_id, flags, seen, size, preview "
+               "FROM messages WHERE account = ? AND folder = ?")
+        if unread_only:
+            sql += " AND seen = 0"
+        sql += " ORDER BY uid DESC LIMIT ?"
+        with self._lock:
+            rows = self._db.execute(sql, (account, folder, limit)).fetchall()
+        return [{
+            "id": str(uid), "uid": uid, "subject": subject, "from": from_addr, "to": to_addr, "date": date,
+            "message_id": message_id, "flags": flags, "unread": not seen, "size_bytes": size,
+            "body": preview[:preview_chars] if preview and preview_chars is not None else preview,
+        } for uid, subject, from_addr, to_addr, date, message_id, flags, seen, size, preview in rows]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class IMAPSession:
+    """One persistent, logged-in IMAP connection whose calls run on a dedicated thread"""
+
+    def __init__(self, host: str, username: str, password: str, port: Optional[int] = None,
+                 use_ssl: bool = True, timeout: float = 30.0, keepalive: float = 60.0):
+        self.host = host
+        self.username = username
+        self.password = password
+        self.port = port or (993 if use_ssl else 143)
+        self.use_ssl = use_ssl
+        self.timeout = timeout
+        self.keepalive = keepalive
+        self._conn: Optional[imaplib.IMAP4] = None
+        self._last_used = 0.0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="imap")
+        self.stats = {"logins": 0, "reconnects": 0, "commands": 0}
+
+    def _connect(self) -> imaplib.IMAP4:
+        cls = imaplib.IMAP4_SSL if self.use_ssl else imaplib.IMAP4
+        conn = cls(self.host, self.port, timeout=self.timeout)
+        conn.login(self.username, self.password)
+        self.stats["logins"] += 1
+        return conn
+
+    def _ensure(self) -> imaplib.IMAP4:
+        if self._conn is not None and time.monotonic() - self._last_used > self.keepalive:
+            try:
+                self._conn.noop()
+            except (imaplib.IMAP4.abort, imaplib.IMAP4.error, OSError):
+                self._drop()
+        if self._conn is None:
+            self._conn = self._connect()
+        return self._conn
+
+    def _drop(self):
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            try:
+                conn.shutdown()
+            except Exception:
+                pass
+
+    def _call(self, fn: Callable[..., Any], args: tuple) -> Any:
+        self.stats["commands"] += 1
+        try:
+            result = fn(self._ensure(), *args)
+        except (imaplib.IMAP4.abort, OSError):
+            # The server closed the session (idle timeout, restart); log in again once
+            self.stats["reconnects"] += 1
+            self._drop()
+            result = fn(self._ensure(), *args)
+        self._last_used = time.monotonic()
+        return result
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        """Run fn(connection, *args) on the session thread"""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self._call, fn, args)
+
+    async def close(self):
+        def logout():
+            if self._conn is not None:
+                try:
+                    self._conn.logout()
+                except Exception:
+                    pass
+                self._conn = None
+
+        await asyncio.get_running_loop().run_in_executor(self._executor, logout)
+        self._executor.shutdown(wait=False)
+
+
+def _search(conn: imaplib.IMAP4, criteria: str) -> List[int]:
+    typ, data = conn.uid("SEARCH", None, criteria)
+    _check(typ, data, f"UID SEARCH {criteria}")
+    return [int(uid) for uid in b" ".join(d for d in data if d).split()]
+
+
+def _fetch(conn: imaplib.IMAP4, index: MailboxIndex, account: str, folder: str, uids: Sequence[int],
+           preview_bytes: int, batch_size: int, on_batch: Optional[Callable[[List[int]], None]] = None) -> int:
+    """Fetch headers and previews for `uids` into the index; returns the number of FETCH commands"""
+    items = f"(UID FLAGS RFC822.SIZE BODY.PEEK[HEADER.FIELDS ({HEADER_FIELDS})] BODY.PEEK[TEXT]<0.{preview_bytes}>)"
+    commands = 0
+    for i in range(0, len(uids), batch_size):
+        batch = list(uids[i:i + batch_size])
+        typ, data = conn.uid("FETCH", uid_ranges(batch), items)
+        _check(typ, data, "UID FETCH")
+        commands += 1
+        rows = []
+        for message in parse_fetch(data):
+            headers = _headers(message["header"])
+            rows.append({
+                "uid": message["uid"], "flags": message["flags"], "size": message["size"],
+                "subject": headers["Subject"], "from": headers["From"], "to": headers["To"],
+                "date": headers["Date"], "message_id": headers["Message-ID"],
+                "preview": build_preview(message["header"], message["text"], preview_bytes),
+                "preview_bytes": preview_bytes,
+            })
+        index.store(account, folder, rows)
+        if on_batch is not None:
+            on_batch(batch)
+    return commands
+
+
+def sync_folder(conn: imaplib.IMAP4, index: MailboxIndex, account: str, folder: str = "INBOX",
+                preview_bytes: int = DEFAULT_PREVIEW_BYTES, batch_size: int = FETCH_BATCH_SIZE,
+                limit: int = 0, unread_only: bool = False, backfill: int = DEFAULT_BACKFILL) -> Dict[str, Any]:
+    """
+    Bring the index for `folder` up to date, so that the newest `limit` (unread)
+    messages are indexed with previews of at least `preview_bytes`; blocking,
+    meant for IMAPSession.run
+    """
+    started = time.perf_counter()
+    typ, data = conn.select(_quote(folder), readonly=True)
+    _check(typ, data, f"SELECT {folder}")
+    exists = int(data[0])
+    uidvalidity = int(conn.response("UIDVALIDITY")[1][0])
+
+    state = index.folder_state(account, folder)
+    if state is not None and state[0] == uidvalidity:
+        _, last_uid, floor_uid, below_floor, _ = state
+    else:
+        index.reset_folder(account, folder)
+        last_uid, floor_uid, below_floor = 0, None, 0
+
+    # "n:*" always matches the highest UID, so filter out what is already indexed
+    new_uids = [uid for uid in _search(conn, f"UID {last_uid + 1}:*") if uid > last_uid] if exists else []
+    keep = max(limit, backfill, 1)
+    if floor_uid is None or len(new_uids) > keep:
+        # First sync, or more new mail than a backfill: index the newest messages, the rest on demand
+        new_uids = new_uids[-keep:]
+        floor_uid = new_uids[0] if new_uids else last_uid + 1
+        # Messages already indexed below the new floor stay, as extras
+        below_floor = exists - len(new_uids)
+
+    def advance(batch: List[int]):
+        nonlocal last_uid
+        last_uid = max(last_uid, max(batch))
+        index.set_folder_state(account, folder, uidvalidity, last_uid, floor_uid, below_floor)
+
+    index.set_folder_state(account, folder, uidvalidity, last_uid, floor_uid, below_floor)
+    fetch_commands = _fetch(conn, index, account, folder, new_uids, preview_bytes, batch_size, advance)
+
+    # Read state changes on old messages too: one UID SEARCH instead of refetching flags
+    unseen = set(_search(conn, "UNSEEN")) if exists else set()
+    index.mark_unseen(account, folder, unseen)
+    removed = 0
+    if index.count(account, folder, floor_uid) + below_floor != exists:
+        all_uids = set(_search(conn, "ALL")) if exists else set()
+        removed = index.retain(account, folder, all_uids)
+        below_floor = sum(1 for uid in all_uids if uid < floor_uid)
+
+    # Older messages, fetched only as far as this read needs them
+    older: List[int] = []
+    if unread_only:
+        indexed = index.uids(account, folder)
+        older = [uid for uid in sorted(unseen)[-limit:] if uid not in indexed] if limit else []
+    elif below_floor and index.count(account, folder, floor_uid) < limit:
+        below = _search(conn, f"UID 1:{floor_uid - 1}") if floor_uid > 1 else []
+        below = [uid for uid in below if uid < floor_uid]
+        extend = below[-(limit - index.count(account, folder, floor_uid)):]
+        indexed = index.uids(account, folder)
+        older = [uid for uid in extend if uid not in indexed]
+        if extend:
+            floor_uid = extend[0]
+        below_floor = len(below) - len(extend)
+    fetch_commands += _fetch(conn, index, account, folder, older, preview_bytes, batch_size)
+
+    short = index.short_previews(account, folder, limit, unread_only, preview_bytes) if limit else []
+    fetch_commands += _fetch(conn, index, account, folder, sorted(short), preview_bytes, batch_size)
+
+    index.set_folder_state(account, folder, uidvalidity, last_uid, floor_uid, below_floor)
+    return {
+        "folder": folder,
+        "exists": exists,
+        "new_messages": len(new_uids),
+        "older_fetched": len(older),
+        "previews_refetched": len(short),
+        "messages_below_floor": below_floor,
+        "removed_messages": removed,
+        "fetch_commands": fetch_commands,
+        "last_uid": last_uid,
+        "sync_seconds": round(time.perf_counter() - started, 4),
+    }
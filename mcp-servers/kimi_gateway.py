@@ -0,0 +1,354 @@
+"""
+Upstream gateway for OpenAI-compatible APIs (NVIDIA NIM for Kimi K2.5)
+
+Wraps a single pooled openai.AsyncOpenAI client with:
+- a token bucket sized to the API quota (shared Retry-After back-off)
+- a bounded semaphore capping in-flight upstream requests
+- retries with full jitter, honoring Retry-After, limited by a retry budget
+- a circuit breaker that fails fast while the upstream is down
+- per-request latency, time-to-first-token and token usage accounting
+- streamed completions that hold their concurrency slot until the stream ends
+"""
+
+import asyncio
+import random
+import time
+import uuid
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+import httpx
+import openai
+
+from rate_limit import TokenBucket
+
+
+class CircuitOpenError(Exception):
+    """Raised when the circuit breaker is open and requests are short-circuited"""
+
+
+class RetryBudgetExhaustedError(Exception):
+    """Raised when a request would retry but the gateway-wide retry budget is spent"""
+
+
+class CircuitBreaker:
+    """Closed -> open after consecutive failures; half-open trial after a cool-down"""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+
+    def allow(self) -> bool:
+        """Return True if a request may go upstream now"""
+        if self.state == "closed":
+            return True
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = "half_open"
+            self._trial_in_flight = False
+        if self.state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self._trial_in_flight = False
+
+    def record_neutral(self):
+        """Release a half-open trial without changing state"""
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self._trial_in_flight = False
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+
+class RetryBudget:
+    """Allow retries up to `ratio` of requests, plus a floor for quiet periods"""
+
+    def __init__(self, ratio: float = 0.2, min_retries: int = 10):
+        self.ratio = ratio
+        self.capacity = float(min_retries)
+        self.tokens = float(min_retries)
+
+    def deposit(self):
+        self.tokens = min(self.capacity, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+
+def parse_retry_after(error: Exception) -> Optional[float]:
+    """Extract a Retry-After delay in seconds from an openai API error, if any"""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000.0
+        except ValueError:
+            pass
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class UpstreamGateway:
+    """Concurrency-, rate- and failure-aware access to an OpenAI-compatible API"""
+
+    RETRYABLE_ERRORS = (
+        openai.RateLimitError,
+        openai.APIConnectionError,  # includes APITimeoutError
+        openai.InternalServerError,
+    )
+
+    def __init__(self, base_url: str, api_key: str,
+                 requests_per_minute: float = 40,
+                 burst: Optional[float] = None,
+                 max_concurrency: int = 8,
+                 max_retries: int = 3,
+                 retry_budget_ratio: float = 0.2,
+                 base_backoff: float = 0.5,
+                 max_backoff: float = 20.0,
+                 failure_threshold: int = 5,
+                 reset_timeout: float = 30.0,
+                 timeout: float = 300.0,
+                 stream_usage: bool = True,
+                 history_size: int = 200):
+        self.client = openai.AsyncOpenAI(
+            base_url=base_url,
+            api_key=api_key,
+            max_retries=0,  # retries are handled here, against the shared budget
+            timeout=timeout,
+            http_client=httpx.AsyncClient(
+                timeout=timeout,
+                limits=httpx.Limits(
+                    max_connections=max_concurrency,
+                    max_keepalive_connections=max_concurrency,
+                    keepalive_expiry=60.0,
+                ),
+            ),
+        )
+        self.bucket = TokenBucket.per_minute(requests_per_minute, burst)
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.retry_budget = RetryBudget(retry_budget_ratio)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.stream_usage = stream_usage
+
+        self.in_flight = 0
+        self.counters: Dict[str, int] = {
+            "requests": 0,
+            "succeeded": 0,
+            "failed": 0,
+            "retries": 0,
+            "rate_limited": 0,
+            "short_circuited": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "total_tokens": 0,
+        }
+        self.history: Deque[Dict[str, Any]] = deque(maxlen=history_size)
+
+    async def close(self):
+        await self.client.close()
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        if retry_after is not None:
+            # Honor the server's hint; a little jitter keeps waiters from stampeding
+            return retry_after + random.uniform(0, self.base_backoff)
+        return random.uniform(0, min(self.max_backoff, self.base_backoff * (2 ** attempt)))
+
+    def _new_record(self, params: Dict[str, Any], stream: bool) -> Dict[str, Any]:
+        self.counters["requests"] += 1
+        self.retry_budget.deposit()
+        return {
+            "id": uuid.uuid4().hex[:12],
+            "model": params.get("model"),
+            "stream": stream,
+            "attempts": 0,
+            "queue_ms": 0.0,
+            "status": "pending",
+        }
+
+    def _account_usage(self, record: Dict[str, Any], usage: Any):
+        for key in ("prompt_tokens", "completion_tokens", "total_tokens"):
+            value = getattr(usage, key, 0) or 0
+            record[key] = value
+            self.counters[key] += value
+
+    def _finish(self, record: Dict[str, Any], started: float, error: Optional[BaseException]):
+        if error is None:
+            record["status"] = "ok"
+            self.counters["succeeded"] += 1
+        else:
+            record["status"] = type(error).__name__
+            self.counters["failed"] += 1
+        record["latency_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        self.history.append(record)
+
+    async def create_chat_completion(self, **params) -> Any:
+        """Call chat.completions.create with rate limiting, retries and accounting"""
+        record = self._new_record(params, stream=False)
+        started = time.perf_counter()
+        error = None
+        try:
+            response = await self._open_with_retries(params, record)
+            self._release()
+            self._account_usage(record, getattr(response, "usage", None))
+            return response
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self._finish(record, started, error)
+
+    async def stream_chat_completion(self, **params) -> AsyncIterator[Any]:
+        """
+        Stream chat completion chunks from upstream.
+
+        Retries only happen before the first chunk arrives; the concurrency
+        slot is held until the stream is exhausted or the consumer stops.
+        """
+        params = {**params, "stream": True}
+        if self.stream_usage:
+            params.setdefault("stream_options", {"include_usage": True})
+        record = self._new_record(params, stream=True)
+        started = time.perf_counter()
+        error = None
+        stream = None
+        try:
+            stream = await self._open_with_retries(params, record)
+            chunks = 0
+            async for chunk in stream:
+                if chunks == 0:
+                    record["ttft_ms"] = round((time.perf_counter() - started) * 1000, 2)
+                chunks += 1
+                if getattr(chunk, "usage", None):
+                    self._account_usage(record, chunk.usage)
+                yield chunk
+            record["chunks"] = chunks
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            if stream is not None:
+                self._release()
+                await stream.close()
+            self._finish(record, started, error)
+
+    def _release(self):
+        self.in_flight -= 1
+        self.semaphore.release()
+
+    def _note_retryable(self, e: Exception) -> Optional[float]:
+        retry_after = parse_retry_after(e)
+        if isinstance(e, openai.RateLimitError):
+            self.counters["rate_limited"] += 1
+            self.bucket.penalize(retry_after if retry_after is not None else self.base_backoff)
+            # 429 is backpressure, not an upstream failure
+            self.breaker.record_neutral()
+        else:
+            self.breaker.record_failure()
+        return retry_after
+
+    async def _open_with_retries(self, params: Dict[str, Any], record: Dict[str, Any]) -> Any:
+        """Return the upstream response with a concurrency slot held; callers must _release()"""
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                self.counters["short_circuited"] += 1
+                raise CircuitOpenError("Upstream circuit breaker is open")
+
+            # allow() only lets a request through a half-open breaker as its single trial
+            is_trial = self.breaker.state == "half_open"
+            acquired = False
+            try:
+                queued = time.perf_counter()
+                await self.bucket.acquire()
+                await self.semaphore.acquire()
+                acquired = True
+                record["queue_ms"] += round((time.perf_counter() - queued) * 1000, 2)
+                record["attempts"] += 1
+                self.in_flight += 1
+                response = await self.client.chat.completions.create(**params)
+            except BaseException as e:
+                if acquired:
+                    self._release()
+                if isinstance(e, self.RETRYABLE_ERRORS):
+                    error = e
+                    retry_after = self._note_retryable(e)
+                elif isinstance(e, openai.APIStatusError):
+                    # Client errors (4xx) mean the upstream is healthy
+                    self.breaker.record_success()
+                    raise
+                else:
+                    # Cancelled (the client went away) or unexpected: no verdict on the
+                    # upstream, but a trial that never finishes would keep the breaker half-open
+                    if is_trial:
+                        self.breaker.record_neutral()
+                    raise
+            else:
+                self.breaker.record_success()
+                return response
+
+            if attempt >= self.max_retries:
+                raise error
+            if not self.retry_budget.withdraw():
+                raise RetryBudgetExhaustedError("Upstream retry budget exhausted") from error
+            self.counters["retries"] += 1
+            await asyncio.sleep(self._backoff(attempt, retry_after))
+            attempt += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters, latency percentiles and recent per-request records"""
+        latencies = sorted(r["latency_ms"] for r in self.history if r["status"] == "ok")
+        ttfts = sorted(r["ttft_ms"] for r in self.history if "ttft_ms" in r)
+
+        def percentile(values, p: float) -> Optional[float]:
+            if not values:
+                return None
+            return values[min(len(values) - 1, int(p * len(values)))]
+
+        return {
+            **self.counters,
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "circuit_state": self.breaker.state,
+            "retry_budget": round(self.retry_budget.tokens, 2),
+            "latency_ms": {
+                "p50": percentile(latencies, 0.50),
+                "p95": percentile(latencies, 0.95),
+                "max": latencies[-1] if latencies else None,
+            },
+            "ttft_ms": {
+                "p50": percentile(ttfts, 0.50),
+                "p95": percentile(ttfts, 0.95),
+            },
+            "recent": list(self.history)[-20:],
+        }
@@ -9,12 +9,15 @@ import asyncio
 import json
 from typing import Dict, Any, List, Optional
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 import openai
 import base64
 import requests
 from datetime import datetime
 
+from kimi_gateway import UpstreamGateway, CircuitOpenError, RetryBudgetExhaustedError
+
 
 class ChatCompletionRequest(BaseModel):
     """Request model for chat completions"""
@@ -41,6 +44,7 @@ class ToolCallRequest(BaseModel):
     model: str = "moonshotai/kimi-k2.5"
     max_tokens: int = 4096
     temperature: float = 0.6
+    stream: bool = False
     thinking: bool = True
 
 
@@ -64,17 +68,130 @@ API_KEY = "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
 BASE_URL = "https://integrate.api.nvidia.com/v1"
 
 
+# Upstream limits (NIM free tier allows 40 requests per minute)
+UPSTREAM_REQUESTS_PER_MINUTE = 40
+UPSTREAM_MAX_CONCURRENCY = 8
+UPSTREAM_MAX_RETRIES = 3
+
+
 @app.on_event("startup")
 async def startup_event():
-    """Initialize the OpenAI client with NVIDIA API configuration"""
-    global client
-    client = openai.AsyncOpenAI(
+    """Initialize the upstream gateway with NVIDIA API configuration"""
+    global gateway
+    gateway = UpstreamGateway(
         base_url=BASE_URL,
         api_key=API_KEY,
+        requests_per_minute=UPSTREAM_REQUESTS_PER_MINUTE,
+        max_concurrency=UPSTREAM_MAX_CONCURRENCY,
+        max_retries=UPSTREAM_MAX_RETRIES,
     )
     print("Kimi K2.5 MCP Server started successfully")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Close pooled upstream connections"""
+    await gateway.close()
+
+
+def upstream_http_error(e: Exception, context: str) -> HTTPException:
+    """Map gateway/upstream failures onto HTTP errors for our callers"""
+    if isinstance(e, CircuitOpenError):
+        return HTTPException(status_code=503, detail=f"{context}: {str(e)}", headers={"Retry-After": "30"})
+    if isinstance(e, (RetryBudgetExhaustedError, openai.RateLimitError)):
+        return HTTPException(status_code=429, detail=f"{context}: {str(e)}")
+    return HTTPException(status_code=500, detail=f"{context}: {str(e)}")
+
+
+def format_stream_chunk(chunk) -> Dict[str, Any]:
+    """Convert an upstream chunk into an OpenAI-style chat.completion.chunk payload"""
+    choices = []
+    for choice in chunk.choices:
+        delta = {}
+        if getattr(choice.delta, 'role', None):
+            delta["role"] = choice.delta.role
+        if getattr(choice.delta, 'content', None) is not None:
+            delta["content"] = choice.delta.content
+        # Thinking mode streams its reasoning trace incrementally as well
+        if getattr(choice.delta, 'reasoning_content', None):
+            delta["reasoning_content"] = choice.delta.reasoning_content
+        if getattr(choice.delta, 'tool_calls', None):
+            delta["tool_calls"] = [
+                tool_call.model_dump(exclude_none=True) for tool_call in choice.delta.tool_calls
+            ]
+        choices.append({
+            "index": choice.index,
+            "delta": delta,
+            "finish_reason": choice.finish_reason,
+        })
+
+    result = {
+        "id": chunk.id,
+        "object": "chat.completion.chunk",
+        "created": chunk.created,
+        "model": chunk.model,
+        "choices": choices,
+    }
+    if getattr(chunk, 'usage', None):
+        result["usage"] = {
+            "prompt_tokens": getattr(chunk.usage, 'prompt_tokens', 0),
+            "completion_tokens": getattr(chunk.usage, 'completion_tokens', 0),
+            "total_tokens": getattr(chunk.usage, 'total_tokens', 0),
+        }
+    return result
+
+
+class RelayStreamingResponse(StreamingResponse):
+    """StreamingResponse that closes its upstream stream however the response ends"""
+
+    def __init__(self, content, upstream, **kwargs):
+        super().__init__(content, **kwargs)
+        self.upstream = upstream
+
+    async def __call__(self, scope, receive, send):
+        # The body may never be iterated (client gone before it starts), so the
+        # upstream stream and its concurrency slot are released here instead
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.upstream.aclose()
+
+
+async def stream_chat_completion(api_params: Dict[str, Any], context: str) -> StreamingResponse:
+    """
+    Relay an upstream completion as Server-Sent Events
+
+    The first chunk is awaited before the response starts, so rate limiting,
+    retries and upstream errors still surface as proper HTTP status codes.
+    """
+    chunks = gateway.stream_chat_completion(**api_params)
+    try:
+        first_chunk = await chunks.__anext__()
+    except StopAsyncIteration:
+        first_chunk = None
+    except Exception as e:
+        raise upstream_http_error(e, context)
+
+    async def events():
+        try:
+            if first_chunk is not None:
+                yield f"data: {json.dumps(format_stream_chunk(first_chunk))}\n\n"
+            async for chunk in chunks:
+                yield f"data: {json.dumps(format_stream_chunk(chunk))}\n\n"
+        except Exception as e:
+            yield f"data: {json.dumps({'error': {'message': f'{context}: {str(e)}'}})}\n\n"
+        finally:
+            await chunks.aclose()
+        yield "data: [DONE]\n\n"
+
+    return RelayStreamingResponse(
+        events(),
+        chunks,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
     """Health check endpoint"""
@@ -140,8 +257,11 @@ async def chat_completions(request: ChatCompletionRequest):
             # Use instant mode (direct responses without reasoning traces)
             api_params["extra_body"] = {"thinking": {"type": "disabled"}}
         
+        if request.stream:
+            return await stream_chat_completion(api_params, "Error calling Kimi K2.5 API")
+
         # Make the API call
-        response = await client.chat.completions.create(**api_params)
+        response = await gateway.create_chat_completion(**api_params)
         
         # Format the response
         result = {
@@ -173,8 +293,10 @@ async def chat_completions(request: ChatCompletionRequest):
         
         return result
         
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error calling Kimi K2.5 API: {str(e)}")
+        raise upstream_http_error(e, "Error calling Kimi K2.5 API")
 
 
 @app.post("/chat/completions/tools")
@@ -202,8 +324,11 @@ async def chat_completions_with_tools(request: ToolCallRequest):
         else:
             api_params["extra_body"] = {"thinking": {"type": "disabled"}}
         
+        if request.stream:
+            return await stream_chat_completion(api_params, "Error calling Kimi K2.5 API with tools")
+
         # Make the API call
-        response = await client.chat.completions.create(**api_params)
+        response = await gateway.create_chat_completion(**api_params)
         
         # Format the response
         result = {
@@ -249,8 +374,16 @@ async def chat_completions_with_tools(request: ToolCallRequest):
         
         return result
         
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error calling Kimi K2.5 API with tools: {str(e)}")
+        raise upstream_http_error(e, "Error calling Kimi K2.5 API with tools")
+
+
+@app.get("/metrics")
+async def metrics():
+    """Upstream gateway counters, latency percentiles and recent request accounting"""
+    return gateway.stats()
 
 
 @app.get("/models")
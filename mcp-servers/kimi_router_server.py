@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+"""
+Kimi K2.5 Router Server
+Exposes one OpenAI-compatible endpoint in front of the local llama.cpp-backed
+Kimi (local_kimi_server.py, port 3007) and the NIM-backed Kimi
+(kimi_k25_mcp_server.py, port 3006).
+
+Each request is routed to the backend with the lowest expected completion
+time among those that can serve it (tools, images, context size), using
+live queue depth, observed latency and health. Failed attempts fail over
+to the next candidate automatically.
+
+Long conversations are compacted to each backend's token budget before
+forwarding (see context_compactor.py); the prefill tokens saved are
+reported per request in the X-Prefill-Tokens-Saved header.
+"""
+
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+import aiohttp
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
+
+from context_compactor import ContextCompactor, TokenCounter
+
+
+class BackendConfig(BaseModel):
+    """Static description of a Kimi backend"""
+    name: str
+    url: str
+    model: str
+    chat_path: str = "/chat/completions"
+    tools_path: Optional[str] = Field(default=None, description="Endpoint for tool calling; None if unsupported")
+    health_path: str = "/health"
+    supports_images: bool = False
+    supports_streaming: bool = Field(default=True, description="Can answer stream=true with SSE")
+    max_context_tokens: int = 16384
+    max_concurrency: int = 1
+    expected_latency_ms: float = Field(default=2000.0, description="Latency prior before any observations")
+    prefill_ms_per_1k_tokens: float = Field(default=100.0, description="Extra latency per 1K prompt tokens")
+
+
+DEFAULT_BACKENDS = [
+    BackendConfig(
+        name="local",
+        url="http://localhost:3007",
+        model="kimi-k25-local",
+        health_path="/health/ready",
+        supports_streaming=False,  # local_kimi_server.py returns whole completions only
+        max_context_tokens=16384,  # --ctx-size in local_kimi_server.py
+        max_concurrency=1,  # --parallel 1
+        expected_latency_ms=4000.0,
+        prefill_ms_per_1k_tokens=400.0,
+    ),
+    BackendConfig(
+        name="nim",
+        url="http://localhost:3006",
+        model="moonshotai/kimi-k2.5",
+        tools_path="/chat/completions/tools",
+        supports_images=True,
+        max_context_tokens=262144,
+        max_concurrency=8,
+        expected_latency_ms=3000.0,
+        prefill_ms_per_1k_tokens=50.0,
+    ),
+]
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class ContextConfig(BaseModel):
+    """Context compaction settings for the router"""
+    enabled: bool = True
+    budget_tokens: Optional[int] = Field(default=None, description="Prompt budget cap; defaults to each backend's window")
+    reserve_tokens: int = Field(default=256, description="Headroom kept free besides max_tokens")
+    strategy: str = Field(default="summarize", description="'summarize' or 'drop' older turns")
+    keep_recent_turns: int = 2
+    drop_granularity: int = Field(default=4, description="Turns are compacted in blocks of this size")
+    summary_max_tokens: int = 512
+
+
+class NoBackendAvailable(Exception):
+    """Raised when no backend can serve a request"""
+
+
+def has_images(body: Dict[str, Any]) -> bool:
+    """True if the request carries image inputs"""
+    if body.get("images"):
+        return True
+    for message in body.get("messages", []):
+        content = message.get("content")
+        if isinstance(content, list) and any(
+            isinstance(part, dict) and part.get("type") == "image_url" for part in content
+        ):
+            return True
+    return False
+
+
+class Backend:
+    """Live routing state for one backend"""
+
+    def __init__(self, config: BackendConfig, ewma_alpha: float = 0.3,
+                 failure_threshold: int = 3, cooldown_seconds: float = 15.0):
+        self.config = config
+        self.ewma_alpha = ewma_alpha
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.in_flight = 0
+        self.latency_ms = config.expected_latency_ms
+        self.healthy = True
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+        self.requests = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def available(self) -> bool:
+        return self.healthy and time.monotonic() >= self.cooldown_until
+
+    def can_serve(self, needs_tools: bool, needs_images: bool, required_tokens: int,
+                  needs_streaming: bool = False) -> bool:
+        if needs_tools and not self.config.tools_path:
+            return False
+        if needs_images and not self.config.supports_images:
+            return False
+        if needs_streaming and not self.config.supports_streaming:
+            return False
+        return required_tokens <= self.config.max_context_tokens
+
+    def expected_ms(self, prompt_tokens: int) -> float:
+        """Expected completion time: queueing behind in-flight work plus prefill cost"""
+        queue_factor = 1.0 + self.in_flight / self.config.max_concurrency
+        prefill = prompt_tokens / 1000.0 * self.config.prefill_ms_per_1k_tokens
+        return self.latency_ms * queue_factor + prefill
+
+    def record_success(self, elapsed_ms: float):
+        self.latency_ms = self.ewma_alpha * elapsed_ms + (1 - self.ewma_alpha) * self.latency_ms
+        self.consecutive_failures = 0
+        self.healthy = True
+
+    def record_failure(self, error: str):
+        self.failures += 1
+        self.consecutive_failures += 1
+        self.last_error = error
+        if self.consecutive_failures >= self.failure_threshold:
+            self.cooldown_until = time.monotonic() + self.cooldown_seconds
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.config.name,
+            "url": self.config.url,
+            "healthy": self.healthy,
+            "available": self.available,
+            "in_flight": self.in_flight,
+            "max_concurrency": self.config.max_concurrency,
+            "latency_ms_ewma": round(self.latency_ms, 2),
+            "requests": self.requests,
+            "failures": self.failures,
+            "last_error": self.last_error,
+        }
+
+
+class KimiRouter:
+    """Picks a backend per request and fails over between them"""
+
+    def __init__(self, configs: List[BackendConfig], health_interval: float = 10.0,
+                 request_timeout: float = 300.0, context: Optional[ContextConfig] = None):
+        self.backends = [Backend(config) for config in configs]
+        self.context = context or ContextConfig()
+        self.counter = TokenCounter()
+        self.compactor = ContextCompactor(
+            self.counter,
+            strategy=self.context.strategy,
+            keep_recent_turns=self.context.keep_recent_turns,
+            drop_granularity=self.context.drop_granularity,
+            summary_max_tokens=self.context.summary_max_tokens,
+        )
+        self.context_stats = {"requests": 0, "compacted_requests": 0, "prefill_tokens_saved": 0}
+        self.health_interval = health_interval
+        self.request_timeout = request_timeout
+        self.session: Optional[aiohttp.ClientSession] = None
+        self._health_task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=100, keepalive_timeout=60),
+            timeout=aiohttp.ClientTimeout(total=self.request_timeout),
+        )
+        await self.check_health()
+        self._health_task = asyncio.create_task(self._health_loop())
+
+    async def stop(self):
+        if self._health_task:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+        if self.session:
+            await self.session.close()
+
+    async def check_health(self):
+        """Probe every backend's health endpoint concurrently"""
+        async def probe(backend: Backend):
+            try:
+                timeout = aiohttp.ClientTimeout(total=5)
+                url = backend.config.url + backend.config.health_path
+                async with self.session.get(url, timeout=timeout) as response:
+                    backend.healthy = response.status == 200
+                    if not backend.healthy:
+                        backend.last_error = f"Health check returned status {response.status}"
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                backend.healthy = False
+                backend.last_error = f"Health check failed: {e}"
+
+        await asyncio.gather(*(probe(backend) for backend in self.backends))
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            await self.check_health()
+
+    def budget_for(self, backend: Backend, body: Dict[str, Any]) -> int:
+        """Prompt token budget for this backend: its window minus the completion and headroom"""
+        budget = (backend.config.max_context_tokens - int(body.get("max_tokens") or 0)
+                  - self.context.reserve_tokens)
+        override = body.get("context_budget_tokens") or self.context.budget_tokens
+        return min(budget, override) if override else budget
+
+    def candidates(self, body: Dict[str, Any]) -> List[Backend]:
+        """Backends able to serve the request, best first"""
+        needs_tools = bool(body.get("tools"))
+        needs_images = has_images(body)
+        needs_streaming = bool(body.get("stream"))
+        messages = body.get("messages", [])
+        prompt_tokens = self.counter.count_messages(messages) + self.counter.count_tools(body.get("tools"))
+        if self.context.enabled:
+            # Compaction can shrink everything but the system prefix and tool definitions
+            prefix, _ = ContextCompactor.split_prefix(messages)
+            min_prompt_tokens = self.counter.count_messages(prefix) + self.counter.count_tools(body.get("tools"))
+        else:
+            min_prompt_tokens = prompt_tokens
+        required_tokens = min_prompt_tokens + int(body.get("max_tokens") or 0)
+
+        capable = [b for b in self.backends
+                   if b.can_serve(needs_tools, needs_images, required_tokens, needs_streaming)]
+        if not capable:
+            raise NoBackendAvailable(
+                f"No backend supports this request (tools={needs_tools}, images={needs_images}, "
+                f"stream={needs_streaming}, tokens={required_tokens})"
+            )
+
+        def rank(backend: Backend) -> Tuple[bool, bool, float]:
+            budget = self.budget_for(backend, body)
+            # Prefer backends that take the prompt whole over lossy compaction, unless
+            # an explicit budget forces compaction everywhere
+            needs_compaction = prompt_tokens > budget and not (
+                self.context.budget_tokens or body.get("context_budget_tokens"))
+            # Unavailable backends stay as a last resort in case health data is stale
+            return (not backend.available, needs_compaction, backend.expected_ms(min(prompt_tokens, budget)))
+
+        return sorted(capable, key=rank)
+
+    def _backend_request(self, backend: Backend, body: Dict[str, Any],
+                         compacted: Dict[int, Tuple[List[Dict[str, Any]], Dict[str, Any]]]) -> Tuple[str, Dict[str, Any], Dict[str, Any]]:
+        payload = {k: v for k, v in body.items() if k != "context_budget_tokens"}
+        payload["model"] = backend.config.model
+        report = {"prefill_tokens_saved": 0}
+        if self.context.enabled:
+            budget = self.budget_for(backend, body)
+            if budget not in compacted:
+                compacted[budget] = self.compactor.compact(body["messages"], budget, body.get("tools"))
+            payload["messages"], report = compacted[budget]
+        path = backend.config.tools_path if body.get("tools") else backend.config.chat_path
+        return backend.config.url + path, payload, report
+
+    async def forward(self, body: Dict[str, Any]) -> Tuple[Backend, aiohttp.ClientResponse, float, Dict[str, Any]]:
+        """
+        Send the request to the best backend, failing over on connection
+        errors and retryable statuses. Returns (backend, aiohttp response,
+        start time, compaction report); the caller must release the response
+        and call finish().
+        """
+        errors = []
+        compacted: Dict[int, Tuple[List[Dict[str, Any]], Dict[str, Any]]] = {}
+        for backend in self.candidates(body):
+            url, payload, report = self._backend_request(backend, body, compacted)
+            backend.in_flight += 1
+            backend.requests += 1
+            started = time.perf_counter()
+            try:
+                response = await self.session.post(url, json=payload)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                backend.in_flight -= 1
+                backend.record_failure(str(e) or type(e).__name__)
+                errors.append(f"{backend.config.name}: {backend.last_error}")
+                continue
+
+            if response.status in RETRYABLE_STATUS:
+                detail = await response.text()
+                response.release()
+                backend.in_flight -= 1
+                backend.record_failure(f"HTTP {response.status}: {detail[:200]}")
+                errors.append(f"{backend.config.name}: HTTP {response.status}")
+                continue
+
+            self.context_stats["requests"] += 1
+            if report["prefill_tokens_saved"]:
+                self.context_stats["compacted_requests"] += 1
+                self.context_stats["prefill_tokens_saved"] += report["prefill_tokens_saved"]
+            return backend, response, started, report
+
+        raise NoBackendAvailable("All backends failed: " + "; ".join(errors))
+
+    def finish(self, backend: Backend, started: float, ok: bool, error: str = ""):
+        backend.in_flight -= 1
+        if ok:
+            backend.record_success((time.perf_counter() - started) * 1000)
+        else:
+            backend.record_failure(error)
+
+
+def create_router_app(configs: List[BackendConfig], context: Optional[ContextConfig] = None) -> FastAPI:
+    router = KimiRouter(configs, context=context)
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        await router.start()
+        yield
+        await router.stop()
+
+    app = FastAPI(
+        title="Kimi K2.5 Router",
+        description="OpenAI-compatible router across local and NIM-backed Kimi K2.5",
+        version="1.0.0",
+        lifespan=lifespan,
+    )
+    app.state.router = router
+
+    @app.post("/chat/completions")
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        """Route an OpenAI-style chat completion to the best available backend"""
+        body = await request.json()
+        if not isinstance(body.get("messages"), list):
+            raise HTTPException(status_code=400, detail="'messages' must be a list")
+
+        try:
+            backend, response, started, report = await router.forward(body)
+        except NoBackendAvailable as e:
+            raise HTTPException(status_code=503, detail=str(e))
+
+        headers = {
+            "X-Kimi-Backend": backend.config.name,
+            "X-Prefill-Tokens-Saved": str(report["prefill_tokens_saved"]),
+        }
+        ok = response.status < 400
+
+        if body.get("stream") and ok:
+            async def relay():
+                error = ""
+                try:
+                    async for data in response.content.iter_any():
+                        yield data
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    error = str(e) or type(e).__name__
+                finally:
+                    response.release()
+                    router.finish(backend, started, not error, error)
+
+            return StreamingResponse(relay(), media_type="text/event-stream", headers=headers)
+
+        try:
+            content = await response.read()
+        finally:
+            response.release()
+            router.finish(backend, started, ok or response.status < 500, f"HTTP {response.status}")
+        try:
+            payload = json.loads(content)
+        except ValueError:
+            payload = {"detail": content.decode(errors="replace")}
+        return JSONResponse(status_code=response.status, content=payload, headers=headers)
+
+    @app.get("/models")
+    @app.get("/v1/models")
+    async def list_models():
+        """Single logical model served by the router"""
+        return {
+            "object": "list",
+            "data": [{"id": "kimi-k2.5", "object": "model", "created": 1706745600, "owned_by": "router"}],
+        }
+
+    @app.get("/health")
+    async def health_check():
+        """Healthy while at least one backend is available"""
+        available = [b.config.name for b in router.backends if b.available]
+        return JSONResponse(
+            status_code=200 if available else 503,
+            content={"status": "healthy" if available else "unavailable", "available_backends": available},
+        )
+
+    @app.get("/backends")
+    async def backends():
+        """Live routing state per backend"""
+        return {"backends": [b.stats() for b in router.backends], "context": router.context_stats}
+
+    return app
+
+
+app = create_router_app(DEFAULT_BACKENDS)
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=3008)
@@ -0,0 +1,194 @@
+"""
+Streaming MIME messages for EmailMCP
+
+A StreamingMessage is a multipart/mixed message whose attachments stay on
+disk until it is sent. Iterating it yields the wire form (CRLF line endings,
+dot-stuffed for SMTP DATA) in bounded chunks: attachments are read and
+base64-encoded 57 * BASE64_LINES_PER_CHUNK bytes at a time, so sending a
+50 MB attachment needs about 80 KB of buffer rather than several copies of
+the file. The exact encoded size is known up front, which lets size limits
+(ours and the server's SIZE extension) be enforced before any data is sent.
+
+send_streaming() is the streaming counterpart of smtplib.SMTP.sendmail and
+writes those chunks straight to the socket after DATA.
+"""
+
+import base64
+import email.policy
+import mimetypes
+import os
+import re
+import secrets
+import smtplib
+from email.message import EmailMessage, MIMEPart
+from email.utils import formatdate, make_msgid
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+BASE64_LINE_BYTES = 57  # raw bytes per 76-character base64 line
+BASE64_LINES_PER_CHUNK = 1024
+
+_POLICY = email.policy.SMTP
+_LEADING_DOT = re.compile(rb"^\.", re.MULTILINE)
+
+
+class MessageTooLarge(ValueError):
+    """An attachment or the whole message exceeds a configured or server size limit"""
+
+
+def base64_size(raw_bytes: int) -> int:
+    """Length of the CRLF-wrapped base64 encoding of `raw_bytes` bytes"""
+    full_lines, remainder = divmod(raw_bytes, BASE64_LINE_BYTES)
+    size = full_lines * (76 + 2)
+    if remainder:
+        size += 4 * -(-remainder // 3) + 2
+    return size
+
+
+def _fold_headers(message) -> bytes:
+    return b"".join(_POLICY.fold_binary(name, value) for name, value in message.items())
+
+
+def _dot_stuff(data: bytes) -> bytes:
+    # Lines that start with "." would otherwise end or corrupt the SMTP DATA stream
+    return _LEADING_DOT.sub(b"..", data)
+
+
+class StreamingMessage:
+    """multipart/mixed message: headers, a text/plain body and file attachments read on demand"""
+
+    def __init__(self, from_addr: str, to: Sequence[str], subject: str, body: str,
+                 cc: Sequence[str] = (), attachments: Sequence[str] = (),
+                 max_attachment_bytes: Optional[int] = None, max_message_bytes: Optional[int] = None):
+        self.attachments: List[Tuple[str, int]] = []
+        for path in attachments:
+            size = os.path.getsize(path)
+            if max_attachment_bytes is not None and size > max_attachment_bytes:
+                raise MessageTooLarge(
+                    f"Attachment {os.path.basename(path)} is {size} bytes (max: {max_attachment_bytes})")
+            self.attachments.append((path, size))
+
+        self.boundary = "=_" + secrets.token_hex(16)
+        headers = EmailMessage(policy=_POLICY)
+        headers["From"] = from_addr
+        headers["To"] = ", ".join(to)
+        if cc:
+            headers["Cc"] = ", ".join(cc)
+        headers["Subject"] = subject
+        headers["Date"] = formatdate(localtime=True)
+        headers["Message-ID"] = make_msgid()
+        headers["MIME-Version"] = "1.0"
+        headers["Content-Type"] = f'multipart/mixed; boundary="{self.boundary}"'
+        self._head = _fold_headers(headers) + b"\r\n"
+
+        text = MIMEPart(policy=_POLICY)
+        # 7bit-safe even for non-ASCII text, so no server needs to offer 8BITMIME
+        text.set_content(body, cte="quoted-printable")
+        self._text = _dot_stuff(text.as_bytes())
+
+        self._part_heads = [self._attachment_head(path) for path, _ in self.attachments]
+        self.size = (len(self._head) + len(self._delimiter()) + len(self._text)
+                     + sum(len(self._delimiter()) + len(head) + base64_size(size)
+                           for head, (_, size) in zip(self._part_heads, self.attachments))
+                     + len(self._closing()))
+        if max_message_bytes is not None and self.size > max_message_bytes:
+            raise MessageTooLarge(f"Message is {self.size} bytes encoded (max: {max_message_bytes})")
+
+    def _delimiter(self) -> bytes:
+        return f"\r\n--{self.boundary}\r\n".encode()
+
+    def _closing(self) -> bytes:
+        return f"\r\n--{self.boundary}--\r\n".encode()
+
+    @staticmethod
+    def _attachment_head(path: str) -> bytes:
+        name = os.path.basename(path)
+        content_type, _ = mimetypes.guess_type(name)
+        part = MIMEPart(policy=_POLICY)
+        part["Content-Type"] = content_type or "application/octet-stream"
+        part.add_header("Content-Disposition", "attachment", filename=name)
+        part["Content-Transfer-Encoding"] = "base64"
+        return _fold_headers(part) + b"\r\n"
+
+    @staticmethod
+    def _encode_file(path: str) -> Iterator[bytes]:
+        chunk_bytes = BASE64_LINE_BYTES * BASE64_LINES_PER_CHUNK
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(chunk_bytes)
+                if not chunk:
+                    return
+                # Chunks are whole lines, so line breaks land exactly where a one-shot encode puts them
+                yield base64.encodebytes(chunk).replace(b"\n", b"\r\n")
+
+    def __iter__(self) -> Iterator[bytes]:
+        """Yield the SMTP DATA payload (dot-stuffed, CRLF) in bounded chunks"""
+        yield self._head
+        yield self._delimiter() + self._text
+        for head, (path, _) in zip(self._part_heads, self.attachments):
+            yield self._delimiter() + head
+            yield from self._encode_file(path)
+        yield self._closing()
+
+    def as_bytes(self) -> bytes:
+        return b"".join(self)
+
+
+def _rset(smtp: smtplib.SMTP):
+    try:
+        smtp.rset()
+    except smtplib.SMTPServerDisconnected:
+        pass
+
+
+def send_streaming(smtp: smtplib.SMTP, from_addr: str, recipients: Sequence[str],
+                   message: StreamingMessage) -> Dict[str, Tuple[int, bytes]]:
+    """
+    Like smtplib.SMTP.sendmail, but writes the message to the DATA stream
+    chunk by chunk. Declares the size with the SIZE extension when offered,
+    and refuses up front when it exceeds the server's advertised limit.
+    Returns the refused recipients; raises the same exceptions as sendmail.
+    """
+    smtp.ehlo_or_helo_if_needed()
+    options = []
+    if smtp.does_esmtp and smtp.has_extn("size"):
+        limit = int(smtp.esmtp_features["size"] or 0)
+        if limit and message.size > limit:
+            raise MessageTooLarge(f"Message is {message.size} bytes; the server accepts at most {limit}")
+        options.append(f"SIZE={message.size}")
+
+    code, response = smtp.mail(from_addr, options)
+    if code != 250:
+        if code == 421:
+            smtp.close()
+        else:
+            _rset(smtp)
+        raise smtplib.SMTPSenderRefused(code, response, from_addr)
+
+    refused: Dict[str, Tuple[int, bytes]] = {}
+    for recipient in recipients:
+        code, response = smtp.rcpt(recipient)
+        if code not in (250, 251):
+            refused[recipient] = (code, response)
+        if code == 421:
+            smtp.close()
+            raise smtplib.SMTPRecipientsRefused(refused)
+    if len(refused) == len(recipients):
+        _rset(smtp)
+        raise smtplib.SMTPRecipientsRefused(refused)
+
+    code, response = smtp.docmd("DATA")
+    if code != 354:
+        _rset(smtp)
+        raise smtplib.SMTPDataError(code, response)
+    for chunk in message:
+        smtp.send(chunk)
+    # The payload already ends in CRLF, so this completes the CRLF.CRLF terminator
+    smtp.send(b".\r\n")
+    code, response = smtp.getreply()
+    if code != 250:
+        if code == 421:
+            smtp.close()
+        else:
+            _rset(smtp)
+        raise smtplib.SMTPDataError(code, response)
+    return refused
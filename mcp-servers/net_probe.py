@@ -0,0 +1,159 @@
+"""
+Concurrent TCP connectivity probes for SystemDevOpsMCP
+
+Each probe resolves the host through a small TTL cache (concurrent lookups of
+the same name share one getaddrinfo call), then connects with a non-blocking
+socket on the event loop, trying each resolved address in turn within the
+probe's timeout. DNS and connect latency are reported separately, so a slow
+resolver is distinguishable from a slow endpoint.
+"""
+
+import asyncio
+import errno
+import socket
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+DNS_CACHE_TTL = 60.0
+DNS_NEGATIVE_TTL = 5.0
+
+Target = Union[str, Tuple[str, int], Dict[str, Any]]
+
+
+class DNSCache:
+    """getaddrinfo results cached per (host, port) for `ttl` seconds"""
+
+    def __init__(self, ttl: float = DNS_CACHE_TTL, negative_ttl: float = DNS_NEGATIVE_TTL):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries: Dict[Tuple[str, int], Tuple[float, Any]] = {}
+        self._pending: Dict[Tuple[str, int], asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def resolve(self, host: str, port: int) -> List[tuple]:
+        """Return [(family, sockaddr), ...]; raises socket.gaierror for unknown hosts"""
+        key = (host, port)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self.hits += 1
+            result = entry[1]
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        # The lookup runs as its own task, so a caller timing out does not cancel it for the others
+        task = self._pending.get(key)
+        if task is None:
+            self.misses += 1
+            task = self._pending[key] = asyncio.ensure_future(self._lookup(key))
+            task.add_done_callback(_retrieve_exception)
+        else:
+            self.hits += 1
+        return await asyncio.shield(task)
+
+    async def _lookup(self, key: Tuple[str, int]) -> List[tuple]:
+        host, port = key
+        try:
+            infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+            addresses = list(dict.fromkeys((family, sockaddr) for family, _, _, _, sockaddr in infos))
+            self._entries[key] = (time.monotonic() + self.ttl, addresses)
+            return addresses
+        except socket.gaierror as e:
+            self._entries[key] = (time.monotonic() + self.negative_ttl, e)
+            raise
+        finally:
+            self._pending.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+def _retrieve_exception(task: asyncio.Future):
+    # A failed lookup whose callers all timed out would otherwise be logged as unhandled
+    if not task.cancelled():
+        task.exception()
+
+
+async def _connect(family: int, sockaddr: tuple) -> None:
+    loop = asyncio.get_running_loop()
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setblocking(False)
+    try:
+        await loop.sock_connect(sock, sockaddr)
+    finally:
+        sock.close()
+
+
+async def _attempt(host: str, port: int, dns: DNSCache, result: Dict[str, Any]) -> None:
+    started = time.perf_counter()
+    addresses = await dns.resolve(host, port)
+    result["dns_ms"] = round((time.perf_counter() - started) * 1000, 3)
+    last_error: Optional[OSError] = None
+    for family, sockaddr in addresses:
+        attempt = time.perf_counter()
+        try:
+            await _connect(family, sockaddr)
+        except OSError as e:
+            last_error = e
+            continue
+        result.update({
+            "is_connected": True,
+            "status_code": 0,
+            "address": sockaddr[0],
+            "connect_ms": round((time.perf_counter() - attempt) * 1000, 3),
+        })
+        return
+    result["status_code"] = last_error.errno if last_error and last_error.errno else errno.ECONNREFUSED
+    result["error"] = str(last_error) if last_error else "no addresses"
+
+
+async def probe(host: str, port: int, timeout: float = 5.0, dns: Optional[DNSCache] = None) -> Dict[str, Any]:
+    """Probe one host:port; never raises, failures are reported in the result"""
+    started = time.perf_counter()
+    result: Dict[str, Any] = {"host": host, "port": port, "is_connected": False}
+    try:
+        await asyncio.wait_for(_attempt(host, port, dns or DNSCache(ttl=0), result), timeout)
+    except asyncio.TimeoutError:
+        result.update({"status_code": errno.ETIMEDOUT, "error": f"timed out after {timeout} seconds"})
+    except socket.gaierror as e:
+        result.update({"status_code": e.errno, "error": f"DNS resolution failed: {e}"})
+    result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 3)
+    return result
+
+
+def parse_target(target: Target, default_port: int = 80) -> Tuple[str, int]:
+    """Accept "host:port", "[v6]:port", (host, port) or {"host": ..., "port": ...}"""
+    if isinstance(target, dict):
+        return target["host"], int(target.get("port", default_port))
+    if isinstance(target, (tuple, list)):
+        return target[0], int(target[1])
+    if target.startswith("["):
+        host, _, rest = target[1:].partition("]")
+        return host, int(rest.lstrip(":") or default_port)
+    if target.count(":") == 1:
+        host, port = target.split(":")
+        return host, int(port)
+    return target, default_port
+
+
+async def probe_many(targets: Iterable[Target], timeout: float = 5.0, concurrency: int = 64,
+                     dns: Optional[DNSCache] = None, default_port: int = 80) -> List[Dict[str, Any]]:
+    """Probe every target concurrently (at most `concurrency` at once), results in input order"""
+    dns = dns or DNSCache()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(target: Target) -> Dict[str, Any]:
+        try:
+            host, port = parse_target(target, default_port)
+        except (KeyError, IndexError, TypeError, ValueError) as e:
+            # A malformed target fails on its own instead of aborting the batch
+            return {"target": target, "is_connected": False, "status_code": errno.EINVAL,
+                    "error": f"Invalid target {target!r}: {e}"}
+        async with semaphore:
+            return await probe(host, port, timeout, dns)
+
+    return list(await asyncio.gather(*(bounded(t) for t in targets)))
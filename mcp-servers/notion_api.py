@@ -0,0 +1,188 @@
+"""
+Async Notion API client for NotionMCP
+
+One long-lived aiohttp session (keep-alive connection pool, timeouts, auth
+headers) shared by every call, with:
+- a token bucket at Notion's documented average of 3 requests per second,
+  paused for the whole client when a 429 carries Retry-After
+- a semaphore bounding requests in flight
+- retries with jittered exponential backoff for 429, 5xx and connection errors
+- cursor pagination exposed as an async generator, so callers can stream
+  results instead of stopping at the first 100
+- bulk page creation with bounded concurrency, results in input order
+"""
+
+import asyncio
+import random
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence
+
+import aiohttp
+
+from rate_limit import TokenBucket
+
+NOTION_VERSION = "2022-06-28"
+MAX_PAGE_SIZE = 100
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+class NotionAPIError(Exception):
+    """Non-retryable (or retries exhausted) error response from the Notion API"""
+
+    def __init__(self, status: int, code: str, message: str):
+        super().__init__(f"Notion API {status} {code}: {message}")
+        self.status = status
+        self.code = code
+
+
+class NotionClient:
+    def __init__(self, token: str, base_url: str = "https://api.notion.com/v1",
+                 requests_per_second: float = 3.0, burst: Optional[float] = None,
+                 max_concurrency: int = 3, max_retries: int = 4, timeout: float = 30.0,
+                 base_backoff: float = 0.5, max_backoff: float = 30.0):
+        self.token = token
+        self.base_url = base_url.rstrip("/")
+        self.bucket = TokenBucket(requests_per_second, burst)
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.counters = {"requests": 0, "retries": 0, "rate_limited": 0, "failed": 0}
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_concurrency, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={
+                    "Authorization": f"Bearer {self.token}",
+                    "Content-Type": "application/json",
+                    "Notion-Version": NOTION_VERSION,
+                },
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        if retry_after is not None:
+            return retry_after + random.uniform(0, self.base_backoff)
+        return random.uniform(0, min(self.max_backoff, self.base_backoff * (2 ** attempt)))
+
+    async def request(self, method: str, path: str, payload: Optional[Dict[str, Any]] = None,
+                      retry_unsafe: bool = True) -> Dict[str, Any]:
+        """
+        Send one API request, retrying rate limits and transient failures.
+        With retry_unsafe=False (non-idempotent writes) only failures that
+        prove the request was not applied are retried: 429 and connection
+        errors raised before it was sent.
+        """
+        session = self._get_session()
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        attempt = 0
+        while True:
+            await self.bucket.acquire()
+            self.counters["requests"] += 1
+            retry_after: Optional[float] = None
+            try:
+                async with self.semaphore:
+                    async with session.request(method, url, json=payload) as response:
+                        if response.status < 400:
+                            return await response.json()
+                        try:
+                            body = await response.json(content_type=None) or {}
+                        except ValueError:
+                            body = {}
+                        if response.status == 429:
+                            self.counters["rate_limited"] += 1
+                            try:
+                                retry_after = float(response.headers.get("Retry-After", ""))
+                            except ValueError:
+                                retry_after = None
+                            # Every caller shares the quota, so pause them all
+                            self.bucket.penalize(retry_after if retry_after is not None else self._backoff(attempt, None))
+                        error = NotionAPIError(response.status, body.get("code", "error"),
+                                               body.get("message", response.reason or ""))
+                        retryable = response.status == 429 or (retry_unsafe and response.status in RETRYABLE_STATUSES)
+                        if not retryable:
+                            self.counters["failed"] += 1
+                            raise error
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if not retry_unsafe and not isinstance(e, aiohttp.ClientConnectorError):
+                    # The request may already have been applied; resending it could duplicate the write
+                    self.counters["failed"] += 1
+                    raise
+                error = e
+            if attempt >= self.max_retries:
+                self.counters["failed"] += 1
+                raise error
+            self.counters["retries"] += 1
+            await asyncio.sleep(self._backoff(attempt, retry_after))
+            attempt += 1
+
+    async def iter_query(self, database_id: str, filter: Optional[Dict[str, Any]] = None,
+                         sorts: Optional[List[Dict[str, Any]]] = None,
+                         page_size: int = MAX_PAGE_SIZE,
+                         start_cursor: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Yield every page in the database matching `filter`, following cursors"""
+        cursor = start_cursor
+        while True:
+            payload: Dict[str, Any] = {"page_size": min(page_size, MAX_PAGE_SIZE)}
+            if filter:
+                payload["filter"] = filter
+            if sorts:
+                payload["sorts"] = sorts
+            if cursor:
+                payload["start_cursor"] = cursor
+            data = await self.request("POST", f"databases/{database_id}/query", payload)
+            for page in data.get("results", []):
+                yield page
+            if not data.get("has_more") or not data.get("next_cursor"):
+                return
+            cursor = data["next_cursor"]
+
+    async def query_database(self, database_id: str, filter: Optional[Dict[str, Any]] = None,
+                             sorts: Optional[List[Dict[str, Any]]] = None,
+                             limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Collect up to `limit` matching pages (all of them when limit is None)"""
+        pages = []
+        async for page in self.iter_query(database_id, filter, sorts,
+                                          page_size=min(limit, MAX_PAGE_SIZE) if limit else MAX_PAGE_SIZE):
+            pages.append(page)
+            if limit is not None and len(pages) >= limit:
+                break
+        return pages
+
+    async def create_page(self, parent_database_id: str, properties: Dict[str, Any],
+                          children: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        payload: Dict[str, Any] = {"parent": {"database_id": parent_database_id}, "properties": properties}
+        if children:
+            payload["children"] = children
+        return await self.request("POST", "pages", payload, retry_unsafe=False)
+
+    async def create_pages(self, parent_database_id: str, items: Sequence[Dict[str, Any]],
+                           concurrency: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Create one page per properties dict with at most `concurrency` creations
+        in flight. Failures are reported per item instead of aborting the batch.
+        """
+        gate = asyncio.Semaphore(concurrency or self.max_concurrency)
+
+        async def one(index: int, properties: Dict[str, Any]) -> Dict[str, Any]:
+            async with gate:
+                started = time.perf_counter()
+                try:
+                    page = await self.create_page(parent_database_id, properties)
+                    result = {"success": True, "page_id": page["id"], "url": page.get("url")}
+                except (NotionAPIError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    result = {"success": False, "error": str(e)}
+                result.update({"index": index, "seconds": round(time.perf_counter() - started, 4)})
+                return result
+
+        return list(await asyncio.gather(*(one(i, properties) for i, properties in enumerate(items))))
@@ -1,50 +1,132 @@
 import asyncio
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import FastMCP, Context
 from pydantic import BaseModel, Field
-import requests
-import json
+from typing import List, Optional, Set, Tuple
+
+from notion_api import NotionClient
+from notion_replica import NotionReplica, UnsupportedFilter, supports
 
 class NotionConfig(BaseModel):
     integration_token: str = Field(description="Notion integration token")
     base_url: str = Field(default="https://api.notion.com/v1", description="Notion API base URL")
+    requests_per_second: float = Field(default=3.0, description="Average request rate allowed by Notion")
+    max_concurrency: int = Field(default=3, description="Max requests in flight")
+    timeout_seconds: float = Field(default=30.0, description="Per-request timeout")
+    replica_path: Optional[str] = Field(default=None, description="SQLite file for a local replica of queried databases (disabled when unset)")
+    replica_max_staleness_seconds: float = Field(default=60.0, description="Serve replica reads synced at most this long ago")
+    replica_full_sync_seconds: float = Field(default=3600.0, description="Interval between full resyncs that detect deleted pages")
 
 class PageQuery(BaseModel):
     database_id: str = Field(description="ID of the database to query")
     filter_conditions: dict = Field(default=None, description="Filter conditions for query")
+    sorts: List[dict] = Field(default=None, description="Sort criteria for query")
+    limit: Optional[int] = Field(default=None, description="Maximum number of pages to return (all when unset)")
+    max_staleness_seconds: Optional[float] = Field(default=None, description="Override the replica staleness bound for this query")
+
+class BulkCreateRequest(BaseModel):
+    parent_database_id: str = Field(description="ID of the database to add pages to")
+    pages: List[dict] = Field(description="Properties of each page to create")
+    concurrency: int = Field(default=3, description="Max page creations in flight")
 
 class NotionMCP:
     def __init__(self):
         self.app = FastMCP("notion")
         self.config = None
+        self.client: Optional[NotionClient] = None
+        self.replica: Optional[NotionReplica] = None
+        self._closing: Set[asyncio.Task] = set()
         
     def set_config(self, config: NotionConfig):
         self.config = config
+        # The client holds the old token's session; close it, it reopens on next use
+        retired = self._detach()
+        if config.replica_path:
+            self.replica = NotionReplica(config.replica_path, config.replica_full_sync_seconds)
+        if not any(retired):
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            asyncio.run(self._close_resources(*retired))
+            return
+        task = loop.create_task(self._close_resources(*retired))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    def _detach(self) -> Tuple[Optional[NotionClient], Optional[NotionReplica]]:
+        retired = (self.client, self.replica)
+        self.client = None
+        self.replica = None
+        return retired
+
+    @staticmethod
+    async def _close_resources(client: Optional[NotionClient], replica: Optional[NotionReplica]):
+        if client is not None:
+            await client.close()
+        if replica is not None:
+            replica.close()
+
+    def _client(self) -> NotionClient:
+        if self.client is None:
+            self.client = NotionClient(
+                self.config.integration_token, self.config.base_url,
+                requests_per_second=self.config.requests_per_second,
+                max_concurrency=self.config.max_concurrency,
+                timeout=self.config.timeout_seconds
+            )
+        return self.client
 
-    async def query_database(self, database_id: str, filter_conditions: dict = None) -> dict:
-        """Query a Notion database."""
+    async def close(self):
+        """Close the API session and the replica"""
+        await self._close_resources(*self._detach())
+        if self._closing:
+            await asyncio.gather(*self._closing, return_exceptions=True)
+
+    async def query_database(self, database_id: str, filter_conditions: dict = None,
+                             sorts: List[dict] = None, limit: Optional[int] = None,
+                             ctx: Optional[Context] = None,
+                             max_staleness: Optional[float] = None) -> dict:
+        """Query a Notion database, from the local replica when it can answer."""
         if not self.config:
             return {"success": False, "error": "Notion configuration not set"}
-            
-        headers = {
-            "Authorization": f"Bearer {self.config.integration_token}",
-            "Content-Type": "application/json",
-            "Notion-Version": "2022-06-28"
-        }
-        
-        url = f"{self.config.base_url}/databases/{database_id}/query"
         
-        payload = {}
-        if filter_conditions:
-            payload["filter"] = filter_conditions
-            
         try:
-            response = requests.post(url, headers=headers, json=payload)
-            response.raise_for_status()
+            if self.replica and supports(filter_conditions, sorts):
+                if max_staleness is None:
+                    max_staleness = self.config.replica_max_staleness_seconds
+                sync = await self.replica.ensure_fresh(self._client(), database_id, max_staleness)
+                try:
+                    pages = await asyncio.to_thread(
+                        self.replica.query, database_id, filter_conditions, sorts, limit
+                    )
+                    return {
+                        "success": True,
+                        "pages": pages,
+                        "total": len(pages),
+                        "source": "replica",
+                        "synced_at": self.replica.state(database_id)[0],
+                        "sync": sync
+                    }
+                except UnsupportedFilter:
+                    # A sort on a property type the replica cannot order; Notion can
+                    pass
+            
+            pages = []
+            async for page in self._client().iter_query(
+                database_id, filter_conditions, sorts,
+                page_size=min(limit, 100) if limit else 100
+            ):
+                pages.append(page)
+                if ctx and len(pages) % 100 == 0:
+                    await ctx.report_progress(len(pages), limit, f"Fetched {len(pages)} pages")
+                if limit is not None and len(pages) >= limit:
+                    break
             
             return {
                 "success": True,
-                "pages": response.json().get("results", []),
-                "total": response.json().get("total", 0)
+                "pages": pages,
+                "total": len(pages),
+                "source": "api"
             }
         except Exception as e:
             return {
@@ -52,45 +134,70 @@ class NotionMCP:
                 "error": str(e)
             }
 
-def create_notion_server():
-    server = NotionMCP()
-    
-    @server.app.tool("query_database", "Query a Notion database with optional filters")
-    async def handle_query(query: PageQuery) -> dict:
-        return await server.query_database(query.database_id, query.filter_conditions)
-    
-    @server.app.tool("create_page", "Create a new page in Notion")
-    async def create_page(properties: dict, parent_database_id: str) -> dict:
-        if not server.config:
+    async def create_page(self, properties: dict, parent_database_id: str) -> dict:
+        """Create a new page in a Notion database."""
+        if not self.config:
             return {"success": False, "error": "Notion configuration not set"}
-            
-        headers = {
-            "Authorization": f"Bearer {server.config.integration_token}",
-            "Content-Type": "application/json",
-            "Notion-Version": "2022-06-28"
-        }
-        
-        url = "https://api.notion.com/v1/pages"
-        
-        payload = {
-            "parent": {"database_id": parent_database_id},
-            "properties": properties
-        }
         
         try:
-            response = requests.post(url, headers=headers, json=payload)
-            response.raise_for_status()
+            page = await self._client().create_page(parent_database_id, properties)
+            if self.replica:
+                # Write through so the next replica read sees the page without a sync
+                await asyncio.to_thread(self.replica.store, parent_database_id, [page])
             
             return {
                 "success": True,
-                "page_id": response.json()["id"],
-                "url": response.json()["url"]
+                "page_id": page["id"],
+                "url": page.get("url")
             }
         except Exception as e:
             return {
                 "success": False,
                 "error": str(e)
             }
+
+    async def create_pages(self, parent_database_id: str, pages: List[dict],
+                           concurrency: int = 3) -> dict:
+        """Create many pages concurrently within Notion's rate limit."""
+        if not self.config:
+            return {"success": False, "error": "Notion configuration not set"}
+        
+        try:
+            client = self._client()
+            results = await client.create_pages(parent_database_id, pages, concurrency)
+            if self.replica:
+                # The next replica read pulls the new pages with an incremental sync
+                await asyncio.to_thread(self.replica.invalidate, parent_database_id)
+            return {
+                "success": all(r["success"] for r in results),
+                "created": sum(1 for r in results if r["success"]),
+                "failed": sum(1 for r in results if not r["success"]),
+                "results": results,
+                "stats": dict(client.counters)
+            }
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e)
+            }
+
+def create_notion_server():
+    server = NotionMCP()
+    
+    @server.app.tool("query_database", "Query a Notion database with optional filters")
+    async def handle_query(query: PageQuery, ctx: Context) -> dict:
+        return await server.query_database(
+            query.database_id, query.filter_conditions, query.sorts, query.limit, ctx,
+            query.max_staleness_seconds
+        )
+    
+    @server.app.tool("create_page", "Create a new page in Notion")
+    async def create_page(properties: dict, parent_database_id: str) -> dict:
+        return await server.create_page(properties, parent_database_id)
+    
+    @server.app.tool("create_pages", "Create many pages in a Notion database concurrently")
+    async def handle_create_pages(req: BulkCreateRequest) -> dict:
+        return await server.create_pages(req.parent_database_id, req.pages, req.concurrency)
     
     return server
 
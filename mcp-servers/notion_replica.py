@@ -0,0 +1,351 @@
+"""
+Local read-through replica of Notion databases for NotionMCP
+
+NotionReplica keeps a SQLite copy of each database it has been asked about.
+sync() only asks Notion for pages edited since the newest last_edited_time
+already stored (Notion rounds that timestamp to the minute, so the boundary
+minute is fetched again and upserted). Database queries never return
+archived pages, so deletions are only noticed by a full sync, which runs on
+first use and then every `full_sync_seconds`.
+
+Queries whose filter and sorts can be evaluated locally (see supports()) are
+answered from the replica once it is no older than the caller's staleness
+bound; anything else (formula, relation, rollup, people, ... conditions)
+goes to the API as before. A sort names only a property, so its type is
+checked against the stored pages when sorting (see SORTABLE_TYPES).
+"""
+
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS databases (
+    database_id TEXT PRIMARY KEY,
+    synced_at REAL NOT NULL,
+    full_synced_at REAL NOT NULL,
+    high_water TEXT
+);
+CREATE TABLE IF NOT EXISTS pages (
+    id TEXT PRIMARY KEY,
+    database_id TEXT NOT NULL,
+    created_time TEXT NOT NULL,
+    last_edited_time TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pages_by_database ON pages (database_id, created_time);
+"""
+
+TEXT_TYPES = {"title", "rich_text", "url", "email", "phone_number"}
+EQUALITY_TYPES = {"select", "status"}
+TIMESTAMPS = {"created_time", "last_edited_time"}
+# Property types whose values _property_value reduces to a comparable scalar
+SORTABLE_TYPES = TEXT_TYPES | EQUALITY_TYPES | {"number", "checkbox", "date"}
+
+TEXT_CONDITIONS = {"equals", "does_not_equal", "contains", "does_not_contain",
+                   "starts_with", "ends_with", "is_empty", "is_not_empty"}
+NUMBER_CONDITIONS = {"equals", "does_not_equal", "greater_than", "less_than",
+                     "greater_than_or_equal_to", "less_than_or_equal_to", "is_empty", "is_not_empty"}
+DATE_CONDITIONS = {"equals", "before", "after", "on_or_before", "on_or_after", "is_empty", "is_not_empty"}
+SUPPORTED_CONDITIONS = {
+    **{t: TEXT_CONDITIONS for t in TEXT_TYPES},
+    "number": NUMBER_CONDITIONS,
+    "checkbox": {"equals", "does_not_equal"},
+    "select": {"equals", "does_not_equal", "is_empty", "is_not_empty"},
+    "status": {"equals", "does_not_equal", "is_empty", "is_not_empty"},
+    "multi_select": {"contains", "does_not_contain", "is_empty", "is_not_empty"},
+    "date": DATE_CONDITIONS,
+    "created_time": DATE_CONDITIONS,
+    "last_edited_time": DATE_CONDITIONS,
+}
+
+
+class UnsupportedFilter(ValueError):
+    """The filter or sort uses a condition the replica cannot evaluate locally"""
+
+
+def _property_value(prop: Optional[Dict[str, Any]]) -> Any:
+    """Plain Python value of a page property object (None when empty)"""
+    if not prop:
+        return None
+    kind = prop.get("type")
+    value = prop.get(kind)
+    if kind in ("title", "rich_text"):
+        return "".join(part.get("plain_text", "") for part in value or []) or None
+    if kind in EQUALITY_TYPES:
+        return value.get("name") if value else None
+    if kind == "multi_select":
+        return [option.get("name") for option in value or []]
+    if kind == "date":
+        return value.get("start") if value else None
+    return value
+
+
+def _parse_date(value: str) -> Tuple[Any, bool]:
+    """(comparable value, date_only) for an ISO 8601 date or datetime"""
+    if len(value) == 10:
+        return date.fromisoformat(value), True
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed, False
+
+
+def _compare_dates(actual: str, expected: str) -> int:
+    a, a_date_only = _parse_date(actual)
+    b, b_date_only = _parse_date(expected)
+    # Comparing against a bare date compares calendar days, like Notion does
+    if b_date_only or a_date_only:
+        a = a if a_date_only else a.date()
+        b = b if b_date_only else b.date()
+    return (a > b) - (a < b)
+
+
+def _text_matches(actual: Optional[str], condition: str, expected: Any) -> bool:
+    text = actual or ""
+    if condition == "is_empty":
+        return not text
+    if condition == "is_not_empty":
+        return bool(text)
+    if condition == "equals":
+        return text == expected
+    if condition == "does_not_equal":
+        return text != expected
+    # Notion's text matching is case-insensitive
+    text, expected = text.lower(), str(expected).lower()
+    if condition == "contains":
+        return expected in text
+    if condition == "does_not_contain":
+        return expected not in text
+    if condition == "starts_with":
+        return text.startswith(expected)
+    return text.endswith(expected)
+
+
+def _number_matches(actual: Optional[float], condition: str, expected: Any) -> bool:
+    if condition == "is_empty":
+        return actual is None
+    if condition == "is_not_empty":
+        return actual is not None
+    if condition == "does_not_equal":
+        return actual != expected
+    if actual is None:
+        return False
+    return {
+        "equals": actual == expected,
+        "greater_than": actual > expected,
+        "less_than": actual < expected,
+        "greater_than_or_equal_to": actual >= expected,
+        "less_than_or_equal_to": actual <= expected,
+    }[condition]
+
+
+def _date_matches(actual: Optional[str], condition: str, expected: Any) -> bool:
+    if condition == "is_empty":
+        return actual is None
+    if condition == "is_not_empty":
+        return actual is not None
+    if actual is None:
+        return False
+    order = _compare_dates(actual, expected)
+    return {
+        "equals": order == 0,
+        "before": order < 0,
+        "after": order > 0,
+        "on_or_before": order <= 0,
+        "on_or_after": order >= 0,
+    }[condition]
+
+
+def supports(filter: Optional[Dict[str, Any]], sorts: Optional[List[Dict[str, Any]]] = None) -> bool:
+    """Whether the filter and sorts can be evaluated against the replica"""
+    for sort in sorts or []:
+        if "property" not in sort and sort.get("timestamp") not in TIMESTAMPS:
+            return False
+    if not filter:
+        return True
+    for compound in ("and", "or"):
+        if compound in filter:
+            return all(supports(f) for f in filter[compound])
+    kind = filter.get("timestamp") or next((k for k in filter if k != "property"), None)
+    conditions = SUPPORTED_CONDITIONS.get(kind)
+    if conditions is None or not isinstance(filter.get(kind), dict) or len(filter[kind]) != 1:
+        return False
+    return next(iter(filter[kind])) in conditions
+
+
+def matches(page: Dict[str, Any], filter: Optional[Dict[str, Any]]) -> bool:
+    """Evaluate a Notion database filter against a page object"""
+    if not filter:
+        return True
+    if "and" in filter:
+        return all(matches(page, f) for f in filter["and"])
+    if "or" in filter:
+        return any(matches(page, f) for f in filter["or"])
+    if not supports(filter):
+        raise UnsupportedFilter(json.dumps(filter))
+
+    if "timestamp" in filter:
+        kind = filter["timestamp"]
+        actual = page.get(kind)
+    else:
+        kind = next(k for k in filter if k != "property")
+        actual = _property_value(page.get("properties", {}).get(filter["property"]))
+    condition, expected = next(iter(filter[kind].items()))
+
+    if kind in TEXT_TYPES:
+        return _text_matches(actual, condition, expected)
+    if kind in EQUALITY_TYPES:
+        if condition in ("is_empty", "is_not_empty"):
+            return (actual is None) == (condition == "is_empty")
+        return (actual == expected) == (condition == "equals")
+    if kind == "number":
+        return _number_matches(actual, condition, expected)
+    if kind == "checkbox":
+        return (bool(actual) == expected) == (condition == "equals")
+    if kind == "multi_select":
+        if condition in ("is_empty", "is_not_empty"):
+            return (not actual) == (condition == "is_empty")
+        return (expected in (actual or [])) == (condition == "contains")
+    return _date_matches(actual, condition, expected)
+
+
+def _sort_key(value: Any) -> Any:
+    return value.lower() if isinstance(value, str) else value
+
+
+def _sort_values(pages: List[Dict[str, Any]], sort: Dict[str, Any]) -> List[Any]:
+    if "timestamp" in sort:
+        return [page.get(sort["timestamp"]) for page in pages]
+    values = []
+    for page in pages:
+        prop = page.get("properties", {}).get(sort["property"])
+        if prop and prop.get("type") not in SORTABLE_TYPES:
+            # Formula, people, relation, rollup, ... values are objects Notion orders its own way
+            raise UnsupportedFilter(json.dumps(sort))
+        values.append(_property_value(prop))
+    return values
+
+
+def sort_pages(pages: List[Dict[str, Any]], sorts: Optional[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Order pages like Notion: by each sort in turn, empty values last (raises UnsupportedFilter)"""
+    for sort in reversed(sorts or []):
+        values = _sort_values(pages, sort)
+        present = [(_sort_key(v), p) for v, p in zip(values, pages) if v is not None]
+        missing = [p for v, p in zip(values, pages) if v is None]
+        # Stable sorts applied last-to-first give a multi-key ordering
+        present.sort(key=lambda item: item[0], reverse=sort.get("direction") == "descending")
+        pages = [p for _, p in present] + missing
+    return pages
+
+
+class NotionReplica:
+    """SQLite copy of Notion databases, synced incrementally by last_edited_time"""
+
+    def __init__(self, path: str, full_sync_seconds: float = 3600.0):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.full_sync_seconds = full_sync_seconds
+        self._lock = threading.Lock()
+        self._sync_locks: Dict[str, asyncio.Lock] = {}
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+
+    @contextmanager
+    def _transaction(self):
+        # The connection is in autocommit mode; group multi-row writes into one transaction
+        self._db.execute("BEGIN")
+        try:
+            yield
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        self._db.execute("COMMIT")
+
+    def state(self, database_id: str) -> Optional[Tuple[float, float, Optional[str]]]:
+        """(synced_at, full_synced_at, high_water) for a database, or None if never synced"""
+        with self._lock:
+            return self._db.execute(
+                "SELECT synced_at, full_synced_at, high_water FROM databases WHERE database_id = ?",
+                (database_id,)).fetchone()
+
+    def store(self, database_id: str, pages: Iterable[Dict[str, Any]]):
+        with self._lock, self._transaction():
+            self._db.executemany(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)",
+                [(p["id"], database_id, p["created_time"], p["last_edited_time"], json.dumps(p))
+                 for p in pages if not p.get("archived")])
+
+    def _finish_sync(self, database_id: str, started: float, full: bool, keep: Optional[set] = None):
+        with self._lock, self._transaction():
+            if keep is not None:
+                stored = {row[0] for row in self._db.execute(
+                    "SELECT id FROM pages WHERE database_id = ?", (database_id,))}
+                self._db.executemany("DELETE FROM pages WHERE id = ?", [(i,) for i in stored - keep])
+            high_water = self._db.execute("SELECT MAX(last_edited_time) FROM pages WHERE database_id = ?",
+                                          (database_id,)).fetchone()[0]
+            previous = self._db.execute("SELECT full_synced_at FROM databases WHERE database_id = ?",
+                                        (database_id,)).fetchone()
+            self._db.execute("INSERT OR REPLACE INTO databases VALUES (?, ?, ?, ?)",
+                             (database_id, started, started if full else previous[0], high_water))
+
+    def invalidate(self, database_id: str):
+        """Make the next ensure_fresh() sync regardless of the staleness bound"""
+        with self._lock:
+            self._db.execute("UPDATE databases SET synced_at = 0 WHERE database_id = ?", (database_id,))
+
+    def pages(self, database_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._db.execute("SELECT data FROM pages WHERE database_id = ? ORDER BY created_time, id",
+                                    (database_id,)).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def query(self, database_id: str, filter: Optional[Dict[str, Any]] = None,
+              sorts: Optional[List[Dict[str, Any]]] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Evaluate a query against the replica (raises UnsupportedFilter)"""
+        if not supports(filter, sorts):
+            raise UnsupportedFilter(json.dumps({"filter": filter, "sorts": sorts}))
+        results = sort_pages([p for p in self.pages(database_id) if matches(p, filter)], sorts)
+        return results[:limit] if limit is not None else results
+
+    async def sync(self, client, database_id: str, full: bool = False) -> Dict[str, Any]:
+        """Pull pages edited since the last sync (every page, and drop deleted ones, when full)"""
+        state = await asyncio.to_thread(self.state, database_id)
+        started = time.time()
+        full = full or state is None or state[2] is None or started - state[1] >= self.full_sync_seconds
+        filter = None
+        if not full:
+            filter = {"timestamp": "last_edited_time", "last_edited_time": {"on_or_after": state[2]}}
+        sorts = [{"timestamp": "last_edited_time", "direction": "ascending"}]
+
+        batch, seen, fetched = [], set(), 0
+        async for page in client.iter_query(database_id, filter, sorts):
+            batch.append(page)
+            seen.add(page["id"])
+            if len(batch) >= 500:
+                await asyncio.to_thread(self.store, database_id, batch)
+                fetched += len(batch)
+                batch = []
+        await asyncio.to_thread(self.store, database_id, batch)
+        fetched += len(batch)
+        await asyncio.to_thread(self._finish_sync, database_id, started, full, seen if full else None)
+        return {"full": full, "fetched": fetched, "synced_at": started}
+
+    async def ensure_fresh(self, client, database_id: str, max_staleness: float) -> Optional[Dict[str, Any]]:
+        """Sync unless the replica is younger than `max_staleness` seconds; concurrent callers share one sync"""
+        lock = self._sync_locks.setdefault(database_id, asyncio.Lock())
+        async with lock:
+            state = await asyncio.to_thread(self.state, database_id)
+            if state is not None and time.time() - state[0] <= max_staleness:
+                return None
+            return await self.sync(client, database_id)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
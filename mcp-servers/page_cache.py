@@ -0,0 +1,289 @@
+"""
+Shared on-disk page cache for the scraping servers
+
+Pages are keyed by producer namespace and normalized URL and stored as
+zlib-compressed JSON blobs named by the SHA-256 of their content, so
+identical pages share one file.
+A SQLite index keeps validators (ETag / Last-Modified), expiry and access
+times; stale entries are revalidated with a conditional GET and the least
+recently used entries are evicted once the cache exceeds its size limit.
+WAL mode lets several server processes share one cache directory.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import aiohttp
+
+from crawl_engine import normalize_url
+
+DEFAULT_CACHE_DIR = os.environ.get("PAGE_CACHE_DIR", str(Path.home() / ".cache" / "mcp-page-cache"))
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_TTL = 15 * 60
+
+# fetch(url, conditional_headers) -> page dict, or None when the server answered 304
+PageFetcher = Callable[[str, Dict[str, str]], Awaitable[Optional[Dict[str, Any]]]]
+
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    fetched_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    last_access REAL NOT NULL,
+    stored_bytes INTEGER NOT NULL,
+    raw_bytes INTEGER NOT NULL,
+    namespace TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS entries_last_access ON entries(last_access);
+CREATE INDEX IF NOT EXISTS entries_digest ON entries(digest);
+"""
+
+
+@dataclass
+class CachedPage:
+    url: str
+    page: Dict[str, Any]
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched_at: float
+    expires_at: float
+    raw_bytes: int
+
+    @property
+    def fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+    def conditional_headers(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+def cache_key(url: str, namespace: str = "") -> str:
+    normalized = normalize_url(url) or url
+    return hashlib.sha256(f"{namespace}\n{normalized}".encode() if namespace else normalized.encode()).hexdigest()
+
+
+def ttl_from_headers(headers: Dict[str, str], default: float) -> Optional[float]:
+    """TTL in seconds from Cache-Control, or None if the response must not be stored"""
+    cache_control = headers.get("cache-control", "").lower()
+    if "no-store" in cache_control:
+        return None
+    match = _MAX_AGE.search(cache_control)
+    if match:
+        return min(float(match.group(1)), default)
+    return default
+
+
+async def conditional_probe(session: aiohttp.ClientSession, url: str, headers: Dict[str, str],
+                            timeout: float = 10.0) -> bool:
+    """True when the origin confirms (304) that the cached copy is still current"""
+    if not headers:
+        return False
+    try:
+        async with session.get(url, headers=headers, allow_redirects=True,
+                               timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            return response.status == 304
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        return False
+
+
+class PageCache:
+    """Size-bounded LRU page cache with TTL and conditional revalidation"""
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES,
+                 default_ttl: float = DEFAULT_TTL, compression_level: int = 6, namespace: str = ""):
+        self.directory = Path(directory)
+        # Producers store different page schemas, so each gets its own keys in the shared directory
+        self.namespace = namespace
+        self.blob_dir = self.directory / "blobs"
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.compression_level = compression_level
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.directory / "index.sqlite3"), timeout=30,
+                                   check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(entries)")}
+        if "namespace" not in columns:
+            # Indexes created before namespaces; their keys were never namespaced either
+            self._db.execute("ALTER TABLE entries ADD COLUMN namespace TEXT NOT NULL DEFAULT ''")
+        self.counters = {"hits": 0, "revalidated": 0, "misses": 0, "stores": 0,
+                         "evictions": 0, "bytes_saved": 0}
+
+    def _key(self, url: str) -> str:
+        return cache_key(url, self.namespace)
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.blob_dir / digest[:2] / f"{digest}.zz"
+
+    def lookup(self, url: str) -> Optional[CachedPage]:
+        """Return the cached page (fresh or stale) or None"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT url, digest, etag, last_modified, fetched_at, expires_at, raw_bytes "
+                "FROM entries WHERE key = ?", (self._key(url),)
+            ).fetchone()
+        if row is None:
+            return None
+        try:
+            page = json.loads(zlib.decompress(self._blob_path(row[1]).read_bytes()))
+        except (OSError, zlib.error, ValueError):
+            self.delete(url)
+            return None
+        return CachedPage(url=row[0], page=page, etag=row[2], last_modified=row[3],
+                          fetched_at=row[4], expires_at=row[5], raw_bytes=row[6])
+
+    def store(self, url: str, page: Dict[str, Any], etag: Optional[str] = None,
+              last_modified: Optional[str] = None, ttl: Optional[float] = None):
+        raw = json.dumps(page, sort_keys=True, default=str).encode()
+        digest = hashlib.sha256(raw).hexdigest()
+        path = self._blob_path(digest)
+        if not path.exists():
+            compressed = zlib.compress(raw, self.compression_level)
+            path.parent.mkdir(exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_bytes(compressed)
+            os.replace(tmp, path)
+        stored_bytes = path.stat().st_size
+        now = time.time()
+        ttl = self.default_ttl if ttl is None else ttl
+
+        with self._lock:
+            previous = self._db.execute("SELECT digest FROM entries WHERE key = ?", (self._key(url),)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (self._key(url), url, digest, etag, last_modified, now, now + ttl, now,
+                 stored_bytes, len(raw), self.namespace),
+            )
+            self.counters["stores"] += 1
+            if previous and previous[0] != digest:
+                self._drop_blob_if_unused(previous[0])
+            self._evict()
+
+    def refresh(self, url: str, ttl: Optional[float] = None):
+        """Extend expiry after a 304 Not Modified"""
+        now = time.time()
+        ttl = self.default_ttl if ttl is None else ttl
+        with self._lock:
+            self._db.execute("UPDATE entries SET expires_at = ?, last_access = ? WHERE key = ?",
+                             (now + ttl, now, self._key(url)))
+
+    def delete(self, url: str):
+        with self._lock:
+            row = self._db.execute("SELECT digest FROM entries WHERE key = ?", (self._key(url),)).fetchone()
+            if row:
+                self._db.execute("DELETE FROM entries WHERE key = ?", (self._key(url),))
+                self._drop_blob_if_unused(row[0])
+
+    def _touch(self, url: str):
+        with self._lock:
+            self._db.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), self._key(url)))
+
+    def _drop_blob_if_unused(self, digest: str):
+        if not self._db.execute("SELECT 1 FROM entries WHERE digest = ? LIMIT 1", (digest,)).fetchone():
+            try:
+                self._blob_path(digest).unlink()
+            except FileNotFoundError:
+                pass
+
+    def _total_bytes(self) -> int:
+        # Content-addressed blobs are shared, so count each digest once
+        return self._db.execute(
+            "SELECT COALESCE(SUM(stored_bytes), 0) FROM (SELECT DISTINCT digest, stored_bytes FROM entries)"
+        ).fetchone()[0]
+
+    def _evict(self):
+        total = self._total_bytes()
+        while total > self.max_bytes:
+            row = self._db.execute(
+                "SELECT key, digest FROM entries ORDER BY last_access LIMIT 1"
+            ).fetchone()
+            if row is None:
+                break
+            self._db.execute("DELETE FROM entries WHERE key = ?", (row[0],))
+            self._drop_blob_if_unused(row[1])
+            self.counters["evictions"] += 1
+            total = self._total_bytes()
+
+    async def get_or_fetch(self, url: str, fetch: PageFetcher, ttl: Optional[float] = None,
+                           required_fields: Tuple[str, ...] = ()) -> Tuple[Dict[str, Any], str]:
+        """
+        Return (page, status) where status is "hit", "revalidated" or "miss".
+        Only successful pages are stored; `fetch` may return the response
+        headers under "response_headers" to supply validators and max-age.
+        Entries missing any of `required_fields` (written by an older version
+        of the producer) are refetched unconditionally.
+        """
+        entry = await asyncio.to_thread(self.lookup, url)
+        if entry is not None and any(field not in entry.page for field in required_fields):
+            entry = None
+        if entry is not None and entry.fresh:
+            await asyncio.to_thread(self._touch, url)
+            self.counters["hits"] += 1
+            self.counters["bytes_saved"] += entry.raw_bytes
+            return entry.page, "hit"
+
+        headers = entry.conditional_headers() if entry is not None else {}
+        page = await fetch(url, headers)
+        if page is None and entry is not None:
+            await asyncio.to_thread(self.refresh, url, ttl)
+            self.counters["revalidated"] += 1
+            self.counters["bytes_saved"] += entry.raw_bytes
+            return entry.page, "revalidated"
+
+        self.counters["misses"] += 1
+        page = dict(page or {"success": False, "error": "Empty response"})
+        response_headers = {k.lower(): v for k, v in (page.pop("response_headers", None) or {}).items()}
+        if page.get("success", True):
+            page_ttl = ttl_from_headers(response_headers, self.default_ttl if ttl is None else ttl)
+            if page_ttl:
+                await asyncio.to_thread(self.store, url, page, response_headers.get("etag"),
+                                        response_headers.get("last-modified"), page_ttl)
+        return page, "miss"
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, raw = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(raw_bytes), 0) FROM entries WHERE namespace = ?",
+                (self.namespace,)
+            ).fetchone()
+            # Blobs are shared and evicted across namespaces, so storage is reported for the whole directory
+            stored = self._total_bytes()
+        lookups = self.counters["hits"] + self.counters["revalidated"] + self.counters["misses"]
+        return {
+            **self.counters,
+            "hit_rate": round((self.counters["hits"] + self.counters["revalidated"]) / lookups, 4) if lookups else 0.0,
+            "entries": entries,
+            "stored_bytes": stored,
+            "uncompressed_bytes": raw,
+            "max_bytes": self.max_bytes,
+            "directory": str(self.directory),
+            "namespace": self.namespace,
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,75 @@
+"""
+Rate limiting primitives shared by the MCP servers
+"""
+
+import asyncio
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    Asyncio token bucket.
+
+    Tokens refill continuously at `rate` per second up to `capacity`.
+    Waiters are served in FIFO order, and `penalize` pauses the whole
+    bucket, which is how upstream Retry-After hints are shared between
+    all callers instead of each one discovering the limit separately.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated: Optional[float] = None
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    def per_minute(cls, requests_per_minute: float, burst: Optional[float] = None) -> "TokenBucket":
+        """Build a bucket from a per-minute quota"""
+        return cls(requests_per_minute / 60.0, burst)
+
+    def _refill(self, now: float):
+        if self._updated is None:
+            self._updated = now
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated = now
+
+    async def acquire(self, tokens: float = 1.0) -> float:
+        """Wait until `tokens` are available and take them; returns seconds waited"""
+        if tokens > self.capacity:
+            raise ValueError(f"Cannot acquire {tokens} tokens from a bucket of capacity {self.capacity}")
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        async with self._lock:
+            while True:
+                now = loop.time()
+                if now < self._blocked_until:
+                    await asyncio.sleep(self._blocked_until - now)
+                    continue
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return loop.time() - started
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+    def penalize(self, seconds: float):
+        """Stop handing out tokens for `seconds` (e.g. after a 429 with Retry-After)"""
+        loop = asyncio.get_running_loop()
+        self._blocked_until = max(self._blocked_until, loop.time() + seconds)
+        self._tokens = 0.0
+        self._updated = self._blocked_until
+
+    @property
+    def available(self) -> float:
+        """Tokens currently available (approximate, without waiting)"""
+        try:
+            self._refill(asyncio.get_running_loop().time())
+        except RuntimeError:
+            pass
+        return self._tokens
@@ -0,0 +1,108 @@
+"""
+Streaming report writer for ResearchAnalysisMCP.generate_report
+
+Every format is produced by a generator of string pieces, so a report is
+either joined once (linear, instead of repeated string concatenation) or
+written straight to a file in fixed-size chunks without ever holding the
+whole document in memory.
+"""
+
+import csv
+import io
+import json
+from itertools import chain
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+DEFAULT_CHUNK_BYTES = 64 * 1024
+
+
+def _markdown(findings: Sequence[Dict[str, Any]]) -> Iterator[str]:
+    yield "# Research Report\n\n"
+    for i, finding in enumerate(findings, 1):
+        lines = [f"## Finding {i}\n"]
+        lines.extend(f"- **{key.capitalize()}**: {value}\n" for key, value in finding.items())
+        lines.append("\n")
+        yield "".join(lines)
+
+
+def _json(findings: Sequence[Dict[str, Any]], generated_at: Optional[float]) -> Iterator[str]:
+    # Same document as before, but each finding goes through the C encoder on one
+    # line; indent=2 throughout would force the much slower pure-Python encoder
+    yield '{\n  "report_type": "research_findings",\n  "findings": ['
+    separator = "\n    "
+    for finding in findings:
+        yield separator + json.dumps(finding)
+        separator = ",\n    "
+    yield ("\n  " if findings else "") + f'],\n  "generated_at": {json.dumps(generated_at)}\n}}'
+
+
+def _jsonl(findings: Sequence[Dict[str, Any]]) -> Iterator[str]:
+    encoder = json.JSONEncoder(default=str)
+    for finding in findings:
+        yield encoder.encode(finding) + "\n"
+
+
+def _csv_cell(value: Any) -> Any:
+    if isinstance(value, (dict, list, tuple)):
+        return json.dumps(value, default=str)
+    return value
+
+
+def _csv(findings: Sequence[Dict[str, Any]], rows_per_piece: int = 1000) -> Iterator[str]:
+    # Columns are the union of keys in first-seen order
+    fieldnames = list(dict.fromkeys(chain.from_iterable(findings)))
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(fieldnames)
+    for i, finding in enumerate(findings, 1):
+        writer.writerow([_csv_cell(finding.get(key, "")) for key in fieldnames])
+        if i % rows_per_piece == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def iter_report(findings: Sequence[Dict[str, Any]], format_type: str = "markdown",
+                generated_at: Optional[float] = None) -> Iterator[str]:
+    """Yield the report in `format_type` as a sequence of string pieces"""
+    if format_type == "markdown":
+        return _markdown(findings)
+    if format_type == "json":
+        return _json(findings, generated_at)
+    if format_type == "jsonl":
+        return _jsonl(findings)
+    if format_type == "csv":
+        return _csv(findings)
+    return iter([str(findings)])
+
+
+def render_report(findings: Sequence[Dict[str, Any]], format_type: str = "markdown",
+                  generated_at: Optional[float] = None) -> str:
+    return "".join(iter_report(findings, format_type, generated_at))
+
+
+def write_report(findings: Sequence[Dict[str, Any]], path: str, format_type: str = "markdown",
+                 generated_at: Optional[float] = None, chunk_bytes: int = DEFAULT_CHUNK_BYTES) -> Dict[str, Any]:
+    """Stream the report to `path`, flushing roughly every `chunk_bytes`"""
+    path = Path(path).expanduser()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".part")
+    written = 0
+    chunks = 0
+    pending: List[str] = []
+    pending_size = 0
+    with open(tmp, "w", encoding="utf-8", newline="") as f:
+        for piece in iter_report(findings, format_type, generated_at):
+            pending.append(piece)
+            pending_size += len(piece)
+            if pending_size >= chunk_bytes:
+                written += f.write("".join(pending))
+                chunks += 1
+                pending, pending_size = [], 0
+        if pending:
+            written += f.write("".join(pending))
+            chunks += 1
+    tmp.replace(path)
+    return {"path": str(path), "characters": written, "bytes": path.stat().st_size, "chunks": chunks}
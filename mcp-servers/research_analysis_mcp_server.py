@@ -4,45 +4,147 @@ from pydantic import BaseModel, Field
 from typing import List, Dict, Optional
 import json
 import requests
-from urllib.parse import urlparse
+from urllib.parse import urljoin, urlparse
 import re
+import time
+from collections import OrderedDict
+import aiohttp
+from bs4 import BeautifulSoup
+
+from extraction import SchemaError, compile_schema
+from columnar import DEFAULT_CHUNK_SIZE, ColumnarPipeline, run_pipeline
+from page_cache import PageCache
+from report_writer import render_report, write_report
+from text_analysis import BatchAnalyzer, TextAnalyzer
 
 class ScrapeRequest(BaseModel):
     url: str = Field(description="URL to scrape")
     extraction_schema: Optional[Dict] = Field(default=None, description="Schema for structured extraction")
+    use_cache: bool = Field(default=True, description="Serve from the shared page cache when fresh")
 
 class ContentAnalysisRequest(BaseModel):
     text: str = Field(description="Text to analyze")
     analysis_types: List[str] = Field(default=["summarize"], description="Types of analysis to perform")
 
+class BatchAnalysisRequest(BaseModel):
+    texts: List[str] = Field(description="Documents to analyze")
+    analysis_types: List[str] = Field(default=["summarize"], description="Types of analysis to perform")
+
 class DataProcessingRequest(BaseModel):
-    data: List[Dict] = Field(description="Data to process")
+    data: List[Dict] = Field(default=[], description="Data to process (omit when reading from source)")
     operations: List[str] = Field(default=["clean"], description="Operations to perform")
+    source: Optional[str] = Field(default=None, description="CSV or JSONL file to read instead of inline data")
+    output_path: Optional[str] = Field(default=None, description="Write results to this .jsonl/.csv file instead of returning them")
+    chunk_size: int = Field(default=DEFAULT_CHUNK_SIZE, description="Rows processed per chunk")
+
+class DataStreamRequest(BaseModel):
+    stream_id: str = Field(description="Identifier tying chunks of one dataset together")
+    data: List[Dict] = Field(description="Next chunk of rows")
+    operations: List[str] = Field(default=["clean"], description="Operations to perform (fixed by the first chunk)")
+    final: bool = Field(default=False, description="Last chunk: release the stream's dedup state")
 
 class ReportGenerationRequest(BaseModel):
     findings: List[Dict] = Field(description="Findings to include in report")
-    format_type: str = Field(default="markdown", description="Output format")
+    format_type: str = Field(default="markdown", description="Output format (markdown, json, jsonl, csv)")
+    output_path: Optional[str] = Field(default=None, description="Stream the report to this file instead of returning it")
 
 class ResearchAnalysisMCP:
     def __init__(self):
         self.app = FastMCP("research-analysis")
-        
-    async def scrape_url(self, url: str, extraction_schema: Optional[Dict] = None) -> dict:
+        self.cache = PageCache(namespace="research")
+        self.session = None
+        self.analyzer = TextAnalyzer()
+        self.batch_analyzer = BatchAnalyzer()
+        # stream_id -> (pipeline, last used), least recently used first
+        self.data_streams: "OrderedDict[str, tuple]" = OrderedDict()
+        self.stream_idle_ttl = 3600.0  # abandoned streams are dropped after this many idle seconds
+        self.max_open_streams = 256
+
+    @staticmethod
+    def parse_html(url: str, html: str) -> dict:
+        """Reduce an HTML document to text, links and images."""
+        soup = BeautifulSoup(html, "lxml")
+        for tag in soup(["script", "style", "noscript"]):
+            tag.decompose()
+        links = [
+            {"href": urljoin(url, a["href"]), "text": a.get_text(" ", strip=True)}
+            for a in soup.find_all("a", href=True)
+        ]
+        images = [
+            {"src": urljoin(url, img["src"]), "alt": img.get("alt", "")}
+            for img in soup.find_all("img", src=True)
+        ]
+        return {
+            "title": soup.title.get_text(strip=True) if soup.title else "",
+            "html": html,
+            "content": soup.get_text("\n", strip=True),
+            "links": links,
+            "images": images
+        }
+
+    async def _fetch_page(self, url: str, conditional_headers: Dict[str, str]) -> Optional[dict]:
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=30))
+        async with self.session.get(url, headers=conditional_headers) as response:
+            if response.status == 304:
+                return None
+            if response.status >= 400:
+                return {"success": False, "status_code": response.status, "error": f"HTTP {response.status}"}
+            html = await response.text(errors="replace")
+            page = await asyncio.to_thread(self.parse_html, str(response.url), html)
+            page.update({
+                "success": True,
+                "status_code": response.status,
+                "response_headers": dict(response.headers)
+            })
+            return page
+
+    async def scrape_url(self, url: str, extraction_schema: Optional[Dict] = None, use_cache: bool = True) -> dict:
         """Scrape content from a URL."""
         try:
-            # This would normally use a proper scraping tool like the Crawl4AI server
-            # For simulation, we'll return a mock response
             parsed_url = urlparse(url)
             domain = parsed_url.netloc
-            
+            extractor = compile_schema(extraction_schema) if extraction_schema else None
+            if use_cache:
+                page, cache_status = await self.cache.get_or_fetch(url, self._fetch_page, required_fields=("html",))
+            else:
+                page, cache_status = await self._fetch_page(url, {}), "bypass"
+                page.pop("response_headers", None)
+            if not page.get("success"):
+                return {
+                    "success": False,
+                    "error": page.get("error"),
+                    "url": url,
+                    "cache": cache_status
+                }
+            if extractor is not None:
+                return {
+                    "success": True,
+                    "url": url,
+                    "domain": domain,
+                    "extracted_data": await asyncio.to_thread(extractor.extract, page["html"]),
+                    "cache": cache_status,
+                    "timestamp": asyncio.get_event_loop().time()
+                }
+
             return {
                 "success": True,
                 "url": url,
                 "domain": domain,
-                "content_preview": f"Content from {domain} - simulated scraping result",
-                "extraction_schema": extraction_schema,
+                "title": page.get("title", ""),
+                "content_preview": (page.get("content") or "")[:500],
+                "content": page.get("content") or "",
+                "links": page.get("links", []),
+                "images": page.get("images", []),
+                "cache": cache_status,
                 "timestamp": asyncio.get_event_loop().time()
             }
+        except SchemaError as e:
+            return {
+                "success": False,
+                "error": f"Invalid extraction schema: {e}",
+                "url": url
+            }
         except Exception as e:
             return {
                 "success": False,
@@ -50,49 +152,26 @@ class ResearchAnalysisMCP:
                 "url": url
             }
 
+    async def cache_stats(self) -> dict:
+        """Report page cache hit rate, bytes saved and disk usage."""
+        try:
+            return {
+                "success": True,
+                "cache": self.cache.stats()
+            }
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e)
+            }
+
     async def analyze_content(self, text: str, analysis_types: List[str]) -> dict:
         """Analyze content based on specified analysis types."""
         try:
-            results = {}
-            
-            if "summarize" in analysis_types:
-                # Simple summarization simulation
-                sentences = text.split('.')
-                summary_length = min(3, len(sentences))
-                results["summary"] = '. '.join(sentences[:summary_length]) + '.'
-            
-            if "sentiment" in analysis_types:
-                # Simple sentiment analysis simulation
-                positive_words = ['good', 'great', 'excellent', 'positive', 'wonderful']
-                negative_words = ['bad', 'terrible', 'awful', 'negative', 'horrible']
-                
-                pos_count = sum(1 for word in positive_words if word.lower() in text.lower())
-                neg_count = sum(1 for word in negative_words if word.lower() in text.lower())
-                
-                if pos_count > neg_count:
-                    results["sentiment"] = "positive"
-                elif neg_count > pos_count:
-                    results["sentiment"] = "negative"
-                else:
-                    results["sentiment"] = "neutral"
-                    
-            if "entities" in analysis_types:
-                # Simple entity extraction simulation
-                email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-                emails = re.findall(email_pattern, text)
-                
-                phone_pattern = r'\b\d{3}[-.]?\d{3}[-.]?\d{4}\b'
-                phones = re.findall(phone_pattern, text)
-                
-                results["entities"] = {
-                    "emails": emails,
-                    "phones": phones
-                }
-            
             return {
                 "success": True,
                 "analysis_types": analysis_types,
-                "results": results,
+                "results": self.analyzer.analyze(text, analysis_types),
                 "input_length": len(text)
             }
         except Exception as e:
@@ -101,82 +180,106 @@ class ResearchAnalysisMCP:
                 "error": str(e)
             }
 
-    async def process_data(self, data: List[Dict], operations: List[str]) -> dict:
-        """Process data according to specified operations."""
+    async def analyze_batch(self, texts: List[str], analysis_types: List[str]) -> dict:
+        """Analyze many documents in one call, fanning large batches out to a process pool."""
         try:
-            processed_data = data.copy()
-            
-            for operation in operations:
-                if operation == "clean":
-                    # Remove empty values and normalize
-                    cleaned_data = []
-                    for item in processed_data:
-                        cleaned_item = {}
-                        for k, v in item.items():
-                            if v is not None and v != "":
-                                cleaned_item[k] = v
-                        if cleaned_item:
-                            cleaned_data.append(cleaned_item)
-                    processed_data = cleaned_data
-                    
-                elif operation == "deduplicate":
-                    # Remove duplicates based on all fields
-                    seen = set()
-                    unique_data = []
-                    for item in processed_data:
-                        item_tuple = tuple(sorted(item.items()))
-                        if item_tuple not in seen:
-                            seen.add(item_tuple)
-                            unique_data.append(item)
-                    processed_data = unique_data
-                    
-                elif operation == "standardize":
-                    # Convert field names to lowercase and trim whitespace
-                    standardized_data = []
-                    for item in processed_data:
-                        standardized_item = {}
-                        for k, v in item.items():
-                            standardized_key = k.lower().strip().replace(" ", "_")
-                            if isinstance(v, str):
-                                standardized_value = v.strip()
-                            else:
-                                standardized_value = v
-                            standardized_item[standardized_key] = standardized_value
-                        standardized_data.append(standardized_item)
-                    processed_data = standardized_data
-            
+            started = asyncio.get_event_loop().time()
+            results = await self.batch_analyzer.analyze(texts, analysis_types)
+            elapsed = asyncio.get_event_loop().time() - started
             return {
                 "success": True,
-                "original_count": len(data),
-                "processed_count": len(processed_data),
+                "analysis_types": analysis_types,
+                "results": results,
+                "document_count": len(texts),
+                "elapsed_seconds": round(elapsed, 4),
+                "docs_per_second": round(len(texts) / elapsed, 1) if elapsed > 0 else None
+            }
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e)
+            }
+
+    async def process_data(self, data: List[Dict], operations: List[str], source: Optional[str] = None,
+                           output_path: Optional[str] = None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> dict:
+        """Process data according to specified operations."""
+        try:
+            # Chunked columnar pipeline; runs in a thread since it is CPU and file bound
+            result = await asyncio.to_thread(run_pipeline, operations, data, source, output_path, chunk_size)
+            stats = result["stats"]
+            response = {
+                "success": True,
+                "original_count": stats["input_rows"],
+                "processed_count": stats["output_rows"],
                 "operations": operations,
-                "data": processed_data
+                "stats": stats
             }
+            if output_path:
+                response["output_path"] = output_path
+            else:
+                response["data"] = result["rows"]
+            return response
         except Exception as e:
             return {
                 "success": False,
                 "error": str(e)
             }
 
-    async def generate_report(self, findings: List[Dict], format_type: str = "markdown") -> dict:
+    def _open_stream(self, stream_id: str, operations: List[str]) -> ColumnarPipeline:
+        """Pipeline for stream_id, dropping idle streams and the least recently used beyond the cap"""
+        now = time.monotonic()
+        while self.data_streams:
+            oldest_id, (_, last_used) = next(iter(self.data_streams.items()))
+            if now - last_used <= self.stream_idle_ttl:
+                break
+            del self.data_streams[oldest_id]
+        entry = self.data_streams.pop(stream_id, None)
+        pipeline = entry[0] if entry else ColumnarPipeline(operations)
+        self.data_streams[stream_id] = (pipeline, now)
+        while len(self.data_streams) > self.max_open_streams:
+            self.data_streams.popitem(last=False)
+        return pipeline
+
+    async def process_data_stream(self, stream_id: str, data: List[Dict], operations: List[str],
+                                  final: bool = False) -> dict:
+        """Process one chunk of a dataset sent over several calls, deduplicating across chunks."""
+        try:
+            pipeline = self._open_stream(stream_id, operations)
+            rows = await asyncio.to_thread(pipeline.process_rows, data)
+            if final:
+                self.data_streams.pop(stream_id, None)
+            return {
+                "success": True,
+                "stream_id": stream_id,
+                "processed_count": len(rows),
+                "data": rows,
+                "final": final,
+                "stats": dict(pipeline.stats)
+            }
+        except Exception as e:
+            self.data_streams.pop(stream_id, None)
+            return {
+                "success": False,
+                "error": str(e),
+                "stream_id": stream_id
+            }
+
+    async def generate_report(self, findings: List[Dict], format_type: str = "markdown",
+                              output_path: Optional[str] = None) -> dict:
         """Generate a report from findings."""
         try:
-            if format_type == "markdown":
-                report_content = "# Research Report\n\n"
-                for i, finding in enumerate(findings, 1):
-                    report_content += f"## Finding {i}\n"
-                    for key, value in finding.items():
-                        report_content += f"- **{key.capitalize()}**: {value}\n"
-                    report_content += "\n"
-            elif format_type == "json":
-                report_content = json.dumps({
-                    "report_type": "research_findings",
-                    "findings": findings,
-                    "generated_at": asyncio.get_event_loop().time()
-                }, indent=2)
-            else:
-                report_content = str(findings)
-            
+            generated_at = asyncio.get_event_loop().time()
+            if output_path:
+                written = await asyncio.to_thread(write_report, findings, output_path, format_type, generated_at)
+                return {
+                    "success": True,
+                    "format": format_type,
+                    "output_path": written["path"],
+                    "bytes": written["bytes"],
+                    "finding_count": len(findings)
+                }
+
+            report_content = await asyncio.to_thread(render_report, findings, format_type, generated_at)
             return {
                 "success": True,
                 "format": format_type,
@@ -194,19 +297,32 @@ def create_research_analysis_server():
     
     @server.app.tool("scrape_url", "Scrape content from a URL with optional structured extraction")
     async def handle_scrape(request: ScrapeRequest) -> dict:
-        return await server.scrape_url(request.url, request.extraction_schema)
+        return await server.scrape_url(request.url, request.extraction_schema, request.use_cache)
+    
+    @server.app.tool("cache_stats", "Report page cache hit rate, bytes saved and disk usage")
+    async def handle_cache_stats() -> dict:
+        return await server.cache_stats()
     
     @server.app.tool("analyze_content", "Analyze content with various analysis techniques")
     async def handle_analyze(request: ContentAnalysisRequest) -> dict:
         return await server.analyze_content(request.text, request.analysis_types)
     
+    @server.app.tool("analyze_batch", "Analyze many documents per call with a single-pass analyzer")
+    async def handle_analyze_batch(request: BatchAnalysisRequest) -> dict:
+        return await server.analyze_batch(request.texts, request.analysis_types)
+    
     @server.app.tool("process_data", "Process data with various operations")
     async def handle_process(request: DataProcessingRequest) -> dict:
-        return await server.process_data(request.data, request.operations)
+        return await server.process_data(request.data, request.operations, request.source,
+                                         request.output_path, request.chunk_size)
+    
+    @server.app.tool("process_data_stream", "Process a large dataset sent in chunks, deduplicating across chunks")
+    async def handle_process_stream(request: DataStreamRequest) -> dict:
+        return await server.process_data_stream(request.stream_id, request.data, request.operations, request.final)
     
     @server.app.tool("generate_report", "Generate a report from findings")
     async def handle_generate_report(request: ReportGenerationRequest) -> dict:
-        return await server.generate_report(request.findings, request.format_type)
+        return await server.generate_report(request.findings, request.format_type, request.output_path)
     
     return server
 
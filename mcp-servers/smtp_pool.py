@@ -0,0 +1,226 @@
+"""
+Pooled, keep-alive SMTP delivery for EmailMCP
+
+Opening a connection, running STARTTLS and authenticating costs several
+round trips and a TLS handshake, which dominated send time when every
+message paid for it. SMTPPool keeps up to `size` authenticated smtplib
+connections and reuses them across messages. The blocking smtplib calls run
+on a dedicated thread per connection slot, off the event loop.
+
+StreamingMessage payloads are written to the DATA stream chunk by chunk,
+so attachments never have to be held in memory.
+
+Connections idle for longer than `idle_timeout` are replaced before use
+(servers commonly drop idle sessions). A pooled connection that turns out to
+have been dropped anyway is reopened and the message retried once, but only
+if the failure came before DATA: once the payload may have reached the
+server, resending could deliver it twice, so the failure is reported instead.
+"""
+
+import asyncio
+import smtplib
+import ssl
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from email.message import Message
+from typing import Any, Deque, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from mime_stream import StreamingMessage, send_streaming
+from rate_limit import TokenBucket
+
+# Timeouts are not among these: a slow server may still be processing the command
+DISCONNECT_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError)
+
+
+class _TracksData:
+    """Records whether DATA has been sent, i.e. whether the server may have the message"""
+
+    data_started = False
+
+    def putcmd(self, cmd, args=""):
+        if cmd.lower() == "data":
+            self.data_started = True
+        super().putcmd(cmd, args)
+
+
+class _SMTP(_TracksData, smtplib.SMTP):
+    pass
+
+
+class _SMTP_SSL(_TracksData, smtplib.SMTP_SSL):
+    pass
+
+
+class _Connection:
+    def __init__(self, smtp: _TracksData):
+        self.smtp = smtp
+        self.opened = time.monotonic()
+        self.last_used = self.opened
+        self.messages = 0
+
+
+class SMTPPool:
+    """Up to `size` reusable SMTP sessions to one server"""
+
+    def __init__(self, host: str, port: int = 587, username: Optional[str] = None, password: Optional[str] = None,
+                 starttls: bool = True, use_ssl: bool = False, size: int = 4, idle_timeout: float = 60.0,
+                 max_messages_per_connection: int = 500, timeout: float = 30.0,
+                 ssl_context: Optional[ssl.SSLContext] = None):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.use_ssl = use_ssl
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.max_messages_per_connection = max_messages_per_connection
+        self.timeout = timeout
+        self.ssl_context = ssl_context
+        self._idle: Deque[_Connection] = deque()
+        self._slots = asyncio.Semaphore(size)
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="smtp")
+        self._lock = threading.Lock()
+        self.stats = {"connections_opened": 0, "reconnects": 0, "messages_sent": 0, "failures": 0}
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    # Blocking helpers, run on the pool's threads
+
+    def _open(self) -> _Connection:
+        context = self.ssl_context or ssl.create_default_context()
+        if self.use_ssl:
+            smtp = _SMTP_SSL(self.host, self.port, timeout=self.timeout, context=context)
+        else:
+            smtp = _SMTP(self.host, self.port, timeout=self.timeout)
+            if self.starttls:
+                smtp.starttls(context=context)
+        if self.username and self.password:
+            smtp.login(self.username, self.password)
+        self._count("connections_opened")
+        return _Connection(smtp)
+
+    @staticmethod
+    def _discard(connection: Optional[_Connection]):
+        if connection is None:
+            return
+        try:
+            connection.smtp.quit()
+        except Exception:
+            connection.smtp.close()
+
+    def _usable(self, connection: Optional[_Connection]) -> bool:
+        return (connection is not None
+                and time.monotonic() - connection.last_used < self.idle_timeout
+                and connection.messages < self.max_messages_per_connection)
+
+    @staticmethod
+    def _transmit(connection: _Connection, from_addr: str, recipients: Sequence[str],
+                  data: Union[StreamingMessage, bytes]) -> Dict[str, Tuple[int, bytes]]:
+        connection.smtp.data_started = False
+        if isinstance(data, StreamingMessage):
+            return send_streaming(connection.smtp, from_addr, recipients, data)
+        return connection.smtp.sendmail(from_addr, list(recipients), data)
+
+    def _deliver(self, connection: Optional[_Connection], from_addr: str, recipients: Sequence[str],
+                 data: Union[StreamingMessage, bytes]) -> Tuple[Optional[_Connection], Dict[str, Any]]:
+        """Send on `connection` (opening one if needed); returns the connection to reuse, if any"""
+        try:
+            reused = self._usable(connection)
+            if not reused:
+                self._discard(connection)
+                connection = None
+                connection = self._open()
+            try:
+                refused = self._transmit(connection, from_addr, recipients, data)
+            except DISCONNECT_ERRORS:
+                if not reused or connection.smtp.data_started:
+                    raise
+                # The server dropped the session while it sat in the pool, before it saw the message
+                self._count("reconnects")
+                connection.smtp.close()
+                connection = None
+                connection = self._open()
+                refused = self._transmit(connection, from_addr, recipients, data)
+        except smtplib.SMTPRecipientsRefused as e:
+            self._count("failures")
+            # The session is still usable after a rejected envelope
+            connection.last_used = time.monotonic()
+            return connection, {"success": False, "error": "All recipients refused", "refused": _refused(e.recipients)}
+        except Exception as e:
+            self._count("failures")
+            if connection is not None and not self._reset(connection):
+                connection = None
+            return connection, {"success": False, "error": str(e)}
+        connection.messages += 1
+        connection.last_used = time.monotonic()
+        self._count("messages_sent")
+        return connection, {"success": True, "refused": _refused(refused)}
+
+    @staticmethod
+    def _reset(connection: _Connection) -> bool:
+        try:
+            connection.smtp.rset()
+            connection.last_used = time.monotonic()
+            return True
+        except Exception:
+            connection.smtp.close()
+            return False
+
+    # Async API
+
+    async def send(self, from_addr: str, recipients: Sequence[str],
+                   message: Union[StreamingMessage, Message, bytes, str]) -> Dict[str, Any]:
+        """Send one message over a pooled connection; failures are reported in the result"""
+        if isinstance(message, Message):
+            data = message.as_bytes()
+        elif isinstance(message, str):
+            data = message.encode("utf-8")
+        else:
+            data = message
+        loop = asyncio.get_running_loop()
+        async with self._slots:
+            connection = self._idle.pop() if self._idle else None
+            connection, result = await loop.run_in_executor(
+                self._executor, self._deliver, connection, from_addr, recipients, data)
+            if connection is not None:
+                self._idle.append(connection)
+        return result
+
+    async def send_bulk(self, messages: Iterable[Tuple[str, Sequence[str], Union[StreamingMessage, Message, bytes, str]]],
+                        concurrency: Optional[int] = None,
+                        rate_limit: Optional[TokenBucket] = None) -> List[Dict[str, Any]]:
+        """
+        Send (from_addr, recipients, message) tuples with at most `concurrency`
+        in flight (default: the pool size). Results come back in input order,
+        with failures reported per message instead of aborting the batch.
+        """
+        gate = asyncio.Semaphore(concurrency or self.size)
+
+        async def one(index: int, from_addr: str, recipients: Sequence[str], message) -> Dict[str, Any]:
+            async with gate:
+                waited = await rate_limit.acquire() if rate_limit else 0.0
+                started = time.perf_counter()
+                result = await self.send(from_addr, recipients, message)
+                result.update({"index": index, "rate_limit_wait_seconds": round(waited, 4),
+                               "send_seconds": round(time.perf_counter() - started, 4)})
+                return result
+
+        return list(await asyncio.gather(*(one(i, *item) for i, item in enumerate(messages))))
+
+    def idle_connections(self) -> int:
+        return len(self._idle)
+
+    async def close(self):
+        loop = asyncio.get_running_loop()
+        while self._idle:
+            await loop.run_in_executor(self._executor, self._discard, self._idle.pop())
+        self._executor.shutdown(wait=False)
+
+
+def _refused(recipients: Dict[str, Tuple[int, bytes]]) -> Dict[str, str]:
+    return {address: f"{code} {reply.decode(errors='replace')}" for address, (code, reply) in recipients.items()}
@@ -0,0 +1,146 @@
+"""
+Background system stats sampler for SystemDevOpsMCP
+
+A single asyncio task samples CPU, memory, disk and network counters every
+`interval` seconds into a ring buffer, so stats requests return the latest
+sample immediately instead of blocking the event loop in
+psutil.cpu_percent(interval=1). CPU utilisation is computed from cpu_times()
+deltas between samples, which keeps the sampler independent of psutil's
+process-global cpu_percent() state.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+import psutil
+
+
+def _cpu_busy(times) -> tuple:
+    total = sum(times)
+    idle = times.idle + getattr(times, "iowait", 0.0)
+    return total - idle, total
+
+
+class StatsSampler:
+    """Ring buffer of periodic psutil samples with rate and time-series helpers"""
+
+    def __init__(self, interval: float = 1.0, history: int = 600, disk_path: str = "/"):
+        self.interval = interval
+        self.disk_path = disk_path
+        self.samples: Deque[Dict[str, Any]] = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._previous_cpu = _cpu_busy(psutil.cpu_times())
+        self._task: Optional[asyncio.Task] = None
+
+    def sample(self) -> Dict[str, Any]:
+        """Take one sample (a few fast syscalls) and append it to the ring buffer"""
+        busy, total = _cpu_busy(psutil.cpu_times())
+        with self._lock:
+            previous_busy, previous_total = self._previous_cpu
+            self._previous_cpu = (busy, total)
+        elapsed = total - previous_total
+        cpu_percent = round(min(100.0, max(0.0, (busy - previous_busy) / elapsed * 100)), 1) if elapsed > 0 else None
+
+        freq = psutil.cpu_freq()
+        mem = psutil.virtual_memory()
+        disk = psutil.disk_usage(self.disk_path)
+        disk_io = psutil.disk_io_counters()
+        net_io = psutil.net_io_counters()
+        sample = {
+            "timestamp": time.time(),
+            "monotonic": time.monotonic(),
+            "cpu": {
+                "percent": cpu_percent,
+                "count": psutil.cpu_count(),
+                "freq": freq._asdict() if freq else None,
+                "load_avg": list(psutil.getloadavg()) if hasattr(psutil, "getloadavg") else None,
+            },
+            "memory": {"total": mem.total, "available": mem.available, "used": mem.used, "percent": mem.percent},
+            "disk": {
+                "total": disk.total, "used": disk.used, "free": disk.free,
+                "read_bytes": disk_io.read_bytes if disk_io else None,
+                "write_bytes": disk_io.write_bytes if disk_io else None,
+            },
+            "network": {
+                "bytes_sent": net_io.bytes_sent, "bytes_recv": net_io.bytes_recv,
+                "packets_sent": net_io.packets_sent, "packets_recv": net_io.packets_recv,
+            },
+        }
+        with self._lock:
+            self.samples.append(sample)
+        return sample
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                # disk_usage can stall on a slow mount, so keep it off the event loop
+                await asyncio.to_thread(self.sample)
+            except Exception:
+                pass
+
+    def ensure_started(self):
+        """Start the sampling task on the running loop if it is not already running"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def latest(self, max_age: Optional[float] = None) -> Dict[str, Any]:
+        """Most recent sample; takes one on demand if none exists or it is older than max_age"""
+        with self._lock:
+            sample = self.samples[-1] if self.samples else None
+        if sample is None or (max_age is not None and time.monotonic() - sample["monotonic"] > max_age):
+            sample = self.sample()
+        return sample
+
+    def _window(self, seconds: float) -> List[Dict[str, Any]]:
+        with self._lock:
+            samples = list(self.samples)
+        if not samples:
+            return []
+        cutoff = samples[-1]["monotonic"] - seconds
+        return [s for s in samples if s["monotonic"] >= cutoff]
+
+    def rates(self, window_seconds: float = 60.0) -> Optional[Dict[str, Any]]:
+        """Per-second network and disk I/O rates across the window (None until two samples exist)"""
+        window = self._window(window_seconds)
+        if len(window) < 2:
+            return None
+        first, last = window[0], window[-1]
+        elapsed = last["monotonic"] - first["monotonic"]
+        if elapsed <= 0:
+            return None
+
+        def per_second(section: str, key: str) -> Optional[float]:
+            start, end = first[section][key], last[section][key]
+            if start is None or end is None:
+                return None
+            return round(max(0, end - start) / elapsed, 1)
+
+        cpu_values = [s["cpu"]["percent"] for s in window if s["cpu"]["percent"] is not None]
+        return {
+            "window_seconds": round(elapsed, 2),
+            "cpu_percent_avg": round(sum(cpu_values) / len(cpu_values), 1) if cpu_values else None,
+            "cpu_percent_max": max(cpu_values) if cpu_values else None,
+            "net_bytes_sent_per_sec": per_second("network", "bytes_sent"),
+            "net_bytes_recv_per_sec": per_second("network", "bytes_recv"),
+            "net_packets_sent_per_sec": per_second("network", "packets_sent"),
+            "net_packets_recv_per_sec": per_second("network", "packets_recv"),
+            "disk_read_bytes_per_sec": per_second("disk", "read_bytes"),
+            "disk_write_bytes_per_sec": per_second("disk", "write_bytes"),
+        }
+
+    def series(self, window_seconds: float = 60.0) -> List[Dict[str, Any]]:
+        """Compact time series of CPU and memory utilisation over the window"""
+        return [
+            {"timestamp": s["timestamp"], "cpu_percent": s["cpu"]["percent"], "memory_percent": s["memory"]["percent"]}
+            for s in self._window(window_seconds)
+        ]
@@ -1,78 +1,118 @@
 import asyncio
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import FastMCP, Context
 from pydantic import BaseModel, Field
 from typing import List, Dict, Optional
-import psutil
 import os
-import subprocess
-import socket
+import time
 from datetime import datetime
 import json
 
+import file_reader
+from command_runner import CommandRunner
+from net_probe import DNSCache, probe, probe_many
+from stats_sampler import StatsSampler
+
+STATS_SAMPLE_INTERVAL = float(os.environ.get("STATS_SAMPLE_INTERVAL", "1.0"))
+STATS_HISTORY = int(os.environ.get("STATS_HISTORY", "600"))
+MAX_CONCURRENT_COMMANDS = int(os.environ.get("MAX_CONCURRENT_COMMANDS", "8"))
+MAX_COMMAND_OUTPUT_BYTES = int(os.environ.get("MAX_COMMAND_OUTPUT_BYTES", str(1024 * 1024)))
+
 class SystemStatsRequest(BaseModel):
     cpu: bool = Field(default=True, description="Include CPU stats")
     memory: bool = Field(default=True, description="Include memory stats")
     disk: bool = Field(default=True, description="Include disk stats")
     network: bool = Field(default=False, description="Include network stats")
+    history_seconds: int = Field(default=0, description="Include rates and a time series covering this many seconds")
 
 class FileOperationRequest(BaseModel):
     path: str = Field(description="File path")
     encoding: str = Field(default="utf-8", description="File encoding")
-    max_size_mb: int = Field(default=10, description="Max file size in MB")
+    max_size_mb: int = Field(default=10, description="Max file size in MB (max bytes returned for windowed modes)")
+    mode: str = Field(default="full", description="full, range, lines, tail or search")
+    offset: int = Field(default=0, description="Byte offset for range mode (negative counts from the end)")
+    length: int = Field(default=65536, description="Bytes to read in range mode")
+    start_line: int = Field(default=1, description="First line (1-based) for lines mode")
+    max_lines: int = Field(default=100, description="Lines to return in lines and tail modes")
+    pattern: Optional[str] = Field(default=None, description="Regular expression for search mode")
+    ignore_case: bool = Field(default=False, description="Case-insensitive search")
+    max_matches: int = Field(default=100, description="Max matching lines in search mode")
+    context_lines: int = Field(default=0, description="Lines of context around each search match")
+
+class FileStreamRequest(BaseModel):
+    path: str = Field(description="File path")
+    encoding: str = Field(default="utf-8", description="File encoding")
+    offset: int = Field(default=0, description="Byte offset to start from")
+    chunk_bytes: int = Field(default=256 * 1024, description="Bytes per chunk")
+    max_bytes: int = Field(default=8 * 1024 * 1024, description="Stop after this many bytes; resume from next_offset")
 
 class CommandRequest(BaseModel):
     command: str = Field(description="Command to execute")
     timeout_seconds: int = Field(default=30, description="Timeout in seconds")
     capture_output: bool = Field(default=True, description="Capture command output")
 
+class BatchCommandRequest(BaseModel):
+    commands: List[CommandRequest] = Field(description="Commands to run concurrently")
+
 class NetworkCheckRequest(BaseModel):
     host: str = Field(description="Host to check")
     port: int = Field(default=80, description="Port to check")
     timeout_seconds: int = Field(default=5, description="Timeout in seconds")
 
+class ConnectivityBatchRequest(BaseModel):
+    targets: List[str] = Field(description="Endpoints as host:port (port defaults to 80)")
+    timeout_seconds: float = Field(default=5, description="Timeout per probe in seconds")
+    concurrency: int = Field(default=64, description="Max probes in flight")
+
 class SystemDevOpsMCP:
     def __init__(self):
         self.app = FastMCP("system-devops")
-        
-    async def get_system_stats(self, cpu: bool = True, memory: bool = True, 
-                              disk: bool = True, network: bool = False) -> dict:
-        """Get system statistics."""
+        self.sampler = StatsSampler(interval=STATS_SAMPLE_INTERVAL, history=STATS_HISTORY)
+        self.dns = DNSCache()
+        self.runner = CommandRunner(max_concurrency=MAX_CONCURRENT_COMMANDS, max_output_bytes=MAX_COMMAND_OUTPUT_BYTES)
+
+    async def get_system_stats(self, cpu: bool = True, memory: bool = True,
+                              disk: bool = True, network: bool = False, history_seconds: int = 0) -> dict:
+        """Get system statistics from the background sampler."""
         try:
-            stats = {"timestamp": datetime.now().isoformat()}
+            self.sampler.ensure_started()
+            sample = await asyncio.to_thread(self.sampler.latest, self.sampler.interval * 3)
+            stats = {
+                "timestamp": datetime.fromtimestamp(sample["timestamp"]).isoformat(),
+                "sample_age_seconds": round(max(0.0, time.monotonic() - sample["monotonic"]), 3)
+            }
             
             if cpu:
                 stats["cpu"] = {
-                    "percent": psutil.cpu_percent(interval=1),
-                    "count": psutil.cpu_count(),
-                    "freq": psutil.cpu_freq()._asdict() if psutil.cpu_freq() else None
+                    "percent": sample["cpu"]["percent"],
+                    "count": sample["cpu"]["count"],
+                    "freq": sample["cpu"]["freq"],
+                    "load_avg": sample["cpu"]["load_avg"]
                 }
             
             if memory:
-                mem = psutil.virtual_memory()
+                mem = sample["memory"]
                 stats["memory"] = {
-                    "total_gb": round(mem.total / (1024**3), 2),
-                    "available_gb": round(mem.available / (1024**3), 2),
-                    "percent_used": mem.percent,
-                    "used_gb": round(mem.used / (1024**3), 2)
+                    "total_gb": round(mem["total"] / (1024**3), 2),
+                    "available_gb": round(mem["available"] / (1024**3), 2),
+                    "percent_used": mem["percent"],
+                    "used_gb": round(mem["used"] / (1024**3), 2)
                 }
             
             if disk:
-                disk_usage = psutil.disk_usage('/')
+                disk_usage = sample["disk"]
                 stats["disk"] = {
-                    "total_gb": round(disk_usage.total / (1024**3), 2),
-                    "used_gb": round(disk_usage.used / (1024**3), 2),
-                    "free_gb": round(disk_usage.free / (1024**3), 2),
-                    "percent_used": round((disk_usage.used / disk_usage.total) * 100, 2)
+                    "total_gb": round(disk_usage["total"] / (1024**3), 2),
+                    "used_gb": round(disk_usage["used"] / (1024**3), 2),
+                    "free_gb": round(disk_usage["free"] / (1024**3), 2),
+                    "percent_used": round((disk_usage["used"] / disk_usage["total"]) * 100, 2)
                 }
             
             if network:
-                net_io = psutil.net_io_counters()
-                stats["network"] = {
-                    "bytes_sent": net_io.bytes_sent,
-                    "bytes_recv": net_io.bytes_recv,
-                    "packets_sent": net_io.packets_sent,
-                    "packets_recv": net_io.packets_recv
-                }
+                stats["network"] = dict(sample["network"])
+            
+            if history_seconds > 0:
+                stats["rates"] = self.sampler.rates(history_seconds)
+                stats["series"] = self.sampler.series(history_seconds)
             
             return {
                 "success": True,
@@ -84,8 +124,11 @@ class SystemDevOpsMCP:
                 "error": str(e)
             }
 
-    async def read_file(self, path: str, encoding: str = "utf-8", max_size_mb: int = 10) -> dict:
-        """Read a file with size limitations."""
+    async def read_file(self, path: str, encoding: str = "utf-8", max_size_mb: int = 10,
+                        mode: str = "full", offset: int = 0, length: int = 65536,
+                        start_line: int = 1, max_lines: int = 100, pattern: Optional[str] = None,
+                        ignore_case: bool = False, max_matches: int = 100, context_lines: int = 0) -> dict:
+        """Read a file, or a window of it, with size limitations."""
         try:
             if not os.path.exists(path):
                 return {
@@ -95,21 +138,91 @@ class SystemDevOpsMCP:
             
             file_size = os.path.getsize(path)
             max_size_bytes = max_size_mb * 1024 * 1024
-            
-            if file_size > max_size_bytes:
+
+            # Windowed modes read from an mmap, so only the returned slice is bounded
+            if mode == "range":
+                result = await asyncio.to_thread(
+                    file_reader.read_range, path, offset, min(length, max_size_bytes), encoding)
+            elif mode == "lines":
+                result = await asyncio.to_thread(
+                    file_reader.read_lines, path, start_line, max_lines, encoding, max_size_bytes)
+            elif mode == "tail":
+                result = await asyncio.to_thread(file_reader.tail, path, max_lines, encoding, max_size_bytes)
+            elif mode == "search":
+                if not pattern:
+                    return {
+                        "success": False,
+                        "error": "search mode requires a pattern"
+                    }
+                result = await asyncio.to_thread(
+                    file_reader.search, path, pattern, ignore_case, max_matches, context_lines, encoding)
+            elif mode == "full":
+                if file_size > max_size_bytes:
+                    return {
+                        "success": False,
+                        "error": f"File too large: {file_size} bytes (max: {max_size_bytes}); "
+                                 f"use range, lines, tail or search mode"
+                    }
+                result = {"content": await asyncio.to_thread(self._read_text, path, encoding)}
+            else:
                 return {
                     "success": False,
-                    "error": f"File too large: {file_size} bytes (max: {max_size_bytes})"
+                    "error": f"Unknown read mode: {mode}"
                 }
-            
-            with open(path, 'r', encoding=encoding) as f:
-                content = f.read()
-            
+
             return {
                 "success": True,
                 "path": path,
+                "mode": mode,
                 "size_bytes": file_size,
-                "content": content
+                **result
+            }
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e)
+            }
+
+    @staticmethod
+    def _read_text(path: str, encoding: str) -> str:
+        with open(path, 'r', encoding=encoding) as f:
+            return f.read()
+
+    async def stream_file(self, path: str, encoding: str = "utf-8", offset: int = 0,
+                          chunk_bytes: int = 256 * 1024, max_bytes: int = 8 * 1024 * 1024,
+                          ctx: Optional[Context] = None) -> dict:
+        """Send a file chunk by chunk as log notifications; without a client context the chunks are returned."""
+        try:
+            if not os.path.exists(path):
+                return {
+                    "success": False,
+                    "error": f"File does not exist: {path}"
+                }
+
+            chunks = []
+            sent = 0
+            next_offset = offset
+            while next_offset is not None and sent < max_bytes:
+                chunk = await asyncio.to_thread(
+                    file_reader.read_range, path, next_offset, min(chunk_bytes, max_bytes - sent), encoding)
+                if chunk["bytes_read"] == 0:
+                    next_offset = None
+                    break
+                sent += chunk["bytes_read"]
+                next_offset = chunk["next_offset"]
+                if ctx is not None:
+                    await ctx.log("info", chunk["content"], logger_name=f"read_file:{path}")
+                    await ctx.report_progress(sent, chunk["size_bytes"] - offset)
+                else:
+                    chunks.append({"offset": chunk["offset"], "content": chunk["content"]})
+
+            return {
+                "success": True,
+                "path": path,
+                "bytes_sent": sent,
+                "next_offset": next_offset,
+                "eof": next_offset is None,
+                "chunks": chunks if ctx is None else None
             }
         except Exception as e:
             return {
@@ -117,8 +230,8 @@ class SystemDevOpsMCP:
                 "error": str(e)
             }
 
-    async def run_command(self, command: str, timeout_seconds: int = 30, 
-                         capture_output: bool = True) -> dict:
+    async def run_command(self, command: str, timeout_seconds: int = 30,
+                         capture_output: bool = True, ctx: Optional[Context] = None) -> dict:
         """Run a command safely with timeout."""
         try:
             # Security check: basic validation to prevent command injection
@@ -129,27 +242,30 @@ class SystemDevOpsMCP:
                         "success": False,
                         "error": f"Dangerous command pattern detected: {pattern}"
                     }
-            
-            result = subprocess.run(
-                command,
-                shell=True,
-                capture_output=capture_output,
-                text=True,
-                timeout=timeout_seconds
-            )
-            
+
+            on_output = None
+            if ctx is not None:
+                streamed = {"bytes": 0}
+
+                async def on_output(stream: str, chunk: bytes):
+                    streamed["bytes"] += len(chunk)
+                    tail = chunk[-200:].decode("utf-8", errors="replace").rstrip()
+                    await ctx.report_progress(streamed["bytes"], None, f"{stream}: {tail}")
+
+            result = await self.runner.run(command, timeout_seconds, capture_output, on_output)
+            if result["timed_out"]:
+                return {
+                    "success": False,
+                    "error": f"Command timed out after {timeout_seconds} seconds",
+                    "command": command,
+                    **result
+                }
             return {
                 "success": True,
                 "command": command,
-                "return_code": result.returncode,
-                "stdout": result.stdout if capture_output else None,
-                "stderr": result.stderr if capture_output else None,
-                "execution_time_seconds": timeout_seconds
-            }
-        except subprocess.TimeoutExpired:
-            return {
-                "success": False,
-                "error": f"Command timed out after {timeout_seconds} seconds"
+                "stdout": None,
+                "stderr": None,
+                **result
             }
         except Exception as e:
             return {
@@ -157,20 +273,26 @@ class SystemDevOpsMCP:
                 "error": str(e)
             }
 
+    async def run_commands(self, commands: List[dict]) -> dict:
+        """Run several commands concurrently, bounded by the runner's concurrency limit."""
+        started = time.perf_counter()
+        results = await asyncio.gather(*(
+            self.run_command(c["command"], c.get("timeout_seconds", 30), c.get("capture_output", True))
+            for c in commands
+        ))
+        return {
+            "success": all(r["success"] for r in results),
+            "results": results,
+            "count": len(results),
+            "max_concurrency": self.runner.max_concurrency,
+            "execution_time_seconds": round(time.perf_counter() - started, 4)
+        }
+
     async def check_connectivity(self, host: str, port: int = 80, timeout_seconds: int = 5) -> dict:
         """Check connectivity to a host and port."""
         try:
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
-                sock.settimeout(timeout_seconds)
-                result = sock.connect_ex((host, port))
-                
-                return {
-                    "success": True,
-                    "host": host,
-                    "port": port,
-                    "is_connected": result == 0,
-                    "status_code": result
-                }
+            result = await probe(host, port, timeout_seconds, self.dns)
+            return {"success": True, **result}
         except Exception as e:
             return {
                 "success": False,
@@ -179,32 +301,69 @@ class SystemDevOpsMCP:
                 "port": port
             }
 
+    async def check_connectivity_batch(self, targets: List[str], timeout_seconds: float = 5,
+                                       concurrency: int = 64) -> dict:
+        """Probe many host:port targets concurrently, with DNS caching and per-target latency."""
+        try:
+            started = time.perf_counter()
+            results = await probe_many(targets, timeout_seconds, concurrency, self.dns)
+            return {
+                "success": True,
+                "results": results,
+                "connected": sum(1 for r in results if r["is_connected"]),
+                "failed": sum(1 for r in results if not r["is_connected"]),
+                "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+                "dns_cache": self.dns.stats()
+            }
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e)
+            }
+
 def create_system_devops_server():
     server = SystemDevOpsMCP()
     
     @server.app.tool("get_system_stats", "Get system statistics (CPU, memory, disk, network)")
     async def handle_system_stats(req: SystemStatsRequest) -> dict:
         return await server.get_system_stats(
-            req.cpu, req.memory, req.disk, req.network
+            req.cpu, req.memory, req.disk, req.network, req.history_seconds
         )
     
-    @server.app.tool("read_file", "Read a file with size limitations")
+    @server.app.tool("read_file", "Read a file, a byte range, a line window, its tail, or regex matches")
     async def handle_read_file(req: FileOperationRequest) -> dict:
         return await server.read_file(
-            req.path, req.encoding, req.max_size_mb
+            req.path, req.encoding, req.max_size_mb, req.mode, req.offset, req.length,
+            req.start_line, req.max_lines, req.pattern, req.ignore_case, req.max_matches, req.context_lines
+        )
+
+    @server.app.tool("stream_file", "Stream a large file in chunks, resumable from next_offset")
+    async def handle_stream_file(req: FileStreamRequest, ctx: Context) -> dict:
+        return await server.stream_file(
+            req.path, req.encoding, req.offset, req.chunk_bytes, req.max_bytes, ctx
         )
     
     @server.app.tool("run_command", "Run a command safely with timeout")
-    async def handle_run_command(req: CommandRequest) -> dict:
+    async def handle_run_command(req: CommandRequest, ctx: Context) -> dict:
         return await server.run_command(
-            req.command, req.timeout_seconds, req.capture_output
+            req.command, req.timeout_seconds, req.capture_output, ctx
         )
+
+    @server.app.tool("run_commands", "Run several commands concurrently with a bounded worker pool")
+    async def handle_run_commands(req: BatchCommandRequest) -> dict:
+        return await server.run_commands([c.model_dump() for c in req.commands])
     
     @server.app.tool("check_connectivity", "Check connectivity to a host and port")
     async def handle_check_connectivity(req: NetworkCheckRequest) -> dict:
         return await server.check_connectivity(
             req.host, req.port, req.timeout_seconds
         )
+
+    @server.app.tool("check_connectivity_batch", "Check many host:port endpoints concurrently")
+    async def handle_check_connectivity_batch(req: ConnectivityBatchRequest) -> dict:
+        return await server.check_connectivity_batch(
+            req.targets, req.timeout_seconds, req.concurrency
+        )
     
     return server
 
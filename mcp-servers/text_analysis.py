@@ -0,0 +1,190 @@
+"""
+Text analysis engine for ResearchAnalysisMCP.analyze_content
+
+Each document is lowercased once and the sentiment lexicon, including
+multi-word phrases such as "not good", is matched through a token trie
+anchored by C-level substring search. Entity patterns are compiled at import
+time and skipped when a cheap prefilter shows they cannot match. Batches are
+split into chunks and fanned out to a process pool, since the work is
+CPU-bound and holds the GIL.
+"""
+
+import asyncio
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+EMAIL_PATTERN = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
+PHONE_PATTERN = re.compile(r'\b\d{3}[-.]?\d{3}[-.]?\d{4}\b')
+DIGIT_PATTERN = re.compile(r'\d')
+
+_SPACE_PATTERN = re.compile(r"\s+")
+_END = object()
+
+DEFAULT_LEXICON: Dict[str, float] = {
+    "good": 1.0, "great": 1.0, "excellent": 1.0, "positive": 1.0, "wonderful": 1.0,
+    "bad": -1.0, "terrible": -1.0, "awful": -1.0, "negative": -1.0, "horrible": -1.0,
+    "not good": -1.0, "not great": -1.0, "not bad": 0.5, "not terrible": 0.5,
+}
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "'"
+
+
+class PhraseMatcher:
+    """
+    Multi-phrase lexicon matcher. Phrases live in a token trie; occurrences of
+    each phrase's first token are located with str.find (a C-level substring
+    search, far cheaper per character than a regex alternation) and extended
+    through the trie from there. Matching is leftmost-longest on whole words,
+    so "not good" counts once rather than also as "good".
+    """
+
+    def __init__(self, phrases: Dict[str, Any]):
+        self.payloads: Dict[str, Any] = {}
+        self.trie: Dict[str, Any] = {}
+        for phrase, payload in phrases.items():
+            tokens = TOKEN_PATTERN.findall(phrase.lower())
+            if not tokens:
+                continue
+            self.payloads[" ".join(tokens)] = payload
+            node = self.trie
+            for token in tokens:
+                node = node.setdefault(token, {})
+            node[_END] = True
+
+    def _longest_at(self, text: str, start: int) -> Optional[Tuple[int, str]]:
+        node = self.trie
+        tokens: List[str] = []
+        best = None
+        pos = start
+        while True:
+            match = TOKEN_PATTERN.match(text, pos)
+            if match is None or match.group() not in node:
+                return best
+            node = node[match.group()]
+            tokens.append(match.group())
+            pos = match.end()
+            if _END in node:
+                best = (pos, " ".join(tokens))
+            space = _SPACE_PATTERN.match(text, pos)
+            if space is None:
+                return best
+            pos = space.end()
+
+    def matches(self, text: str) -> List[Tuple[int, str, Any]]:
+        """Return (offset, phrase, payload) for each match in lowercased `text`"""
+        starts = []
+        length = len(text)
+        for token in self.trie:
+            start = text.find(token)
+            while start != -1:
+                end = start + len(token)
+                if (start == 0 or not _is_word_char(text[start - 1])) and (end == length or not _is_word_char(text[end])):
+                    starts.append(start)
+                start = text.find(token, end)
+        starts.sort()
+
+        found = []
+        covered = 0
+        for start in starts:
+            if start < covered:
+                continue
+            longest = self._longest_at(text, start)
+            if longest is not None:
+                covered, phrase = longest
+                found.append((start, phrase, self.payloads[phrase]))
+        return found
+
+
+class TextAnalyzer:
+    """Runs summarize / sentiment / entities over a document in one tokenization pass"""
+
+    def __init__(self, lexicon: Optional[Dict[str, float]] = None):
+        self.matcher = PhraseMatcher(lexicon or DEFAULT_LEXICON)
+
+    def analyze(self, text: str, analysis_types: Iterable[str]) -> Dict[str, Any]:
+        analysis_types = set(analysis_types)
+        results: Dict[str, Any] = {}
+
+        if "summarize" in analysis_types:
+            sentences = text.split('.')
+            summary_length = min(3, len(sentences))
+            results["summary"] = '. '.join(sentences[:summary_length]) + '.'
+
+        if "sentiment" in analysis_types:
+            positive = negative = 0
+            score = 0.0
+            for _, _, weight in self.matcher.matches(text.lower()):
+                score += weight
+                if weight > 0:
+                    positive += 1
+                elif weight < 0:
+                    negative += 1
+            if score > 0:
+                results["sentiment"] = "positive"
+            elif score < 0:
+                results["sentiment"] = "negative"
+            else:
+                results["sentiment"] = "neutral"
+            results["sentiment_score"] = {"score": score, "positive_hits": positive, "negative_hits": negative}
+
+        if "entities" in analysis_types:
+            # Cheap C-level prefilters skip the full scans on documents that cannot match
+            results["entities"] = {
+                "emails": EMAIL_PATTERN.findall(text) if "@" in text else [],
+                "phones": PHONE_PATTERN.findall(text) if DIGIT_PATTERN.search(text) else []
+            }
+
+        return results
+
+
+_DEFAULT_ANALYZER = TextAnalyzer()
+
+
+def analyze_chunk(texts: List[str], analysis_types: List[str]) -> List[Dict[str, Any]]:
+    """Process-pool entry point: analyze a chunk of documents with the default lexicon"""
+    return [_DEFAULT_ANALYZER.analyze(text, analysis_types) for text in texts]
+
+
+class BatchAnalyzer:
+    """
+    Analyzes many documents per call. Small batches run in a worker thread;
+    batches above `parallel_min_chars` are chunked across a process pool.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, parallel_min_chars: int = 200_000,
+                 chunks_per_worker: int = 4):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.parallel_min_chars = parallel_min_chars
+        self.chunks_per_worker = chunks_per_worker
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._pool
+
+    async def analyze(self, texts: List[str], analysis_types: List[str]) -> List[Dict[str, Any]]:
+        """Return one result dict per document, in input order"""
+        if not texts:
+            return []
+        if self.max_workers <= 1 or sum(len(text) for text in texts) < self.parallel_min_chars:
+            return await asyncio.to_thread(analyze_chunk, texts, analysis_types)
+
+        chunk_size = max(1, -(-len(texts) // (self.max_workers * self.chunks_per_worker)))
+        loop = asyncio.get_running_loop()
+        pool = self._executor()
+        chunks = await asyncio.gather(*(
+            loop.run_in_executor(pool, analyze_chunk, texts[i:i + chunk_size], analysis_types)
+            for i in range(0, len(texts), chunk_size)
+        ))
+        return [result for chunk in chunks for result in chunk]
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for ResearchAnalysisMCP.analyze_content
+Compares the original per-keyword scan with the single-pass analyzer and
+the process-pool batch path, reporting documents per second.
+
+Usage: python scripts/benchmark_analyze_content.py [--docs 5000] [--words 400]
+"""
+
+import argparse
+import asyncio
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "mcp-servers"))
+
+from text_analysis import BatchAnalyzer, TextAnalyzer
+
+ANALYSIS_TYPES = ["summarize", "sentiment", "entities"]
+VOCABULARY = (
+    "the market product customer growth revenue team quarter report data analysis service support "
+    "pricing launch and of to in for with on that this is was are be by from at as an it we our "
+    "their new more year company platform sales user users features release roadmap strategy "
+    "operations cost costs margin plan plans hiring regional enterprise"
+).split()
+SENTIMENT_WORDS = "good great excellent bad terrible awful not".split()
+
+
+def legacy_analyze(text, analysis_types):
+    """The analyze_content implementation this benchmark replaces"""
+    results = {}
+    if "summarize" in analysis_types:
+        sentences = text.split('.')
+        results["summary"] = '. '.join(sentences[:min(3, len(sentences))]) + '.'
+    if "sentiment" in analysis_types:
+        positive_words = ['good', 'great', 'excellent', 'positive', 'wonderful']
+        negative_words = ['bad', 'terrible', 'awful', 'negative', 'horrible']
+        pos_count = sum(1 for word in positive_words if word.lower() in text.lower())
+        neg_count = sum(1 for word in negative_words if word.lower() in text.lower())
+        results["sentiment"] = "positive" if pos_count > neg_count else "negative" if neg_count > pos_count else "neutral"
+    if "entities" in analysis_types:
+        results["entities"] = {
+            "emails": re.findall(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', text),
+            "phones": re.findall(r'\b\d{3}[-.]?\d{3}[-.]?\d{4}\b', text)
+        }
+    return results
+
+
+def make_documents(count, words, contact_ratio=0.1, sentiment_ratio=0.03, seed=7):
+    """
+    Synthetic scraped text: `sentiment_ratio` of words come from the lexicon and
+    `contact_ratio` of documents carry an email address and phone number
+    """
+    rng = random.Random(seed)
+    documents = []
+    for i in range(count):
+        body = " ".join(
+            rng.choice(SENTIMENT_WORDS if rng.random() < sentiment_ratio else VOCABULARY)
+            for _ in range(words)
+        )
+        sentences = ". ".join(body[j:j + 120] for j in range(0, len(body), 120))
+        if rng.random() < contact_ratio:
+            sentences += f". Contact sales{i}@example.com or 555-123-{i % 10000:04d}"
+        documents.append(sentences + ".")
+    return documents
+
+
+def report(label, count, elapsed):
+    print(f"{label:<28} {count / elapsed:>10.0f} docs/sec  ({elapsed:.2f}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--docs", type=int, default=5000)
+    parser.add_argument("--words", type=int, default=400)
+    parser.add_argument("--contact-ratio", type=float, default=0.1)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    documents = make_documents(args.docs, args.words, args.contact_ratio)
+    print(f"{args.docs} documents, ~{sum(map(len, documents)) // args.docs} chars each\n")
+
+    started = time.perf_counter()
+    for text in documents:
+        legacy_analyze(text, ANALYSIS_TYPES)
+    report("legacy analyze_content", args.docs, time.perf_counter() - started)
+
+    analyzer = TextAnalyzer()
+    started = time.perf_counter()
+    for text in documents:
+        analyzer.analyze(text, ANALYSIS_TYPES)
+    report("TextAnalyzer", args.docs, time.perf_counter() - started)
+
+    batch = BatchAnalyzer(max_workers=args.workers, parallel_min_chars=0)
+    asyncio.run(batch.analyze(documents[:batch.max_workers], ANALYSIS_TYPES))  # start workers
+    started = time.perf_counter()
+    asyncio.run(batch.analyze(documents, ANALYSIS_TYPES))
+    report(f"batch ({batch.max_workers} processes)", args.docs, time.perf_counter() - started)
+    batch.close()
+
+
+if __name__ == "__main__":
+    main()
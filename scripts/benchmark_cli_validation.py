@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for OpenClawCLITool command validation and audit logging
+Compares the original per-command path (re-read and re-parse the allowlist
+JSON and recompile its regexes for every command; open the log file for every
+entry) with the cached allowlist and the buffered audit log writer.
+
+Usage: python scripts/benchmark_cli_validation.py [--commands 10000]
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "cli_tools"))
+
+from python_cli_tool import DANGEROUS_PATTERNS, AuditLogWriter, OpenClawCLITool
+
+SAMPLE_COMMANDS = [
+    "git status", "ls -la /var/log", "python3 -m pytest -q", "df -h", "du -sh .",
+    "ping example", "docker ps", "make build", "terraform plan", "rm -rf /tmp/x",
+    "cat README.md; rm -rf /", "kubectl get pods", "npm run build", "uptime",
+]
+
+
+def legacy_validate(allowlist_file, command):
+    """_validate_command as it was before the allowlist cache"""
+    for pattern in DANGEROUS_PATTERNS:
+        if pattern in command:
+            return False
+    with open(allowlist_file, 'r') as f:
+        allowlist = json.load(f)
+    command_parts = command.strip().split()
+    if not command_parts:
+        return False
+    if command_parts[0] in allowlist.get("approved_commands", []):
+        return True
+    for pattern in allowlist.get("approved_patterns", []):
+        if re.match(pattern, command.strip()):
+            return True
+    return False
+
+
+def legacy_log(log_file, action, details):
+    """_log_activity as it was before the buffered writer"""
+    log_entry = {"timestamp": datetime.now().isoformat(), "action": action, "details": details}
+    with open(log_file, 'a') as f:
+        f.write(json.dumps(log_entry) + '\n')
+
+
+def report(label, count, elapsed):
+    print(f"{label:<28} {elapsed:>8.3f}s  {count / elapsed:>12,.0f} /s  {elapsed / count * 1e6:>8.2f} us each")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--commands", type=int, default=10_000, help="Number of commands to validate")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    commands = [rng.choice(SAMPLE_COMMANDS) for _ in range(args.commands)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        tool = OpenClawCLITool()
+        tool.audit_log = AuditLogWriter(Path(directory) / "buffered.log")
+
+        print(f"Validating {args.commands:,} commands")
+        started = time.perf_counter()
+        legacy = [legacy_validate(tool.allowlist_file, c) for c in commands]
+        report("legacy (read + compile)", len(commands), time.perf_counter() - started)
+
+        started = time.perf_counter()
+        cached = [tool._validate_command(c) for c in commands]
+        report("cached allowlist", len(commands), time.perf_counter() - started)
+        assert cached == legacy, "cached validation disagrees with the legacy path"
+
+        print(f"\nLogging {args.commands:,} audit entries")
+        legacy_file = Path(directory) / "legacy.log"
+        started = time.perf_counter()
+        for command in commands:
+            legacy_log(legacy_file, "command_attempt", {"command": command})
+        report("legacy (open per entry)", len(commands), time.perf_counter() - started)
+
+        started = time.perf_counter()
+        for command in commands:
+            tool._log_activity("command_attempt", {"command": command})
+        enqueue = time.perf_counter() - started
+        tool.audit_log.flush()
+        report("buffered (caller side)", len(commands), enqueue)
+        report("buffered (incl. flush)", len(commands), time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    main()
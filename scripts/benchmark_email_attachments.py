@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark for EmailMCP attachments
+Compares the original in-memory MIME build (read, base64-encode and render the
+whole message with as_string) with the streaming MIME writer, for a message
+carrying one large attachment. Both produce the bytes that go to SMTP DATA;
+here they are written to a sink that only counts them.
+
+Usage: python scripts/benchmark_email_attachments.py [--size-mb 50]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from email import encoders
+from email.mime.base import MIMEBase
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "mcp-servers"))
+
+from mime_stream import StreamingMessage
+
+
+def legacy_message(path):
+    """The message build and render send_email used before streaming"""
+    msg = MIMEMultipart()
+    msg['From'] = "bot@example.com"
+    msg['To'] = "team@example.com"
+    msg['Subject'] = "Quarterly export"
+    msg.attach(MIMEText("Export attached.", 'plain'))
+    with open(path, "rb") as attachment:
+        part = MIMEBase('application', 'octet-stream')
+        part.set_payload(attachment.read())
+        encoders.encode_base64(part)
+        part.add_header('Content-Disposition', f'attachment; filename= {os.path.basename(path)}')
+        msg.attach(part)
+    return len(msg.as_string().encode())
+
+
+def streaming_message(path):
+    message = StreamingMessage("bot@example.com", ["team@example.com"], "Quarterly export",
+                               "Export attached.", attachments=[path])
+    return sum(len(chunk) for chunk in message)
+
+
+def measure(label, func, path):
+    started = time.perf_counter()
+    size = func(path)
+    elapsed = time.perf_counter() - started
+    # Second run under tracemalloc, which slows execution too much to time
+    tracemalloc.start()
+    func(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<12} {size / 2**20:>8.1f} MiB on the wire  {elapsed:>7.3f}s   peak {peak / 2**20:>8.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size-mb", type=int, default=50, help="Attachment size in MiB")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "export.bin")
+        with open(path, "wb") as f:
+            for _ in range(args.size_mb):
+                f.write(os.urandom(1024 * 1024))
+        print(f"One {args.size_mb} MiB attachment")
+        measure("legacy", legacy_message, path)
+        measure("streaming", streaming_message, path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark for ResearchAnalysisMCP.generate_report
+Compares the original string-concatenation markdown builder with the
+streaming report writer, in memory and written to a file, for every format.
+
+Usage: python scripts/benchmark_generate_report.py [--findings 100000]
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "mcp-servers"))
+
+from report_writer import render_report, write_report
+
+
+def legacy_markdown(findings):
+    """The markdown builder this benchmark replaces"""
+    report_content = "# Research Report\n\n"
+    for i, finding in enumerate(findings, 1):
+        report_content += f"## Finding {i}\n"
+        for key, value in finding.items():
+            report_content += f"- **{key.capitalize()}**: {value}\n"
+        report_content += "\n"
+    return report_content
+
+
+def make_findings(count):
+    return [
+        {
+            "title": f"Finding number {i}",
+            "source": f"https://example.com/articles/{i}",
+            "summary": "Customers cite onboarding speed and pricing clarity as key factors. " * 2,
+            "confidence": round((i % 100) / 100, 2),
+            "tags": ["pricing", "onboarding"] if i % 2 else ["support"],
+        }
+        for i in range(count)
+    ]
+
+
+def measure(label, func):
+    started = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - started
+    # Second run under tracemalloc, which slows execution too much to time
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<28} {elapsed:>8.3f}s   peak {peak / 2**20:>8.1f} MiB")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--findings", type=int, default=100_000)
+    args = parser.parse_args()
+
+    findings = make_findings(args.findings)
+    print(f"{args.findings} findings\n")
+
+    legacy = measure("legacy markdown (+=)", lambda: legacy_markdown(findings))
+    streamed = measure("markdown (in memory)", lambda: render_report(findings, "markdown"))
+    assert legacy == streamed, "streaming writer must produce identical markdown"
+
+    with tempfile.TemporaryDirectory() as directory:
+        for format_type in ("markdown", "json", "jsonl", "csv"):
+            path = Path(directory) / f"report.{format_type}"
+            written = measure(f"{format_type} (to file)", lambda: write_report(findings, str(path), format_type, 0.0))
+            print(f"{'':<28} {written['bytes'] / 2**20:>8.1f} MiB in {written['chunks']} chunks")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Local fake IMAP4rev1 server for tests
+
+Implements the subset imaplib and imap_sync use: LOGIN, SELECT/EXAMINE,
+UID SEARCH (UID ranges, ALL, UNSEEN), UID FETCH (UID, FLAGS, RFC822.SIZE,
+RFC822, BODY.PEEK[HEADER.FIELDS (...)], BODY.PEEK[TEXT]<0.n>), NOOP,
+CLOSE and LOGOUT. Every command is recorded, so tests can assert how much
+was asked of the server.
+"""
+
+import re
+import socketserver
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+
+class Mailbox:
+    def __init__(self, uidvalidity: int = 1):
+        self.uidvalidity = uidvalidity
+        self.uidnext = 1
+        self.messages: List[Tuple[int, Set[str], bytes]] = []
+
+    def append(self, raw: bytes, flags: Optional[Set[str]] = None) -> int:
+        uid = self.uidnext
+        self.uidnext += 1
+        self.messages.append((uid, set(flags or ()), raw))
+        return uid
+
+
+def _uid_set(spec: str, highest: int) -> Set[int]:
+    uids: Set[int] = set()
+    for part in spec.split(","):
+        if ":" in part:
+            a, b = part.split(":")
+            a = highest if a == "*" else int(a)
+            b = highest if b == "*" else int(b)
+            uids.update(range(min(a, b), max(a, b) + 1))
+        else:
+            uids.add(highest if part == "*" else int(part))
+    return uids
+
+
+def _header_fields(raw: bytes, fields: List[str]) -> bytes:
+    head = raw.split(b"\r\n\r\n", 1)[0]
+    wanted = {f.upper() for f in fields}
+    lines, keep = [], False
+    for line in head.split(b"\r\n"):
+        if line[:1] in (b" ", b"\t"):
+            if keep:
+                lines.append(line)
+            continue
+        keep = line.split(b":", 1)[0].decode().upper() in wanted
+        if keep:
+            lines.append(line)
+    return b"\r\n".join(lines) + b"\r\n\r\n"
+
+
+class FakeIMAPServer:
+    def __init__(self, username: str = "bot@example.com", password: str = "secret"):
+        self.username = username
+        self.password = password
+        self.folders: Dict[str, Mailbox] = {"INBOX": Mailbox()}
+        self.commands: List[str] = []
+        self.logins = 0
+        self.bytes_sent = 0
+        self._server: Optional[socketserver.ThreadingTCPServer] = None
+        self._handlers: List[socketserver.StreamRequestHandler] = []
+        self.port = 0
+
+    def start(self):
+        fake = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                fake._handlers.append(self)
+                fake._session(self)
+
+        self._server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.drop_connections()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def drop_connections(self):
+        """Close every client connection, like a server-side idle timeout"""
+        for handler in self._handlers:
+            try:
+                handler.connection.shutdown(2)
+            except OSError:
+                pass
+        self._handlers.clear()
+
+    def _session(self, handler):
+        send = lambda data: self._send(handler, data)  # noqa: E731
+        send(b"* OK [CAPABILITY IMAP4rev1] fake ready\r\n")
+        selected: Optional[Mailbox] = None
+        authenticated = False
+        while True:
+            try:
+                line = handler.rfile.readline()
+            except OSError:
+                return
+            if not line:
+                return
+            tag, _, rest = line.decode().rstrip("\r\n").partition(" ")
+            command, _, args = rest.partition(" ")
+            command = command.upper()
+            self.commands.append(rest if command != "LOGIN" else "LOGIN")
+            if command == "CAPABILITY":
+                send(b"* CAPABILITY IMAP4rev1\r\n" + f"{tag} OK done\r\n".encode())
+            elif command == "LOGIN":
+                user, password = [a.strip('"') for a in args.split(" ", 1)]
+                if (user, password) == (self.username, self.password):
+                    authenticated = True
+                    self.logins += 1
+                    send(f"{tag} OK logged in\r\n".encode())
+                else:
+                    send(f"{tag} NO bad credentials\r\n".encode())
+            elif not authenticated:
+                send(f"{tag} BAD log in first\r\n".encode())
+            elif command in ("SELECT", "EXAMINE"):
+                selected = self.folders.get(args.strip('"'))
+                if selected is None:
+                    send(f"{tag} NO no such folder\r\n".encode())
+                    continue
+                send(f"* {len(selected.messages)} EXISTS\r\n* 0 RECENT\r\n"
+                     f"* OK [UIDVALIDITY {selected.uidvalidity}] ok\r\n* OK [UIDNEXT {selected.uidnext}] ok\r\n"
+                     f"{tag} OK [READ-ONLY] selected\r\n".encode())
+            elif command == "UID" and selected is not None:
+                sub, _, sub_args = args.partition(" ")
+                if sub.upper() == "SEARCH":
+                    send(self._search(selected, sub_args) + f"{tag} OK search done\r\n".encode())
+                elif sub.upper() == "FETCH":
+                    send(self._fetch(selected, sub_args) + f"{tag} OK fetch done\r\n".encode())
+                else:
+                    send(f"{tag} BAD unsupported\r\n".encode())
+            elif command == "NOOP":
+                send(f"{tag} OK noop\r\n".encode())
+            elif command == "CLOSE":
+                selected = None
+                send(f"{tag} OK closed\r\n".encode())
+            elif command == "LOGOUT":
+                send(b"* BYE bye\r\n" + f"{tag} OK logout\r\n".encode())
+                return
+            else:
+                send(f"{tag} BAD unsupported\r\n".encode())
+
+    def _send(self, handler, data: bytes):
+        self.bytes_sent += len(data)
+        handler.wfile.write(data)
+        handler.wfile.flush()
+
+    @staticmethod
+    def _search(box: Mailbox, criteria: str) -> bytes:
+        highest = box.messages[-1][0] if box.messages else 0
+        criteria = criteria.upper()
+        if criteria.startswith("UID "):
+            wanted = _uid_set(criteria[4:], highest)
+            uids = [uid for uid, _, _ in box.messages if uid in wanted]
+        elif criteria == "UNSEEN":
+            uids = [uid for uid, flags, _ in box.messages if "\\Seen" not in flags]
+        else:
+            uids = [uid for uid, _, _ in box.messages]
+        return ("* SEARCH" + "".join(f" {uid}" for uid in uids) + "\r\n").encode()
+
+    @staticmethod
+    def _fetch(box: Mailbox, args: str) -> bytes:
+        spec, _, items = args.partition(" ")
+        highest = box.messages[-1][0] if box.messages else 0
+        wanted = _uid_set(spec, highest)
+        header_fields = re.search(r"BODY\.PEEK\[HEADER\.FIELDS \(([^)]*)\)\]", items)
+        text_partial = re.search(r"BODY\.PEEK\[TEXT\]<0\.(\d+)>", items)
+        out = b""
+        for seq, (uid, flags, raw) in enumerate(box.messages, 1):
+            if uid not in wanted:
+                continue
+            parts = [f"UID {uid}".encode()]
+            if "FLAGS" in items:
+                parts.append(f"FLAGS ({' '.join(sorted(flags))})".encode())
+            if "RFC822.SIZE" in items:
+                parts.append(f"RFC822.SIZE {len(raw)}".encode())
+            if header_fields:
+                data = _header_fields(raw, header_fields.group(1).split())
+                parts.append(f"BODY[HEADER.FIELDS ({header_fields.group(1)})] {{{len(data)}}}\r\n".encode() + data)
+            if text_partial:
+                data = raw.split(b"\r\n\r\n", 1)[-1][:int(text_partial.group(1))]
+                parts.append(f"BODY[TEXT]<0> {{{len(data)}}}\r\n".encode() + data)
+            if re.search(r"\bRFC822\b(?!\.)", items):
+                parts.append(f"RFC822 {{{len(raw)}}}\r\n".encode() + raw)
+            out += f"* {seq} FETCH (".encode() + b" ".join(parts) + b")\r\n"
+        return out
@@ -0,0 +1,175 @@
+"""
+Local fake n8n server for tests
+
+Serves the parts of the n8n REST API that cli_tools/n8n_integration.py uses
+(/api/v1/workflows with cursor pagination, /api/v1/executions) plus
+/webhook/<path>, on an aiohttp web app. Executions run for
+`execution_seconds` and then report status "success" (or "error" when their
+input has "fail": true). Tests can inspect every request, how many TCP
+connections clients opened, and the peak number of executions running at
+once, make the next `fail_executions` executions fail, answer the next
+`fail_polls` execution lookups with 503, count lookups that asked for run
+data (`data_fetches`), and cap request bodies at `max_body_bytes`.
+"""
+
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from aiohttp import web
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class FakeN8nServer:
+    def __init__(self, api_key: str = "n8n-key", execution_seconds: float = 0.2,
+                 max_body_bytes: int = 1024 ** 2):
+        self.api_key = api_key
+        self.execution_seconds = execution_seconds
+        self.max_body_bytes = max_body_bytes
+        self.fail_executions = 0
+        self.fail_polls = 0
+        self.data_fetches = 0
+        self.workflows: Dict[str, Dict[str, Any]] = {}
+        self.executions: Dict[str, Dict[str, Any]] = {}
+        self.requests: List[Tuple[str, str]] = []
+        self.connections: Set[Tuple[str, int]] = set()
+        self.max_running = 0
+        self.page_size = 100
+        self._next_id = 1
+        self._runner: Optional[web.AppRunner] = None
+        self.port = 0
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/api/v1"
+
+    def _new_id(self) -> str:
+        value = str(self._next_id)
+        self._next_id += 1
+        return value
+
+    def running(self) -> int:
+        now = time.monotonic()
+        return sum(1 for e in self.executions.values() if e["_started"] <= now < e["_ends"])
+
+    async def start(self):
+        app = web.Application(middlewares=[self._track], client_max_size=self.max_body_bytes)
+        app.router.add_get("/api/v1/workflows", self._list_workflows)
+        app.router.add_post("/api/v1/workflows", self._create_workflow)
+        app.router.add_get("/api/v1/workflows/{id}", self._get_workflow)
+        app.router.add_delete("/api/v1/workflows/{id}", self._delete_workflow)
+        app.router.add_post("/api/v1/executions", self._create_execution)
+        app.router.add_get("/api/v1/executions/{id}", self._get_execution)
+        app.router.add_post("/api/v1/executions/{id}/stop", self._stop_execution)
+        app.router.add_post("/webhook/{path}", self._webhook)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        await self._runner.cleanup()
+
+    @web.middleware
+    async def _track(self, request: web.Request, handler):
+        self.requests.append((request.method, request.path))
+        self.connections.add(request.transport.get_extra_info("peername"))
+        if not request.path.startswith("/webhook/") and \
+                request.headers.get("Authorization") != f"Bearer {self.api_key}":
+            return web.json_response({"message": "unauthorized"}, status=401)
+        return await handler(request)
+
+    async def _list_workflows(self, request: web.Request) -> web.Response:
+        workflows = list(self.workflows.values())
+        start = int(request.query.get("cursor", 0))
+        limit = int(request.query.get("limit", self.page_size))
+        more = start + limit < len(workflows)
+        return web.json_response({"data": workflows[start:start + limit],
+                                  "nextCursor": str(start + limit) if more else None})
+
+    async def _create_workflow(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        workflow = {**body, "id": self._new_id(), "active": False, "createdAt": _now(), "updatedAt": _now()}
+        self.workflows[workflow["id"]] = workflow
+        return web.json_response(workflow)
+
+    async def _get_workflow(self, request: web.Request) -> web.Response:
+        workflow = self.workflows.get(request.match_info["id"])
+        if workflow is None:
+            return web.json_response({"message": "Not Found"}, status=404)
+        return web.json_response(workflow)
+
+    async def _delete_workflow(self, request: web.Request) -> web.Response:
+        workflow = self.workflows.pop(request.match_info["id"], None)
+        if workflow is None:
+            return web.json_response({"message": "Not Found"}, status=404)
+        return web.json_response(workflow)
+
+    async def _create_execution(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        if body.get("workflowId") not in self.workflows:
+            return web.json_response({"message": "Workflow not found"}, status=404)
+        started = time.monotonic()
+        execution = {
+            "id": self._new_id(),
+            "workflowId": body["workflowId"],
+            "input": body.get("data"),
+            "startedAt": _now(),
+            "_started": started,
+            "_ends": started + self.execution_seconds,
+            "_failed": bool((body.get("data") or {}).get("fail")) or self.fail_executions > 0,
+        }
+        self.fail_executions = max(0, self.fail_executions - 1)
+        self.executions[execution["id"]] = execution
+        self.max_running = max(self.max_running, self.running())
+        return web.json_response(self._public(execution))
+
+    async def _get_execution(self, request: web.Request) -> web.Response:
+        if self.fail_polls > 0:
+            self.fail_polls -= 1
+            return web.json_response({"message": "Service Unavailable"}, status=503)
+        execution = self.executions.get(request.match_info["id"])
+        if execution is None:
+            return web.json_response({"message": "Not Found"}, status=404)
+        include_data = request.query.get("includeData") == "true"
+        self.data_fetches += include_data
+        return web.json_response(self._public(execution, include_data))
+
+    async def _stop_execution(self, request: web.Request) -> web.Response:
+        execution = self.executions.get(request.match_info["id"])
+        if execution is None:
+            return web.json_response({"message": "Not Found"}, status=404)
+        execution["_ends"] = min(execution["_ends"], time.monotonic())
+        execution["_failed"] = execution["_stopped"] = True
+        return web.json_response(self._public(execution))
+
+    @staticmethod
+    def _public(execution: Dict[str, Any], include_data: bool = False) -> Dict[str, Any]:
+        finished = time.monotonic() >= execution["_ends"]
+        failed = execution["_failed"]
+        public = {k: v for k, v in execution.items() if not k.startswith("_")}
+        public["finished"] = finished and not failed
+        if not finished:
+            public["status"] = "running"
+        elif execution.get("_stopped"):
+            public["status"] = "canceled"
+        else:
+            public["status"] = "error" if failed else "success"
+        if finished and not failed and include_data:
+            # Shaped like n8n's run data: the last node emits the input marked as processed
+            item = {"json": {**(execution["input"] or {}), "processed": True}}
+            public["data"] = {"resultData": {
+                "lastNodeExecuted": "Process Data",
+                "runData": {"Process Data": [{"data": {"main": [[item]]}}]},
+            }}
+        return public
+
+    async def _webhook(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        await asyncio.sleep(self.execution_seconds)
+        return web.json_response({"path": request.match_info["path"], "received": body})
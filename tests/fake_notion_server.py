@@ -0,0 +1,143 @@
+"""
+Local fake Notion API server for tests
+
+Implements POST /databases/{id}/query (cursor pagination, page_size capped at
+100, last_edited_time filters and timestamp sorts; other filters go through
+`filter_fn`, and property sorts are ignored) and POST /pages on an aiohttp web app. Archived pages are left
+out of query results, as in Notion. Tests can queue error responses
+(e.g. 429 with Retry-After), add latency, and inspect every request and the
+peak number of requests in flight.
+"""
+
+import asyncio
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+class FakeNotionServer:
+    def __init__(self, token: str = "secret-token"):
+        self.token = token
+        self.databases: Dict[str, List[Dict[str, Any]]] = {}
+        self.requests: List[Tuple[float, str, str, Dict[str, Any]]] = []
+        self.failures: List[Tuple[int, Dict[str, str]]] = []
+        self.latency = 0.0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.filter_fn: Optional[Callable[[Dict[str, Any], Dict[str, Any]], bool]] = None
+        self._runner: Optional[web.AppRunner] = None
+        self.port = 0
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/v1"
+
+    def add_page(self, database_id: str, properties: Dict[str, Any],
+                 last_edited_time: Optional[str] = None) -> Dict[str, Any]:
+        page_id = str(uuid.uuid4())
+        stamp = last_edited_time or _now()
+        page = {
+            "object": "page",
+            "id": page_id,
+            "created_time": stamp,
+            "last_edited_time": stamp,
+            "archived": False,
+            "parent": {"type": "database_id", "database_id": database_id},
+            "properties": properties,
+            "url": f"https://www.notion.so/{page_id.replace('-', '')}",
+        }
+        self.databases.setdefault(database_id, []).append(page)
+        return page
+
+    def update_page(self, page: Dict[str, Any], properties: Dict[str, Any],
+                    last_edited_time: Optional[str] = None):
+        page["properties"].update(properties)
+        page["last_edited_time"] = last_edited_time or _now()
+
+    def archive_page(self, page: Dict[str, Any]):
+        page["archived"] = True
+        page["last_edited_time"] = _now()
+
+    def fail_next(self, status: int, headers: Optional[Dict[str, str]] = None, times: int = 1):
+        """Answer the next `times` requests with `status` before serving normally"""
+        self.failures.extend([(status, headers or {})] * times)
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/v1/databases/{database_id}/query", self._query)
+        app.router.add_post("/v1/pages", self._create_page)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        await self._runner.cleanup()
+
+    async def _enter(self, request: web.Request) -> Tuple[Optional[web.Response], Dict[str, Any]]:
+        body = await request.json() if request.can_read_body else {}
+        self.requests.append((time.monotonic(), request.method, request.path, body))
+        if request.headers.get("Authorization") != f"Bearer {self.token}":
+            return web.json_response({"object": "error", "code": "unauthorized",
+                                      "message": "API token is invalid."}, status=401), body
+        if self.failures:
+            status, headers = self.failures.pop(0)
+            code = "rate_limited" if status == 429 else "internal_server_error"
+            return web.json_response({"object": "error", "code": code, "message": code},
+                                     status=status, headers=headers), body
+        return None, body
+
+    async def _serve(self, handler, request: web.Request) -> web.Response:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            error, body = await self._enter(request)
+            if error is not None:
+                return error
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            return handler(request, body)
+        finally:
+            self.in_flight -= 1
+
+    async def _query(self, request: web.Request) -> web.Response:
+        def handler(request, body):
+            database_id = request.match_info["database_id"]
+            if database_id not in self.databases:
+                return web.json_response({"object": "error", "code": "object_not_found",
+                                          "message": "Could not find database"}, status=404)
+            pages = [p for p in self.databases[database_id] if not p["archived"]]
+            query_filter = body.get("filter")
+            if query_filter and query_filter.get("timestamp") == "last_edited_time":
+                since = query_filter["last_edited_time"]["on_or_after"]
+                pages = [p for p in pages if p["last_edited_time"] >= since]
+            elif query_filter and self.filter_fn:
+                pages = [p for p in pages if self.filter_fn(p, query_filter)]
+            for sort in reversed([s for s in body.get("sorts") or [] if "timestamp" in s]):
+                pages = sorted(pages, key=lambda p: p[sort["timestamp"]],
+                               reverse=sort.get("direction") == "descending")
+            start = int(body.get("start_cursor") or 0)
+            size = min(int(body.get("page_size", 100)), 100)
+            chunk = pages[start:start + size]
+            more = start + size < len(pages)
+            return web.json_response({
+                "object": "list",
+                "results": chunk,
+                "has_more": more,
+                "next_cursor": str(start + size) if more else None,
+            })
+        return await self._serve(handler, request)
+
+    async def _create_page(self, request: web.Request) -> web.Response:
+        def handler(request, body):
+            database_id = body["parent"]["database_id"]
+            return web.json_response(self.add_page(database_id, body["properties"]))
+        return await self._serve(handler, request)
@@ -0,0 +1,130 @@
+"""
+Local fake of an OpenAI-compatible /chat/completions API for tests
+"""
+
+import asyncio
+import json
+import time
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+
+
+class FakeOpenAIServer:
+    """
+    Serves /v1/chat/completions on 127.0.0.1 with a scripted sequence of replies.
+
+    Each entry in `script` is consumed by one request: an int status code
+    (e.g. 429 or 500) or a (status, headers) tuple. Once the script is
+    exhausted every request succeeds.
+    """
+
+    def __init__(self, script: Optional[List[Any]] = None, delay: float = 0.0,
+                 content: str = "Hello from fake Kimi", reasoning: str = "Let me think",
+                 chunk_delay: float = 0.0):
+        self.script = list(script or [])
+        self.delay = delay
+        self.content = content
+        self.reasoning = reasoning
+        self.chunk_delay = chunk_delay
+        self.requests: List[Dict[str, Any]] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._runner: Optional[web.AppRunner] = None
+        self.port = 0
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/v1"
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self._chat_completions)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    def _completion(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "id": f"chatcmpl-{len(self.requests)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "moonshotai/kimi-k2.5"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": self.content},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 12, "completion_tokens": 5, "total_tokens": 17},
+        }
+
+    def _chunks(self, body: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Build a streamed completion: role, reasoning deltas, content or tool-call deltas, usage"""
+        deltas: List[Dict[str, Any]] = [{"role": "assistant"}]
+        deltas += [{"reasoning_content": word + " "} for word in self.reasoning.split()]
+        if body.get("tools"):
+            name = body["tools"][0]["function"]["name"]
+            deltas.append({"tool_calls": [{"index": 0, "id": "call_1", "type": "function",
+                                           "function": {"name": name, "arguments": ""}}]})
+            deltas += [{"tool_calls": [{"index": 0, "function": {"arguments": part}}]}
+                       for part in ('{"city": ', '"Paris"}')]
+            finish_reason = "tool_calls"
+        else:
+            deltas += [{"content": word + " "} for word in self.content.split()]
+            finish_reason = "stop"
+
+        base = {"id": f"chatcmpl-{len(self.requests)}", "object": "chat.completion.chunk",
+                "created": int(time.time()), "model": body.get("model", "moonshotai/kimi-k2.5")}
+        chunks = [{**base, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+                  for delta in deltas]
+        chunks.append({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": finish_reason}]})
+        if body.get("stream_options", {}).get("include_usage"):
+            chunks.append({**base, "choices": [],
+                           "usage": {"prompt_tokens": 12, "completion_tokens": len(deltas), "total_tokens": 12 + len(deltas)}})
+        return chunks
+
+    async def _stream(self, request: web.Request, body: Dict[str, Any]) -> web.StreamResponse:
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for chunk in self._chunks(body):
+            if self.chunk_delay:
+                await asyncio.sleep(self.chunk_delay)
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    async def _chat_completions(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        self.requests.append(body)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            if self.script:
+                action = self.script.pop(0)
+                status, headers = action if isinstance(action, tuple) else (action, {})
+                if status != 200:
+                    return web.json_response(
+                        {"error": {"message": f"scripted {status}", "type": "fake"}},
+                        status=status, headers=headers,
+                    )
+            if body.get("stream"):
+                return await self._stream(request, body)
+            return web.json_response(self._completion(body))
+        finally:
+            self.in_flight -= 1
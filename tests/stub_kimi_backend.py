@@ -0,0 +1,87 @@
+"""
+Local stub of a Kimi backend (local_kimi_server.py / kimi_k25_mcp_server.py) for router tests
+"""
+
+import asyncio
+import json
+import time
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+
+
+class StubKimiBackend:
+    """
+    Minimal Kimi-compatible backend on 127.0.0.1.
+
+    Replies identify the backend by name. `fail_status` makes completions
+    fail with that HTTP status, `healthy=False` fails the health endpoint
+    and `delay` simulates generation time.
+    """
+
+    def __init__(self, name: str, health_path: str = "/health", tools: bool = False,
+                 delay: float = 0.0, fail_status: Optional[int] = None, healthy: bool = True):
+        self.name = name
+        self.health_path = health_path
+        self.tools = tools
+        self.delay = delay
+        self.fail_status = fail_status
+        self.healthy = healthy
+        self.requests: List[Dict[str, Any]] = []
+        self.port = 0
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get(self.health_path, self._health)
+        app.router.add_post("/chat/completions", self._chat)
+        if self.tools:
+            app.router.add_post("/chat/completions/tools", self._chat)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+
+    async def _health(self, request: web.Request) -> web.Response:
+        status = 200 if self.healthy else 503
+        return web.json_response({"status": "healthy" if self.healthy else "down"}, status=status)
+
+    async def _chat(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        body["_path"] = request.path
+        self.requests.append(body)
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.fail_status:
+            return web.json_response({"detail": f"{self.name} failing"}, status=self.fail_status)
+
+        content = f"reply from {self.name}"
+        if body.get("stream"):
+            response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+            await response.prepare(request)
+            for word in content.split():
+                chunk = {"object": "chat.completion.chunk",
+                         "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}]}
+                await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            await response.write(b"data: [DONE]\n\n")
+            await response.write_eof()
+            return response
+
+        return web.json_response({
+            "id": f"{self.name}-{len(self.requests)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                         "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 3, "total_tokens": 13},
+        })
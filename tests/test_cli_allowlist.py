@@ -0,0 +1,109 @@
+"""
+Tests for the cached allowlist and buffered audit log in cli_tools/python_cli_tool.py
+"""
+
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "cli_tools"))
+
+from python_cli_tool import AllowlistCache, AuditLogWriter, OpenClawCLITool
+
+
+def test_validation_reads_allowlist_once(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    tool = OpenClawCLITool()
+    opened = []
+    real_open = open
+    monkeypatch.setattr("builtins.open", lambda *a, **k: opened.append(a[0]) or real_open(*a, **k))
+
+    for _ in range(1000):
+        assert tool._validate_command("git status")
+        assert tool._validate_command("  python3 -c 'print(1)'")
+        assert not tool._validate_command("rm -rf /")
+        assert not tool._validate_command("ls; rm -rf /")
+        assert not tool._validate_command("   ")
+    assert tool.allowlist.reloads == 1
+    assert [p for p in opened if str(p).endswith("cli_allowlist.json")] == [tool.allowlist_file]
+
+
+def test_allowlist_hot_reload(tmp_path):
+    path = tmp_path / "allowlist.json"
+    path.write_text(json.dumps({"approved_commands": ["ls"], "approved_patterns": [r"^make(\s+\w+)?$", "(bad"]}))
+    errors = []
+    cache = AllowlistCache(path, check_interval=0, on_error=errors.append)
+    assert cache.allows("ls -la") and cache.allows("make test")
+    assert not cache.allows("make test now")
+    assert not cache.allows("uptime")
+
+    path.write_text(json.dumps({"approved_commands": ["uptime"], "approved_patterns": []}))
+    os.utime(path, ns=(time.time_ns(), time.time_ns() + 10 ** 9))
+    assert cache.allows("uptime") and not cache.allows("ls")
+    assert cache.reloads == 2
+
+    # A malformed file revokes access and is reported once, not on every check
+    path.write_text("{")
+    os.utime(path, ns=(time.time_ns(), time.time_ns() + 2 * 10 ** 9))
+    assert not cache.allows("uptime") and not cache.allows("uptime")
+    assert len(errors) == 1 and "allowlist.json" in errors[0]
+    path.write_text(json.dumps({"approved_commands": ["uptime"], "approved_patterns": []}))
+    assert cache.allows("uptime") and cache.reloads == 3 and cache.last_error is None
+
+    # So does deleting the file, instead of keeping the cached allowlist
+    path.unlink()
+    assert not cache.allows("uptime") and len(errors) == 2
+    path.write_text(json.dumps({"approved_commands": ["uptime"], "approved_patterns": []}))
+    assert cache.allows("uptime") and cache.reloads == 4
+
+    # Within check_interval the file is not even stat'ed
+    path.write_text(json.dumps({"approved_commands": ["uptime"]}))
+    throttled = AllowlistCache(path, check_interval=60)
+    assert throttled.allows("uptime")
+    path.write_text(json.dumps({"approved_commands": ["whoami"]}))
+    os.utime(path, ns=(time.time_ns(), time.time_ns() + 3 * 10 ** 9))
+    assert not throttled.allows("whoami") and throttled.reloads == 1
+
+
+def test_allowlist_errors_are_audited(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    tool = OpenClawCLITool()
+    tool.audit_log = AuditLogWriter(tmp_path / "audit.log", flush_interval=60)
+    tool.allowlist_file.write_text("[]")
+    tool.allowlist.check_interval = 0
+    assert not tool._validate_command("git status")
+    tool.audit_log.flush()
+    entries = [json.loads(line) for line in (tmp_path / "audit.log").read_text().splitlines()]
+    assert [e["action"] for e in entries] == ["allowlist_error"]
+    assert "expected a JSON object" in entries[0]["details"]["error"]
+
+
+def test_audit_log_is_buffered_and_flushed_periodically(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    tool = OpenClawCLITool()
+    tool.audit_log = AuditLogWriter(tmp_path / "audit.log", flush_interval=0.1, max_buffer=10_000)
+    for i in range(500):
+        tool._log_activity("command_attempt", {"command": f"echo {i}"})
+    assert not (tmp_path / "audit.log").exists()
+
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline and not (tmp_path / "audit.log").exists():
+        time.sleep(0.02)
+    time.sleep(0.05)
+    lines = (tmp_path / "audit.log").read_text().splitlines()
+    assert [json.loads(line)["details"]["command"] for line in lines] == [f"echo {i}" for i in range(500)]
+    assert tool.audit_log.writes == 1
+
+
+def test_audit_log_flushes_when_buffer_fills(tmp_path):
+    writer = AuditLogWriter(tmp_path / "audit.log", flush_interval=60, max_buffer=50)
+    for i in range(120):
+        writer.write({"n": i})
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline and writer.writes == 0:
+        time.sleep(0.01)
+    writer.flush()
+    lines = (tmp_path / "audit.log").read_text().splitlines()
+    assert [json.loads(line)["n"] for line in lines] == list(range(120))
@@ -0,0 +1,96 @@
+"""
+Tests for OpenClawCLITool.run_batch / iter_batch and the `batch` CLI command
+"""
+
+import asyncio
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "cli_tools"))
+
+import python_cli_tool
+from python_cli_tool import AuditLogWriter, OpenClawCLITool
+
+
+def make_tool(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    allowlist = tmp_path / "allowlist.json"
+    allowlist.write_text(json.dumps({"approved_commands": ["sleep", "echo", "false"], "approved_patterns": []}))
+    tool = OpenClawCLITool(str(allowlist))
+    tool.audit_log = AuditLogWriter(tmp_path / "audit.log")
+    return tool
+
+
+def test_batch_is_bounded_and_streams_completions(tmp_path, monkeypatch):
+    tool = make_tool(tmp_path, monkeypatch)
+    commands = ["sleep 0.4"] * 6 + ["echo fast"]
+
+    async def scenario():
+        order = [r["command"] async for r in tool.iter_batch(commands[-1:] + commands[:2], concurrency=3)]
+        assert order[0] == "echo fast"
+
+        streamed = []
+        started = time.monotonic()
+        batch = await tool.run_batch(commands, concurrency=3, on_result=streamed.append)
+        return batch, streamed, time.monotonic() - started
+
+    batch, streamed, elapsed = asyncio.run(scenario())
+    assert batch["success"]
+    assert [r["index"] for r in batch["results"]] == list(range(7))
+    assert sorted(r["index"] for r in streamed) == list(range(7))
+    # 7 commands, 3 at a time: three waves, not seven sequential sleeps
+    assert 0.75 <= elapsed < 2.0
+    stats = batch["stats"]
+    assert stats["succeeded"] == 7 and stats["concurrency"] == 3
+    assert stats["parallelism"] > 1.5
+    assert stats["max_queue_wait_seconds"] >= 0.35
+    assert stats["min_seconds"] <= stats["p50_seconds"] <= stats["p95_seconds"] <= stats["max_seconds"]
+
+
+def test_batch_reports_timeouts_and_rejections(tmp_path, monkeypatch):
+    tool = make_tool(tmp_path, monkeypatch)
+    commands = ["sleep 5", "rm -rf /tmp/nothing", "false", "echo ok"]
+    batch = asyncio.run(tool.run_batch(commands, concurrency=4, timeout=0.3))
+    stats = batch["stats"]
+    assert batch["success"] is False
+    assert (stats["succeeded"], stats["failed"], stats["rejected"], stats["timed_out"]) == (1, 3, 1, 1)
+    assert batch["results"][0]["elapsed"] < 1.0
+    assert batch["results"][3]["stdout"] == "ok\n"
+
+
+def test_stopping_a_batch_early_kills_running_commands(tmp_path, monkeypatch):
+    tool = make_tool(tmp_path, monkeypatch)
+    marker = f"sleep {27 + time.time() % 1:.4f}"
+    commands = ["echo first"] + [marker] * 3
+
+    def running():
+        ps = subprocess.run(["ps", "-eo", "args"], capture_output=True, text=True).stdout
+        return [line for line in ps.splitlines() if marker in line and "ps -eo" not in line]
+
+    async def scenario():
+        batch = tool.iter_batch(commands, concurrency=4)
+        first = await batch.__anext__()
+        await asyncio.sleep(0.2)
+        assert running()
+        await batch.aclose()
+        return first
+
+    assert asyncio.run(scenario())["stdout"] == "first\n"
+    assert running() == []
+
+
+def test_batch_cli_prints_ndjson(tmp_path, monkeypatch, capsys):
+    make_tool(tmp_path, monkeypatch)
+    commands_file = tmp_path / "commands.txt"
+    commands_file.write_text("# sweep\necho one\n\necho two\n")
+    monkeypatch.setattr(sys, "argv", [
+        "python_cli_tool.py", "batch", "--args", "echo zero", "--file", str(commands_file),
+        "--allowlist", str(tmp_path / "allowlist.json"), "--concurrency", "2"
+    ])
+    python_cli_tool.main()
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert sorted(r["stdout"] for r in lines[:-1]) == ["one\n", "two\n", "zero\n"]
+    assert lines[-1]["success"] and lines[-1]["stats"]["commands"] == 3
@@ -0,0 +1,178 @@
+"""
+Tests for mcp-servers/columnar.py and the process_data tools built on it
+"""
+
+import asyncio
+import csv
+import itertools
+import json
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "mcp-servers"))
+
+import columnar
+from columnar import ColumnarPipeline, run_pipeline
+from research_analysis_mcp_server import ResearchAnalysisMCP
+
+
+def legacy_process(data, operations):
+    """The row-wise process_data implementation the columnar engine replaces"""
+    processed = list(data)
+    for operation in operations:
+        if operation == "clean":
+            processed = [item for item in (
+                {k: v for k, v in row.items() if v is not None and v != ""} for row in processed
+            ) if item]
+        elif operation == "deduplicate":
+            seen, unique = set(), []
+            for item in processed:
+                key = tuple(sorted(item.items()))
+                if key not in seen:
+                    seen.add(key)
+                    unique.append(item)
+            processed = unique
+        elif operation == "standardize":
+            processed = [{k.lower().strip().replace(" ", "_"): v.strip() if isinstance(v, str) else v
+                          for k, v in item.items()} for item in processed]
+    return processed
+
+
+def _rows(count, seed=3):
+    rng = random.Random(seed)
+    keys = ["Name", " Email ", "Company Name", "score"]
+    values = ["", None, " alice ", "bob", "Acme", 1, 2.5, True]
+    return [{k: rng.choice(values) for k in rng.sample(keys, rng.randint(0, len(keys)))} for _ in range(count)]
+
+
+@pytest.fixture(params=["numpy", "pure-python"])
+def backend(request, monkeypatch):
+    if request.param == "pure-python":
+        monkeypatch.setattr(columnar, "np", None)
+    return request.param
+
+
+@pytest.mark.parametrize("operations", [
+    list(ops) for n in range(1, 4) for ops in itertools.permutations(columnar.OPERATIONS, n)
+])
+def test_matches_row_wise_semantics(backend, operations):
+    data = _rows(300)
+    expected = legacy_process(data, operations)
+    # Small chunks exercise deduplication state carried between chunks
+    result = run_pipeline(operations, data=data, chunk_size=37)
+    assert result["rows"] == expected
+    assert result["stats"]["output_rows"] == len(expected)
+
+
+@pytest.mark.parametrize("operations", [
+    ["deduplicate", "deduplicate"],
+    ["deduplicate", "standardize", "deduplicate"],
+    ["clean", "deduplicate", "standardize", "deduplicate", "clean"],
+])
+def test_repeated_deduplicate_steps_keep_separate_state(backend, operations):
+    data = _rows(300) + [{"a": " x"}, {"a": "x"}]
+    expected = legacy_process(data, operations)
+    assert expected
+    assert run_pipeline(operations, data=data, chunk_size=37)["rows"] == expected
+
+
+def test_unhashable_values_are_deduplicated(backend):
+    data = [{"tags": ["a", "b"], "meta": {"x": 1}}, {"meta": {"x": 1}, "tags": ["a", "b"]}, {"tags": ["b"]}]
+    rows = ColumnarPipeline(["deduplicate"]).process_rows(data)
+    assert rows == [data[0], data[2]]
+
+
+def test_unknown_operation_is_rejected():
+    with pytest.raises(ValueError, match="Unknown operations: explode"):
+        ColumnarPipeline(["clean", "explode"])
+
+
+def test_csv_and_jsonl_sources_stream_to_output(tmp_path):
+    csv_path = tmp_path / "crm.csv"
+    with open(csv_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Full Name", "Email"])
+        writer.writerows([[" Ann ", "ann@x.io"], ["Ann", "ann@x.io"], ["", ""], ["Bob", ""]])
+    jsonl_path = tmp_path / "crm.jsonl"
+    jsonl_path.write_text("\n".join(json.dumps(row) for row in [{"a": 1}, {"a": 1}, {"a": []}]) + "\n")
+
+    ops = ["clean", "standardize", "deduplicate"]
+    from_csv = run_pipeline(ops, source=str(csv_path), chunk_size=2)
+    assert from_csv["rows"] == [{"full_name": "Ann", "email": "ann@x.io"}, {"full_name": "Bob"}]
+    assert from_csv["stats"]["empty_rows_removed"] == 1 and from_csv["stats"]["duplicates_removed"] == 1
+
+    output = tmp_path / "out.jsonl"
+    from_jsonl = run_pipeline(ops, source=str(jsonl_path), output_path=str(output))
+    assert from_jsonl["rows"] is None
+    assert [json.loads(line) for line in output.read_text().splitlines()] == [{"a": 1}, {"a": []}]
+
+    with pytest.raises(ValueError, match="Unsupported input format"):
+        run_pipeline(ops, source=str(tmp_path / "crm.xlsx"))
+
+
+def test_csv_output_keeps_columns_blank_in_the_first_chunk(tmp_path, backend):
+    source = tmp_path / "in.csv"
+    with open(source, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Name", "Notes"])
+        writer.writerows([[f"n{i}", "" if i < 5 else f"note {i}"] for i in range(12)])
+
+    output = tmp_path / "out.csv"
+    result = run_pipeline(["clean", "standardize"], source=str(source), output_path=str(output), chunk_size=4)
+    assert result["stats"]["chunks"] == 3
+    with open(output, newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert [row["notes"] for row in rows] == [""] * 5 + [f"note {i}" for i in range(5, 12)]
+
+    # Inline rows whose keys first appear in a later chunk
+    output = tmp_path / "inline.csv"
+    data = [{"a": 1}, {"a": 2, "b": None}, {"a": 3, "c": "x"}]
+    run_pipeline(["clean"], data=data, output_path=str(output), chunk_size=1)
+    assert output.read_text().splitlines() == ["a,b,c", "1,,", "2,,", "3,,x"]
+
+
+def test_rebatch_regroups_blocks_by_row_count():
+    blocks = [columnar.Chunk({"a": list(range(start, start + size))}, size)
+              for start, size in [(0, 5), (5, 1), (6, 9)]]
+    chunks = list(columnar._rebatch(blocks, 4))
+    assert [chunk.length for chunk in chunks] == [4, 4, 4, 3]
+    assert [value for chunk in chunks for value in chunk.columns["a"]] == list(range(15))
+
+
+def test_process_data_tools():
+    async def scenario():
+        server = ResearchAnalysisMCP()
+        inline = await server.process_data([{"a": " x "}, {"a": "x"}], ["standardize", "deduplicate"])
+        first = await server.process_data_stream("s1", [{"a": 1}, {"a": 2}], ["deduplicate"])
+        second = await server.process_data_stream("s1", [{"a": 2}, {"a": 3}], ["deduplicate"], final=True)
+        bad = await server.process_data([], ["explode"])
+        return server, inline, first, second, bad
+
+    server, inline, first, second, bad = asyncio.run(scenario())
+    assert inline["data"] == [{"a": "x"}] and inline["original_count"] == 2
+    assert first["data"] == [{"a": 1}, {"a": 2}]
+    assert second["data"] == [{"a": 3}] and second["stats"]["duplicates_removed"] == 1
+    assert "s1" not in server.data_streams
+    assert not bad["success"] and "explode" in bad["error"]
+
+
+def test_abandoned_streams_are_dropped():
+    async def scenario():
+        server = ResearchAnalysisMCP()
+        server.max_open_streams = 2
+        for stream_id in ("a", "b", "c"):
+            await server.process_data_stream(stream_id, [{"x": 1}], ["deduplicate"])
+        capped = list(server.data_streams)
+        server.stream_idle_ttl = 0.05
+        await asyncio.sleep(0.1)
+        resumed = await server.process_data_stream("b", [{"x": 1}], ["deduplicate"])
+        return server, capped, resumed
+
+    server, capped, resumed = asyncio.run(scenario())
+    assert capped == ["b", "c"]
+    # "b" sat idle past the TTL, so its dedup state was released and the row counts as new
+    assert resumed["data"] == [{"x": 1}]
+    assert list(server.data_streams) == ["b"]
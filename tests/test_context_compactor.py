@@ -0,0 +1,130 @@
+"""
+Tests for mcp-servers/context_compactor.py and its use in the Kimi router
+"""
+
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "mcp-servers"))
+
+from context_compactor import SUMMARY_HEADER, ContextCompactor, TokenCounter
+from kimi_router_server import BackendConfig, create_router_app
+from stub_kimi_backend import StubKimiBackend
+
+SYSTEM = {"role": "system", "content": "You are a meticulous research agent."}
+
+
+def _conversation(turns: int):
+    messages = [SYSTEM]
+    for i in range(turns):
+        messages.append({"role": "user", "content": f"Question {i}. " + "Please elaborate on the topic. " * 20})
+        messages.append({"role": "assistant", "content": f"Answer {i}. " + "Here is a long explanation. " * 20})
+    return messages
+
+
+def test_under_budget_is_untouched():
+    messages = _conversation(2)
+    compacted, report = ContextCompactor().compact(messages, budget_tokens=100000)
+    assert compacted is messages
+    assert report["prefill_tokens_saved"] == 0
+
+
+def test_old_turns_are_summarized_and_prefix_kept():
+    compactor = ContextCompactor(keep_recent_turns=2, drop_granularity=2)
+    messages = _conversation(20)
+    compacted, report = compactor.compact(messages, budget_tokens=1500)
+
+    assert compacted[0] is SYSTEM
+    assert compacted[1]["content"].startswith(SUMMARY_HEADER)
+    assert "Question 0." in compacted[1]["content"]
+    assert compacted[-2:] == messages[-2:]
+    assert report["compacted_tokens"] <= 1500
+    assert report["prefill_tokens_saved"] == report["original_tokens"] - report["compacted_tokens"] > 0
+    assert compactor.counter.count_messages(compacted) == report["compacted_tokens"]
+
+
+def test_compacted_prefix_is_stable_across_requests():
+    compactor = ContextCompactor(keep_recent_turns=2, drop_granularity=4)
+    history = _conversation(20)
+    first, _ = compactor.compact(history, budget_tokens=3000)
+    second, _ = compactor.compact(history + _conversation(1)[1:], budget_tokens=3000)
+    # Same block of turns compacted, so the summary (and backend prompt cache) is reused
+    assert first[:2] == second[:2]
+
+
+def test_tool_results_stay_with_their_calls():
+    messages = [SYSTEM]
+    for i in range(12):
+        messages += [
+            {"role": "user", "content": f"Look up item {i}. " + "context " * 60},
+            {"role": "assistant", "content": None,
+             "tool_calls": [{"id": f"c{i}", "type": "function", "function": {"name": "lookup", "arguments": "{}"}}]},
+            {"role": "tool", "tool_call_id": f"c{i}", "content": "result " * 60},
+            {"role": "assistant", "content": f"Item {i} found."},
+        ]
+    compacted, _ = ContextCompactor(strategy="drop", drop_granularity=1).compact(messages, budget_tokens=800)
+    assert compacted[0] is SYSTEM
+    assert compacted[1]["role"] == "user"
+    call_ids = {c["id"] for m in compacted if m.get("tool_calls") for c in m["tool_calls"]}
+    assert all(m["tool_call_id"] in call_ids for m in compacted if m["role"] == "tool")
+
+
+def test_oversized_recent_message_is_truncated():
+    messages = [SYSTEM, {"role": "user", "content": "log line with details. " * 2000}]
+    compacted, report = ContextCompactor().compact(messages, budget_tokens=500)
+    assert report["truncated"]
+    assert "tokens truncated" in compacted[1]["content"]
+    assert report["compacted_tokens"] <= 500
+
+
+def test_dense_content_truncation_terminates():
+    rows = json.dumps([{"id": i, "v": [1, 2, 3], "k": "a"} for i in range(3000)])
+    messages = [SYSTEM, {"role": "user", "content": "q"},
+                {"role": "tool", "tool_call_id": "c0", "content": rows}]
+    compacted, report = ContextCompactor().compact(messages, budget_tokens=2000)
+    assert report["truncated"] and report["compacted_tokens"] <= 2000
+    assert compacted[2]["content"].startswith(rows[:100])
+
+    # A budget below the fixed overhead cannot be met, but compaction still returns
+    _, report = ContextCompactor().compact([SYSTEM, {"role": "user", "content": "1,2 " * 5000}], budget_tokens=5)
+    assert report["truncated"] and report["compacted_tokens"] < 100
+
+
+def test_regex_counter_tracks_text_size():
+    counter = TokenCounter()
+    assert counter.count_text("") == 0
+    assert counter.count_text("hello world") >= 2
+    assert counter.count_text("word " * 1000) > counter.count_text("word " * 100) * 9
+
+
+def test_router_compacts_and_reports_saved_tokens():
+    async def scenario():
+        backend = StubKimiBackend("nim")
+        await backend.start()
+        app = create_router_app([BackendConfig(name="nim", url=backend.url, model="m",
+                                               max_context_tokens=100000, max_concurrency=4)])
+        router = app.state.router
+        await router.start()
+        try:
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://r") as client:
+                response = await client.post("/v1/chat/completions", json={
+                    "messages": _conversation(20), "context_budget_tokens": 2000,
+                })
+                stats = (await client.get("/backends")).json()["context"]
+        finally:
+            await router.stop()
+            await backend.stop()
+
+        saved = int(response.headers["x-prefill-tokens-saved"])
+        assert response.status_code == 200 and saved > 0
+        forwarded = backend.requests[0]
+        assert "context_budget_tokens" not in forwarded
+        assert len(forwarded["messages"]) < len(_conversation(20))
+        assert stats == {"requests": 1, "compacted_requests": 1, "prefill_tokens_saved": saved}
+
+    asyncio.run(scenario())
@@ -0,0 +1,132 @@
+"""
+Tests for mcp-servers/crawl_engine.py against a local HTTP fixture site
+"""
+
+import asyncio
+import re
+import sys
+from pathlib import Path
+
+import aiohttp
+from aiohttp import web
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "mcp-servers"))
+
+from crawl_engine import CrawlEngine, normalize_url
+
+SITE = {
+    "/": ["/a", "/b#section", "/a?utm_source=newsletter", "http://external.example/", "mailto:x@y.z"],
+    "/a": ["/a/c", "/"],
+    "/b": ["a/c", "/missing"],
+    "/a/c": ["/deep"],
+    "/deep": [],
+}
+
+
+class FixtureSite:
+    """Serves SITE as HTML pages and records request timing and concurrency"""
+
+    def __init__(self, delay: float = 0.02):
+        self.delay = delay
+        self.hits = []
+        self.starts = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.hits.append(request.path_qs)
+        self.starts.append(asyncio.get_running_loop().time())
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            if request.path not in SITE:
+                return web.Response(status=404, text="not found")
+            links = "".join(f'<a href="{href}">link</a>' for href in SITE[request.path])
+            return web.Response(text=f"<html><body>{links}</body></html>", content_type="text/html")
+        finally:
+            self.in_flight -= 1
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_get("/{tail:.*}", self.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        self.url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+        self.session = aiohttp.ClientSession()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+        await self.runner.cleanup()
+
+    async def fetch(self, url: str) -> dict:
+        async with self.session.get(url) as response:
+            html = await response.text()
+            hrefs = re.findall(r'href="([^"]+)"', html)
+            return {"success": response.status == 200, "content": html,
+                    "links": {"internal": [{"href": href} for href in hrefs]}}
+
+
+async def _crawl(site: FixtureSite, **options):
+    engine = CrawlEngine(site.fetch, **options)
+    return [page async for page in engine.crawl([site.url + "/", site.url])]
+
+
+def test_normalize_url():
+    assert normalize_url("HTTP://Example.COM:80/a//b?b=2&a=1&utm_source=x#frag") == "http://example.com/a/b?a=1&b=2"
+    assert normalize_url("../c", base="https://example.com/a/b") == "https://example.com/c"
+    assert normalize_url("https://example.com") == "https://example.com/"
+    assert normalize_url("mailto:someone@example.com") is None
+    assert normalize_url("http://[broken") is None
+
+
+def test_follows_links_with_dedup_and_depth_limit():
+    async def scenario():
+        async with FixtureSite() as site:
+            pages = await _crawl(site, max_depth=2, per_domain_delay=0)
+            return site, pages
+
+    site, pages = asyncio.run(scenario())
+    crawled = {page["url"][len(site.url):]: page for page in pages}
+    assert set(crawled) == {"/", "/a", "/b", "/a/c", "/missing"}
+    assert sorted(site.hits) == sorted(crawled)  # every page fetched exactly once
+    assert crawled["/a/c"]["depth"] == 2
+    assert not crawled["/missing"]["success"]
+    assert "/deep" not in crawled  # depth 3
+
+
+def test_max_pages_caps_the_crawl():
+    async def scenario():
+        async with FixtureSite() as site:
+            return await _crawl(site, max_depth=5, max_pages=3, per_domain_delay=0)
+
+    assert len(asyncio.run(scenario())) == 3
+
+
+def test_per_domain_concurrency_and_delay():
+    async def scenario():
+        async with FixtureSite(delay=0.05) as site:
+            await _crawl(site, max_depth=3, max_workers=8, max_per_domain=1, per_domain_delay=0.03)
+            return site
+
+    site = asyncio.run(scenario())
+    assert site.max_in_flight == 1
+    gaps = [later - earlier for earlier, later in zip(site.starts, site.starts[1:])]
+    assert min(gaps) >= 0.03
+
+
+def test_results_stream_as_pages_complete():
+    async def scenario():
+        async with FixtureSite(delay=0.1) as site:
+            engine = CrawlEngine(site.fetch, max_depth=3, max_per_domain=4, per_domain_delay=0)
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            arrivals = [loop.time() - started async for _ in engine.crawl([site.url])]
+            return arrivals
+
+    arrivals = asyncio.run(scenario())
+    # The seed page is delivered long before the last level of links is fetched
+    assert arrivals[0] < arrivals[-1] - 0.15
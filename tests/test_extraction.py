@@ -0,0 +1,111 @@
+"""
+Tests for mcp-servers/extraction.py
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "mcp-servers"))
+
+import extraction
+from extraction import SchemaError, compile_schema, extract
+from page_cache import PageCache
+from research_analysis_mcp_server import ResearchAnalysisMCP
+
+HTML = """
+<html><body>
+  <h1>Catalog</h1>
+  <p class="contact">Write to sales@example.com or support@example.com</p>
+  <div class="product" data-id="1">
+    <h2>Widget</h2><a href="/widget">more</a>
+    <span class="price">Price: $19.99</span>
+    <span class="tag">tools</span><span class="tag">metal</span>
+    <ul class="specs"><li><b>Weight</b> 2kg</li><li><b>Color</b> red</li></ul>
+  </div>
+  <div class="product" data-id="2">
+    <h2>Gadget</h2><a href="/gadget">more</a>
+    <span class="price">Price: $5</span>
+  </div>
+</body></html>
+"""
+
+PRODUCTS = {
+    "baseSelector": "div.product",
+    "fields": [
+        {"name": "id", "type": "attribute", "attribute": "data-id"},
+        {"name": "title", "selector": "h2", "type": "text"},
+        {"name": "link", "selector": "a", "type": "attribute", "attribute": "href"},
+        {"name": "price", "selector": ".price", "type": "regex", "pattern": r"\$([0-9.]+)"},
+        {"name": "tags", "selector": ".tag", "type": "text", "multiple": True, "default": []},
+        {"name": "specs", "selector": "ul.specs li", "type": "nested", "multiple": True,
+         "fields": [{"name": "label", "selector": "b", "type": "text"}]},
+    ],
+}
+
+
+def test_css_schema_extracts_records():
+    records = extract(HTML, PRODUCTS)
+    assert records == [
+        {"id": "1", "title": "Widget", "link": "/widget", "price": "19.99", "tags": ["tools", "metal"],
+         "specs": [{"label": "Weight"}, {"label": "Color"}]},
+        {"id": "2", "title": "Gadget", "link": "/gadget", "price": "5", "tags": [], "specs": None},
+    ]
+
+
+def test_xpath_and_page_level_regex_fields():
+    schema = {
+        "selectorType": "xpath",
+        "fields": [
+            {"name": "heading", "selector": "//h1", "type": "text"},
+            {"name": "ids", "selector": "//div/@data-id", "type": "text", "multiple": True},
+            {"name": "emails", "type": "regex", "pattern": r"[\w.]+@[\w.]+\.\w+", "multiple": True},
+        ],
+    }
+    assert extract(HTML, schema) == {
+        "heading": "Catalog",
+        "ids": ["1", "2"],
+        "emails": ["sales@example.com", "support@example.com"],
+    }
+
+
+def test_schema_is_compiled_once():
+    extraction._compile_cached.cache_clear()
+    first = compile_schema(PRODUCTS)
+    # Key order does not matter: the cache key is canonical JSON
+    second = compile_schema(dict(reversed(list(PRODUCTS.items()))))
+    assert first is second
+    assert extraction.cache_info() == {"hits": 1, "misses": 1, "size": 1}
+
+
+@pytest.mark.parametrize("schema", [
+    {"fields": []},
+    {"fields": [{"name": "x", "selector": "div[", "type": "text"}]},
+    {"fields": [{"name": "x", "type": "regex"}]},
+    {"fields": [{"name": "x", "type": "attribute"}]},
+    {"selectorType": "xpath", "fields": [{"name": "x", "selector": "//[", "type": "text"}]},
+])
+def test_invalid_schemas_are_rejected(schema):
+    with pytest.raises(SchemaError):
+        compile_schema(schema)
+
+
+def test_scrape_url_returns_only_extracted_fields(tmp_path):
+    async def scenario():
+        server = ResearchAnalysisMCP()
+        server.cache = PageCache(str(tmp_path))
+
+        async def fetch(url, headers):
+            return {"success": True, "html": HTML, **server.parse_html(url, HTML)}
+
+        server._fetch_page = fetch
+        ok = await server.scrape_url("https://shop.example/", PRODUCTS)
+        bad = await server.scrape_url("https://shop.example/", {"fields": []})
+        return ok, bad
+
+    ok, bad = asyncio.run(scenario())
+    assert ok["success"] and ok["extracted_data"][0]["title"] == "Widget"
+    assert "content" not in ok
+    assert not bad["success"] and "Invalid extraction schema" in bad["error"]
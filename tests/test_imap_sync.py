@@ -0,0 +1,239 @@
+"""
+Tests for mcp-servers/imap_sync.py and EmailMCP.read_emails against a fake IMAP server
+"""
+
+import asyncio
+import sqlite3
+import sys
+from email.mime.application import MIMEApplication
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "mcp-servers"))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from email_mcp_server import EmailConfig, EmailMCP
+from fake_imap_server import FakeIMAPServer, Mailbox
+from imap_sync import IMAPSession, MailboxIndex, build_preview, sync_folder, uid_ranges
+
+
+def _message(i: int, attachment_bytes: int = 0) -> bytes:
+    msg = MIMEMultipart()
+    msg["From"] = f"sender{i}@example.com"
+    msg["To"] = "bot@example.com"
+    msg["Subject"] = f"Report {i}"
+    msg["Date"] = "Mon, 19 Oct 2026 10:00:00 +0000"
+    msg.attach(MIMEText(f"Hello number {i}, see attached.", "plain"))
+    if attachment_bytes:
+        msg.attach(MIMEApplication(b"\0" * attachment_bytes, Name="data.bin"))
+    return msg.as_bytes().replace(b"\n", b"\r\n")
+
+
+@pytest.fixture
+def imap_server():
+    server = FakeIMAPServer()
+    server.start()
+    yield server
+    server.stop()
+
+
+def test_uid_ranges_and_preview():
+    assert uid_ranges([7, 1, 2, 3, 9, 10]) == "1:3,7,9:10"
+    assert uid_ranges([]) == ""
+    raw = _message(1, attachment_bytes=10)
+    header, text = raw.split(b"\r\n\r\n", 1)
+    # A preview cut short in the middle of the attachment still finds the text part
+    assert build_preview(header, text[:400], 100) == "Hello number 1, see attached."
+    assert build_preview(b"Content-Type: text/html\r\n", b"<p>Hi &amp; bye</p>", 50) == "Hi & bye"
+
+
+def test_incremental_sync_fetches_only_new_headers_and_previews(imap_server, tmp_path):
+    inbox = imap_server.folders["INBOX"]
+    for i in range(450):
+        inbox.append(_message(i, attachment_bytes=50_000 if i % 50 == 0 else 0), {"\\Seen"} if i < 400 else set())
+
+    index = MailboxIndex(str(tmp_path / "mail.sqlite3"))
+
+    async def scenario():
+        session = IMAPSession("127.0.0.1", "bot@example.com", "secret", port=imap_server.port, use_ssl=False)
+        first = await session.run(sync_folder, index, "bot", "INBOX", 256, 200)
+        sent_after_first = imap_server.bytes_sent
+        second = await session.run(sync_folder, index, "bot", "INBOX", 256, 200)
+        sent_by_second = imap_server.bytes_sent - sent_after_first
+        for i in range(450, 455):
+            inbox.append(_message(i))
+        third = await session.run(sync_folder, index, "bot", "INBOX", 256, 200)
+        await session.close()
+        return first, second, sent_by_second, third, session.stats
+
+    first, second, sent_by_second, third, stats = asyncio.run(scenario())
+    assert first["new_messages"] == 450 and first["fetch_commands"] == 3
+    assert second["new_messages"] == 0 and second["fetch_commands"] == 0
+    assert sent_by_second < 5000
+    assert third["new_messages"] == 5 and third["fetch_commands"] == 1
+    # Attachments were never downloaded: 9 of the messages carry 50 kB each
+    assert imap_server.bytes_sent < 450 * 2000
+    assert not any("RFC822)" in c or "RFC822 " in c for c in imap_server.commands)
+    assert stats["logins"] == 1
+
+    newest = index.query("bot", "INBOX", limit=3)
+    assert [m["subject"] for m in newest] == ["Report 454", "Report 453", "Report 452"]
+    assert newest[0]["body"] == "Hello number 454, see attached." and newest[0]["unread"]
+    assert len(index.query("bot", "INBOX", limit=1000, unread_only=True)) == 55
+
+
+def test_flags_expunges_and_uidvalidity_are_tracked(imap_server, tmp_path):
+    inbox = imap_server.folders["INBOX"]
+    for i in range(5):
+        inbox.append(_message(i))
+    index = MailboxIndex(str(tmp_path / "mail.sqlite3"))
+
+    async def scenario():
+        session = IMAPSession("127.0.0.1", "bot@example.com", "secret", port=imap_server.port, use_ssl=False)
+        await session.run(sync_folder, index, "bot", "INBOX")
+        # Read one message elsewhere and expunge another
+        uid, flags, raw = inbox.messages[0]
+        inbox.messages[0] = (uid, {"\\Seen"}, raw)
+        del inbox.messages[1]
+        changed = await session.run(sync_folder, index, "bot", "INBOX")
+        unread = index.query("bot", "INBOX", limit=10, unread_only=True)
+        read_flags = {m["uid"]: m["flags"] for m in index.query("bot", "INBOX", limit=10)}
+
+        # ...and mark it unread again
+        inbox.messages[0] = (uid, set(), raw)
+        await session.run(sync_folder, index, "bot", "INBOX")
+        unread_flags = {m["uid"]: (m["flags"], m["unread"]) for m in index.query("bot", "INBOX", limit=10)}
+
+        # A rebuilt mailbox invalidates every cached UID
+        imap_server.folders["INBOX"] = Mailbox(uidvalidity=2)
+        imap_server.folders["INBOX"].append(_message(99))
+        rebuilt = await session.run(sync_folder, index, "bot", "INBOX")
+
+        # The server drops the session; the next call logs in again
+        imap_server.drop_connections()
+        again = await session.run(sync_folder, index, "bot", "INBOX")
+        await session.close()
+        return changed, unread, read_flags, unread_flags, rebuilt, again, session.stats
+
+    changed, unread, read_flags, unread_flags, rebuilt, again, stats = asyncio.run(scenario())
+    assert changed["removed_messages"] == 1 and changed["new_messages"] == 0
+    assert [m["uid"] for m in unread] == [5, 4, 3]
+    # The flags text agrees with the unread column
+    assert "\\Seen" in read_flags[1] and not any("\\Seen" in read_flags[uid] for uid in (3, 4, 5))
+    assert unread_flags[1] == ("", True)
+    assert rebuilt["new_messages"] == 1
+    assert [m["subject"] for m in index.query("bot", "INBOX")] == ["Report 99"]
+    assert again["new_messages"] == 0
+    assert stats["reconnects"] == 1 and stats["logins"] == 2
+
+
+def test_backfill_is_capped_and_older_messages_are_fetched_on_demand(imap_server, tmp_path):
+    inbox = imap_server.folders["INBOX"]
+    for i in range(300):
+        inbox.append(_message(i), set() if i in (3, 150) else {"\\Seen"})
+    index = MailboxIndex(str(tmp_path / "mail.sqlite3"))
+
+    async def scenario():
+        session = IMAPSession("127.0.0.1", "bot@example.com", "secret", port=imap_server.port, use_ssl=False)
+
+        def sync(limit, unread_only=False):
+            return session.run(sync_folder, index, "bot", "INBOX", 64, 200, limit, unread_only, 50)
+
+        first = await sync(10)
+        deeper = await sync(120)
+        unread = await sync(5, unread_only=True)
+        # An expunge below the indexed range is still noticed
+        del inbox.messages[0]
+        expunged = await sync(10)
+        await session.close()
+        return first, deeper, unread, expunged
+
+    first, deeper, unread, expunged = asyncio.run(scenario())
+    assert first["new_messages"] == 50 and first["messages_below_floor"] == 250
+    assert deeper["older_fetched"] == 70 and deeper["messages_below_floor"] == 180
+    assert [m["subject"] for m in index.query("bot", "INBOX", limit=120)][-1] == "Report 180"
+    # Unread messages below the indexed range are fetched on their own
+    assert unread["older_fetched"] == 2
+    assert [m["subject"] for m in index.query("bot", "INBOX", limit=5, unread_only=True)] == \
+        ["Report 150", "Report 3"]
+    assert expunged["messages_below_floor"] == 179
+    assert index.count("bot", "INBOX") == 122
+
+
+def test_longer_previews_are_refetched(imap_server, tmp_path):
+    inbox = imap_server.folders["INBOX"]
+    for i in range(20):
+        inbox.append(_message(i))
+    index = MailboxIndex(str(tmp_path / "mail.sqlite3"))
+
+    async def scenario():
+        session = IMAPSession("127.0.0.1", "bot@example.com", "secret", port=imap_server.port, use_ssl=False)
+        short = await session.run(sync_folder, index, "bot", "INBOX", 8, 200, 5)
+        longer = await session.run(sync_folder, index, "bot", "INBOX", 2048, 200, 5)
+        again = await session.run(sync_folder, index, "bot", "INBOX", 16, 200, 5)
+        await session.close()
+        return short, longer, again
+
+    short, longer, again = asyncio.run(scenario())
+    assert short["previews_refetched"] == 0
+    assert longer["previews_refetched"] == 5 and longer["fetch_commands"] == 1
+    assert again["previews_refetched"] == 0
+    newest = index.query("bot", "INBOX", limit=6)
+    assert [m["body"] for m in newest[:2]] == ["Hello number 19, see attached.", "Hello number 18, see attached."]
+    assert len(newest[5]["body"]) <= 8
+    assert index.query("bot", "INBOX", limit=1, preview_chars=5)[0]["body"] == "Hello"
+
+
+def test_read_emails_uses_index(imap_server, tmp_path):
+    inbox = imap_server.folders["INBOX"]
+    for i in range(12):
+        inbox.append(_message(i), {"\\Seen"} if i % 2 else set())
+
+    async def scenario():
+        server = EmailMCP()
+        server.set_config(EmailConfig(
+            smtp_server="127.0.0.1", email_address="bot@example.com", password="secret",
+            imap_server="127.0.0.1", imap_port=imap_server.port, imap_ssl=False,
+            mail_index_path=str(tmp_path / "mail.sqlite3")))
+        latest = await server.read_emails(limit=5)
+        unread = await server.read_emails(limit=100, unread_only=True)
+        missing = await server.read_emails(folder="Archive")
+        await server.imap_session.close()
+        return latest, unread, missing
+
+    latest, unread, missing = asyncio.run(scenario())
+    assert latest["success"] and latest["count"] == 5
+    assert latest["emails"][0]["subject"] == "Report 11" and latest["emails"][0]["from"] == "sender11@example.com"
+    assert latest["sync"]["new_messages"] == 12
+    assert unread["count"] == 6 and unread["sync"]["new_messages"] == 0
+    assert not missing["success"] and "Archive" in missing["error"]
+
+
+def test_reconfiguring_closes_the_old_session_and_index(imap_server, tmp_path):
+    imap_server.folders["INBOX"].append(_message(1))
+
+    def config(name):
+        return EmailConfig(smtp_server="127.0.0.1", email_address="bot@example.com", password="secret",
+                           imap_server="127.0.0.1", imap_port=imap_server.port, imap_ssl=False,
+                           mail_index_path=str(tmp_path / name))
+
+    async def scenario():
+        server = EmailMCP()
+        server.set_config(config("a.sqlite3"))
+        await server.read_emails()
+        old_session, old_index = server.imap_session, server.mail_index
+        server.set_config(config("b.sqlite3"))
+        second = await server.read_emails()
+        await server.close()
+        return server, old_session, old_index, second
+
+    server, old_session, old_index, second = asyncio.run(scenario())
+    assert second["success"] and second["count"] == 1
+    assert server.imap_session is None and server.mail_index is None
+    assert old_session._executor._shutdown
+    with pytest.raises(sqlite3.ProgrammingError):
+        old_index.count("bot@example.com", "INBOX")
+    assert sum(1 for c in imap_server.commands if c.startswith("LOGOUT")) == 2
@@ -0,0 +1,131 @@
+"""
+Tests for the upstream gateway used by mcp-servers/kimi_k25_mcp_server.py
+Runs against a local fake OpenAI-compatible server
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import openai
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "mcp-servers"))
+
+from fake_openai_server import FakeOpenAIServer
+from kimi_gateway import CircuitOpenError, UpstreamGateway
+from rate_limit import TokenBucket
+
+MESSAGES = [{"role": "user", "content": "Hi"}]
+
+
+def _gateway(server: FakeOpenAIServer, **kwargs) -> UpstreamGateway:
+    options = {"requests_per_minute": 6000, "base_backoff": 0.01, "max_backoff": 0.05}
+    options.update(kwargs)
+    return UpstreamGateway(server.base_url, "test-key", **options)
+
+
+def test_retries_rate_limit_honoring_retry_after():
+    async def scenario():
+        async with FakeOpenAIServer(script=[(429, {"Retry-After": "0.3"})]) as server:
+            gateway = _gateway(server)
+            started = time.perf_counter()
+            response = await gateway.create_chat_completion(model="moonshotai/kimi-k2.5", messages=MESSAGES)
+            elapsed = time.perf_counter() - started
+            await gateway.close()
+
+        assert response.choices[0].message.content == "Hello from fake Kimi"
+        assert elapsed >= 0.3
+        stats = gateway.stats()
+        assert stats["rate_limited"] == 1
+        assert stats["retries"] == 1
+        assert stats["succeeded"] == 1
+        assert stats["total_tokens"] == 17
+        assert stats["recent"][-1]["attempts"] == 2
+
+    asyncio.run(scenario())
+
+
+def test_concurrency_is_bounded():
+    async def scenario():
+        async with FakeOpenAIServer(delay=0.05) as server:
+            gateway = _gateway(server, max_concurrency=3)
+            await asyncio.gather(*[
+                gateway.create_chat_completion(model="m", messages=MESSAGES) for _ in range(12)
+            ])
+            await gateway.close()
+        assert server.max_in_flight <= 3
+        assert gateway.stats()["succeeded"] == 12
+
+    asyncio.run(scenario())
+
+
+def test_client_errors_are_not_retried():
+    async def scenario():
+        async with FakeOpenAIServer(script=[400]) as server:
+            gateway = _gateway(server)
+            with pytest.raises(openai.BadRequestError):
+                await gateway.create_chat_completion(model="m", messages=MESSAGES)
+            await gateway.close()
+        assert len(server.requests) == 1
+        assert gateway.breaker.state == "closed"
+
+    asyncio.run(scenario())
+
+
+def test_circuit_opens_after_repeated_failures():
+    async def scenario():
+        async with FakeOpenAIServer(script=[500] * 10) as server:
+            gateway = _gateway(server, max_retries=1, failure_threshold=2, reset_timeout=60)
+            with pytest.raises(openai.InternalServerError):
+                await gateway.create_chat_completion(model="m", messages=MESSAGES)
+            with pytest.raises(CircuitOpenError):
+                await gateway.create_chat_completion(model="m", messages=MESSAGES)
+            await gateway.close()
+        assert len(server.requests) == 2
+        assert gateway.stats()["short_circuited"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_half_open_trial_releases_the_breaker():
+    async def scenario():
+        async with FakeOpenAIServer(script=[500, 500], delay=0.2) as server:
+            gateway = _gateway(server, max_retries=0, failure_threshold=2, reset_timeout=0.05)
+            for _ in range(2):
+                with pytest.raises(openai.InternalServerError):
+                    await gateway.create_chat_completion(model="m", messages=MESSAGES)
+            assert gateway.breaker.state == "open"
+            await asyncio.sleep(0.06)
+
+            async def consume():
+                async for _ in gateway.stream_chat_completion(model="m", messages=MESSAGES):
+                    pass
+
+            # The half-open trial's client disconnects before the upstream answers
+            trial = asyncio.create_task(consume())
+            await asyncio.sleep(0.05)
+            assert gateway.breaker.state == "half_open"
+            trial.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await trial
+
+            response = await gateway.create_chat_completion(model="m", messages=MESSAGES)
+            await gateway.close()
+        assert response.choices[0].message.content == "Hello from fake Kimi"
+        assert gateway.breaker.state == "closed" and gateway.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_token_bucket_spaces_requests():
+    async def scenario():
+        bucket = TokenBucket(rate=20, capacity=1)
+        started = time.perf_counter()
+        for _ in range(5):
+            await bucket.acquire()
+        return time.perf_counter() - started
+
+    assert asyncio.run(scenario()) >= 0.19
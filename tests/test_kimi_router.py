@@ -0,0 +1,144 @@
+"""
+Tests for mcp-servers/kimi_router_server.py
+Routes between local stub Kimi backends on 127.0.0.1
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "mcp-servers"))
+
+from kimi_router_server import BackendConfig, create_router_app
+from stub_kimi_backend import StubKimiBackend
+
+HELLO = [{"role": "user", "content": "Hello"}]
+
+
+class RouterHarness:
+    """Starts a stub 'local' and 'nim' backend plus the router app in-process"""
+
+    def __init__(self, local: StubKimiBackend, nim: StubKimiBackend):
+        self.local = local
+        self.nim = nim
+
+    async def __aenter__(self):
+        await self.local.start()
+        await self.nim.start()
+        configs = [
+            BackendConfig(name="local", url=self.local.url, model="kimi-k25-local",
+                          health_path=self.local.health_path, max_context_tokens=1000,
+                          max_concurrency=1, expected_latency_ms=100.0, supports_streaming=False),
+            BackendConfig(name="nim", url=self.nim.url, model="moonshotai/kimi-k2.5",
+                          tools_path="/chat/completions/tools", supports_images=True,
+                          max_context_tokens=100000, max_concurrency=8, expected_latency_ms=150.0),
+        ]
+        app = create_router_app(configs)
+        self.router = app.state.router
+        await self.router.start()
+        self.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://router")
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.client.aclose()
+        await self.router.stop()
+        await self.local.stop()
+        await self.nim.stop()
+
+    async def chat(self, **body):
+        body.setdefault("messages", HELLO)
+        return await self.client.post("/v1/chat/completions", json=body)
+
+
+def test_prefers_fast_local_backend_and_rewrites_model():
+    async def scenario():
+        async with RouterHarness(StubKimiBackend("local"), StubKimiBackend("nim", tools=True)) as h:
+            response = await h.chat(model="kimi-k2.5", max_tokens=50)
+        assert response.status_code == 200
+        assert response.headers["x-kimi-backend"] == "local"
+        assert response.json()["choices"][0]["message"]["content"] == "reply from local"
+        assert h.local.requests[0]["model"] == "kimi-k25-local"
+
+    asyncio.run(scenario())
+
+
+def test_capabilities_and_prompt_size_select_remote():
+    async def scenario():
+        async with RouterHarness(StubKimiBackend("local"), StubKimiBackend("nim", tools=True)) as h:
+            tools = await h.chat(tools=[{"type": "function", "function": {"name": "f"}}])
+            image_message = [{"role": "user", "content": [
+                {"type": "text", "text": "What is this?"},
+                {"type": "image_url", "image_url": {"url": "data:image/png;base64,AAAA"}},
+            ]}]
+            images = await h.chat(messages=image_message)
+            large = await h.chat(messages=[{"role": "user", "content": "word " * 2000}])
+        assert [r.headers["x-kimi-backend"] for r in (tools, images, large)] == ["nim"] * 3
+        assert h.nim.requests[0]["_path"] == "/chat/completions/tools"
+        assert not h.local.requests
+
+    asyncio.run(scenario())
+
+
+def test_fails_over_when_backend_errors():
+    async def scenario():
+        local = StubKimiBackend("local", fail_status=500)
+        async with RouterHarness(local, StubKimiBackend("nim")) as h:
+            response = await h.chat()
+            stats = (await h.client.get("/backends")).json()["backends"]
+        assert response.status_code == 200
+        assert response.headers["x-kimi-backend"] == "nim"
+        assert len(local.requests) == 1
+        assert stats[0]["failures"] == 1 and stats[0]["in_flight"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_queue_depth_spills_to_remote():
+    async def scenario():
+        async with RouterHarness(StubKimiBackend("local", delay=0.3), StubKimiBackend("nim")) as h:
+            first = asyncio.create_task(h.chat())
+            await asyncio.sleep(0.1)
+            second = await h.chat()
+            first = await first
+        assert first.headers["x-kimi-backend"] == "local"
+        assert second.headers["x-kimi-backend"] == "nim"
+
+    asyncio.run(scenario())
+
+
+def test_unhealthy_backend_is_skipped_and_errors_surface_when_none_left():
+    async def scenario():
+        local = StubKimiBackend("local", health_path="/health/ready", healthy=False)
+        nim = StubKimiBackend("nim", fail_status=503)
+        async with RouterHarness(local, nim) as h:
+            health = (await h.client.get("/health")).json()
+            response = await h.chat()
+        assert health["available_backends"] == ["nim"]
+        # Local is tried last as a fallback once nim fails
+        assert response.status_code == 200
+        assert response.headers["x-kimi-backend"] == "local"
+
+        nim_only = StubKimiBackend("nim", fail_status=503)
+        async with RouterHarness(StubKimiBackend("local", fail_status=502), nim_only) as h:
+            response = await h.chat()
+        assert response.status_code == 503
+        assert "All backends failed" in response.json()["detail"]
+
+    asyncio.run(scenario())
+
+
+def test_streams_through_selected_backend():
+    async def scenario():
+        async with RouterHarness(StubKimiBackend("local"), StubKimiBackend("nim")) as h:
+            response = await h.chat(stream=True)
+            stats = (await h.client.get("/backends")).json()["backends"]
+        assert response.headers["content-type"].startswith("text/event-stream")
+        # The local backend cannot stream, so the request skips it despite its lower latency
+        assert response.headers["x-kimi-backend"] == "nim" and not h.local.requests
+        assert "reply" in response.text and response.text.strip().endswith("data: [DONE]")
+        assert stats[0]["in_flight"] == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,126 @@
+"""
+Tests for SSE streaming in mcp-servers/kimi_k25_mcp_server.py
+Runs the FastAPI app in-process against a local fake OpenAI-compatible server
+"""
+
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+from starlette.requests import ClientDisconnect
+
+sys.path.insert(0, str(Path(__file__).parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "mcp-servers"))
+
+import kimi_k25_mcp_server as kimi
+from fake_openai_server import FakeOpenAIServer
+from kimi_gateway import UpstreamGateway
+
+MESSAGES = [{"role": "user", "content": "Weather in Paris?"}]
+WEATHER_TOOL = {"type": "function", "function": {"name": "get_weather", "parameters": {"type": "object"}}}
+
+
+async def _post_stream(server: FakeOpenAIServer, path: str, payload: dict):
+    kimi.gateway = UpstreamGateway(server.base_url, "test-key", requests_per_minute=6000)
+    transport = httpx.ASGITransport(app=kimi.app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://kimi") as client:
+            response = await client.post(path, json=payload)
+    finally:
+        await kimi.gateway.close()
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    lines = [line[len("data: "):] for line in response.text.split("\n\n") if line.startswith("data: ")]
+    assert lines[-1] == "[DONE]"
+    return [json.loads(line) for line in lines[:-1]]
+
+
+def test_plain_endpoint_streams_reasoning_and_content():
+    async def scenario():
+        async with FakeOpenAIServer() as server:
+            events = await _post_stream(server, "/chat/completions", {"messages": MESSAGES, "stream": True})
+        assert server.requests[0]["stream"] is True
+
+        deltas = [event["choices"][0]["delta"] for event in events if event["choices"]]
+        assert deltas[0] == {"role": "assistant"}
+        assert "".join(d.get("reasoning_content", "") for d in deltas) == "Let me think "
+        assert "".join(d.get("content", "") for d in deltas) == "Hello from fake Kimi "
+        assert events[-2]["choices"][0]["finish_reason"] == "stop"
+        assert events[-1]["usage"]["prompt_tokens"] == 12
+        assert all(event["object"] == "chat.completion.chunk" for event in events)
+
+    asyncio.run(scenario())
+
+
+def test_tools_endpoint_streams_tool_call_deltas():
+    async def scenario():
+        async with FakeOpenAIServer() as server:
+            payload = {"messages": MESSAGES, "tools": [WEATHER_TOOL], "stream": True}
+            events = await _post_stream(server, "/chat/completions/tools", payload)
+
+        tool_deltas = [call for event in events if event["choices"]
+                       for call in event["choices"][0]["delta"].get("tool_calls", [])]
+        assert tool_deltas[0]["id"] == "call_1"
+        assert tool_deltas[0]["function"]["name"] == "get_weather"
+        arguments = "".join(delta["function"].get("arguments", "") for delta in tool_deltas)
+        assert json.loads(arguments) == {"city": "Paris"}
+        assert [e for e in events if e["choices"]][-1]["choices"][0]["finish_reason"] == "tool_calls"
+
+    asyncio.run(scenario())
+
+
+def test_stream_releases_slot_and_records_time_to_first_token():
+    async def scenario():
+        async with FakeOpenAIServer(chunk_delay=0.02) as server:
+            gateway = UpstreamGateway(server.base_url, "test-key", requests_per_minute=6000, max_concurrency=1)
+            chunks = [chunk async for chunk in gateway.stream_chat_completion(model="m", messages=MESSAGES)]
+            # The single slot must be free again for the next request
+            await asyncio.wait_for(gateway.create_chat_completion(model="m", messages=MESSAGES), timeout=5)
+            await gateway.close()
+
+        record = gateway.stats()["recent"][0]
+        assert record["stream"] and record["status"] == "ok"
+        assert record["chunks"] == len(chunks)
+        assert record["ttft_ms"] < record["latency_ms"]
+        assert record["total_tokens"] > 0
+        assert gateway.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_slot_is_released_when_the_client_leaves_before_the_body():
+    async def scenario():
+        async with FakeOpenAIServer(chunk_delay=0.02) as server:
+            kimi.gateway = UpstreamGateway(server.base_url, "test-key", requests_per_minute=6000, max_concurrency=1)
+            response = await kimi.stream_chat_completion({"model": "m", "messages": MESSAGES}, "Error")
+            assert kimi.gateway.in_flight == 1
+
+            async def gone(message):
+                raise OSError("client disconnected")
+
+            scope = {"type": "http", "asgi": {"spec_version": "2.4"}}
+            with pytest.raises(ClientDisconnect):
+                await response(scope, None, gone)
+            in_flight = kimi.gateway.in_flight
+            await asyncio.wait_for(kimi.gateway.create_chat_completion(model="m", messages=MESSAGES), timeout=5)
+            await kimi.gateway.close()
+        assert in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_upstream_errors_before_first_chunk_keep_http_status():
+    async def scenario():
+        async with FakeOpenAIServer(script=[400]) as server:
+            kimi.gateway = UpstreamGateway(server.base_url, "test-key", requests_per_minute=6000)
+            transport = httpx.ASGITransport(app=kimi.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://kimi") as client:
+                response = await client.post("/chat/completions", json={"messages": MESSAGES, "stream": True})
+            await kimi.gateway.close()
+        assert response.status_code == 500
+        assert "Error calling Kimi K2.5 API" in response.json()["detail"]
+
+    asyncio.run(scenario())
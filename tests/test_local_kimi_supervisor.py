@@ -0,0 +1,149 @@
+"""
+Tests for the llama.cpp supervisor in local_kimi_deployment/local_kimi_server.py
+Uses a tiny stand-in llama-server process built on http.server
+"""
+
+import asyncio
+import socket
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "local_kimi_deployment"))
+
+from local_kimi_server import LlamaServerSupervisor
+
+FAKE_LLAMA_SERVER = '''
+import json
+import sys
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+class Handler(BaseHTTPRequestHandler):
+    def _reply(self, body):
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self._reply({"object": "list", "data": [{"id": "kimi-k25-local"}]})
+
+    def do_POST(self):
+        global failing_posts
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if failing_posts:
+            failing_posts -= 1
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self._reply({"choices": [{"message": {"role": "assistant", "content": "Hi"}}]})
+
+    def log_message(self, *args):
+        pass
+
+# Optional second argument: answer that many completions with 503 first
+failing_posts = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+HTTPServer(("127.0.0.1", int(sys.argv[1])), Handler).serve_forever()
+'''
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _wait_for(predicate, timeout: float = 15.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not predicate():
+        assert loop.time() < deadline, "condition not reached in time"
+        await asyncio.sleep(0.05)
+
+
+def _make_supervisor(tmp_path: Path, cmd=None, failing_posts: int = 0) -> LlamaServerSupervisor:
+    port = _free_port()
+    script = tmp_path / "fake_llama_server.py"
+    script.write_text(FAKE_LLAMA_SERVER)
+    return LlamaServerSupervisor(
+        cmd or [sys.executable, str(script), str(port), str(failing_posts)],
+        f"http://127.0.0.1:{port}/v1",
+        min_probe_interval=0.05,
+        max_probe_interval=0.2,
+        liveness_interval=0.1,
+        min_restart_backoff=0.1,
+        max_restart_backoff=0.2,
+    )
+
+
+def test_becomes_ready_after_warm_up(tmp_path):
+    async def scenario():
+        supervisor = _make_supervisor(tmp_path)
+        await supervisor.start()
+        assert not supervisor.ready
+        try:
+            await _wait_for(lambda: supervisor.ready)
+            readiness = supervisor.readiness()
+            assert readiness.llama_server == "ready"
+            assert readiness.warmed_up
+            assert readiness.managed
+        finally:
+            await supervisor.stop()
+        assert supervisor.state == "stopped"
+
+    asyncio.run(scenario())
+
+
+def test_restarts_after_crash(tmp_path):
+    async def scenario():
+        supervisor = _make_supervisor(tmp_path)
+        await supervisor.start()
+        try:
+            await _wait_for(lambda: supervisor.ready)
+            supervisor.process.kill()
+            await _wait_for(lambda: not supervisor.ready)
+            await _wait_for(lambda: supervisor.ready)
+            assert supervisor.restarts == 1
+            assert "exited" in supervisor.last_error
+        finally:
+            await supervisor.stop()
+
+    asyncio.run(scenario())
+
+
+def test_ready_only_after_a_successful_warm_up(tmp_path):
+    async def scenario():
+        flaky = _make_supervisor(tmp_path, failing_posts=1)
+        await flaky.start()
+        try:
+            await _wait_for(lambda: flaky.ready)
+            assert flaky.warmed_up and flaky.restarts == 0
+        finally:
+            await flaky.stop()
+
+        broken = _make_supervisor(tmp_path, failing_posts=1000)
+        await broken.start()
+        try:
+            await _wait_for(lambda: broken.restarts >= 1)
+            assert not broken.ready and not broken.readiness().ready
+            assert "503" in broken.last_error
+        finally:
+            await broken.stop()
+
+    asyncio.run(scenario())
+
+
+def test_missing_binary_falls_back_to_external_mode(tmp_path):
+    async def scenario():
+        supervisor = _make_supervisor(tmp_path, cmd=[str(tmp_path / "no-such-llama-server")])
+        await supervisor.start()
+        try:
+            await _wait_for(lambda: not supervisor.managed)
+            assert supervisor.state == "external"
+            assert not supervisor.ready
+        finally:
+            await supervisor.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,158 @@
+"""
+Tests for mcp-servers/mime_stream.py and streaming attachments in EmailMCP.send_email
+"""
+
+import asyncio
+import email
+import email.policy
+import os
+import socket
+import sys
+import tracemalloc
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "mcp-servers"))
+
+from mime_stream import MessageTooLarge, StreamingMessage, base64_size
+
+pytest.importorskip("aiosmtpd")
+from aiosmtpd.controller import Controller
+
+from email_mcp_server import EmailConfig, EmailMCP
+from smtp_pool import SMTPPool
+
+
+def _undot(data: bytes) -> bytes:
+    return b"\r\n".join(line[1:] if line.startswith(b"..") else line for line in data.split(b"\r\n"))
+
+
+def _files(tmp_path, sizes):
+    paths = []
+    for i, size in enumerate(sizes):
+        path = tmp_path / f"rapport é {i}.bin"
+        path.write_bytes(os.urandom(size))
+        paths.append(str(path))
+    return paths
+
+
+def test_base64_size_matches_encoder():
+    import base64
+    for n in [0, 1, 2, 3, 56, 57, 58, 114, 1000, 58368, 58369]:
+        assert base64_size(n) == len(base64.encodebytes(b"x" * n).replace(b"\n", b"\r\n"))
+
+
+def test_stream_round_trips_and_size_is_exact(tmp_path):
+    paths = _files(tmp_path, [0, 1, 57 * 1024 + 5, 200_000])
+    body = "Line one\n.starts with a dot\nÜnïcode ✓"
+    message = StreamingMessage("bot@example.com", ["a@example.com"], "Résumé ✓", body,
+                               cc=["c@example.com"], attachments=paths)
+    wire = message.as_bytes()
+    assert len(wire) == message.size
+    assert b"\r\n..starts with a dot" in wire
+    # Non-ASCII text must not need 8BITMIME on the way out
+    assert wire.isascii()
+
+    parsed = email.message_from_bytes(_undot(wire), policy=email.policy.default)
+    assert parsed["Subject"] == "Résumé ✓" and parsed["Cc"] == "c@example.com"
+    parts = list(parsed.iter_parts())
+    assert parts[0]["Content-Transfer-Encoding"] == "quoted-printable"
+    assert parts[0].get_content().replace("\r\n", "\n").rstrip("\n") == body
+    for part, path in zip(parts[1:], paths):
+        assert part.get_filename() == os.path.basename(path)
+        assert part.get_payload(decode=True) == Path(path).read_bytes()
+
+
+def test_limits_and_bounded_memory(tmp_path):
+    big, = _files(tmp_path, [5 * 1024 * 1024])
+    with pytest.raises(MessageTooLarge, match="Attachment"):
+        StreamingMessage("a@example.com", ["b@example.com"], "s", "b", attachments=[big],
+                         max_attachment_bytes=1024 * 1024)
+    with pytest.raises(MessageTooLarge, match="encoded"):
+        # Base64 inflates 5 MB to about 6.9 MB on the wire
+        StreamingMessage("a@example.com", ["b@example.com"], "s", "b", attachments=[big],
+                         max_message_bytes=6 * 1024 * 1024)
+
+    message = StreamingMessage("a@example.com", ["b@example.com"], "s", "b", attachments=[big])
+    tracemalloc.start()
+    total = sum(len(chunk) for chunk in message)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert total == message.size
+    assert peak < 1024 * 1024
+
+
+class Recorder:
+    def __init__(self):
+        self.messages = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(envelope.content)
+        return "250 OK"
+
+
+@pytest.fixture
+def smtp_server():
+    controllers = []
+
+    def start(**kwargs):
+        recorder = Recorder()
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]
+        controller = Controller(recorder, hostname="127.0.0.1", port=port, **kwargs)
+        controller.start()
+        controllers.append(controller)
+        return recorder, port
+
+    yield start
+    for controller in controllers:
+        controller.stop()
+
+
+def test_streams_to_smtp_and_honours_server_size(smtp_server, tmp_path):
+    recorder, port = smtp_server(data_size_limit=2 * 1024 * 1024)
+    small, large = _files(tmp_path, [1024 * 1024, 3 * 1024 * 1024])
+
+    async def scenario():
+        pool = SMTPPool("127.0.0.1", port, starttls=False, size=1)
+        ok = await pool.send("bot@example.com", ["a@example.com"],
+                             StreamingMessage("bot@example.com", ["a@example.com"], "ok", ".\n..\n", attachments=[small]))
+        too_big = await pool.send("bot@example.com", ["a@example.com"],
+                                  StreamingMessage("bot@example.com", ["a@example.com"], "big", "x", attachments=[large]))
+        after = await pool.send("bot@example.com", ["a@example.com"], b"Subject: after\r\n\r\nstill fine\r\n")
+        stats = dict(pool.stats)
+        await pool.close()
+        return ok, too_big, after, stats
+
+    ok, too_big, after, stats = asyncio.run(scenario())
+    assert ok["success"] and after["success"]
+    assert not too_big["success"] and "server accepts at most" in too_big["error"]
+    # The oversized message was refused before DATA, on the same session
+    assert stats["connections_opened"] == 1 and len(recorder.messages) == 2
+    received = email.message_from_bytes(recorder.messages[0], policy=email.policy.default)
+    text, attachment = received.iter_parts()
+    assert text.get_content().replace("\r\n", "\n") == ".\n..\n"
+    assert attachment.get_payload(decode=True) == Path(small).read_bytes()
+
+
+def test_send_email_enforces_limits(smtp_server, tmp_path):
+    recorder, port = smtp_server()
+    attachment, = _files(tmp_path, [2 * 1024 * 1024])
+
+    async def scenario():
+        server = EmailMCP()
+        server.set_config(EmailConfig(smtp_server="127.0.0.1", smtp_port=port, email_address="bot@example.com",
+                                      password="", imap_server="127.0.0.1", smtp_starttls=False,
+                                      max_attachment_mb=1))
+        refused = await server.send_email(["a@example.com"], "Report", "See attached", attachments=[attachment])
+        server.config.max_attachment_mb = 5
+        sent = await server.send_email(["a@example.com"], "Report", "See attached", attachments=[attachment])
+        await server.smtp_pool.close()
+        return refused, sent
+
+    refused, sent = asyncio.run(scenario())
+    assert not refused["success"] and "max: 1048576" in refused["error"]
+    assert sent["success"] and sent["size_bytes"] > 2 * 1024 * 1024
+    assert len(recorder.messages) == 1
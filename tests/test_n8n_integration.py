@@ -0,0 +1,232 @@
+"""
+Tests for cli_tools/n8n_integration.py against a local fake n8n server
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "cli_tools"))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from fake_n8n_server import FakeN8nServer
+from n8n_integration import N8nIntegration, N8nWorkflowManager, execution_output
+
+
+def with_n8n(scenario, **fake_kwargs):
+    async def run():
+        fake = FakeN8nServer(**fake_kwargs)
+        await fake.start()
+        client = N8nIntegration(fake.base_url, fake.api_key, poll_initial_delay=0.02, poll_max_delay=0.2)
+        try:
+            await scenario(fake, client)
+        finally:
+            await client.close()
+            await fake.stop()
+    asyncio.run(run())
+
+
+def test_requests_share_pooled_connections():
+    async def scenario(fake, client):
+        await client.create_workflow({"name": "wf", "nodes": [], "connections": {}})
+        for _ in range(20):
+            listed = await client.list_workflows()
+        assert len(listed["data"]) == 1
+        assert len(fake.connections) == 1
+
+        missing = await client.get_workflow("404")
+        assert missing["success"] is False and missing["status_code"] == 404
+    with_n8n(scenario)
+
+
+def test_execute_many_is_bounded_ordered_and_waits():
+    async def scenario(fake, client):
+        workflow = await client.create_workflow({"name": "wf", "nodes": [], "connections": {}})
+        inputs = [{"url": f"https://example.com/{i}"} for i in range(10)] + [{"fail": True}]
+        started = time.monotonic()
+        runs = await client.execute_many(workflow["id"], inputs, concurrency=3)
+        elapsed = time.monotonic() - started
+
+        assert [run["input"] for run in runs] == inputs
+        assert all(run["result"]["success"] and run["result"]["status"] == "success" for run in runs[:10])
+        assert execution_output(runs[0]["result"]["execution"]) == [{**inputs[0], "processed": True}]
+        assert runs[10]["result"]["success"] is False and runs[10]["result"]["status"] == "error"
+        assert 1 < fake.max_running <= 3
+        # Sequential runs would take at least 11 * 0.2s
+        assert elapsed < 11 * 0.2
+        assert len(fake.connections) <= 3
+    with_n8n(scenario)
+
+
+def test_polling_backs_off_until_timeout():
+    async def scenario(fake, client):
+        workflow = await client.create_workflow({"name": "wf", "nodes": [], "connections": {}})
+        execution = await client.execute_workflow(workflow["id"], {"x": 1})
+        done = await client.wait_for_execution(execution["id"])
+        assert done["success"]
+        # Fixed 20ms polling would take ~40 polls for a 0.8s execution
+        assert done["polls"] <= 8
+
+        slow = await client.execute_workflow(workflow["id"], {"x": 2})
+        timed_out = await client.wait_for_execution(slow["id"], timeout=0.1)
+        assert timed_out["success"] is False and "did not finish" in timed_out["error"]
+
+        missing = await client.wait_for_execution("nope")
+        assert missing["success"] is False and missing["polls"] == 1
+    with_n8n(scenario, execution_seconds=0.8)
+
+
+def test_polls_fetch_status_only_and_survive_transient_errors():
+    async def scenario(fake, client):
+        workflow = await client.create_workflow({"name": "wf", "nodes": [], "connections": {}})
+        runs = await client.execute_many(workflow["id"], [{"n": i} for i in range(4)], concurrency=4, retries=2)
+        assert all(run["result"]["success"] and run["attempts"] == 1 for run in runs)
+        # Run data is downloaded once per execution, not on every poll
+        assert fake.data_fetches == 4
+        assert sum(run["result"]["polls"] for run in runs) > 4
+
+        execution = await client.execute_workflow(workflow["id"], {"n": 9})
+        fake.fail_polls = 2
+        done = await client.wait_for_execution(execution["id"])
+        assert done["success"] and execution_output(done["execution"]) == [{"n": 9, "processed": True}]
+        assert len(fake.executions) == 5
+
+        fake.fail_polls = client.poll_retries + 1
+        broken = await client.wait_for_execution(execution["id"])
+        assert broken["success"] is False and broken["status_code"] == 503
+    with_n8n(scenario, execution_seconds=0.3)
+
+
+def test_webhook_fan_out():
+    async def scenario(fake, client):
+        inputs = [{"n": i} for i in range(6)]
+        runs = await client.execute_many(None, inputs, concurrency=2, webhook_path="scrape")
+        assert [run["result"] for run in runs] == [{"path": "scrape", "received": d} for d in inputs]
+        assert not fake.executions
+        assert all(path == "/webhook/scrape" for _, path in fake.requests)
+    with_n8n(scenario, execution_seconds=0.05)
+
+
+def with_manager(scenario, tmp_path):
+    async def run():
+        fake = FakeN8nServer(execution_seconds=0.01)
+        await fake.start()
+        managers = []
+
+        def manager(cache="workflows.json"):
+            m = N8nWorkflowManager(fake.base_url, fake.api_key, registry_file=tmp_path / cache)
+            m.n8n.poll_initial_delay = 0.02
+            managers.append(m)
+            return m
+        try:
+            await scenario(fake, manager)
+        finally:
+            for m in managers:
+                await m.close()
+            await fake.stop()
+    asyncio.run(run())
+
+
+def test_template_workflows_are_created_once(tmp_path):
+    async def scenario(fake, manager):
+        first = await manager().run_web_scraping_workflow(["https://a.test", "https://b.test"])
+        again = manager()
+        second = await again.run_web_scraping_workflow(["https://c.test"])
+        assert first["success"] and second["success"]
+        assert (first["workflow_source"], second["workflow_source"]) == ("created", "cache")
+        assert first["workflow_id"] == second["workflow_id"]
+        assert all(e["status"] == "success" for e in first["executions"] + second["executions"])
+        assert fake.requests.count(("POST", "/api/v1/workflows")) == 1
+        assert ("GET", "/api/v1/workflows") not in fake.requests[fake.requests.index(("POST", "/api/v1/workflows")):]
+
+        # Another machine without the local cache finds the workflow by its versioned name
+        fake.page_size = 1
+        other = await manager("other.json").run_data_processing_workflow([{"x": 1}])
+        assert other["workflow_source"] == "created"
+        lookup = await manager("other-2.json").run_web_scraping_workflow(["https://d.test"])
+        assert lookup["workflow_source"] == "lookup" and lookup["workflow_id"] == first["workflow_id"]
+        assert len(fake.workflows) == 2
+    with_manager(scenario, tmp_path)
+
+
+def test_stale_templates_are_replaced_and_collected(tmp_path):
+    async def scenario(fake, manager):
+        legacy = [
+            {"name": "Scraping Workflow - 20240101_120000"},
+            {"name": "Email Workflow - 20240102_093000"},
+            {"name": "Data Processing Workflow - 1a2b3c4d"},
+            {"name": "Hand-made workflow"},
+        ]
+        for workflow in legacy:
+            fake.workflows[str(len(fake.workflows) + 100)] = {**workflow, "id": str(len(fake.workflows) + 100)}
+        m = manager()
+        old = await m.run_data_processing_workflow([{"x": 1}])
+        await m.run_email_workflow("a@x.test", ["b@x.test"], "hi", "body")
+
+        m.workflow_templates["data_processing"]["nodes"][1]["parameters"]["functionCode"] += "\n// v2"
+        assert m.registry.stale_templates() == ["data_processing"]
+        new = await m.run_data_processing_workflow([{"x": 2}])
+        assert new["success"] and new["workflow_source"] == "created"
+        assert new["workflow_id"] != old["workflow_id"]
+        assert m.registry.stale_templates() == []
+
+        preview = await m.garbage_collect_workflows(dry_run=True)
+        assert len(preview["orphans"]) == 3 and preview["deleted"] == []
+        collected = await m.garbage_collect_workflows()
+        assert sorted(collected["deleted"]) == sorted([old["workflow_id"], "100", "101"])
+        assert {w["name"] for w in fake.workflows.values()} == {
+            "Hand-made workflow",
+            "Data Processing Workflow - 1a2b3c4d",
+            m.registry.workflow_name("data_processing"),
+            m.registry.workflow_name("email_automation"),
+        }
+    with_manager(scenario, tmp_path)
+
+
+def test_deleted_workflow_is_registered_again(tmp_path):
+    async def scenario(fake, manager):
+        m = manager()
+        first = await m.run_email_workflow("a@x.test", ["b@x.test"], "hi", "body")
+        del fake.workflows[first["workflow_id"]]
+        second = await m.run_email_workflow("a@x.test", ["b@x.test"], "hi", "body")
+        assert second["success"] and second["workflow_source"] == "created"
+        assert second["workflow_id"] in fake.workflows
+        assert second["execution"]["workflowId"] == second["workflow_id"]
+    with_manager(scenario, tmp_path)
+
+
+def test_chunked_data_processing_reassembles_and_retries(tmp_path):
+    async def scenario(fake, manager):
+        m = manager()
+        m.retry_delay = 0.01
+        data = [{"n": i, "blob": "x" * 2000} for i in range(1000)]
+
+        whole = await m.run_data_processing_workflow(data)
+        assert whole["success"] is False and whole["execution"]["status_code"] == 413
+
+        fake.fail_executions = 2
+        chunked = await m.run_data_processing_workflow(data, chunk_size=100, concurrency=3)
+        assert chunked["success"] and chunked["failed_chunks"] == []
+        assert [record["n"] for item in chunked["results"] for record in item["data"]] == list(range(1000))
+        assert all(item["processed"] for item in chunked["results"])
+        assert [c["index"] for c in chunked["chunks"]] == list(range(10))
+        assert sorted(c["attempts"] for c in chunked["chunks"])[-2:] == [2, 2]
+        assert chunked["records_processed"] == 1000
+        assert 1 < fake.max_running <= 3
+
+        fake.fail_executions = 3
+        partial = await m.run_data_processing_workflow(data[:30], chunk_size=10, concurrency=1, retries=1)
+        assert partial["success"] is False and partial["failed_chunks"] == [0]
+        assert partial["chunks"][0]["attempts"] == 2
+        assert [record["n"] for item in partial["results"] for record in item["data"]] == list(range(10, 30))
+    with_manager(scenario, tmp_path)
+
+
+def test_unreachable_n8n_is_reported_not_raised(tmp_path):
+    async def scenario():
+        async with N8nWorkflowManager("http://127.0.0.1:9", "key", registry_file=tmp_path / "workflows.json") as m:
+            return await m.run_email_workflow("a@x.test", ["b@x.test"], "hi", "body")
+
+    result = asyncio.run(scenario())
+    assert result["success"] is False and result["error"]
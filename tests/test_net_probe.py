@@ -0,0 +1,156 @@
+"""
+Tests for mcp-servers/net_probe.py and the connectivity tools, against local sockets
+"""
+
+import asyncio
+import socket
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "mcp-servers"))
+sys.path.insert(0, str(Path(__file__).parent.parent / "cli_tools"))
+
+from net_probe import DNSCache, parse_target, probe_many
+from system_devops_mcp_server import SystemDevOpsMCP
+
+
+def _listener():
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    sock.listen(64)
+    return sock
+
+
+def _closed_port():
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def test_parse_target():
+    assert parse_target("example.com:443") == ("example.com", 443)
+    assert parse_target("example.com") == ("example.com", 80)
+    assert parse_target("[::1]:8080") == ("::1", 8080)
+    assert parse_target({"host": "h", "port": 22}) == ("h", 22)
+
+
+def test_batch_probe_reports_latency_and_failures():
+    listeners = [_listener() for _ in range(5)]
+    closed = _closed_port()
+    targets = [f"localhost:{s.getsockname()[1]}" for s in listeners] + [f"localhost:{closed}"]
+
+    async def scenario():
+        dns = DNSCache()
+        results = await probe_many(targets + ["no-such-host.invalid:80"], timeout=2, dns=dns)
+        return results, dns
+
+    try:
+        results, dns = asyncio.run(scenario())
+    finally:
+        for s in listeners:
+            s.close()
+
+    assert [r["is_connected"] for r in results] == [True] * 5 + [False, False]
+    assert all(r["connect_ms"] >= 0 and r["dns_ms"] >= 0 for r in results[:5])
+    assert results[5]["status_code"] != 0 and "error" in results[5]
+    assert "DNS resolution failed" in results[6]["error"]
+    assert [r["port"] for r in results[:6]] == [int(t.rsplit(":", 1)[1]) for t in targets]
+    assert dns.stats()["misses"] == 7
+
+
+def test_malformed_targets_fail_on_their_own():
+    listener = _listener()
+    good = f"127.0.0.1:{listener.getsockname()[1]}"
+    try:
+        results = asyncio.run(probe_many(["host:notaport", good, {"port": 80}], timeout=2))
+    finally:
+        listener.close()
+    assert [r["is_connected"] for r in results] == [False, True, False]
+    assert "Invalid target 'host:notaport'" in results[0]["error"] and results[0]["target"] == "host:notaport"
+    assert "Invalid target" in results[2]["error"]
+
+
+def test_dns_lookups_are_shared_cached_and_bounded_by_timeout(monkeypatch):
+    calls = []
+    real_lookup = DNSCache._lookup
+
+    async def slow_lookup(self, key):
+        calls.append(key)
+        if key[0] == "slow.test":
+            await asyncio.sleep(10)
+        return await real_lookup(self, ("127.0.0.1", key[1]))
+
+    monkeypatch.setattr(DNSCache, "_lookup", slow_lookup)
+    listener = _listener()
+    port = listener.getsockname()[1]
+
+    async def scenario():
+        dns = DNSCache()
+        first = await probe_many([f"svc.test:{port}"] * 20, timeout=2, dns=dns)
+        again = await probe_many([f"svc.test:{port}"], timeout=2, dns=dns)
+        started = time.perf_counter()
+        slow = await probe_many([f"slow.test:{port}"] * 3 + [f"svc.test:{port}"], timeout=0.3, dns=dns)
+        return first, again, slow, time.perf_counter() - started, dns
+
+    try:
+        first, again, slow, elapsed, dns = asyncio.run(scenario())
+    finally:
+        listener.close()
+
+    assert all(r["is_connected"] for r in first + again)
+    # 20 concurrent probes of one name resolve it once; the later call hits the cache
+    assert calls.count(("svc.test", port)) == 1 and calls.count(("slow.test", port)) == 1
+    assert [r["is_connected"] for r in slow] == [False, False, False, True]
+    assert all("timed out" in r["error"] for r in slow[:3])
+    assert elapsed < 2
+    assert dns.stats()["hits"] >= 20
+
+
+def test_server_and_cli_tools(tmp_path, monkeypatch):
+    # The CLI tool writes its allowlist under the working directory
+    monkeypatch.chdir(tmp_path)
+    listener = _listener()
+    port = listener.getsockname()[1]
+    closed = _closed_port()
+
+    async def scenario():
+        server = SystemDevOpsMCP()
+        single = await server.check_connectivity("127.0.0.1", port, 2)
+        batch = await server.check_connectivity_batch([f"127.0.0.1:{port}", f"127.0.0.1:{closed}"], 2)
+        return single, batch
+
+    from python_cli_tool import OpenClawCLITool
+
+    try:
+        single, batch = asyncio.run(scenario())
+        cli = OpenClawCLITool()
+        cli_single = cli.check_connectivity("127.0.0.1", port, 2)
+        cli_batch = asyncio.run(cli.probe_connectivity([f"localhost:{port}", f"localhost:{closed}"], 2))
+    finally:
+        listener.close()
+
+    assert single["success"] and single["is_connected"] and single["status_code"] == 0
+    assert batch["connected"] == 1 and batch["failed"] == 1
+    assert cli_single["is_connected"] and "connect_ms" in cli_single and cli_single["timeout"] == 2
+    assert [r["is_connected"] for r in cli_batch["results"]] == [True, False]
+    # The CLI resolves through the shared DNS cache, one entry per (host, port)
+    assert isinstance(cli._dns, DNSCache) and cli._dns.stats()["entries"] == 3
+
+
+def test_cli_check_connectivity_inside_a_running_loop(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    listener = _listener()
+    port = listener.getsockname()[1]
+    from python_cli_tool import OpenClawCLITool
+
+    async def scenario():
+        return OpenClawCLITool().check_connectivity("127.0.0.1", port, 2)
+
+    try:
+        result = asyncio.run(scenario())
+    finally:
+        listener.close()
+    assert result["success"] and result["is_connected"] and result["timeout"] == 2
@@ -0,0 +1,135 @@
+"""
+Tests for mcp-servers/notion_api.py and NotionMCP against a local fake Notion server
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "mcp-servers"))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from fake_notion_server import FakeNotionServer
+from notion_api import NotionAPIError, NotionClient
+from notion_mcp_server import NotionConfig, NotionMCP
+
+
+def with_server(scenario):
+    async def run():
+        fake = FakeNotionServer()
+        await fake.start()
+        try:
+            await scenario(fake)
+        finally:
+            await fake.stop()
+    asyncio.run(run())
+
+
+def test_query_follows_cursors_past_first_hundred():
+    async def scenario(fake):
+        for i in range(250):
+            fake.add_page("db", {"n": i})
+        client = NotionClient(fake.token, fake.base_url, requests_per_second=100)
+        try:
+            seen = [p["properties"]["n"] async for p in client.iter_query("db")]
+            session = client._session
+            limited = await client.query_database("db", limit=30)
+            assert client._session is session
+        finally:
+            await client.close()
+        assert seen == list(range(250))
+        assert len(fake.requests) == 4
+        assert [p["properties"]["n"] for p in limited] == list(range(30))
+        assert fake.requests[-1][3]["page_size"] == 30
+    with_server(scenario)
+
+
+def test_retry_after_pauses_every_caller():
+    async def scenario(fake):
+        fake.add_page("db", {"n": 0})
+        fake.fail_next(429, {"Retry-After": "0.3"}, times=3)
+        client = NotionClient(fake.token, fake.base_url, requests_per_second=100, base_backoff=0.01)
+        try:
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            results = await asyncio.gather(*(client.query_database("db") for _ in range(3)))
+            elapsed = loop.time() - started
+        finally:
+            await client.close()
+        assert all(len(r) == 1 for r in results)
+        assert client.counters["rate_limited"] == 3
+        assert elapsed >= 0.3
+        # No retry reached the server during the Retry-After window
+        first = fake.requests[0][0]
+        assert len(fake.requests) == 6
+        assert all(t - first >= 0.3 for t, *_ in fake.requests[3:])
+    with_server(scenario)
+
+
+def test_errors_are_not_retried_unless_transient():
+    async def scenario(fake):
+        client = NotionClient("wrong", fake.base_url, requests_per_second=100, base_backoff=0.01)
+        try:
+            with pytest.raises(NotionAPIError) as excinfo:
+                await client.query_database("db")
+            assert excinfo.value.status == 401
+            assert len(fake.requests) == 1
+
+            client.token = fake.token
+            await client.close()
+            fake.add_page("db", {"n": 0})
+            fake.fail_next(503, times=2)
+            assert len(await client.query_database("db")) == 1
+            assert client.counters["retries"] == 2
+        finally:
+            await client.close()
+    with_server(scenario)
+
+
+def test_page_creation_is_not_resent_after_it_may_have_applied():
+    async def scenario(fake):
+        fake.databases["db"] = []
+        client = NotionClient(fake.token, fake.base_url, requests_per_second=100, base_backoff=0.01, timeout=0.2)
+        try:
+            fake.fail_next(503)
+            with pytest.raises(NotionAPIError) as excinfo:
+                await client.create_page("db", {"n": 0})
+            assert excinfo.value.status == 503
+
+            fake.fail_next(429, {"Retry-After": "0"})
+            await client.create_page("db", {"n": 1})
+
+            fake.latency = 0.4
+            with pytest.raises(asyncio.TimeoutError):
+                await client.create_page("db", {"n": 2})
+            await asyncio.sleep(0.4)
+        finally:
+            await client.close()
+        assert [r[2] for r in fake.requests] == ["/v1/pages"] * 4
+        # The timed-out request still created its page, exactly once
+        assert sorted(p["properties"]["n"] for p in fake.databases["db"]) == [1, 2]
+        assert client.counters["retries"] == 1
+    with_server(scenario)
+
+
+def test_bulk_create_is_bounded_and_ordered():
+    async def scenario(fake):
+        fake.latency = 0.05
+        fake.databases["db"] = []
+        server = NotionMCP()
+        server.set_config(NotionConfig(integration_token=fake.token, base_url=fake.base_url,
+                                       requests_per_second=200, max_concurrency=10))
+        try:
+            pages = [{"n": i} for i in range(20)]
+            result = await server.create_pages("db", pages, concurrency=4)
+            query = await server.query_database("db")
+        finally:
+            await server.close()
+        assert result["success"] and result["created"] == 20
+        assert [r["index"] for r in result["results"]] == list(range(20))
+        assert 1 < fake.max_in_flight <= 4
+        assert query["total"] == 20
+        assert sorted(p["properties"]["n"] for p in query["pages"]) == list(range(20))
+    with_server(scenario)
@@ -0,0 +1,181 @@
+"""
+Tests for mcp-servers/notion_replica.py and replica-backed NotionMCP.query_database
+"""
+
+import asyncio
+import sqlite3
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "mcp-servers"))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from fake_notion_server import FakeNotionServer
+from notion_mcp_server import NotionConfig, NotionMCP
+import pytest
+
+from notion_replica import UnsupportedFilter, matches, sort_pages, supports
+
+
+def title(text):
+    return {"type": "title", "title": [{"plain_text": text}]}
+
+
+def page(name, **props):
+    properties = {"Name": title(name)}
+    for key, value in props.items():
+        kind = {"done": "checkbox", "points": "number", "stage": "select",
+                "tags": "multi_select", "due": "date"}[key]
+        if kind == "select":
+            value = {"name": value}
+        elif kind == "multi_select":
+            value = [{"name": v} for v in value]
+        elif kind == "date":
+            value = {"start": value}
+        properties[key] = {"type": kind, kind: value}
+    return {"id": name, "created_time": "2024-01-01T00:00:00.000Z",
+            "last_edited_time": "2024-01-01T00:00:00.000Z", "properties": properties}
+
+
+def run_with_server(scenario, tmp_path, **config):
+    async def run():
+        fake = FakeNotionServer()
+        await fake.start()
+        server = NotionMCP()
+        server.set_config(NotionConfig(integration_token=fake.token, base_url=fake.base_url,
+                                       requests_per_second=100,
+                                       replica_path=str(tmp_path / "replica.sqlite3"), **config))
+        try:
+            await scenario(fake, server)
+        finally:
+            await server.close()
+            await fake.stop()
+    asyncio.run(run())
+
+
+def test_local_filter_evaluation():
+    a = page("Alpha launch", done=True, points=5, stage="Doing", tags=["web", "ops"], due="2024-03-01")
+    b = page("beta", done=False, points=None, stage=None, tags=[], due="2024-03-02T10:00:00.000+00:00")
+
+    def names(f):
+        return [p["id"] for p in (a, b) if matches(p, f)]
+
+    assert names({"property": "done", "checkbox": {"equals": True}}) == ["Alpha launch"]
+    assert names({"property": "Name", "title": {"contains": "LAUNCH"}}) == ["Alpha launch"]
+    assert names({"property": "points", "number": {"greater_than": 3}}) == ["Alpha launch"]
+    assert names({"property": "points", "number": {"is_empty": True}}) == ["beta"]
+    assert names({"property": "stage", "select": {"does_not_equal": "Doing"}}) == ["beta"]
+    assert names({"property": "tags", "multi_select": {"contains": "ops"}}) == ["Alpha launch"]
+    assert names({"property": "due", "date": {"equals": "2024-03-02"}}) == ["beta"]
+    assert names({"or": [{"property": "done", "checkbox": {"equals": False}},
+                         {"and": [{"property": "points", "number": {"equals": 5}},
+                                  {"property": "due", "date": {"before": "2024-03-02"}}]}]}) == ["Alpha launch", "beta"]
+    assert [p["id"] for p in sort_pages([b, a], [{"property": "points", "direction": "descending"}])] == \
+        ["Alpha launch", "beta"]
+
+    assert not supports({"property": "Owner", "people": {"contains": "someone"}})
+    assert not supports({"and": [{"property": "done", "checkbox": {"equals": True}},
+                                 {"property": "Total", "formula": {"number": {"equals": 1}}}]})
+    assert not supports(None, [{"property": "x"}, {"timestamp": "archived"}])
+
+
+def test_incremental_sync_fetches_only_edited_pages(tmp_path):
+    async def scenario(fake, server):
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        pages = [fake.add_page("db", {"Name": title(f"p{i}")},
+                               (start + timedelta(minutes=i)).strftime("%Y-%m-%dT%H:%M:%S.000Z"))
+                 for i in range(150)]
+        first = await server.query_database("db")
+        assert first["source"] == "replica" and first["total"] == 150
+        assert first["sync"]["full"] and len(fake.requests) == 2
+
+        fake.update_page(pages[3], {"Name": title("renamed")}, "2024-01-02T00:00:00.000Z")
+        fake.add_page("db", {"Name": title("new")}, "2024-01-02T00:00:00.000Z")
+        second = await server.query_database(
+            "db", {"property": "Name", "title": {"starts_with": "re"}}, max_staleness=0)
+        # The two edits, plus the last page of the previous sync's boundary minute
+        assert not second["sync"]["full"] and second["sync"]["fetched"] == 3
+        assert fake.requests[-1][3]["filter"]["last_edited_time"]["on_or_after"] == "2024-01-01T02:29:00.000Z"
+        assert [p["id"] for p in second["pages"]] == [pages[3]["id"]]
+
+        fake.requests.clear()
+        third = await server.query_database("db", limit=5)
+        assert fake.requests == []
+        assert third["total"] == 5 and third["sync"] is None
+    run_with_server(scenario, tmp_path)
+
+
+def test_unsupported_filter_goes_to_api(tmp_path):
+    async def scenario(fake, server):
+        fake.add_page("db", {"Name": title("x")})
+        fake.filter_fn = lambda p, f: False
+        result = await server.query_database("db", {"property": "Owner", "people": {"contains": "u1"}})
+        assert result["source"] == "api" and result["total"] == 0
+        assert len(fake.requests) == 1
+    run_with_server(scenario, tmp_path)
+
+
+def test_sorts_on_non_scalar_properties_go_to_api(tmp_path):
+    formula = {"type": "formula", "formula": {"type": "number", "number": 3}}
+    people = {"type": "people", "people": [{"object": "user", "id": "u1"}]}
+    pages = [page("a", tags=["x"]), page("b")]
+    for p, prop in zip(pages, (formula, people)):
+        p["properties"].update({"Total": formula, "Owner": prop})
+    for key in ("Total", "Owner", "tags"):
+        with pytest.raises(UnsupportedFilter):
+            sort_pages(pages, [{"property": key}])
+
+    async def scenario(fake, server):
+        fake.add_page("db", {"Name": title("x"), "Total": formula})
+        result = await server.query_database("db", sorts=[{"property": "Total", "direction": "ascending"}])
+        assert result["success"] and result["source"] == "api" and result["total"] == 1
+    run_with_server(scenario, tmp_path)
+
+
+def test_full_sync_drops_deleted_pages_and_writes_through(tmp_path):
+    async def scenario(fake, server):
+        keep = fake.add_page("db", {"Name": title("keep")})
+        gone = fake.add_page("db", {"Name": title("gone")})
+        assert (await server.query_database("db"))["total"] == 2
+
+        fake.archive_page(gone)
+        created = await server.create_page({"Name": title("made here")}, "db")
+        fake.requests.clear()
+        result = await server.query_database("db", max_staleness=3600)
+        assert fake.requests == []
+        assert {p["id"] for p in result["pages"]} == {keep["id"], gone["id"], created["page_id"]}
+
+        result = await server.query_database("db", max_staleness=0)
+        assert result["sync"]["full"]
+        assert {p["id"] for p in result["pages"]} == {keep["id"], created["page_id"]}
+    run_with_server(scenario, tmp_path, replica_full_sync_seconds=0)
+
+
+def test_reconfiguring_closes_the_old_client_and_replica(tmp_path):
+    async def scenario():
+        fake = FakeNotionServer()
+        await fake.start()
+        fake.add_page("db", {"Name": title("x")})
+
+        def config(name):
+            return NotionConfig(integration_token=fake.token, base_url=fake.base_url, requests_per_second=100,
+                                replica_path=str(tmp_path / name))
+        server = NotionMCP()
+        try:
+            server.set_config(config("a.sqlite3"))
+            await server.query_database("db")
+            old_client, old_replica = server.client, server.replica
+            server.set_config(config("b.sqlite3"))
+            second = await server.query_database("db")
+            await server.close()
+        finally:
+            await fake.stop()
+        return server, old_client, old_replica, second
+
+    server, old_client, old_replica, second = asyncio.run(scenario())
+    assert second["success"] and second["source"] == "replica" and second["total"] == 1
+    assert server.client is None and server.replica is None
+    assert old_client._session is None
+    with pytest.raises(sqlite3.ProgrammingError):
+        old_replica.state("db")
@@ -0,0 +1,151 @@
+"""
+Tests for mcp-servers/page_cache.py and its use by the research server's scrape_url
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+from aiohttp import web
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "mcp-servers"))
+
+from page_cache import PageCache, ttl_from_headers
+from research_analysis_mcp_server import ResearchAnalysisMCP
+
+PAGE = {"success": True, "content": "Hello world " * 200, "links": [], "images": []}
+
+
+def test_store_lookup_and_url_normalization(tmp_path):
+    cache = PageCache(str(tmp_path), default_ttl=60)
+    cache.store("https://Example.com/a?b=2&a=1&utm_source=x#top", PAGE, etag='"v1"')
+    entry = cache.lookup("https://example.com/a?a=1&b=2")
+    assert entry is not None and entry.fresh
+    assert entry.page == PAGE
+    assert entry.conditional_headers() == {"If-None-Match": '"v1"'}
+    stats = cache.stats()
+    # Repetitive page text compresses well
+    assert stats["stored_bytes"] < stats["uncompressed_bytes"] / 5
+
+
+def test_identical_pages_share_one_blob(tmp_path):
+    cache = PageCache(str(tmp_path))
+    cache.store("https://a.example/", PAGE)
+    cache.store("https://b.example/mirror", PAGE)
+    assert len(list((tmp_path / "blobs").rglob("*.zz"))) == 1
+    cache.delete("https://a.example/")
+    assert cache.lookup("https://b.example/mirror").page == PAGE
+
+
+def test_lru_eviction_by_size(tmp_path):
+    cache = PageCache(str(tmp_path))
+    pages = [{"success": True, "content": f"page {i} " + "x" * 10000 + str(i * 7919)} for i in range(3)]
+    for i, page in enumerate(pages):
+        cache.store(f"https://example.com/{i}", page)
+        time.sleep(0.01)
+    cache.max_bytes = cache.stats()["stored_bytes"] - 1
+    asyncio.run(cache.get_or_fetch("https://example.com/0", None))  # touch page 0
+    cache.store("https://example.com/3", {"success": True, "content": "small"})
+    assert cache.lookup("https://example.com/1") is None
+    assert cache.lookup("https://example.com/0") is not None
+    assert cache.stats()["evictions"] >= 1
+
+
+def test_cache_control_ttl():
+    assert ttl_from_headers({"cache-control": "no-store"}, 900) is None
+    assert ttl_from_headers({"cache-control": "public, max-age=60"}, 900) == 60
+    assert ttl_from_headers({}, 900) == 900
+
+
+class Origin:
+    """HTML origin that honours If-None-Match"""
+
+    def __init__(self):
+        self.requests = []
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.requests.append(request.headers.get("If-None-Match"))
+        if request.headers.get("If-None-Match") == '"v1"':
+            return web.Response(status=304, headers={"ETag": '"v1"'})
+        html = "<html><head><title>Doc</title></head><body><p>Body text</p><a href='/next'>Next</a></body></html>"
+        return web.Response(text=html, content_type="text/html", headers={"ETag": '"v1"'})
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_get("/doc", self.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        self.url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}/doc"
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.runner.cleanup()
+
+
+def test_scrape_url_hits_then_revalidates(tmp_path):
+    async def scenario():
+        server = ResearchAnalysisMCP()
+        server.cache = PageCache(str(tmp_path), default_ttl=60)
+        async with Origin() as origin:
+            first = await server.scrape_url(origin.url)
+            second = await server.scrape_url(origin.url)
+            server.cache.refresh(origin.url, ttl=-1)  # force staleness
+            third = await server.scrape_url(origin.url)
+            stats = (await server.cache_stats())["cache"]
+        await server.session.close()
+        return origin, first, second, third, stats
+
+    origin, first, second, third, stats = asyncio.run(scenario())
+    assert [r["cache"] for r in (first, second, third)] == ["miss", "hit", "revalidated"]
+    assert first["title"] == "Doc" and "Body text" in first["content"]
+    assert first["links"][0]["href"] == origin.url.replace("/doc", "/next")
+    assert third["content"] == first["content"]
+    assert origin.requests == [None, '"v1"']
+    assert stats["hits"] == 1 and stats["revalidated"] == 1 and stats["bytes_saved"] > 0
+    assert stats["hit_rate"] == round(2 / 3, 4)
+
+
+def test_producers_do_not_share_page_schemas(tmp_path):
+    async def scenario():
+        crawl = PageCache(str(tmp_path), default_ttl=60, namespace="crawl4ai")
+        server = ResearchAnalysisMCP()
+        server.cache = PageCache(str(tmp_path), default_ttl=60, namespace="research")
+        async with Origin() as origin:
+            # Crawl4AI-shaped page: markdown content, no title, links grouped in a dict
+            crawl.store(origin.url, {"success": True, "content": "# Doc", "html": "<p>Doc</p>",
+                                     "links": {"internal": [], "external": []}, "images": []})
+            result = await server.scrape_url(origin.url)
+        await server.session.close()
+        return crawl, server.cache, result
+
+    crawl, research, result = asyncio.run(scenario())
+    assert result["success"] and result["cache"] == "miss"
+    assert result["title"] == "Doc" and isinstance(result["links"], list)
+    assert crawl.lookup(result["url"]).page["content"] == "# Doc"
+    # Counts are per producer; the blob store is shared
+    assert research.stats()["entries"] == 1 and crawl.stats()["entries"] == 1
+    assert research.stats()["uncompressed_bytes"] != crawl.stats()["uncompressed_bytes"]
+    assert research.stats()["stored_bytes"] == crawl.stats()["stored_bytes"]
+
+
+def test_entries_without_html_are_refetched(tmp_path):
+    async def scenario():
+        server = ResearchAnalysisMCP()
+        server.cache = PageCache(str(tmp_path), default_ttl=60, namespace="research")
+        async with Origin() as origin:
+            # Written before pages kept their HTML
+            server.cache.store(origin.url, {"success": True, "title": "Old", "content": "old", "links": [],
+                                            "images": []}, etag='"v1"')
+            result = await server.scrape_url(origin.url, {"fields": [{"name": "title", "selector": "title", "type": "text"}]})
+            again = await server.scrape_url(origin.url)
+        await server.session.close()
+        return origin, result, again
+
+    origin, result, again = asyncio.run(scenario())
+    assert result["cache"] == "miss" and result["extracted_data"] == {"title": "Doc"}
+    # Refetched without If-None-Match, since the stored copy cannot be reused
+    assert origin.requests == [None]
+    assert again["cache"] == "hit" and again["title"] == "Doc"
@@ -0,0 +1,97 @@
+"""
+Tests for mcp-servers/file_reader.py and SystemDevOpsMCP.read_file / stream_file
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "mcp-servers"))
+
+import file_reader
+from system_devops_mcp_server import SystemDevOpsMCP
+
+
+def _log(tmp_path, count=5000):
+    path = tmp_path / "app.log"
+    path.write_text("".join(f"{i} {'ERROR' if i % 1000 == 0 else 'info'} request {i}\n" for i in range(1, count + 1)))
+    return path
+
+
+def test_line_windows_use_sparse_index(tmp_path):
+    path = _log(tmp_path)
+    index = file_reader._line_index(str(path))
+    index.stride = 64
+
+    window = file_reader.read_lines(str(path), 4000, 3)
+    assert window["lines"] == ["4000 ERROR request 4000", "4001 info request 4001", "4002 info request 4002"]
+    assert window["next_line"] == 4003
+    assert len(index.offsets) == 4000 // 64 + 1
+
+    last = file_reader.read_lines(str(path), 4999, 10)
+    assert last["line_count"] == 2 and last["next_line"] is None
+    assert file_reader.read_lines(str(path), 6000, 10)["lines"] == []
+    assert file_reader.read_lines(str(path), 1, 10)["total_lines"] == 5000
+
+
+def test_tail_and_ranges(tmp_path):
+    path = _log(tmp_path)
+    assert file_reader.tail(str(path), 2)["lines"] == ["4999 info request 4999", "5000 ERROR request 5000"]
+
+    text = tmp_path / "blank.txt"
+    text.write_text("a\n\nb\n")
+    assert file_reader.tail(str(text), 2)["lines"] == ["", "b"]
+    assert file_reader.tail(str(text), 10)["lines"] == ["a", "", "b"]
+
+    unicode = tmp_path / "u.txt"
+    unicode.write_text("é" * 10, encoding="utf-8")
+    pieces, offset = [], 0
+    while offset is not None:
+        chunk = file_reader.read_range(str(unicode), offset, 5)
+        pieces.append(chunk["content"])
+        offset = chunk["next_offset"]
+    # Chunks end on character boundaries, so every piece decodes cleanly
+    assert "".join(pieces) == "é" * 10 and all(len(p.encode()) <= 5 for p in pieces)
+    assert file_reader.read_range(str(unicode), -4)["content"] == "éé"
+
+    empty = tmp_path / "empty.txt"
+    empty.write_text("")
+    assert file_reader.tail(str(empty))["lines"] == []
+    assert file_reader.read_range(str(empty))["eof"]
+
+
+def test_search_reports_line_numbers_and_context(tmp_path):
+    path = _log(tmp_path)
+    result = file_reader.search(str(path), r"ERROR request \d+$", context_lines=1)
+    assert [m["line_number"] for m in result["matches"]] == [1000, 2000, 3000, 4000, 5000]
+    assert result["matches"][0]["before"] == ["999 info request 999"]
+    assert result["matches"][-1]["after"] == []
+
+    limited = file_reader.search(str(path), "error", ignore_case=True, max_matches=2)
+    assert limited["match_count"] == 2 and limited["truncated"]
+
+
+def test_server_modes_and_streaming(tmp_path):
+    path = _log(tmp_path)
+
+    async def scenario():
+        server = SystemDevOpsMCP()
+        full = await server.read_file(str(path))
+        too_big = await server.read_file(str(path), max_size_mb=0)
+        tail = await server.read_file(str(path), mode="tail", max_lines=1)
+        search = await server.read_file(str(path), mode="search", pattern="5000 ERROR")
+        bad = await server.read_file(str(path), mode="search")
+        streamed = await server.stream_file(str(path), chunk_bytes=4096, max_bytes=10000)
+        rest = await server.stream_file(str(path), offset=streamed["next_offset"], chunk_bytes=1 << 20)
+        return full, too_big, tail, search, bad, streamed, rest
+
+    full, too_big, tail, search, bad, streamed, rest = asyncio.run(scenario())
+    assert full["content"] == path.read_text()
+    assert not too_big["success"] and "tail" in too_big["error"]
+    assert tail["lines"] == ["5000 ERROR request 5000"]
+    assert search["matches"][0]["line_number"] == 5000
+    assert not bad["success"]
+    assert streamed["bytes_sent"] == 10000 and not streamed["eof"]
+    assert rest["eof"]
+    content = "".join(c["content"] for c in streamed["chunks"] + rest["chunks"])
+    assert content == path.read_text()
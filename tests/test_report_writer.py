@@ -0,0 +1,62 @@
+"""
+Tests for mcp-servers/report_writer.py and generate_report
+"""
+
+import asyncio
+import csv
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "mcp-servers"))
+
+from report_writer import iter_report, render_report, write_report
+from research_analysis_mcp_server import ResearchAnalysisMCP
+
+FINDINGS = [
+    {"title": "Pricing", "detail": "Customers want annual plans", "tags": ["pricing", "plans"]},
+    {"title": "Support, \"tier 2\"", "score": 0.8},
+]
+
+
+def test_markdown_is_unchanged():
+    expected = "# Research Report\n\n"
+    for i, finding in enumerate(FINDINGS, 1):
+        expected += f"## Finding {i}\n"
+        for key, value in finding.items():
+            expected += f"- **{key.capitalize()}**: {value}\n"
+        expected += "\n"
+    assert render_report(FINDINGS, "markdown") == expected
+    # One piece per finding plus the header
+    assert len(list(iter_report(FINDINGS, "markdown"))) == 3
+
+
+def test_json_jsonl_and_csv_formats():
+    assert json.loads(render_report(FINDINGS, "json", generated_at=2.0)) == {
+        "report_type": "research_findings", "findings": FINDINGS, "generated_at": 2.0,
+    }
+    assert [json.loads(line) for line in render_report(FINDINGS, "jsonl").splitlines()] == FINDINGS
+    rows = list(csv.DictReader(render_report(FINDINGS, "csv").splitlines()))
+    assert list(rows[0]) == ["title", "detail", "tags", "score"]
+    assert json.loads(rows[0]["tags"]) == ["pricing", "plans"]
+    assert rows[1]["title"] == 'Support, "tier 2"' and rows[1]["detail"] == ""
+
+
+def test_write_report_streams_in_chunks(tmp_path):
+    findings = [{"n": i, "text": "x" * 100} for i in range(2000)]
+    path = tmp_path / "nested" / "report.jsonl"
+    written = write_report(findings, str(path), "jsonl", chunk_bytes=4096)
+    assert written["chunks"] > 10
+    assert written["bytes"] == path.stat().st_size
+    assert path.read_text() == render_report(findings, "jsonl")
+    assert not list(path.parent.glob("*.part"))
+
+
+def test_generate_report_to_file(tmp_path):
+    server = ResearchAnalysisMCP()
+    path = tmp_path / "report.csv"
+    response = asyncio.run(server.generate_report(FINDINGS, "csv", str(path)))
+    assert response["success"] and "content" not in response
+    assert response["output_path"] == str(path) and response["bytes"] == path.stat().st_size
+    inline = asyncio.run(server.generate_report(FINDINGS, "markdown"))
+    assert inline["content"].startswith("# Research Report")
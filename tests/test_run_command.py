@@ -0,0 +1,92 @@
+"""
+Tests for mcp-servers/command_runner.py and SystemDevOpsMCP.run_command
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "mcp-servers"))
+
+from command_runner import CommandRunner
+from system_devops_mcp_server import SystemDevOpsMCP
+
+PY = sys.executable
+
+
+def test_measures_wall_and_cpu_time():
+    async def scenario():
+        runner = CommandRunner()
+        busy = await runner.run(f"{PY} -c \"s=0\nfor i in range(3_000_000): s+=i\nprint(s)\"")
+        idle = await runner.run("sleep 0.3")
+        runner.close()
+        return busy, idle
+
+    busy, idle = asyncio.run(scenario())
+    assert busy["return_code"] == 0 and busy["stdout"].strip() == str(sum(range(3_000_000)))
+    assert busy["cpu_user_seconds"] > 0.05
+    assert 0.3 <= idle["execution_time_seconds"] < 2
+    assert idle["cpu_user_seconds"] + idle["cpu_system_seconds"] < 0.2
+
+
+def test_output_is_capped_and_streamed():
+    chunks = []
+
+    async def on_output(stream, chunk):
+        chunks.append((stream, len(chunk)))
+
+    async def scenario():
+        runner = CommandRunner(max_output_bytes=1000)
+        result = await runner.run(f"{PY} -c \"import sys; sys.stdout.write('x'*300000); sys.stderr.write('err')\"",
+                                  on_output=on_output)
+        runner.close()
+        return result
+
+    result = asyncio.run(scenario())
+    assert result["stdout"] == "x" * 1000
+    assert result["stdout_bytes"] == 300000 and result["stdout_truncated_bytes"] == 299000
+    assert result["stderr"] == "err" and result["stderr_truncated_bytes"] == 0
+    assert sum(n for stream, n in chunks if stream == "stdout") == 300000
+
+
+def test_timeout_kills_command_without_blocking_loop():
+    async def scenario():
+        server = SystemDevOpsMCP()
+        ticks = 0
+
+        async def heartbeat():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.05)
+                ticks += 1
+
+        beat = asyncio.ensure_future(heartbeat())
+        result = await server.run_command("sleep 30", timeout_seconds=0.5)
+        beat.cancel()
+        return result, ticks
+
+    result, ticks = asyncio.run(scenario())
+    assert not result["success"] and result["timed_out"]
+    assert "timed out after 0.5 seconds" in result["error"]
+    assert result["execution_time_seconds"] < 5
+    assert ticks >= 5
+
+
+def test_batch_runs_concurrently_and_keeps_order():
+    async def scenario():
+        server = SystemDevOpsMCP()
+        blocked = await server.run_command("echo hi; rm -rf /")
+        batch = await server.run_commands([{"command": "sleep 0.4"} for _ in range(4)]
+                                          + [{"command": "echo last"}, {"command": "exit 3"}])
+        return blocked, batch
+
+    started = time.perf_counter()
+    blocked, batch = asyncio.run(scenario())
+    assert not blocked["success"] and "Dangerous" in blocked["error"]
+    assert batch["count"] == 6
+    assert batch["results"][4]["stdout"] == "last\n"
+    assert batch["results"][5]["return_code"] == 3 and batch["results"][5]["success"]
+    # Four 0.4s sleeps in parallel, not 1.6s back to back
+    assert batch["execution_time_seconds"] < 1.4
+    assert time.perf_counter() - started < 5
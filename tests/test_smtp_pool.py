@@ -0,0 +1,234 @@
+"""
+Tests for mcp-servers/smtp_pool.py and EmailMCP.send_bulk against a local aiosmtpd server
+"""
+
+import asyncio
+import socket
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "mcp-servers"))
+
+pytest.importorskip("aiosmtpd")
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import AuthResult
+
+from email_mcp_server import EmailConfig, EmailMCP
+from rate_limit import TokenBucket
+from smtp_pool import SMTPPool
+
+
+class Recorder:
+    def __init__(self):
+        self.messages = []
+        self.sessions = 0
+        self.logins = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.sessions += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.endswith("@blocked.test"):
+            return "550 mailbox unavailable"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append((envelope.mail_from, list(envelope.rcpt_tos), envelope.content))
+        if b"Subject: drop" in envelope.content:
+            # Accept the message but lose the session before the reply reaches the client
+            server.transport.close()
+        return "250 Message accepted"
+
+
+def _authenticate(recorder):
+    def authenticator(server, session, envelope, mechanism, auth_data):
+        recorder.logins += 1
+        return AuthResult(success=auth_data.password == b"secret")
+    return authenticator
+
+
+@pytest.fixture
+def smtp_server():
+    def start(**server_kwargs):
+        recorder = Recorder()
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]
+        controller = Controller(recorder, hostname="127.0.0.1", port=port, authenticator=_authenticate(recorder),
+                                auth_require_tls=False, **server_kwargs)
+        controller.start()
+        started.append(controller)
+        return recorder, port
+
+    started = []
+    yield start
+    for controller in started:
+        controller.stop()
+
+
+def _pool(port, **kwargs):
+    return SMTPPool("127.0.0.1", port, username="bot@example.com", password="secret", starttls=False, **kwargs)
+
+
+def test_connections_are_reused_across_messages(smtp_server):
+    recorder, port = smtp_server()
+
+    async def scenario():
+        pool = _pool(port, size=2)
+        results = await pool.send_bulk(
+            [("bot@example.com", [f"user{i}@example.com"], f"Subject: {i}\r\n\r\nbody {i}\r\n") for i in range(20)])
+        stats = dict(pool.stats)
+        await pool.close()
+        return results, stats
+
+    results, stats = asyncio.run(scenario())
+    assert all(r["success"] for r in results)
+    assert [r["index"] for r in results] == list(range(20))
+    assert len(recorder.messages) == 20
+    # Two sessions for twenty messages, each authenticated once
+    assert stats["connections_opened"] == 2 and recorder.sessions == 2 and recorder.logins == 2
+
+
+def test_idle_and_dropped_sessions_are_reopened(smtp_server):
+    recorder, port = smtp_server(timeout=0.3)
+
+    async def scenario():
+        idle = _pool(port, size=1, idle_timeout=0.2)
+        await idle.send("bot@example.com", ["a@example.com"], b"Subject: 1\r\n\r\nx\r\n")
+        await asyncio.sleep(0.3)
+        await idle.send("bot@example.com", ["a@example.com"], b"Subject: 2\r\n\r\nx\r\n")
+
+        # The server times the session out while the pool still holds it
+        dropped = _pool(port, size=1, idle_timeout=60)
+        await dropped.send("bot@example.com", ["a@example.com"], b"Subject: 3\r\n\r\nx\r\n")
+        await asyncio.sleep(0.6)
+        retried = await dropped.send("bot@example.com", ["a@example.com"], b"Subject: 4\r\n\r\nx\r\n")
+        stats = (dict(idle.stats), dict(dropped.stats))
+        await idle.close()
+        await dropped.close()
+        return retried, stats
+
+    retried, (idle_stats, dropped_stats) = asyncio.run(scenario())
+    assert idle_stats["connections_opened"] == 2 and idle_stats["reconnects"] == 0
+    assert retried["success"]
+    assert dropped_stats["connections_opened"] == 2 and dropped_stats["reconnects"] == 1
+    assert len(recorder.messages) == 4
+
+
+def test_message_is_not_resent_after_its_payload_went_out(smtp_server):
+    recorder, port = smtp_server()
+
+    async def scenario():
+        pool = _pool(port, size=1)
+        await pool.send("bot@example.com", ["a@example.com"], b"Subject: 1\r\n\r\nx\r\n")
+        # The pooled session drops after DATA, so the server may already have the message
+        dropped = await pool.send("bot@example.com", ["a@example.com"], b"Subject: drop\r\n\r\nx\r\n")
+        after = await pool.send("bot@example.com", ["a@example.com"], b"Subject: 3\r\n\r\nx\r\n")
+        stats = dict(pool.stats)
+        await pool.close()
+        return dropped, after, stats
+
+    dropped, after, stats = asyncio.run(scenario())
+    assert not dropped["success"]
+    assert after["success"]
+    assert stats["reconnects"] == 0 and stats["failures"] == 1
+    assert sum(b"Subject: drop" in content for _, _, content in recorder.messages) == 1
+    assert len(recorder.messages) == 3
+
+
+def test_refused_recipients_and_rate_limit(smtp_server):
+    recorder, port = smtp_server()
+
+    async def scenario():
+        pool = _pool(port, size=4)
+        started = time.perf_counter()
+        results = await pool.send_bulk(
+            [("bot@example.com", ["ok@example.com", "x@blocked.test"], b"Subject: a\r\n\r\nx\r\n"),
+             ("bot@example.com", ["y@blocked.test"], b"Subject: b\r\n\r\nx\r\n")]
+            + [("bot@example.com", ["ok@example.com"], b"Subject: c\r\n\r\nx\r\n")] * 4,
+            rate_limit=TokenBucket(20, capacity=1))
+        elapsed = time.perf_counter() - started
+        await pool.close()
+        return results, elapsed
+
+    results, elapsed = asyncio.run(scenario())
+    assert results[0]["success"] and list(results[0]["refused"]) == ["x@blocked.test"]
+    assert not results[1]["success"] and "y@blocked.test" in results[1]["refused"]
+    # The session survives the rejected envelope and later messages still go through
+    assert all(r["success"] for r in results[2:])
+    # One token up front, then 20/s for the other five
+    assert elapsed >= 0.2
+
+
+def test_email_mcp_send_and_send_bulk(smtp_server):
+    recorder, port = smtp_server()
+
+    async def scenario():
+        server = EmailMCP()
+        server.set_config(EmailConfig(smtp_server="127.0.0.1", smtp_port=port, email_address="bot@example.com",
+                                      password="secret", imap_server="127.0.0.1", smtp_starttls=False))
+        single = await server.send_email(["a@example.com"], "Hello", "Body", bcc=["b@example.com"])
+        bulk = await server.send_bulk(
+            [{"to": [f"u{i}@example.com"], "subject": f"News {i}", "body": "Hi"} for i in range(10)],
+            concurrency=3)
+        await server.smtp_pool.close()
+        return single, bulk
+
+    single, bulk = asyncio.run(scenario())
+    assert single["success"] and single["refused"] == {}
+    assert bulk["success"] and bulk["sent"] == 10
+    assert bulk["pool"]["connections_opened"] <= 3
+    assert recorder.messages[0][1] == ["a@example.com", "b@example.com"]
+    assert any(b"Subject: News 9" in content for _, _, content in recorder.messages)
+
+
+def test_send_bulk_reports_unbuildable_messages_individually(smtp_server, tmp_path):
+    recorder, port = smtp_server()
+
+    async def scenario():
+        server = EmailMCP()
+        server.set_config(EmailConfig(smtp_server="127.0.0.1", smtp_port=port, email_address="bot@example.com",
+                                      password="secret", imap_server="127.0.0.1", smtp_starttls=False))
+        bulk = await server.send_bulk([
+            {"to": ["a@example.com"], "subject": "One", "body": "Hi"},
+            {"to": ["b@example.com"], "subject": "Two", "body": "Hi", "attachments": [str(tmp_path / "missing.pdf")]},
+            {"to": ["c@example.com"], "subject": "Three", "body": "Hi"},
+        ])
+        await server.close()
+        return bulk
+
+    bulk = asyncio.run(scenario())
+    assert not bulk["success"] and bulk["sent"] == 2 and bulk["failed"] == 1
+    assert [r["index"] for r in bulk["results"]] == [0, 1, 2]
+    assert [r["success"] for r in bulk["results"]] == [True, False, True]
+    assert "missing.pdf" in bulk["results"][1]["error"]
+    assert sorted(rcpts for _, rcpts, _ in recorder.messages) == [["a@example.com"], ["c@example.com"]]
+
+
+def test_reconfiguring_closes_the_old_pool(smtp_server):
+    recorder, port = smtp_server()
+
+    async def scenario():
+        server = EmailMCP()
+        config = EmailConfig(smtp_server="127.0.0.1", smtp_port=port, email_address="bot@example.com",
+                             password="secret", imap_server="127.0.0.1", smtp_starttls=False)
+        server.set_config(config)
+        await server.send_email(["a@example.com"], "One", "Body")
+        old_pool = server.smtp_pool
+        server.set_config(config)
+        await server.send_email(["a@example.com"], "Two", "Body")
+        new_pool = server.smtp_pool
+        await server.close()
+        return old_pool, new_pool
+
+    old_pool, new_pool = asyncio.run(scenario())
+    assert old_pool is not new_pool
+    assert old_pool.idle_connections() == 0 and old_pool._executor._shutdown
+    assert new_pool.idle_connections() == 0 and new_pool._executor._shutdown
+    assert len(recorder.messages) == 2
@@ -0,0 +1,74 @@
+"""
+Tests for mcp-servers/stats_sampler.py, SystemDevOpsMCP.get_system_stats and the CLI's stats
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "mcp-servers"))
+sys.path.insert(0, str(Path(__file__).parent.parent / "cli_tools"))
+
+from stats_sampler import StatsSampler
+from system_devops_mcp_server import SystemDevOpsMCP
+
+
+def test_samples_fill_ring_buffer_and_compute_rates():
+    sampler = StatsSampler(interval=0.01, history=3)
+    for _ in range(5):
+        time.sleep(0.02)
+        sampler.sample()
+    assert len(sampler.samples) == 3
+    latest = sampler.latest()
+    assert 0.0 <= latest["cpu"]["percent"] <= 100.0
+    rates = sampler.rates(60)
+    assert rates["window_seconds"] > 0
+    assert rates["net_bytes_recv_per_sec"] >= 0
+    assert [point["timestamp"] for point in sampler.series(60)] == [s["timestamp"] for s in sampler.samples]
+
+
+def test_rates_need_two_samples():
+    sampler = StatsSampler()
+    assert sampler.rates() is None
+    sampler.sample()
+    assert sampler.rates() is None
+
+
+def test_get_system_stats_does_not_block_the_loop():
+    async def scenario():
+        server = SystemDevOpsMCP()
+        server.sampler.interval = 0.05
+        started = time.perf_counter()
+        first = await server.get_system_stats(network=True)
+        first_latency = time.perf_counter() - started
+
+        await asyncio.sleep(0.3)
+        started = time.perf_counter()
+        later = await server.get_system_stats(history_seconds=60)
+        later_latency = time.perf_counter() - started
+        await server.sampler.stop()
+        return first, first_latency, later, later_latency
+
+    first, first_latency, later, later_latency = asyncio.run(scenario())
+    assert first["success"] and later["success"]
+    # The old implementation slept a full second in cpu_percent(interval=1)
+    assert first_latency < 0.5 and later_latency < 0.5
+    assert set(first["stats"]) >= {"cpu", "memory", "disk", "network"}
+    assert later["stats"]["sample_age_seconds"] < 0.2
+    assert later["stats"]["rates"]["window_seconds"] > 0
+    assert len(later["stats"]["series"]) >= 3
+
+
+def test_cli_stats_come_from_the_shared_sampler(tmp_path, monkeypatch):
+    # The CLI tool writes its allowlist under the working directory
+    monkeypatch.chdir(tmp_path)
+    from python_cli_tool import OpenClawCLITool
+
+    cli = OpenClawCLITool()
+    first = cli.get_system_stats()
+    second = cli.get_system_stats()
+    assert isinstance(cli._stats_sampler, StatsSampler)
+    assert first["success"] and second["success"]
+    assert 0.0 <= first["stats"]["cpu"]["percent"] <= 100.0
+    assert first["stats"]["memory"]["total_gb"] > 0 and first["stats"]["disk"]["total_gb"] > 0
@@ -0,0 +1,65 @@
+"""
+Tests for mcp-servers/text_analysis.py and ResearchAnalysisMCP.analyze_batch
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "mcp-servers"))
+
+from research_analysis_mcp_server import ResearchAnalysisMCP
+from text_analysis import BatchAnalyzer, PhraseMatcher, TextAnalyzer
+
+TYPES = ["summarize", "sentiment", "entities"]
+
+
+def test_phrase_matcher_prefers_longest_whole_word_matches():
+    matcher = PhraseMatcher({"good": 1, "Not Good": -1, "state of the art": 2, "art": 5})
+    text = "this is not  good but state of the art is good art, not goodness"
+    assert [(phrase, payload) for _, phrase, payload in matcher.matches(text)] == [
+        ("not good", -1), ("state of the art", 2), ("good", 1), ("art", 5),
+    ]
+
+
+def test_matcher_backtracks_to_shorter_phrase():
+    matcher = PhraseMatcher({"a b c": "abc", "b c d": "bcd", "b": "b"})
+    assert [payload for _, _, payload in matcher.matches("a b x b c d b c")] == ["b", "bcd", "b"]
+    assert PhraseMatcher({}).matches("anything") == []
+
+
+def test_analyzer_matches_original_output_shape():
+    text = "The launch was great. Support was excellent. Pricing is bad. Email a@b.com or 555-123-4567."
+    results = TextAnalyzer().analyze(text, TYPES)
+    assert results["summary"] == "The launch was great.  Support was excellent.  Pricing is bad."
+    assert results["sentiment"] == "positive"
+    assert results["sentiment_score"] == {"score": 1.0, "positive_hits": 2, "negative_hits": 1}
+    assert results["entities"] == {"emails": ["a@b.com"], "phones": ["555-123-4567"]}
+
+
+def test_negation_and_word_boundaries():
+    analyzer = TextAnalyzer()
+    assert analyzer.analyze("The food was not good", ["sentiment"])["sentiment"] == "negative"
+    # Substrings no longer count: "badge" is not "bad"
+    assert analyzer.analyze("Wear your badge", ["sentiment"])["sentiment"] == "neutral"
+
+
+def test_batch_results_keep_input_order_across_processes():
+    async def scenario():
+        batch = BatchAnalyzer(max_workers=2, parallel_min_chars=0)
+        try:
+            texts = [f"Doc {i} is {'great' if i % 2 else 'awful'}." for i in range(40)]
+            return await batch.analyze(texts, ["sentiment", "summarize"])
+        finally:
+            batch.close()
+
+    results = asyncio.run(scenario())
+    assert [r["sentiment"] for r in results] == ["negative", "positive"] * 20
+    assert results[7]["summary"].startswith("Doc 7 ")
+
+
+def test_analyze_batch_tool():
+    server = ResearchAnalysisMCP()
+    response = asyncio.run(server.analyze_batch(["good", "bad", "meh"], ["sentiment"]))
+    assert response["success"] and response["document_count"] == 3
+    assert [r["sentiment"] for r in response["results"]] == ["positive", "negative", "neutral"]